@@ -8,11 +8,14 @@ from app.database import Base
 from app.models.company import Company
 from app.models.financial_report import FinancialReport  # Импортируем модель для миграций
 from app.models.mass_parse import MassParseJob, MassParseItem  # noqa: F401
+from app.models.background_task import BackgroundTask  # noqa: F401
 from app.models.disclosure import (  # noqa: F401
     DisclosureSyncRun,
     DisclosurePeriod,
     DisclosureParseJob,
     DisclosureParseItem,
+    DisclosureDownloadJob,
+    DisclosureDownloadItem,
 )
 from app.config import settings
 
@@ -0,0 +1,42 @@
+"""disclosure_periods: частичные индексы под режимы missing / expected
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "a0b1c2d3e4f5"
+down_revision = "f9a0b1c2d3e4"
+branch_labels = None
+depends_on = None
+
+_ORDER = ["ticker", sa.text("fiscal_year DESC"), "period_type"]
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_disclosure_periods_missing",
+        "disclosure_periods",
+        _ORDER,
+        postgresql_where=sa.text(
+            "on_edisclosure AND NOT in_db "
+            "AND (period_type = 'annual' OR is_latest_interim)"
+        ),
+    )
+    op.create_index(
+        "ix_disclosure_periods_expected",
+        "disclosure_periods",
+        _ORDER,
+        postgresql_where=sa.text("expectation = 'expected'"),
+    )
+    op.create_index("ix_disclosure_periods_listing", "disclosure_periods", _ORDER)
+    # Равенство по ticker покрывает ведущая колонка listing-индекса.
+    op.drop_index("ix_disclosure_periods_ticker", table_name="disclosure_periods")
+
+
+def downgrade() -> None:
+    op.create_index("ix_disclosure_periods_ticker", "disclosure_periods", ["ticker"])
+    op.drop_index("ix_disclosure_periods_listing", table_name="disclosure_periods")
+    op.drop_index("ix_disclosure_periods_expected", table_name="disclosure_periods")
+    op.drop_index("ix_disclosure_periods_missing", table_name="disclosure_periods")
@@ -0,0 +1,55 @@
+"""disclosure_download_jobs, disclosure_download_items: скачивание PDF задачей воркера
+
+Revision ID: a6b7c8d9e0f1
+Revises: f5a6b7c8d9e0
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "a6b7c8d9e0f1"
+down_revision = "f5a6b7c8d9e0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "disclosure_download_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(length=32), nullable=False, server_default="pending"),
+        sa.Column("total_items", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("done_ok", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("done_error", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_message", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    op.create_table(
+        "disclosure_download_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "job_id",
+            sa.Integer(),
+            sa.ForeignKey("disclosure_download_jobs.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("disclosure_period_id", sa.Integer(), nullable=False),
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False, server_default="queued"),
+        sa.Column("bytes_done", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("bytes_total", sa.BigInteger(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("pdf_path", sa.String(length=2048), nullable=True),
+    )
+    op.create_index(
+        "ix_disclosure_download_items_job_id", "disclosure_download_items", ["job_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_disclosure_download_items_job_id", table_name="disclosure_download_items")
+    op.drop_table("disclosure_download_items")
+    op.drop_table("disclosure_download_jobs")
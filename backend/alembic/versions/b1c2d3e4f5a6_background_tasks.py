@@ -0,0 +1,60 @@
+"""background_tasks: очередь фоновых задач для процесса app.worker
+
+Revision ID: b1c2d3e4f5a6
+Revises: a0b1c2d3e4f5
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "b1c2d3e4f5a6"
+down_revision = "a0b1c2d3e4f5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "background_tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("queue", sa.String(length=32), nullable=False),
+        sa.Column("kind", sa.String(length=64), nullable=False),
+        sa.Column(
+            "payload",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+            server_default=sa.text("'{}'::jsonb"),
+        ),
+        sa.Column("dedupe_key", sa.String(length=128), nullable=True),
+        sa.Column("priority", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"),
+        sa.Column("run_after", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_by", sa.String(length=128), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_background_tasks_claim",
+        "background_tasks",
+        ["queue", "status", sa.text("priority DESC"), "id"],
+    )
+    op.create_index(
+        "uq_background_tasks_active_key",
+        "background_tasks",
+        ["dedupe_key"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_background_tasks_active_key", table_name="background_tasks")
+    op.drop_index("ix_background_tasks_claim", table_name="background_tasks")
+    op.drop_table("background_tasks")
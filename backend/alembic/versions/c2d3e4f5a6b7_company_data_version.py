@@ -0,0 +1,23 @@
+"""companies.data_version: версия данных компании для кэша ответов API
+
+Revision ID: c2d3e4f5a6b7
+Revises: b1c2d3e4f5a6
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "c2d3e4f5a6b7"
+down_revision = "b1c2d3e4f5a6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "companies",
+        sa.Column("data_version", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("companies", "data_version")
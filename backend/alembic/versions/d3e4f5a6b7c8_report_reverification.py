@@ -0,0 +1,97 @@
+"""reverification_runs, report_scorecards, report_field_scores: перепроверка отчётов по PDF
+
+Revision ID: d3e4f5a6b7c8
+Revises: c2d3e4f5a6b7
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "d3e4f5a6b7c8"
+down_revision = "c2d3e4f5a6b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reverification_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(length=32), nullable=False, server_default="pending"),
+        sa.Column("extractor_version", sa.String(length=128), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=True),
+        sa.Column("concurrency", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("total_items", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("done_ok", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("done_skipped", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("done_error", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_message", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_reverification_runs_status", "reverification_runs", ["status"])
+
+    op.create_table(
+        "report_scorecards",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "report_id",
+            sa.Integer(),
+            sa.ForeignKey("financial_reports.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=True),
+        sa.Column("extractor_version", sa.String(length=128), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("pdf_fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="ok"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("total_fields", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("matched", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("close", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("mismatched", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("missing_in_ai", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("missing_in_existing", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("max_pct_diff", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint(
+            "report_id", "extractor_version", name="uq_report_scorecards_report_version"
+        ),
+    )
+    op.create_index("ix_report_scorecards_report_id", "report_scorecards", ["report_id"])
+    op.create_index("ix_report_scorecards_company_id", "report_scorecards", ["company_id"])
+    op.create_index(
+        "ix_report_scorecards_extractor_version", "report_scorecards", ["extractor_version"]
+    )
+
+    op.create_table(
+        "report_field_scores",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "scorecard_id",
+            sa.Integer(),
+            sa.ForeignKey("report_scorecards.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("field", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("pct_diff", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_report_field_scores_scorecard_id", "report_field_scores", ["scorecard_id"])
+    op.create_index("ix_report_field_scores_field", "report_field_scores", ["field"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_report_field_scores_field", table_name="report_field_scores")
+    op.drop_index("ix_report_field_scores_scorecard_id", table_name="report_field_scores")
+    op.drop_table("report_field_scores")
+    op.drop_index("ix_report_scorecards_extractor_version", table_name="report_scorecards")
+    op.drop_index("ix_report_scorecards_company_id", table_name="report_scorecards")
+    op.drop_index("ix_report_scorecards_report_id", table_name="report_scorecards")
+    op.drop_table("report_scorecards")
+    op.drop_index("ix_reverification_runs_status", table_name="reverification_runs")
+    op.drop_table("reverification_runs")
@@ -0,0 +1,23 @@
+"""companies.brand_checked_at: когда бренд в последний раз спрашивали у ShareBy
+
+Revision ID: e4f5a6b7c8d9
+Revises: d3e4f5a6b7c8
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "e4f5a6b7c8d9"
+down_revision = "d3e4f5a6b7c8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "companies",
+        sa.Column("brand_checked_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("companies", "brand_checked_at")
@@ -0,0 +1,50 @@
+"""dividend_facts: дивиденды по годам для скринов; companies.dividend_facts_version
+
+Revision ID: f5a6b7c8d9e0
+Revises: e4f5a6b7c8d9
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "f5a6b7c8d9e0"
+down_revision = "e4f5a6b7c8d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dividend_facts",
+        sa.Column(
+            "company_id",
+            sa.Integer(),
+            sa.ForeignKey("companies.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("year", sa.Integer(), primary_key=True),
+        sa.Column(
+            "report_id",
+            sa.Integer(),
+            sa.ForeignKey("financial_reports.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("report_date", sa.Date(), nullable=False),
+        sa.Column("dividends_per_share", sa.Numeric(14, 6), nullable=True),
+        sa.Column("special_dividends_per_share", sa.Numeric(14, 6), nullable=True),
+        sa.Column("price_per_share", sa.Numeric(18, 6), nullable=True),
+        sa.Column("dividend_yield", sa.Float(), nullable=True),
+        sa.Column("regular_dividend_yield", sa.Float(), nullable=True),
+        sa.Column("payout_ratio", sa.Float(), nullable=True),
+        sa.Column("streak", sa.Integer(), nullable=False),
+        sa.Column("gap_before", sa.Integer(), nullable=True),
+    )
+    # NULL — таблица для компании ещё не считалась: первый скрин заполнит её целиком.
+    op.add_column(
+        "companies",
+        sa.Column("dividend_facts_version", sa.BigInteger(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("companies", "dividend_facts_version")
+    op.drop_table("dividend_facts")
@@ -0,0 +1,28 @@
+"""mass_parse_jobs: batch-режим (llm_mode, llm_batch_id)
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "f9a0b1c2d3e4"
+down_revision = "e8f9a0b1c2d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "mass_parse_jobs",
+        sa.Column("llm_mode", sa.String(16), nullable=False, server_default="sync"),
+    )
+    op.add_column(
+        "mass_parse_jobs",
+        sa.Column("llm_batch_id", sa.String(128), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("mass_parse_jobs", "llm_batch_id")
+    op.drop_column("mass_parse_jobs", "llm_mode")
@@ -22,12 +22,37 @@ class Settings(BaseSettings):
     # Печатать каждый SQL-запрос (SQLAlchemy echo). Для отладки конкретного
     # запроса; в обычной работе и на демо — выключено.
     SQL_ECHO: bool = False
+    # Пулы соединений на процесс. Синхронный — воркер и пишущие эндпоинты,
+    # async (asyncpg) — читающие эндпоинты API. Сумма по всем процессам
+    # должна укладываться в max_connections Postgres (по умолчанию 100).
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_ASYNC_POOL_SIZE: int = 20
+    DB_ASYNC_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
     # Tinkoff Invest API
     TINKOFF_TOKEN: str = "your_token_here"
+    # Синхронизация компаний: бренд (логотип, цвет), которого нет в списке
+    # Shares, догружается ShareBy — не больше стольких запросов одновременно
+    # и не чаще раза в TINKOFF_BRAND_TTL_DAYS на бумагу (логотипы меняются редко).
+    TINKOFF_BRAND_WORKERS: int = 8
+    TINKOFF_BRAND_TTL_DAYS: int = 30
+    # Поток последних цен (app/services/market/live_feed.py, SSE GET /market/live):
+    # подписка живёт в процессе API, поэтому включать её надо в одном процессе —
+    # у каждого был бы свой стрим и свой лимит подписок. Сделки склеиваются и
+    # рассылаются раз в FLUSH секунд; раз в REFRESH секунд сверяется
+    # data_version компаний, и знаменатели мультипликаторов перечитываются.
+    TINVEST_STREAM_ENABLED: bool = False
+    TINVEST_STREAM_URL: str = (
+        "wss://invest-public-api.tinkoff.ru/ws/"
+        "tinkoff.public.invest.api.contract.v1.MarketDataStreamService/MarketDataStream"
+    )
+    TINVEST_STREAM_FLUSH_SECONDS: float = 1.0
+    TINVEST_STREAM_REFRESH_SECONDS: float = 60.0
 
     # Дополнительные корневые сертификаты (PEM) — склеиваются с certifi.
     # Нужны, когда сервер отдаёт цепочку от УЦ, которого нет в стандартном
@@ -56,9 +81,86 @@ class Settings(BaseSettings):
     LLM_VISION_MODEL: str = ""
     LLM_TEMPERATURE: float = 0.0
     LLM_REQUEST_TIMEOUT: int = 600
+    # Бюджет токенов на текст страниц PDF в одном запросе. 0 — старый режим
+    # (лимит по числу страниц). ~30000 держит промпт предсказуемым по размеру
+    # и не упирается в TPM при массовом парсинге.
+    LLM_PAGE_TOKEN_BUDGET: int = 0
+    # Извлекать отчёт параллельными запросами по разделам (баланс, ОПиУ, ОДДС,
+    # дивиденды) вместо одного большого. Быстрее по времени, но дороже по RPM.
+    LLM_SECTION_MODE: bool = False
+    # Текстовые PDF: баланс, ОПиУ и ОДДС читаются из таблиц по координатам слов
+    # (table_extractor), LLM дозапрашивает только поля, не найденные уверенно.
+    LLM_TABLE_FAST_PATH: bool = True
+    # Годовой текстовый PDF: колонка прошлого года из тех же таблиц — черновик
+    # отчёта за год назад, если его нет, или сверка с ним (пересчёты), если есть.
+    LLM_HARVEST_COMPARATIVES: bool = True
+    # Пул HTTP-соединений общего LLM-клиента (keep-alive между запросами).
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 120.0
+    # Async API: через сколько секунд без ответа слать дубликат запроса.
+    # 0 — без хеджирования (каждый дубликат — лишние токены).
+    LLM_HEDGE_AFTER_SECONDS: float = 0.0
 
     # Корень массового парсинга: подкаталоги = тикеры, внутри *.pdf
     MASS_PARSE_REPORTS_DIR: str = "/home/devops/Reports"
+    # Batch-режим массового парсинга: запросов в одном батче и период опроса
+    # статуса батча у провайдера, сек.
+    MASS_PARSE_BATCH_SIZE: int = 500
+    MASS_PARSE_BATCH_POLL_SECONDS: int = 60
+    # Перепроверка отчётов по исходным PDF (app/services/reverification):
+    # сколько отчётов сверять одновременно. Упирается в RPM/TPM провайдера.
+    REVERIFY_CONCURRENCY: int = 4
+
+    # ─── Фоновые задачи (таблица background_tasks, процесс `python -m app.worker`) ───
+    # Очереди и их лимит параллельности — общий на все процессы воркера.
+    # disclosure=2: sync listing и разбор PDF не ждут друг друга.
+    # analysis — пересборка истории мультипликаторов после импорта отчётов.
+    TASK_QUEUES: str = "mass_parse=1,disclosure=2,market=1,analysis=2"
+    # Аренда задачи: heartbeat продлевает её каждую треть срока; задачу
+    # упавшего воркера другой заберёт не раньше, чем через этот срок.
+    TASK_LEASE_SECONDS: int = 120
+    TASK_POLL_SECONDS: float = 2.0
+    # Запускать воркер и планировщик прямо в процессе API — для локальной
+    # разработки одной командой. В проде — отдельный `python -m app.worker`.
+    TASK_WORKER_IN_API: bool = False
+    # GET /multipliers/history с пустой историей ставит пересборку и ждёт её
+    # столько секунд; не успела — 202 и Retry-After, клиент повторит запрос.
+    MULTIPLIER_REBUILD_WAIT_SECONDS: float = 3.0
+    # События о ходе задач для SSE (app/services/events): сколько последних
+    # событий каждой темы помнить для переподключения по Last-Event-ID.
+    JOB_EVENTS_BUFFER: int = 500
+    # На Postgres воркер дублирует события в NOTIFY job_events, API их слушает —
+    # так события доходят до SSE, когда воркер — отдельный процесс.
+    JOB_EVENTS_PG_NOTIFY: bool = True
+    # Модули разбора PDF и LLM (PyMuPDF, openai) API грузит лениво, при первом
+    # разборе. Разогрев подгружает их в фоне через столько секунд после старта,
+    # чтобы первый загруженный PDF не ждал импорта.
+    PREWARM_PARSER_IMPORTS: bool = True
+    PREWARM_PARSER_DELAY_SECONDS: float = 5.0
+
+    # ─── Кэш ответов карточки компании (app/routers/response_cache.py) ───
+    # Ключ — версия данных компании (companies.data_version), поэтому
+    # срок жизни в LRU не нужен: устаревшая версия просто не запрашивается.
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+    # Общий кэш в Redis (REDIS_URL) — между воркерами uvicorn и после
+    # рестарта. TTL ограничивает жизнь ответов старой версии кода после деплоя.
+    RESPONSE_CACHE_SHARED: bool = False
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    # Ряды дневных цен для графиков (app/services/market/price_series.py):
+    # сколько компаний держать в памяти процесса. 15 лет — ~60 КБ на компанию.
+    PRICE_SERIES_CACHE_MAX_COMPANIES: int = 256
+
+    # ─── Выгрузка таблиц (app/services/export, GET /export/{table}) ───
+    # Строк в пачке серверного курсора: столько держится в памяти и столько
+    # строк в одной row group Parquet / record batch Arrow.
+    EXPORT_BATCH_SIZE: int = 5000
+
+    # ─── Бэктест скринов (app/services/backtest, POST /backtest) ───
+    # Сколько результатов держать в памяти процесса; ключ — параметры и
+    # сумма data_version компаний. Результат за 10 лет — ~100 КБ.
+    BACKTEST_CACHE_MAX_ENTRIES: int = 32
 
     @property
     def llm_configured(self) -> bool:
@@ -1,14 +1,24 @@
+from functools import lru_cache
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+# Синхронный движок — воркер (задачи, парсинг, синхронизации), Alembic и
+# эндпоинты, которые пишут. Пул задан явно: по умолчанию 5+10 соединений,
+# а FastAPI гоняет sync-эндпоинты в тредпуле на 40 потоков.
 engine = create_engine(
     settings.database_url,
     # Лог каждого SQL-запроса. По умолчанию выключен: на публичном демо он
     # засоряет вывод и утаскивает в логи содержимое отчётов. Включается через
     # SQL_ECHO=true в .env, когда нужно отладить конкретный запрос.
     echo=settings.SQL_ECHO,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,3 +32,54 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ─── Асинхронный слой (asyncpg) для читающих эндпоинтов ─────────────────────
+# Горячие GET (списки компаний и отчётов, история мультипликаторов, покрытие
+# e-disclosure) не занимают поток тредпула на время ожидания БД: запросы идут
+# в event loop API. Движок создаётся лениво — воркер и тесты на SQLite
+# импортируют этот модуль без asyncpg.
+
+
+def async_database_url(url: str) -> str:
+    """URL синхронного движка → тот же адрес с async-драйвером."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    raise ValueError(f"Нет async-драйвера для {backend}")
+
+
+@lru_cache(maxsize=1)
+def get_async_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(
+        async_database_url(settings.database_url),
+        echo=settings.SQL_ECHO,
+        pool_size=settings.DB_ASYNC_POOL_SIZE,
+        max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    # expire_on_commit=False: ответ сериализуется после выхода из сессии,
+    # а ленивой подгрузки атрибутов в async нет.
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """Async-сессия БД (dependency для FastAPI) — только для чтения."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """Закрыть пул async-движка при остановке API (если он создавался)."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
@@ -1,22 +1,114 @@
+import asyncio
+import importlib
+import logging
+import sys
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional
 
 from app.routers import companies_router, securities_router, reports_router, dividends_router
 from app.routers import multipliers_router, market_router, bonds_router, admin_router
 from app.routers import mass_parse_router, disclosure_router, holdings_router
-from app.scheduler import start_scheduler, stop_scheduler
-from app.services.mass_parse.worker import recover_orphaned_running_jobs
+from app.routers import reverification_router, export_router, backtest_router
+from app.config import settings
+from app.database import dispose_async_engine, engine
+from app.services.events import listener as job_events_listener
+
+logger = logging.getLogger(__name__)
+
+# Модули разбора PDF и клиента LLM грузятся при первом обращении (см.
+# services/report_parser/__init__.py); разогрев подгружает их после старта.
+_PARSER_MODULES = (
+    "app.services.report_parser.extractor_service",
+    "app.services.report_parser.llm_client",
+)
+
+_warmup: Optional[asyncio.Task] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Запускает планировщик при старте и останавливает при завершении."""
-    recover_orphaned_running_jobs()
-    start_scheduler()
+    """Фоновые задачи выполняет отдельный процесс `python -m app.worker`.
+
+    TASK_WORKER_IN_API=true запускает тот же воркер потоком внутри API —
+    чтобы локально хватало одной команды uvicorn.
+
+    TINVEST_STREAM_ENABLED=true подписывает процесс на поток цен T-Invest
+    (SSE GET /market/live) — он живёт в event loop API, а не в воркере.
+
+    На Postgres API слушает NOTIFY воркера (JOB_EVENTS_PG_NOTIFY) и раздаёт
+    ход задач через SSE …/events.
+
+    Всё, без чего API уже может отвечать (поток цен, разогрев импортов
+    парсера), идёт фоновой задачей `_warm_up` — старт её не ждёт.
+    """
+    global _warmup
+    if settings.JOB_EVENTS_PG_NOTIFY:
+        job_events_listener.start_listener(engine)
+    _warmup = asyncio.create_task(_warm_up(), name="startup-warmup")
+    if not settings.TASK_WORKER_IN_API:
+        yield
+        await _shutdown()
+        return
+    import threading
+
+    from app.worker import run as run_worker
+
+    stop = threading.Event()
+    thread = threading.Thread(target=run_worker, args=(stop,), name="task-worker", daemon=True)
+    thread.start()
     yield
-    stop_scheduler()
+    stop.set()
+    thread.join(timeout=10)
+    await _shutdown()
+
+
+async def _warm_up() -> None:
+    try:
+        if settings.TINVEST_STREAM_ENABLED:
+            from app.services.market import live_feed
+
+            await live_feed.start_feed()
+        if settings.PREWARM_PARSER_IMPORTS:
+            # Пауза — чтобы первые запросы после старта не делили GIL с импортом.
+            await asyncio.sleep(settings.PREWARM_PARSER_DELAY_SECONDS)
+            await asyncio.to_thread(_import_parser)
+    except Exception:
+        logger.exception("Разогрев при старте не удался")
+        raise
+
+
+def _import_parser() -> None:
+    for name in _PARSER_MODULES:
+        importlib.import_module(name)
+
+
+def _warmup_state() -> str:
+    if _warmup is None or not _warmup.done():
+        return "pending"
+    if _warmup.cancelled() or _warmup.exception() is not None:
+        return "failed"
+    return "done"
+
+
+async def _shutdown() -> None:
+    if _warmup is not None:
+        _warmup.cancel()
+        await asyncio.gather(_warmup, return_exceptions=True)
+    job_events_listener.stop_listener()
+    if settings.TINVEST_STREAM_ENABLED:
+        from app.services.market import live_feed
+
+        await live_feed.stop_feed()
+    # Клиент LLM загружается лениво — закрываем его пулы, только если он был.
+    llm_client = sys.modules.get("app.services.report_parser.llm_client")
+    if llm_client is not None:
+        await llm_client.areset_clients()
+    await dispose_async_engine()
 
 
 app = FastAPI(title='Graham Analyzer', lifespan=lifespan)
@@ -40,8 +132,30 @@ app.include_router(admin_router.router)
 app.include_router(mass_parse_router.router)
 app.include_router(disclosure_router.router)
 app.include_router(holdings_router.router)
+app.include_router(reverification_router.router)
+app.include_router(export_router.router)
+app.include_router(backtest_router.router)
 
 
 @app.get('/health')
+@app.get('/health/live')
 def health_check():
+    """Liveness: процесс жив и отвечает. Зависимости не проверяются —
+    перезапуск API не починит упавшую БД."""
     return {'status': 'ok'}
+
+
+@app.get('/health/ready')
+def readiness_check():
+    """Readiness: можно ли слать запросы — БД отвечает на SELECT 1.
+
+    Фоновый разогрев (`warmup`) на готовность не влияет: без потока цен и с
+    холодным парсером API работает, просто первый разбор PDF медленнее.
+    """
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        logger.warning("Readiness: БД недоступна: %s", e)
+        return JSONResponse(status_code=503, content={'status': 'unavailable', 'database': 'error'})
+    return {'status': 'ok', 'database': 'ok', 'warmup': _warmup_state()}
@@ -1,19 +1,25 @@
 from app.models.company import Company
+from app.models.dividend_fact import DividendFact
 from app.models.financial_report import FinancialReport
 from app.models.holding_stake import HoldingStake
 from app.models.key_rate import KeyRate
 from app.models.stock_price import StockPrice
 from app.models.multiplier import Multiplier
 from app.models.mass_parse import MassParseJob, MassParseItem
+from app.models.background_task import BackgroundTask
+from app.models.reverification import ReverificationRun, ReportScorecard, ReportFieldScore
 from app.models.disclosure import (
     DisclosureSyncRun,
     DisclosurePeriod,
     DisclosureParseJob,
     DisclosureParseItem,
+    DisclosureDownloadJob,
+    DisclosureDownloadItem,
 )
 
 __all__ = [
     "Company",
+    "DividendFact",
     "FinancialReport",
     "HoldingStake",
     "KeyRate",
@@ -21,8 +27,14 @@ __all__ = [
     "Multiplier",
     "MassParseJob",
     "MassParseItem",
+    "BackgroundTask",
+    "ReverificationRun",
+    "ReportScorecard",
+    "ReportFieldScore",
     "DisclosureSyncRun",
     "DisclosurePeriod",
     "DisclosureParseJob",
     "DisclosureParseItem",
+    "DisclosureDownloadJob",
+    "DisclosureDownloadItem",
 ]
\ No newline at end of file
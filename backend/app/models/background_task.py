@@ -0,0 +1,56 @@
+"""Очередь фоновых задач на таблице Postgres (исполняет `python -m app.worker`)."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import DateTime, Index, Integer, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.company import JSONVariant
+
+# Статусы, в которых задача ещё будет (или уже) выполняться.
+ACTIVE_TASK_STATUSES = ("queued", "running")
+
+
+class BackgroundTask(Base):
+    __tablename__ = "background_tasks"
+    __table_args__ = (
+        # Выборка воркера: очередь → приоритет → FIFO.
+        Index("ix_background_tasks_claim", "queue", "status", text("priority DESC"), "id"),
+        # Не больше одной активной задачи на ключ (одно задание mass-parse,
+        # один sync e-disclosure); завершённые не мешают поставить снова.
+        Index(
+            "uq_background_tasks_active_key",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    queue: Mapped[str] = mapped_column(String(32), nullable=False)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONVariant, nullable=False, default=dict)
+    dedupe_key: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    # Больше — раньше (ручной запуск из UI обгоняет плановые задачи).
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # queued | running | done | error
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    # Аренда: воркер продлевает lease_expires_at heartbeat'ом; просроченную
+    # running-задачу забирает другой воркер (процесс упал или перезапущен).
+    locked_by: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Boolean, DateTime, Numeric, Text, JSON
+from sqlalchemy import BigInteger, Integer, String, Boolean, DateTime, Numeric, Text, JSON
 from sqlalchemy.dialects.postgresql import JSONB
 
 # JSONB в проде, JSON в SQLite под тестами: у SQLite нет JSONB, и без варианта
@@ -43,6 +43,9 @@ class Company(Base):
     # Бренд из T-Invest API (Shares.brand): логотип на CDN + фирменный цвет шапки
     brand_logo_url: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     brand_color: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    # Когда бренд в последний раз спрашивали у ShareBy. Логотипы меняются
+    # редко: синхронизация не переспрашивает их чаще TINKOFF_BRAND_TTL_DAYS.
+    brand_checked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
     # Прежние тикеры: [{"ticker": "YNDX", "until": "2024-07-07"}, …].
     # ISS хранит котировки под символом, действовавшим в тот день, и связи
@@ -86,6 +89,15 @@ class Company(Base):
 
     current_price: Mapped[Optional[float]] = mapped_column(Numeric(18, 6), nullable=True)
     price_updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Версия данных компании: +1 при каждой записи отчёта, цены, мультипликаторов
+    # или долей холдинга (app/services/companies/data_version.py). Ключ кэша
+    # ответов и ETag карточки компании — пока версия та же, ответ тот же.
+    data_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    # data_version, по которой в последний раз пересчитана таблица dividend_facts.
+    # Не совпадает — отчёты менялись в обход report_service, и перед скрином
+    # строки компании пересчитываются (app/services/dividends/dividend_facts.py).
+    dividend_facts_version: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     
     # Метаданные
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
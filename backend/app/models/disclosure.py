@@ -4,7 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -28,11 +28,43 @@ class DisclosureSyncRun(Base):
 class DisclosurePeriod(Base):
     __tablename__ = "disclosure_periods"
 
+    # Частичные индексы под режимы /disclosure/coverage: WHERE — ровно фильтр
+    # режима, колонки — порядок выдачи (ticker, fiscal_year DESC, period_type),
+    # так что страница берётся из индекса без сортировки всей таблицы.
+    __table_args__ = (
+        # Натуральный ключ (company, тип, год, квартал); квартал NULL у annual/H1,
+        # поэтому через COALESCE. Цель ON CONFLICT в bulk upsert sync_service.
+        Index(
+            "uq_disclosure_period_coalesce",
+            "company_id", "period_type", "fiscal_year",
+            func.coalesce(text("fiscal_quarter"), 0),
+            unique=True,
+        ),
+        Index(
+            "ix_disclosure_periods_missing",
+            "ticker", text("fiscal_year DESC"), "period_type",
+            postgresql_where=text(
+                "on_edisclosure AND NOT in_db "
+                "AND (period_type = 'annual' OR is_latest_interim)"
+            ),
+        ),
+        Index(
+            "ix_disclosure_periods_expected",
+            "ticker", text("fiscal_year DESC"), "period_type",
+            postgresql_where=text("expectation = 'expected'"),
+        ),
+        Index(
+            "ix_disclosure_periods_listing",
+            "ticker", text("fiscal_year DESC"), "period_type",
+        ),
+    )
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     company_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True
     )
-    ticker: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    # Поиск по тикеру — ведущая колонка ix_disclosure_periods_listing.
+    ticker: Mapped[str] = mapped_column(String(32), nullable=False)
     period_type: Mapped[str] = mapped_column(String(32), nullable=False)
     fiscal_year: Mapped[int] = mapped_column(Integer, nullable=False)
     fiscal_quarter: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
@@ -97,3 +129,41 @@ class DisclosureParseItem(Base):
     report_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class DisclosureDownloadJob(Base):
+    """Пачка скачиваний PDF e-disclosure — задача воркера `disclosure.download_job`."""
+
+    __tablename__ = "disclosure_download_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # pending | running | completed
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="pending")
+    total_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    done_ok: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    done_error: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class DisclosureDownloadItem(Base):
+    """Один файл пачки: прогресс в байтах пишет воркер, читают REST и SSE."""
+
+    __tablename__ = "disclosure_download_items"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("disclosure_download_jobs.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    disclosure_period_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # "TICKER:period_key" — ключ прогресса загрузчика.
+    key: Mapped[str] = mapped_column(String(64), nullable=False)
+    # queued | downloading | done | error
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="queued")
+    bytes_done: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    bytes_total: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    pdf_path: Mapped[Optional[str]] = mapped_column(String(2048), nullable=True)
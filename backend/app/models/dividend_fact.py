@@ -0,0 +1,45 @@
+"""Дивиденды компании по годам — производная таблица для скринов по всему рынку.
+
+Строка собирается из отчётов за год с выплатой (приоритет у годового
+отчёта) и пересчитывается целиком по компании при каждой записи отчёта —
+app/services/dividends/dividend_facts.py. Серия лет подряд и пропуски
+считаются там же оконными функциями, поэтому скрин «10 лет подряд,
+доходность от 7%» — один запрос по этой таблице, а не обход отчётов
+каждой компании.
+"""
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Date, Float, ForeignKey, Integer, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class DividendFact(Base):
+    __tablename__ = "dividend_facts"
+
+    company_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True
+    )
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)  # fiscal_year отчёта
+    # Отчёт, из которого взята строка.
+    report_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("financial_reports.id", ondelete="CASCADE"), nullable=False
+    )
+    report_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    dividends_per_share: Mapped[Optional[float]] = mapped_column(Numeric(14, 6), nullable=True)
+    special_dividends_per_share: Mapped[Optional[float]] = mapped_column(Numeric(14, 6), nullable=True)
+    price_per_share: Mapped[Optional[float]] = mapped_column(Numeric(18, 6), nullable=True)
+    # Доходность по цене на дату отчёта, %: вся выплата и без разовой части.
+    dividend_yield: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    regular_dividend_yield: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # Доля прибыли, ушедшая на дивиденды, %: DPS × акции / чистая прибыль.
+    payout_ratio: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    # Сколько лет подряд платили, включая этот год.
+    streak: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Сколько лет без выплат перед этим годом (0 — платили и в прошлом году,
+    # NULL — первая выплата в истории).
+    gap_before: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
@@ -27,6 +27,7 @@ class ReportSource(str, Enum):
     COMPANY_WEBSITE = "company_website"  # С сайта компании
     API = "api"  # Получен через API
     REGULATOR = "regulator"  # С сайта регулятора (ЦБ, SEC)
+    COMPARATIVE_COLUMN = "comparative_column"  # Сравнительная колонка отчёта за следующий год
     OTHER = "other"  # Другой источник
 
 
@@ -21,6 +21,10 @@ class MassParseJob(Base):
     force: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     accounting_standard: Mapped[str] = mapped_column(String(32), nullable=False, default="IFRS")
     consolidated: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    # sync — запрос на каждый PDF; batch — пачками через Batch API провайдера
+    llm_mode: Mapped[str] = mapped_column(String(16), nullable=False, default="sync")
+    # id батча у провайдера, пока он не обработан (items батча — в running)
+    llm_batch_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
 
     total_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     done_ok: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
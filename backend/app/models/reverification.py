@@ -0,0 +1,98 @@
+"""Перепроверка отчётов БД по исходным PDF: прогоны и карточки качества."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database import Base
+
+
+class ReverificationRun(Base):
+    """Прогон перепроверки: какие отчёты взять и сколько уже сделано."""
+
+    __tablename__ = "reverification_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # pending | running | paused | completed | cancelled
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="pending", index=True)
+    # Версия экстрактора на момент создания: модель + хэш промптов и режима.
+    extractor_version: Mapped[str] = mapped_column(String(128), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    # Только отчёты одной компании (None — вся база).
+    company_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    concurrency: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    total_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    done_ok: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Отчёт уже проверен этой версией по этому же PDF.
+    done_skipped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    done_error: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ReportScorecard(Base):
+    """Итог сверки одного отчёта с его PDF одной версией экстрактора."""
+
+    __tablename__ = "report_scorecards"
+    __table_args__ = (
+        # Одна карточка на (отчёт, версия): новый PDF перезаписывает её.
+        UniqueConstraint("report_id", "extractor_version", name="uq_report_scorecards_report_version"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    report_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("financial_reports.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    company_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    run_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    extractor_version: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    # "размер:mtime_ns" файла — PDF заменили, значит проверять заново.
+    pdf_fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    # ok | error (ошибка разбора, которую повтор не исправит)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="ok")
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    total_fields: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    matched: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    close: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    mismatched: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    missing_in_ai: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    missing_in_existing: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # (matched + close) / (matched + close + mismatched + missing_in_ai)
+    score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    max_pct_diff: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    fields: Mapped[list["ReportFieldScore"]] = relationship(
+        "ReportFieldScore",
+        back_populates="scorecard",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class ReportFieldScore(Base):
+    """Статус одного поля в карточке (как `ReportFieldDiff.status`)."""
+
+    __tablename__ = "report_field_scores"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    scorecard_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("report_scorecards.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    field: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    # match | close | mismatch | missing_ai | missing_existing | both_missing
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    pct_diff: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    scorecard: Mapped["ReportScorecard"] = relationship("ReportScorecard", back_populates="fields")
@@ -0,0 +1,25 @@
+"""Бэктест скринов Грэма на истории отчётов и цен."""
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas import BacktestRequest, BacktestResponse
+from app.services.backtest.engine import BacktestParams, get_backtest
+
+router = APIRouter(prefix="/backtest", tags=["backtest"])
+
+
+@router.post("", response_model=BacktestResponse)
+def run_backtest(body: BacktestRequest, db: Session = Depends(get_db)):
+    """
+    Прогнать скрин по истории: на каждой ребалансировке — только отчёты,
+    опубликованные к этой дате, портфель равных долей из прошедших скрин.
+    Повтор с теми же параметрами на тех же данных отдаётся из кэша.
+    """
+    try:
+        params = BacktestParams(**body.model_dump())
+        return get_backtest(db, params).to_dict()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
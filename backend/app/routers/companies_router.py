@@ -2,14 +2,15 @@ import os
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.schemas import Company, CompanyDescriptionUpdate, SectorProfileOption
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.services.analysis.sector_profiles import available_profiles
 from app.services.companies.company_service import (
-    get_all_companies,
-    get_company_by_id,
+    aget_all_companies,
+    aget_company_by_id,
     set_business_description_manual,
     set_preferred_share_flag,
     set_company_type,
@@ -36,7 +37,7 @@ class SectorProfileUpdate(BaseModel):
 router = APIRouter(prefix="/companies", tags=["companies"])
 
 @router.get("/", response_model=list[Company])
-def get_companies(skip: int = 0, limit: int = 200, db: Session = Depends(get_db)):
+async def get_companies(skip: int = 0, limit: int = 200, db: AsyncSession = Depends(get_async_db)):
     """
     Получает список компаний из базы данных.
     
@@ -48,7 +49,7 @@ def get_companies(skip: int = 0, limit: int = 200, db: Session = Depends(get_db)
     Returns:
         Список компаний из БД
     """
-    companies = get_all_companies(db, skip=skip, limit=limit)
+    companies = await aget_all_companies(db, skip=skip, limit=limit)
     return companies
 
 @router.get("/sync/status")
@@ -129,7 +130,7 @@ def list_sector_profiles():
 
 
 @router.get("/{company_id}", response_model=Company)
-def get_company(company_id: int, db: Session = Depends(get_db)):
+async def get_company(company_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Получает информацию о компании по её ID.
     
@@ -143,7 +144,7 @@ def get_company(company_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: Если компания не найдена
     """
-    company = get_company_by_id(db, company_id)
+    company = await aget_company_by_id(db, company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     return company
@@ -4,13 +4,20 @@ from __future__ import annotations
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models.disclosure import DisclosureParseJob, DisclosurePeriod, DisclosureSyncRun
-from app.services.disclosure import parse_queue, sync_service
+from app.database import get_async_db, get_db
+from app.models.disclosure import (
+    DisclosureDownloadItem,
+    DisclosureDownloadJob,
+    DisclosureParseJob,
+    DisclosureSyncRun,
+)
+from app.routers.job_events import LAST_EVENT_ID, event_stream
+from app.services.disclosure import download_queue, parse_queue, sync_service
 
 router = APIRouter(prefix="/disclosure", tags=["disclosure"])
 
@@ -64,6 +71,34 @@ class CoverageSummaryOut(BaseModel):
     last_sync: Optional[SyncRunOut] = None
 
 
+class DownloadItemOut(BaseModel):
+    id: int
+    disclosure_period_id: int
+    key: str
+    status: str
+    bytes_done: int
+    bytes_total: Optional[int] = None
+    error: Optional[str] = None
+    pdf_path: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+class DownloadJobOut(BaseModel):
+    id: int
+    status: str
+    total_items: int
+    done_ok: int
+    done_error: int
+    last_message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    items: List[DownloadItemOut] = []
+
+    model_config = {"from_attributes": True}
+
+
 class IdsIn(BaseModel):
     period_ids: List[int] = Field(..., min_length=1)
 
@@ -91,7 +126,9 @@ class ParseJobOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
-def _sync_out(run: DisclosureSyncRun) -> SyncRunOut:
+def _sync_out(run: DisclosureSyncRun, worker_alive: Optional[bool] = None) -> SyncRunOut:
+    if worker_alive is None:
+        worker_alive = sync_service.is_sync_alive()
     return SyncRunOut(
         id=run.id,
         status=run.status,
@@ -99,7 +136,7 @@ def _sync_out(run: DisclosureSyncRun) -> SyncRunOut:
         companies_done=run.companies_done,
         periods_found=run.periods_found,
         last_message=run.last_message,
-        worker_alive=sync_service.is_sync_alive(),
+        worker_alive=worker_alive,
         started_at=run.started_at,
         finished_at=run.finished_at,
         created_at=run.created_at,
@@ -107,69 +144,47 @@ def _sync_out(run: DisclosureSyncRun) -> SyncRunOut:
 
 
 @router.get("/summary", response_model=CoverageSummaryOut)
-def summary(db: Session = Depends(get_db)):
-    rows = db.query(DisclosurePeriod).all()
-    counts = {"waiting": 0, "overdue": 0, "available": 0, "in_service": 0, "unknown": 0}
-    for r in rows:
-        counts[r.coverage_status] = counts.get(r.coverage_status, 0) + 1
-    last = sync_service.get_latest_run(db)
+async def summary(db: AsyncSession = Depends(get_async_db)):
+    counts = await sync_service.acoverage_counts(db)
+    last = await sync_service.aget_latest_run(db)
     return CoverageSummaryOut(
-        total=len(rows),
+        total=sum(counts.values()),
         waiting=counts.get("waiting", 0),
         overdue=counts.get("overdue", 0),
         available=counts.get("available", 0),
         in_service=counts.get("in_service", 0),
         unknown=counts.get("unknown", 0),
-        last_sync=_sync_out(last) if last else None,
+        last_sync=_sync_out(last, await sync_service.ais_sync_alive(db)) if last else None,
     )
 
 
 @router.get("/coverage", response_model=List[CoverageItemOut])
-def coverage(
+async def coverage(
     mode: str = Query("missing", description="missing | expected | all"),
     status: Optional[str] = Query(None),
     ticker: Optional[str] = Query(None),
     period_type: Optional[str] = Query(None),
     limit: int = Query(500, ge=1, le=5000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    q = db.query(DisclosurePeriod)
-    if ticker:
-        q = q.filter(DisclosurePeriod.ticker == ticker.strip().upper())
-    if period_type:
-        q = q.filter(DisclosurePeriod.period_type == period_type)
-    if status:
-        q = q.filter(DisclosurePeriod.coverage_status == status)
-
-    if mode == "missing":
-        # на e-disclosure, нет в БД; interim только latest
-        q = q.filter(DisclosurePeriod.on_edisclosure.is_(True))
-        q = q.filter(DisclosurePeriod.in_db.is_(False))
-        q = q.filter(
-            (DisclosurePeriod.period_type == "annual")
-            | (DisclosurePeriod.is_latest_interim.is_(True))
-        )
-    elif mode == "expected":
-        q = q.filter(DisclosurePeriod.expectation == "expected")
-
-    rows = (
-        q.order_by(
-            DisclosurePeriod.ticker.asc(),
-            DisclosurePeriod.fiscal_year.desc(),
-            DisclosurePeriod.period_type.asc(),
-        )
-        .offset(offset)
-        .limit(limit)
-        .all()
+    stmt = sync_service.coverage_stmt(
+        mode=mode, status=status, ticker=ticker, period_type=period_type,
+        limit=limit, offset=offset,
     )
-    return rows
+    return list(await db.scalars(stmt))
 
 
 @router.get("/sync/status", response_model=Optional[SyncRunOut])
-def sync_status(db: Session = Depends(get_db)):
-    run = sync_service.get_latest_run(db)
-    return _sync_out(run) if run else None
+async def sync_status(db: AsyncSession = Depends(get_async_db)):
+    run = await sync_service.aget_latest_run(db)
+    return _sync_out(run, await sync_service.ais_sync_alive(db)) if run else None
+
+
+@router.get("/sync/events", summary="Ход синхронизации (SSE)")
+async def sync_events(request: Request, last_event_id: Optional[str] = LAST_EVENT_ID):
+    """События `sync_run` — прогон в виде SyncRunOut без worker_alive, вместо опроса /sync/status."""
+    return event_stream(sync_service.SYNC_TOPIC, request, last_event_id)
 
 
 @router.post("/sync", response_model=SyncRunOut)
@@ -197,12 +212,41 @@ def import_listing(body: ImportListingIn, db: Session = Depends(get_db)):
     )
 
 
-@router.post("/download")
+def _download_job_out(db: Session, job: DisclosureDownloadJob) -> DownloadJobOut:
+    items = (
+        db.query(DisclosureDownloadItem)
+        .filter(DisclosureDownloadItem.job_id == job.id)
+        .order_by(DisclosureDownloadItem.id.asc())
+        .all()
+    )
+    out = DownloadJobOut.model_validate(job)
+    out.items = [DownloadItemOut.model_validate(i) for i in items]
+    return out
+
+
+@router.post("/download", response_model=DownloadJobOut)
 def download(body: IdsIn, db: Session = Depends(get_db)):
+    """Поставить скачивание в очередь воркера; ход — GET /download-jobs/{id} или SSE …/events."""
     try:
-        return parse_queue.download_periods(db, body.period_ids)
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+        job = download_queue.enqueue_download(db, body.period_ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return _download_job_out(db, job)
+
+
+@router.get("/download-jobs/{job_id}", response_model=DownloadJobOut)
+def get_download_job(job_id: int, db: Session = Depends(get_db)):
+    """Задание и прогресс по файлам (байты, статус) — из БД, с любого процесса API."""
+    job = db.get(DisclosureDownloadJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job не найден")
+    return _download_job_out(db, job)
+
+
+@router.get("/download-jobs/{job_id}/events", summary="Ход скачивания (SSE)")
+async def download_job_events(job_id: int, request: Request, last_event_id: Optional[str] = LAST_EVENT_ID):
+    """События `job` (задание без items) и `item` (файл с байтами)."""
+    return event_stream(download_queue.job_topic(job_id), request, last_event_id)
 
 
 @router.post("/enqueue-parse", response_model=ParseJobOut)
@@ -240,3 +284,9 @@ def get_parse_job(job_id: int, db: Session = Depends(get_db)):
         last_message=job.last_message,
         worker_alive=parse_queue.is_parse_worker_alive(job.id),
     )
+
+
+@router.get("/parse-jobs/{job_id}/events", summary="Ход очереди парсинга (SSE)")
+async def parse_job_events(job_id: int, request: Request, last_event_id: Optional[str] = LAST_EVENT_ID):
+    """События `job` (как ParseJobOut без worker_alive) и `item` — строки очереди."""
+    return event_stream(parse_queue.job_topic(job_id), request, last_event_id)
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from app.database import get_db
-from app.schemas import DividendContinuityResult
+from app.routers import response_cache
+from app.schemas import DividendContinuityResult, DividendScreenRow
+from app.services.companies.data_version import get_versions
+from app.services.dividends.dividend_facts import SCREEN_SORTS, screen_dividend_payers
 from app.services.dividends.dividend_service import (
     calculate_dividend_continuity,
     get_dividend_history,
-    update_dividend_start_year
 )
 
 router = APIRouter(prefix="/dividends", tags=["dividends"])
@@ -16,13 +18,19 @@ router = APIRouter(prefix="/dividends", tags=["dividends"])
 @router.get("/company/{company_id}/analysis", response_model=DividendContinuityResult)
 def analyze_dividend_continuity(
     company_id: int,
+    request: Request,
     min_years: int = 20,
     db: Session = Depends(get_db)
 ):
     """Анализирует непрерывность выплаты дивидендов компании по методу Грэма."""
+    cached = response_cache.lookup(
+        request, "dividends.analysis", get_versions(db, company_id), min_years=min_years
+    )
+    if cached.response is not None:
+        return cached.response
     try:
         result = calculate_dividend_continuity(db, company_id, min_years)
-        return result
+        return cached.store(result, DividendContinuityResult)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -36,3 +44,30 @@ def get_company_dividend_history(company_id: int, db: Session = Depends(get_db))
         return get_dividend_history(db, company_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
+
+
+@router.get("/screen", response_model=List[DividendScreenRow])
+def screen_dividend_companies(
+    min_streak: int = Query(0, ge=0, description="Лет выплат подряд, не меньше"),
+    min_yield: Optional[float] = Query(None, description="Доходность по цене отчёта, %, не ниже"),
+    max_payout: Optional[float] = Query(None, description="Доля прибыли на дивиденды, %, не выше"),
+    regular_only: bool = Query(True, description="Без разовых (специальных) выплат"),
+    active_only: bool = Query(True, description="Последняя выплата — не раньше прошлого года"),
+    sort: str = Query("streak", description=" | ".join(SCREEN_SORTS)),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """Скрин всего рынка по дивидендам одним запросом, например «≥10 лет подряд, от 7%»."""
+    try:
+        return screen_dividend_payers(
+            db,
+            min_streak=min_streak,
+            min_yield=min_yield,
+            max_payout=max_payout,
+            regular_only=regular_only,
+            active_only=active_only,
+            sort=sort,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
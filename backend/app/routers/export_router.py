@@ -0,0 +1,84 @@
+"""Потоковая выгрузка таблиц целиком — для ноутбуков и внешнего анализа."""
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterator, List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.database import SessionLocal
+from app.services.export.streaming import (
+    EXPORT_TABLES,
+    MEDIA_TYPES,
+    ExportPlan,
+    ExportQuery,
+    available_columns,
+    build_plan,
+    export_chunks,
+    require_pyarrow,
+)
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+_EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "arrow": "arrows", "parquet": "parquet"}
+
+
+def _stream(plan: ExportPlan, fmt: str) -> Iterator[bytes]:
+    # Своя сессия: ответ читается из курсора уже после выхода из эндпоинта.
+    db = SessionLocal()
+    try:
+        yield from export_chunks(db, plan, fmt)
+    finally:
+        db.close()
+
+
+@router.get("/tables")
+def list_tables():
+    """Выгружаемые таблицы и их колонки."""
+    return {name: available_columns(name) for name in EXPORT_TABLES}
+
+
+@router.get("/{table}")
+def export_table(
+    table: str,
+    format: Literal["ndjson", "csv", "arrow", "parquet"] = Query("ndjson"),
+    columns: Optional[str] = Query(None, description="Через запятую; по умолчанию все"),
+    company_id: List[int] = Query([], description="Только эти компании"),
+    ticker: List[str] = Query([], description="Только эти тикеры"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    period_type: Optional[str] = Query(None, description="financial_reports: annual | quarterly | ..."),
+    type: Optional[str] = Query(None, description="multipliers: report_based | current | daily"),
+    verified_only: bool = Query(False, description="financial_reports: только проверенные"),
+):
+    """
+    Выгрузить таблицу потоком: NDJSON/CSV построчно, Arrow IPC stream и
+    Parquet — пачками по EXPORT_BATCH_SIZE строк. Память сервера не зависит
+    от объёма выгрузки.
+    """
+    query = ExportQuery(
+        table=table,
+        columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else (),
+        company_ids=company_id,
+        tickers=ticker,
+        date_from=date_from,
+        date_to=date_to,
+        period_type=period_type,
+        multiplier_type=type,
+        verified_only=verified_only,
+    )
+    try:
+        plan = build_plan(query)
+        require_pyarrow(format)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except RuntimeError as exc:
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
+    return StreamingResponse(
+        _stream(plan, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{table}.{_EXTENSIONS[format]}"',
+        },
+    )
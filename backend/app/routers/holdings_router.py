@@ -8,10 +8,11 @@
 """
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.routers import response_cache
 from app.models.company import Company
 from app.models.holding_stake import HoldingStake
 from app.schemas import (
@@ -20,6 +21,7 @@ from app.schemas import (
     HoldingStakeIn,
     HoldingStakeOut,
 )
+from app.services.companies.data_version import bump_data_version, get_versions
 from app.services.holdings.nav_service import compute_holding_nav
 
 router = APIRouter(prefix="/companies/{company_id}/holding", tags=["holdings"])
@@ -50,16 +52,21 @@ def _validate(db: Session, payload: HoldingStakeIn) -> None:
 
 
 @router.get("/nav", response_model=HoldingNavOut)
-def get_holding_nav(company_id: int, db: Session = Depends(get_db)):
+def get_holding_nav(company_id: int, request: Request, db: Session = Depends(get_db)):
     """NAV, дисконт и разбор по долям.
 
     Незаполненные карточки дочек не обнуляют долю: она попадает в список
     неоценённых, а полнота расчёта видна по `valued_stakes` из `total_stakes`.
     """
+    # Ключ кэша — версии холдинга и всех дочек: NAV меняется с их ценами.
+    versions = get_versions(db, company_id, with_subsidiaries=True)
+    cached = response_cache.lookup(request, "holdings.nav", versions)
+    if cached.response is not None:
+        return cached.response
     nav = compute_holding_nav(db, company_id)
     if nav is None:
         raise HTTPException(status_code=404, detail=f"Компания {company_id} не найдена")
-    return nav
+    return cached.store(nav, HoldingNavOut)
 
 
 @router.get("/stakes", response_model=List[HoldingStakeOut])
@@ -80,6 +87,7 @@ def add_stake(company_id: int, payload: HoldingStakeIn, db: Session = Depends(ge
 
     stake = HoldingStake(holding_company_id=company_id, **payload.model_dump())
     db.add(stake)
+    bump_data_version(db, [company_id])
     db.commit()
     db.refresh(stake)
     return stake
@@ -100,6 +108,7 @@ def update_stake(
 
     for field, value in payload.model_dump().items():
         setattr(stake, field, value)
+    bump_data_version(db, [company_id])
     db.commit()
     db.refresh(stake)
     return stake
@@ -115,6 +124,7 @@ def delete_stake(company_id: int, stake_id: int, db: Session = Depends(get_db)):
     if stake is None:
         raise HTTPException(status_code=404, detail="Доля не найдена")
     db.delete(stake)
+    bump_data_version(db, [company_id])
     db.commit()
 
 
@@ -129,5 +139,6 @@ def set_corporate_debt(
     """
     company = _get_company(db, company_id)
     company.corporate_center_net_debt = payload.corporate_center_net_debt  # type: ignore[assignment]
+    bump_data_version(db, [company_id])
     db.commit()
     return compute_holding_nav(db, company_id)
@@ -0,0 +1,37 @@
+"""SSE-ответ на тему шины событий задач (app/services/events).
+
+Курсор возобновления — стандартный заголовок Last-Event-ID (его шлёт сам
+EventSource при переподключении) или `?last_event_id=` для клиентов, которые
+заголовки задать не могут. Вид события — `job`, `item`, `sync_run` или
+`reset`; в data — строка таблицы в том же виде, что у REST-эндпоинта.
+`reset` — «пропущенное не восстановить»: клиент один раз перечитывает
+состояние через REST и продолжает слушать.
+
+Использование в эндпоинте:
+
+    @router.get("/jobs/{job_id}/events")
+    async def job_events(job_id: int, request: Request, last_event_id: Optional[str] = LAST_EVENT_ID):
+        return event_stream(job_topic(job_id), request, last_event_id)
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.events.bus import parse_cursor, sse_stream
+
+LAST_EVENT_ID = Query(
+    None, description="Номер последнего полученного события, если нельзя передать заголовок Last-Event-ID",
+)
+
+
+def event_stream(topic: str, request: Request, last_event_id: Optional[str] = None) -> StreamingResponse:
+    cursor = parse_cursor(request.headers.get("last-event-id") or last_event_id)
+    return StreamingResponse(
+        sse_stream(topic, cursor),
+        media_type="text/event-stream",
+        # Без буферизации в nginx события доходили бы пачками.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -5,18 +5,26 @@
     GET  /market/price/moex?ticker=SBER&date=2024-12-31
     GET  /market/shares/moex?ticker=SBER
     GET  /market/dividends/moex?ticker=SBER&fiscal_year=2024
+    GET  /market/prices/series?company_id=1&points=500 — ряд цен для графика
     POST /market/prices/backfill?company_id=1          — ручной бэкфилл цен
     POST /market/prices/backfill-all                   — бэкфилл для всех компаний
+    GET  /market/live?company_id=1                     — SSE: цена и P/E, P/B… в течение дня
 """
 from datetime import date as date_type
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.company import Company
+from app.routers import response_cache
+from app.schemas import PriceSeriesResponse
+from app.services.market import live_feed, price_series
 from app.services.market.price_history_service import backfill_company_prices, backfill_all_companies
 from app.services.share_splits import price_scale_hint, shares_at_date
 from app.services.ticker_history import resolve_ticker
@@ -449,6 +457,69 @@ def manual_backfill(
     )
 
 
+@router.get(
+    "/prices/series",
+    response_model=PriceSeriesResponse,
+    summary="Ряд дневных цен компании для графика",
+    description=(
+        "Цены закрытия из stock_prices, прореженные на сервере до `points` точек: "
+        "LTTB сохраняет форму линии, OHLC — свечи по корзинам торговых дней. "
+        "adjusted=true приводит цены до сплитов к сегодняшней шкале акций. "
+        "Ответ — параллельные массивы dates/close; поддерживает ETag."
+    ),
+)
+async def get_price_series(
+    request: Request,
+    company_id: int = Query(..., description="ID компании"),
+    points: int = Query(500, ge=3, le=5000, description="Сколько точек вернуть, не больше"),
+    method: str = Query("lttb", pattern="^(lttb|ohlc)$", description="lttb | ohlc"),
+    adjusted: bool = Query(True, description="Привести цены к сегодняшней шкале (сплиты)"),
+    date_from: Optional[date_type] = Query(None, description="Начало периода YYYY-MM-DD"),
+    date_to: Optional[date_type] = Query(None, description="Конец периода YYYY-MM-DD"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    row = (await db.execute(
+        select(Company.ticker, Company.share_splits, Company.data_version)
+        .where(Company.id == company_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Компания с id={company_id} не найдена")
+    ticker, splits, version = row
+
+    cached = await response_cache.alookup(
+        request, "market.price_series", ((company_id, int(version)),),
+        points=points, method=method, adjusted=adjusted, date_from=date_from, date_to=date_to,
+    )
+    if cached.response is not None:
+        return cached.response
+
+    series = (await price_series.aget_price_series(db, company_id, int(version))).window(
+        date_from, date_to,
+    )
+    if adjusted:
+        series = price_series.adjust_for_splits(series, splits)
+    sampled = price_series.downsample(series, points, method)
+    result = PriceSeriesResponse(
+        company_id=company_id,
+        ticker=ticker,
+        adjusted=adjusted,
+        method="raw" if method == "lttb" and len(sampled.days) == len(series) else method,
+        total_points=len(series),
+        dates=[date_type.fromordinal(d) for d in sampled.days],
+        close=_rounded(sampled.close),
+        open=_rounded(sampled.open),
+        high=_rounded(sampled.high),
+        low=_rounded(sampled.low),
+    )
+    return await cached.astore(result, PriceSeriesResponse)
+
+
+def _rounded(values):
+    # Шесть знаков — точность колонки stock_prices.price; деление на сплит
+    # иначе тащит в JSON хвосты вида 319.68000000000004.
+    return None if values is None else [round(v, 6) for v in values]
+
+
 class BackfillAllResult(BaseModel):
     total_added: int
     by_ticker: dict
@@ -466,3 +537,33 @@ def manual_backfill_all(db: Session = Depends(get_db)):
         total_added=sum(result.values()),
         by_ticker=result,
     )
+
+
+# ─── Цены в течение дня ───────────────────────────────────────────────────────
+
+@router.get(
+    "/live",
+    summary="Поток цен и мультипликаторов в течение дня (SSE)",
+    description=(
+        "Server-Sent Events: первым событием `snapshot` — последние цены всех "
+        "(или выбранных) компаний, дальше `prices` — пачки обновлений не чаще "
+        "TINVEST_STREAM_FLUSH_SECONDS. В каждом обновлении цена, капитализация "
+        "(млн ₽), P/E, P/B, P/FCF и дивидендная доходность по LTM. В БД цены "
+        "внутри дня не пишутся."
+    ),
+)
+async def live_prices(
+    company_id: Optional[List[int]] = Query(None, description="Только эти компании"),
+):
+    feed = live_feed.get_feed()
+    if feed is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Поток цен выключен: TINVEST_STREAM_ENABLED=false или не задан TINKOFF_TOKEN",
+        )
+    return StreamingResponse(
+        feed.events(company_id),
+        media_type="text/event-stream",
+        # Без буферизации в nginx события доходили бы пачками раз в минуту.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,17 +2,18 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.database import get_db
 from app.models.mass_parse import MassParseJob
+from app.routers.job_events import LAST_EVENT_ID, event_stream
 from app.services.mass_parse import service as mass_parse_service
-from app.services.mass_parse.worker import is_worker_alive
+from app.services.mass_parse.worker import JOBS_TOPIC, is_worker_alive, job_counts, job_topic
 
 router = APIRouter(prefix="/mass-parse", tags=["mass-parse"])
 
@@ -40,6 +41,11 @@ class MassParseCreateIn(BaseModel):
     force: bool = False
     accounting_standard: str = "IFRS"
     consolidated: bool = True
+    llm_mode: Literal["sync", "batch"] = Field(
+        "sync",
+        description="sync — запрос на каждый PDF; batch — Batch API провайдера "
+        "(для ночных очередей: без TPM-пауз, ответ за часы)",
+    )
     auto_start: bool = True
 
 
@@ -67,6 +73,8 @@ class MassParseJobOut(BaseModel):
     force: bool
     accounting_standard: str
     consolidated: bool
+    llm_mode: str = "sync"
+    llm_batch_id: Optional[str] = None
     total_items: int
     done_ok: int
     done_skipped: int
@@ -85,11 +93,7 @@ class MassParseJobOut(BaseModel):
 
 
 def _job_out(job: MassParseJob) -> MassParseJobOut:
-    processed = int(job.done_ok or 0) + int(job.done_skipped or 0) + int(job.done_error or 0)
-    pending = max(0, int(job.total_items or 0) - processed)
-    # running item ещё не в счётчиках
-    if job.status == "running" and job.current_item_id:
-        pending = max(0, pending - 1)
+    processed, pending = job_counts(job)
     return MassParseJobOut(
         id=job.id,
         status=job.status,
@@ -98,6 +102,8 @@ def _job_out(job: MassParseJob) -> MassParseJobOut:
         force=job.force,
         accounting_standard=job.accounting_standard,
         consolidated=job.consolidated,
+        llm_mode=job.llm_mode,
+        llm_batch_id=job.llm_batch_id,
         total_items=job.total_items,
         done_ok=job.done_ok,
         done_skipped=job.done_skipped,
@@ -150,6 +156,12 @@ def list_jobs(db: Session = Depends(get_db)):
     return [_job_out(j) for j in mass_parse_service.list_jobs(db)]
 
 
+@router.get("/jobs/events", summary="Изменения заданий (SSE)")
+async def jobs_events(request: Request, last_event_id: Optional[str] = LAST_EVENT_ID):
+    """События `job` — строки заданий в виде MassParseJobOut без worker_alive."""
+    return event_stream(JOBS_TOPIC, request, last_event_id)
+
+
 @router.post("/jobs", response_model=MassParseJobOut, status_code=status.HTTP_201_CREATED)
 def create_job(body: MassParseCreateIn, db: Session = Depends(get_db)):
     if not settings.llm_configured:
@@ -166,6 +178,7 @@ def create_job(body: MassParseCreateIn, db: Session = Depends(get_db)):
             force=body.force,
             accounting_standard=body.accounting_standard,
             consolidated=body.consolidated,
+            llm_mode=body.llm_mode,
         )
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -188,6 +201,17 @@ def get_job(job_id: int, db: Session = Depends(get_db)):
     return _job_out(job)
 
 
+@router.get("/jobs/{job_id}/events", summary="Ход задания и его элементов (SSE)")
+async def job_events(job_id: int, request: Request, last_event_id: Optional[str] = LAST_EVENT_ID):
+    """События `job` (как MassParseJobOut без worker_alive) и `item` (как MassParseItemOut).
+
+    Вместо опроса GET /jobs/{id} и /jobs/{id}/items: после `reset` клиент
+    перечитывает их один раз. Существование задания не проверяется — без
+    обращения к БД; для неизвестного id событий просто не будет.
+    """
+    return event_stream(job_topic(job_id), request, last_event_id)
+
+
 @router.get("/jobs/{job_id}/items", response_model=List[MassParseItemOut])
 def get_items(
     job_id: int,
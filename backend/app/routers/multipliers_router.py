@@ -9,28 +9,41 @@
         — Обновить текущую цену из T-Invest API и пересчитать мультипликаторы
 
     GET  /companies/{company_id}/multipliers/history
-        — История мультипликаторов (из кэша, для графиков)
+        — История мультипликаторов (из кэша, для графиков); пока история
+          пересобирается в фоне — 202 с пустым списком и Retry-After
 
     GET  /reports/{report_id}/multipliers
         — Мультипликаторы привязанные к конкретному отчёту
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 
-from app.database import get_db
+from app.config import settings
+from app.database import SessionLocal, get_async_db, get_db
 from app.models.company import Company
+from app.models.enums import PeriodType
 from app.models.financial_report import FinancialReport
 from app.models.multiplier import Multiplier
+from app.routers import response_cache
 from app.schemas import (
     BankMetricsOut,
     MultiplierResponse,
     CurrentMultipliersResponse,
     PriceUpdateResponse,
 )
-from app.services.analysis import multiplier_service
+from app.services.analysis import multiplier_service, multiplier_tasks
 from app.services.market import tinvest_price_service
 from app.services.analysis.share_counts import explain_shares_cap_basis
+from app.services.companies.data_version import aget_versions, get_versions
+from app.services.tasks.queue import ahas_active_task
+from app.services.tasks.registry import MULTIPLIERS_REBUILD_HISTORY
 from app.utils.currency_converter import convert_to_rub
 
 router = APIRouter(tags=["multipliers"])
@@ -78,15 +91,19 @@ def _multiplier_to_response(
 )
 def get_current_multipliers(
     company_id: int,
+    request: Request,
     price: Optional[float] = Query(None, description="Переопределить текущую цену акции"),
     db: Session = Depends(get_db),
 ):
-    company = db.query(Company).filter(Company.id == company_id).first()
-    if not company:
+    versions = get_versions(db, company_id)
+    if not versions:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Компания с ID {company_id} не найдена",
         )
+    cached = response_cache.lookup(request, "multipliers.current", versions, price=price)
+    if cached.response is not None:
+        return cached.response
 
     result = multiplier_service.calculate_current_multipliers(
         db=db,
@@ -102,7 +119,7 @@ def get_current_multipliers(
             ),
         )
 
-    return CurrentMultipliersResponse(**result)
+    return cached.store(CurrentMultipliersResponse(**result), CurrentMultipliersResponse)
 
 
 # ---------------------------------------------------------------------------
@@ -166,44 +183,93 @@ def refresh_multipliers(
         "актуальный LTM — в /multipliers/current."
     ),
 )
-def get_multipliers_history(
+async def get_multipliers_history(
     company_id: int,
+    request: Request,
     type: Optional[str] = Query(
         None,
         description="Тип записи: report_based | current | daily. Если не указан — все типы.",
     ),
     limit: int = Query(365, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    company = db.query(Company).filter(Company.id == company_id).first()
-    if not company:
+    versions = await aget_versions(db, company_id)
+    if not versions:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Компания с ID {company_id} не найдена",
         )
+    cached = await response_cache.alookup(
+        request, "multipliers.history", versions, type=type, limit=limit
+    )
+    if cached.response is not None:
+        return cached.response
 
-    history = multiplier_service.get_multipliers_history(
+    history = await multiplier_service.aget_multipliers_history(
         db=db,
         company_id=company_id,
         mult_type=type,
         limit=limit,
     )
-    # Если есть отчёты, но нет report_based в кэше — пересчитываем (импорт/SQL).
+    # Годовые отчёты есть, а report_based в кэше нет (импорт/SQL) — история
+    # пересобирается фоновой задачей, одной на компанию.
     if type == "report_based" and not history:
-        report_count = (
-            db.query(FinancialReport)
-            .filter(FinancialReport.company_id == company_id)
-            .count()
+        annual_count = await db.scalar(
+            select(func.count(FinancialReport.id)).where(
+                FinancialReport.company_id == company_id,
+                FinancialReport.period_type == PeriodType.ANNUAL,
+            )
         )
-        if report_count > 0:
-            multiplier_service.backfill_report_based_multipliers(db, company_id)
-            history = multiplier_service.get_multipliers_history(
+        if annual_count:
+            if not await _wait_history_rebuild(db, company_id):
+                # Не кэшируем: через пару секунд ответ будет другим.
+                retry_after = max(1, math.ceil(settings.MULTIPLIER_REBUILD_WAIT_SECONDS))
+                return Response(
+                    status_code=status.HTTP_202_ACCEPTED,
+                    content=b"[]",
+                    media_type="application/json",
+                    headers={"Retry-After": str(retry_after)},
+                )
+            history = await multiplier_service.aget_multipliers_history(
                 db=db,
                 company_id=company_id,
                 mult_type=type,
                 limit=limit,
             )
-    return [_multiplier_to_response(m) for m in history]
+    # Пересборка выше увеличила версию компании — ответ ляжет под старым
+    # ключом, а следующий запрос соберётся заново уже по новой версии.
+    return await cached.astore(
+        [_multiplier_to_response(m) for m in history], List[MultiplierResponse]
+    )
+
+
+_REBUILD_POLL_SECONDS = 0.25
+
+
+async def _wait_history_rebuild(db: AsyncSession, company_id: int) -> bool:
+    """Поставить пересборку истории (если её ещё нет) и подождать её.
+
+    True — пересборка завершилась, False — ещё идёт. Параллельные запросы
+    одной карточки не запускают по пересчёту каждый: задача с тем же ключом
+    дедупликации не ставится второй раз, все ждут одну.
+    """
+    await run_in_threadpool(_schedule_history_rebuild, company_id)
+    dedupe_key = multiplier_tasks.rebuild_dedupe_key(company_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.MULTIPLIER_REBUILD_WAIT_SECONDS
+    while await ahas_active_task(db, kind=MULTIPLIERS_REBUILD_HISTORY, dedupe_key=dedupe_key):
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(_REBUILD_POLL_SECONDS)
+    return True
+
+
+def _schedule_history_rebuild(company_id: int) -> None:
+    db = SessionLocal()
+    try:
+        multiplier_tasks.schedule_history_rebuild(db, company_id)
+    finally:
+        db.close()
 
 
 # ---------------------------------------------------------------------------
@@ -16,7 +16,7 @@ from typing import Mapping, Optional, Type
 
 from fastapi import HTTPException, status
 
-from app.services.report_parser.llm_client import (
+from app.services.report_parser.errors import (
     LLMNotConfiguredError,
     LLMParseError,
     LLMRateLimitError,
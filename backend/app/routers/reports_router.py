@@ -1,24 +1,23 @@
 import logging
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.company import Company
 from app.schemas import FinancialReport, FinancialReportCreate
+from app.routers import response_cache
 from app.routers.pipeline_errors import http_error_for
+from app.services.companies.data_version import aget_versions
 from app.services.reports import report_service
-from app.services.report_parser import (
-    compare_pdf_with_existing,
-    parse_pdf_to_report,
-)
-from app.services.report_parser.extractor_service import (
-    ReportAlreadyExistsError,
-    ReportNotFoundForComparison,
-)
+# Стек PDF и LLM (PyMuPDF, OpenAI SDK) загружается при первом разборе PDF —
+# через атрибуты пакета report_parser, а не при старте API.
+from app.services import report_parser
+from app.services.report_parser.errors import ReportAlreadyExistsError, ReportNotFoundForComparison
 
 logger = logging.getLogger(__name__)
 
@@ -41,17 +40,17 @@ def create_financial_report(
 
 
 @router.get("/", response_model=List[FinancialReport])
-def get_all_reports(
+async def get_all_reports(
     skip: int = 0,
     limit: int = 200,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить все финансовые отчеты (с пагинацией)."""
-    return report_service.get_all_reports(db=db, skip=skip, limit=limit)
+    return await report_service.aget_all_reports(db=db, skip=skip, limit=limit)
 
 
 @router.get("/{report_id}", response_model=FinancialReport)
-def get_report(report_id: int, db: Session = Depends(get_db)):
+async def get_report(report_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Получить финансовый отчет по ID.
     
@@ -59,7 +58,7 @@ def get_report(report_id: int, db: Session = Depends(get_db)):
     Если отчет в USD, то поля price_per_share_rub, revenue_rub и т.д. будут содержать
     значения умноженные на exchange_rate.
     """
-    report = report_service.get_report_by_id(db=db, report_id=report_id)
+    report = await report_service.aget_report_by_id(db=db, report_id=report_id)
     if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -69,25 +68,32 @@ def get_report(report_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/company/{company_id}", response_model=List[FinancialReport])
-def get_company_reports(
+async def get_company_reports(
     company_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Получить все отчеты для конкретной компании."""
-    return report_service.get_reports_by_company(
+    cached = await response_cache.alookup(
+        request, "reports.company", await aget_versions(db, company_id), skip=skip, limit=limit
+    )
+    if cached.response is not None:
+        return cached.response
+    reports = await report_service.aget_reports_by_company(
         db=db,
         company_id=company_id,
         skip=skip,
         limit=limit
     )
+    return await cached.astore(reports, List[FinancialReport])
 
 
 @router.get("/company/{company_id}/latest", response_model=FinancialReport)
-def get_latest_company_report(company_id: int, db: Session = Depends(get_db)):
+async def get_latest_company_report(company_id: int, db: AsyncSession = Depends(get_async_db)):
     """Получить последний отчет для компании."""
-    report = report_service.get_latest_report(db=db, company_id=company_id)
+    report = await report_service.aget_latest_report(db=db, company_id=company_id)
     if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -132,38 +138,38 @@ def delete_financial_report(report_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/unverified/list", response_model=List[FinancialReport])
-def list_unverified_reports(
+async def list_unverified_reports(
     company_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 200,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Вернуть список отчётов, НЕ проверенных финансовым аналитиком
     (verified_by_analyst=False). Это в первую очередь отчёты, созданные
     AI-парсером из PDF, которые ждут подтверждения.
     """
-    return report_service.get_unverified_reports(
+    return await report_service.aget_unverified_reports(
         db=db, company_id=company_id, skip=skip, limit=limit
     )
 
 
 @router.get("/unverified/counts", response_model=Dict[int, int])
-def unverified_counts_by_company(db: Session = Depends(get_db)):
+async def unverified_counts_by_company(db: AsyncSession = Depends(get_async_db)):
     """
     Вернуть словарь {company_id: count} с количеством непроверенных отчётов
     у каждой компании. Используется фронтом, чтобы подсветить компании
     с неподтверждёнными данными.
     """
-    return report_service.count_unverified_by_company(db=db)
+    return await report_service.acount_unverified_by_company(db=db)
 
 
 @router.get("/counts/by-company", response_model=Dict[int, int])
-def report_counts_by_company(db: Session = Depends(get_db)):
+async def report_counts_by_company(db: AsyncSession = Depends(get_async_db)):
     """
     Вернуть {company_id: число всех отчётов}. Компании без отчётов в ответе отсутствуют.
     """
-    return report_service.count_reports_by_company(db=db)
+    return await report_service.acount_reports_by_company(db=db)
 
 
 @router.post("/{report_id}/verify", response_model=FinancialReport)
@@ -206,6 +212,8 @@ class ParsePdfResponse(BaseModel):
     selected_pages: int
     total_pages: int
     warnings: List[str] = []
+    # Черновик за прошлый год из сравнительной колонки этого же PDF.
+    prior_year_report_id: Optional[int] = None
 
 
 class LlmStatusResponse(BaseModel):
@@ -281,7 +289,7 @@ async def parse_pdf_endpoint(
         )
 
     try:
-        outcome = parse_pdf_to_report(
+        outcome = report_parser.parse_pdf_to_report(
             db=db,
             pdf_source=pdf_bytes,
             company=company,
@@ -333,6 +341,19 @@ async def parse_pdf_endpoint(
         ):
             warnings.append("current_assets/current_liabilities не найдены")
 
+    comparative = outcome.comparative
+    if comparative is not None:
+        warnings.extend(
+            f"Пересчёт {comparative.fiscal_year}: {d.label} — было {d.existing_value}, "
+            f"в сравнительной колонке {d.extracted_value}"
+            for d in comparative.restatements
+        )
+        if comparative.created_report_id:
+            warnings.append(
+                f"Создан черновик за {comparative.fiscal_year} из сравнительной колонки "
+                f"(id={comparative.created_report_id}) — проверьте его"
+            )
+
     return ParsePdfResponse(
         report=FinancialReport.model_validate(created, from_attributes=True),
         auto_extracted=True,
@@ -340,6 +361,7 @@ async def parse_pdf_endpoint(
         selected_pages=outcome.selected_pages,
         total_pages=outcome.total_pages,
         warnings=warnings,
+        prior_year_report_id=comparative.created_report_id if comparative else None,
     )
 
 
@@ -434,7 +456,7 @@ async def compare_pdf_endpoint(
         )
 
     try:
-        result = compare_pdf_with_existing(
+        result = report_parser.compare_pdf_with_existing(
             db=db,
             pdf_source=pdf_bytes,
             company=company,
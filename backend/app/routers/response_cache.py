@@ -0,0 +1,227 @@
+"""Кэш ответов карточки компании с ETag / 304.
+
+Ключ — (эндпоинт, параметры запроса, версии данных компаний, дата). Версии
+берутся из `companies.data_version` (app/services/companies/data_version.py)
+до построения ответа: запись, случившаяся во время построения, увеличит
+версию, и следующий запрос пойдёт мимо кэша. Дата в ключе — потому что часть
+ответов зависит от «сегодня» (LTM, серия дивидендов до текущего года).
+
+Уровни:
+  1. 304 Not Modified — ETag из ключа совпал с If-None-Match: тело не
+     строится и не передаётся вовсе;
+  2. LRU в памяти процесса — готовые байты JSON;
+  3. общий кэш в Redis (RESPONSE_CACHE_SHARED) — между процессами uvicorn
+     и после рестарта. Любая ошибка Redis — просто промах.
+
+Использование в эндпоинте:
+
+    versions = get_versions(db, company_id)
+    cached = response_cache.lookup(request, "dividends.analysis", versions, min_years=min_years)
+    if cached.response is not None:
+        return cached.response
+    ...  # построить ответ как раньше
+    return cached.store(result, DividendContinuityResult)
+
+Async-эндпоинты используют `alookup` / `astore`: обращения к Redis уходят в
+поток, LRU проверяется прямо в event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from typing import Any, Hashable, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.config import settings
+from app.services.companies.data_version import Versions
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "graham:resp:"
+
+
+class _LruStore:
+    """Потокобезопасный LRU: ключ → байты JSON."""
+
+    def __init__(self, max_entries: int):
+        self._max = max_entries
+        self._data: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._data.get(key)
+            if body is not None:
+                self._data.move_to_end(key)
+            return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if self._max <= 0:
+            return
+        with self._lock:
+            self._data[key] = body
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_lru = _LruStore(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+@lru_cache(maxsize=1)
+def _redis_client():
+    """Клиент Redis или None (общий кэш выключен или недоступен)."""
+    if not settings.RESPONSE_CACHE_SHARED:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("RESPONSE_CACHE_SHARED=true, но пакет redis не установлен — только LRU")
+        return None
+    # Короткие таймауты: медленный Redis не должен тормозить ответ дольше,
+    # чем его построение из БД.
+    return redis.Redis.from_url(
+        settings.REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2,
+    )
+
+
+def _shared_get(digest: str) -> Optional[bytes]:
+    client = _redis_client()
+    if client is None:
+        return None
+    try:
+        return client.get(_KEY_PREFIX + digest)
+    except Exception as exc:
+        logger.debug("Общий кэш ответов недоступен: %s", exc)
+        return None
+
+
+def _shared_put(digest: str, body: bytes) -> None:
+    client = _redis_client()
+    if client is None:
+        return
+    try:
+        client.set(_KEY_PREFIX + digest, body, ex=settings.RESPONSE_CACHE_TTL_SECONDS)
+    except Exception as exc:
+        logger.debug("Общий кэш ответов недоступен: %s", exc)
+
+
+@lru_cache(maxsize=64)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def _serialize(value: Any, model: Any) -> bytes:
+    """Как FastAPI с response_model: валидация по схеме (в т.ч. из ORM) → JSON."""
+    adapter = _adapter(model)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True), by_alias=True)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    # Слабое сравнение (RFC 9110): W/"x" и "x" — одно и то же.
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+
+
+class CachedResponse:
+    """Результат lookup: готовый ответ (`response`) или место для нового."""
+
+    def __init__(self, key: Optional[tuple], digest: str, etag: Optional[str]):
+        self._key = key
+        self._digest = digest
+        self.etag = etag
+        self.response: Optional[Response] = None
+
+    @property
+    def _headers(self) -> dict[str, str]:
+        if self.etag is None:
+            return {}
+        # no-cache: браузер хранит ответ, но каждый раз сверяет ETag — 304
+        # приходит за один запрос версий к БД.
+        return {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+
+    def _respond(self, body: bytes) -> Response:
+        return Response(content=body, media_type="application/json", headers=self._headers)
+
+    def store(self, value: Any, model: Any) -> Response:
+        body = _serialize(value, model)
+        if self._key is not None:
+            _lru.put(self._key, body)
+            _shared_put(self._digest, body)
+        return self._respond(body)
+
+    async def astore(self, value: Any, model: Any) -> Response:
+        body = _serialize(value, model)
+        if self._key is not None:
+            _lru.put(self._key, body)
+            if _redis_client() is not None:
+                await asyncio.to_thread(_shared_put, self._digest, body)
+        return self._respond(body)
+
+
+def _prepare(
+    request: Request, endpoint: str, versions: Versions, params: dict[str, Any]
+) -> tuple[CachedResponse, bool]:
+    """(заготовка или готовый ответ, нужен ли поход в общий кэш)."""
+    if not settings.RESPONSE_CACHE_ENABLED or not versions:
+        # Нет компании — эндпоинт сам вернёт 404; такое не кэшируем.
+        return CachedResponse(None, "", None), False
+    key = (endpoint, tuple(sorted(params.items())), versions, date.today().isoformat())
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    cached = CachedResponse(key, digest, f'W/"{digest[:32]}"')
+    if _etag_matches(request, cached.etag):
+        cached.response = Response(status_code=304, headers=cached._headers)
+        return cached, False
+    body = _lru.get(key)
+    if body is not None:
+        cached.response = cached._respond(body)
+        return cached, False
+    return cached, _redis_client() is not None
+
+
+def _from_shared(cached: CachedResponse, body: Optional[bytes]) -> CachedResponse:
+    if body is not None:
+        _lru.put(cached._key, body)
+        cached.response = cached._respond(body)
+    return cached
+
+
+def lookup(request: Request, endpoint: str, versions: Versions, **params: Any) -> CachedResponse:
+    cached, check_shared = _prepare(request, endpoint, versions, params)
+    if check_shared:
+        return _from_shared(cached, _shared_get(cached._digest))
+    return cached
+
+
+async def alookup(
+    request: Request, endpoint: str, versions: Versions, **params: Any
+) -> CachedResponse:
+    cached, check_shared = _prepare(request, endpoint, versions, params)
+    if check_shared:
+        return _from_shared(cached, await asyncio.to_thread(_shared_get, cached._digest))
+    return cached
+
+
+def clear() -> None:
+    """Сбросить LRU процесса (тесты, ручная диагностика)."""
+    _lru.clear()
+
+
+__all__ = ("CachedResponse", "alookup", "clear", "lookup")
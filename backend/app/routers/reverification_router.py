@@ -0,0 +1,159 @@
+"""API перепроверки отчётов БД по исходным PDF и сводной точности извлечения."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db
+from app.models.reverification import ReverificationRun
+from app.services.reverification import service as reverification_service
+from app.services.reverification.planner import extractor_version, plan_candidates
+from app.services.reverification.worker import is_worker_alive
+
+router = APIRouter(prefix="/reverification", tags=["reverification"])
+
+
+class ReverificationPreviewOut(BaseModel):
+    extractor_version: str
+    model: str
+    to_check: int
+    unchanged: int
+    llm_configured: bool
+
+
+class ReverificationCreateIn(BaseModel):
+    company_id: Optional[int] = Field(None, description="Только отчёты этой компании")
+    concurrency: Optional[int] = Field(
+        None, ge=1, le=32, description="Отчётов одновременно; по умолчанию из .env"
+    )
+    auto_start: bool = True
+
+
+class ReverificationRunOut(BaseModel):
+    id: int
+    status: str
+    extractor_version: str
+    model: str
+    company_id: Optional[int] = None
+    concurrency: int
+    total_items: int
+    done_ok: int
+    done_skipped: int
+    done_error: int
+    last_message: Optional[str] = None
+    worker_alive: bool = False
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+class AccuracyRowOut(BaseModel):
+    key: str
+    label: str
+    reports: int
+    errors: int
+    correct: int
+    mismatched: int
+    missing_in_ai: int
+    accuracy: Optional[float] = None
+
+
+def _run_out(run: ReverificationRun) -> ReverificationRunOut:
+    out = ReverificationRunOut.model_validate(run)
+    out.worker_alive = is_worker_alive(run.id)
+    return out
+
+
+@router.get("/preview", response_model=ReverificationPreviewOut)
+def preview(company_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
+    version = extractor_version()
+    todo, unchanged = plan_candidates(db, version, company_id=company_id)
+    return ReverificationPreviewOut(
+        extractor_version=version,
+        model=settings.extraction_model_label,
+        to_check=len(todo),
+        unchanged=unchanged,
+        llm_configured=settings.llm_configured,
+    )
+
+
+@router.get("/runs", response_model=List[ReverificationRunOut])
+def list_runs(db: Session = Depends(get_db)):
+    return [_run_out(r) for r in reverification_service.list_runs(db)]
+
+
+@router.post("/runs", response_model=ReverificationRunOut, status_code=status.HTTP_201_CREATED)
+def create_run(body: ReverificationCreateIn, db: Session = Depends(get_db)):
+    if not settings.llm_configured:
+        raise HTTPException(
+            status_code=503,
+            detail="LLM не сконфигурирован — задайте LLM_API_KEY / LLM_MODEL в .env",
+        )
+    run = reverification_service.create_run(
+        db, company_id=body.company_id, concurrency=body.concurrency,
+    )
+    if body.auto_start:
+        run = reverification_service.start_run(db, run.id)
+    return _run_out(run)
+
+
+@router.get("/runs/{run_id}", response_model=ReverificationRunOut)
+def get_run(run_id: int, db: Session = Depends(get_db)):
+    run = reverification_service.get_run(db, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Прогон не найден")
+    return _run_out(run)
+
+
+@router.post("/runs/{run_id}/start", response_model=ReverificationRunOut)
+def start(run_id: int, db: Session = Depends(get_db)):
+    try:
+        return _run_out(reverification_service.start_run(db, run_id))
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@router.post("/runs/{run_id}/pause", response_model=ReverificationRunOut)
+def pause(run_id: int, db: Session = Depends(get_db)):
+    try:
+        return _run_out(reverification_service.pause_run(db, run_id))
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@router.post("/runs/{run_id}/cancel", response_model=ReverificationRunOut)
+def cancel(run_id: int, db: Session = Depends(get_db)):
+    try:
+        return _run_out(reverification_service.cancel_run(db, run_id))
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.get("/accuracy", response_model=List[AccuracyRowOut])
+def accuracy(
+    group_by: Literal["field", "issuer", "model"] = Query("field"),
+    extractor_version: Optional[str] = Query(
+        None, description="Для field/issuer; по умолчанию текущая версия экстрактора"
+    ),
+    db: Session = Depends(get_db),
+):
+    rows = reverification_service.accuracy(db, group_by, version=extractor_version)
+    return [
+        AccuracyRowOut(
+            key=r.key, label=r.label, reports=r.reports, errors=r.errors, correct=r.correct,
+            mismatched=r.mismatched, missing_in_ai=r.missing_in_ai, accuracy=r.accuracy,
+        )
+        for r in rows
+    ]
@@ -1,10 +1,17 @@
 """
 Планировщик фоновых задач (APScheduler).
 
+Работает в процессе воркера (`python -m app.worker`), и только в одном:
+лидера выбирает advisory lock Postgres (см. app/worker.py). Сам планировщик
+ничего тяжёлого не выполняет — по расписанию ставит задачи в очередь
+background_tasks, а выполняют их слоты очереди market/disclosure.
+
 Задачи:
   1. Ежедневно в 19:00 МСК (UTC+3) — обновить текущие цены из T-Invest
      и докачать пропущенные исторические цены из MOEX.
-  2. При старте сервера — сразу проверить и закрыть пробелы в ценах.
+  2. При старте воркера — проверить и закрыть пробелы в ценах (с низким
+     приоритетом, STARTUP_PRIORITY).
+  3. Еженедельно (вс 03:00 МСК) — listing e-disclosure.
 """
 
 import logging
@@ -14,56 +21,55 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from app.database import SessionLocal
+from app.services.tasks.queue import enqueue
+from app.services.tasks.registry import DAILY_PRICE_UPDATE, PRICE_BACKFILL
 
 logger = logging.getLogger(__name__)
 
 _scheduler: BackgroundScheduler | None = None
 
 
-def _daily_price_update() -> None:
-    """
-    Ежедневная задача:
-      1. Бэкфилл — MOEX докачивает все пропущенные дни (в т.ч. если сервер
-         был выключен несколько дней).
-      2. Текущая цена — T-Invest обновляет сегодняшнее значение.
-    """
-    from app.services.market.price_history_service import backfill_all_companies
-    from app.services.market.tinvest_price_service import update_all_company_prices
+# Бэкфилл при старте — работа «заодно»: уступает в очереди market любой
+# задаче, поставленной пользователем или по расписанию.
+STARTUP_PRIORITY = -10
 
-    logger.info("Планировщик: запуск ежедневного обновления цен")
+
+def _enqueue_scheduled(kind: str, priority: int | None = None) -> None:
+    """Поставить плановую задачу; если прошлая ещё в очереди — не дублировать."""
     db = SessionLocal()
     try:
-        backfill_result = backfill_all_companies(db)
-        if backfill_result:
-            logger.info("Бэкфилл завершён: %s", backfill_result)
-
-        prices = update_all_company_prices(db)
-        updated = sum(1 for v in prices.values() if v is not None)
-        logger.info("Текущие цены обновлены: %d компаний", updated)
+        task = enqueue(db, kind, dedupe_key=kind, priority=priority)
+        db.commit()
+        if task is not None:
+            logger.info("Планировщик: задача %s поставлена (#%s)", kind, task.id)
     except Exception as e:
-        logger.error("Ошибка в ежедневном обновлении цен: %s", e)
+        logger.error("Планировщик: не удалось поставить %s: %s", kind, e)
     finally:
         db.close()
 
 
+def _daily_price_update() -> None:
+    _enqueue_scheduled(DAILY_PRICE_UPDATE)
+
+
 def _startup_backfill() -> None:
-    """
-    Запускается при старте сервера: докачивает все пропуски в ценах.
-    Запускается один раз, через 5 секунд после старта (чтобы не блокировать
-    инициализацию FastAPI).
-    """
-    from app.services.market.price_history_service import backfill_all_companies
+    _enqueue_scheduled(PRICE_BACKFILL, priority=STARTUP_PRIORITY)
+
+
+def _weekly_disclosure_sync() -> None:
+    """Listing e-disclosure → disclosure_periods (без скачивания/парсинга)."""
+    from app.services.disclosure.sync_service import is_sync_alive, start_sync
 
-    logger.info("Старт сервера: проверка и бэкфилл пропущенных цен")
+    if is_sync_alive():
+        logger.warning("Планировщик: disclosure sync уже в очереди — пропуск")
+        return
     db = SessionLocal()
     try:
-        result = backfill_all_companies(db)
-        if result:
-            logger.info("Стартовый бэкфилл завершён: %s", result)
-        else:
-            logger.info("Стартовый бэкфилл: пробелов не обнаружено")
+        # Плановый обход уступает ручному запуску из UI.
+        run = start_sync(db, priority=0)
+        logger.info("Планировщик: поставлен disclosure sync #%s", run.id)
     except Exception as e:
-        logger.error("Ошибка стартового бэкфилла: %s", e)
+        logger.error("Планировщик: не удалось поставить disclosure sync: %s", e)
     finally:
         db.close()
 
@@ -71,7 +77,7 @@ def _startup_backfill() -> None:
 def start_scheduler() -> None:
     """
     Инициализирует и запускает планировщик.
-    Вызывается из lifespan FastAPI при старте приложения.
+    Вызывается процессом воркера, получившим лидерство.
     """
     global _scheduler
     if _scheduler is not None:
@@ -112,25 +118,8 @@ def start_scheduler() -> None:
     )
 
 
-def _weekly_disclosure_sync() -> None:
-    """Listing e-disclosure → disclosure_periods (без скачивания/парсинга)."""
-    from app.services.disclosure.sync_service import is_sync_alive, start_sync
-
-    if is_sync_alive():
-        logger.warning("Планировщик: disclosure sync уже выполняется — пропуск")
-        return
-    db = SessionLocal()
-    try:
-        run = start_sync(db)
-        logger.info("Планировщик: запущен disclosure sync #%s", run.id)
-    except Exception as e:
-        logger.error("Планировщик: не удалось стартовать disclosure sync: %s", e)
-    finally:
-        db.close()
-
-
 def stop_scheduler() -> None:
-    """Останавливает планировщик. Вызывается при завершении приложения."""
+    """Останавливает планировщик (потеря лидерства или завершение воркера)."""
     global _scheduler
     if _scheduler and _scheduler.running:
         _scheduler.shutdown(wait=False)
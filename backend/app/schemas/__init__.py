@@ -7,6 +7,7 @@
 from app.schemas.market import (  # noqa: F401
     Security,
     StockPriceResponse,
+    PriceSeriesResponse,
     PriceUpdateResponse,
 )
 from app.schemas.company import (  # noqa: F401
@@ -36,10 +37,16 @@ from app.schemas.holding import (  # noqa: F401
 )
 from app.schemas.dividend import (  # noqa: F401
     DividendContinuityResult,
+    DividendScreenRow,
 )
 from app.schemas.admin import (  # noqa: F401
     PostgresBackupResponse,
 )
+from app.schemas.backtest import (  # noqa: F401
+    BacktestRebalanceOut,
+    BacktestRequest,
+    BacktestResponse,
+)
 
 __all__ = [
     "BankMetricsOut",
@@ -50,6 +57,7 @@ __all__ = [
     "StakeValuationOut",
     "Security",
     "StockPriceResponse",
+    "PriceSeriesResponse",
     "PriceUpdateResponse",
     "Company",
     "CompanyDescriptionUpdate",
@@ -63,5 +71,9 @@ __all__ = [
     "MultiplierResponse",
     "CurrentMultipliersResponse",
     "DividendContinuityResult",
+    "DividendScreenRow",
     "PostgresBackupResponse",
+    "BacktestRebalanceOut",
+    "BacktestRequest",
+    "BacktestResponse",
 ]
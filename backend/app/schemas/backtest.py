@@ -0,0 +1,49 @@
+"""Схемы бэктеста скринов Грэма."""
+from datetime import date
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class BacktestRequest(BaseModel):
+    """Параметры бэктеста; смысл полей — app/services/backtest/engine.py."""
+
+    date_from: date
+    date_to: date
+    rebalance: Literal["monthly", "quarterly", "semiannual", "annual"] = "quarterly"
+    verdicts: List[Literal["undervalued", "stable", "overvalued"]] = ["undervalued"]
+    max_pe: Optional[float] = None
+    max_pb: Optional[float] = None
+    max_pe_pb: Optional[float] = None
+    min_dividend_yield: Optional[float] = None
+    min_current_ratio: Optional[float] = None
+    max_debt_to_equity: Optional[float] = None
+    min_roe: Optional[float] = None
+    rank_by: Literal["pe_pb", "pe", "pb", "price_to_fcf", "dividend_yield", "roe"] = "pe_pb"
+    max_positions: Optional[int] = Field(None, ge=1)
+    tickers: List[str] = []
+    verified_only: bool = False
+    annual_lag_days: int = Field(120, ge=0)
+    interim_lag_days: int = Field(60, ge=0)
+    max_report_age_days: int = Field(550, ge=0)
+    cost_bps: float = Field(0.0, ge=0)
+
+
+class BacktestRebalanceOut(BaseModel):
+    date: date
+    tickers: List[str]
+    turnover: float
+    cost: float
+
+
+class BacktestResponse(BaseModel):
+    """Дневная стоимость портфеля и эталона (равные доли всех торгуемых), старт — 1,0."""
+
+    params: Dict
+    universe_size: int
+    summary: Dict[str, Optional[float]]
+    benchmark_summary: Dict[str, Optional[float]]
+    days: List[date]
+    portfolio: List[float]
+    benchmark: List[float]
+    rebalances: List[BacktestRebalanceOut]
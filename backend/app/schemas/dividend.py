@@ -13,3 +13,18 @@ class DividendContinuityResult(BaseModel):
     last_payment_year: Optional[int] = None
     gap_years: List[int] = []  # Годы, когда дивиденды не выплачивались
     recommendation: str  # Рекомендация на основе непрерывности
+
+
+class DividendScreenRow(BaseModel):
+    """Строка скрина плательщиков: последний год выплат компании из dividend_facts."""
+    company_id: int
+    ticker: str
+    name: str
+    sector: Optional[str] = None
+    first_year: int  # Первый год выплат в базе
+    last_year: int  # Последний год выплат
+    streak: int  # Лет выплат подряд до last_year включительно
+    dividends_per_share: Optional[float] = None
+    dividend_yield: Optional[float] = None  # % по цене на дату отчёта
+    payout_ratio: Optional[float] = None  # % чистой прибыли
+    current_dividend_yield: Optional[float] = None  # % по текущей цене
@@ -1,6 +1,6 @@
 """Схемы рыночных данных: бумаги MOEX, цены."""
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -52,6 +52,24 @@ class StockPriceResponse(BaseModel):
         from_attributes = True
 
 
+class PriceSeriesResponse(BaseModel):
+    """Ряд цен для графика: параллельные массивы вместо списка объектов.
+
+    open/high/low — только для method="ohlc". Цены с adjusted=true приведены
+    к сегодняшней шкале акций (делёные на сплиты после даты).
+    """
+    company_id: int
+    ticker: str
+    adjusted: bool
+    method: Literal["raw", "lttb", "ohlc"]
+    total_points: int
+    dates: List[date]
+    close: List[float]
+    open: Optional[List[float]] = None
+    high: Optional[List[float]] = None
+    low: Optional[List[float]] = None
+
+
 class PriceUpdateResponse(BaseModel):
     """Ответ при обновлении цены компании."""
     company_id: int
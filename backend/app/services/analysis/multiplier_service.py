@@ -24,6 +24,8 @@ import logging
 from datetime import date, datetime, timezone
 from typing import Optional, List, Dict, Tuple
 
+from sqlalchemy import Select, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.financial_report import FinancialReport
@@ -31,6 +33,7 @@ from app.models.multiplier import Multiplier
 from app.models.company import Company
 from app.models.enums import PeriodType
 from app.services.analysis.calc_multipliers import calculate_multipliers
+from app.services.companies.data_version import bump_data_version
 from app.models.enums import CompanyType
 from app.services.analysis.fcf import compute_banking_flow, compute_core_fcf, compute_fcf
 from app.services.analysis.sector_profiles import (
@@ -43,6 +46,7 @@ from app.services.analysis.bank_metrics import (
     evaluate_all,
 )
 from app.services.analysis.periods import is_full_year
+from app.services.analysis.report_timeline import ReportTimeline, get_report_timeline
 from app.services.analysis.share_counts import (
     compute_circulation_shares,
     resolve_shares_for_multipliers,
@@ -149,32 +153,6 @@ def _ltm_from_interim_formula(
     }
 
 
-def _find_matching_report(
-    db: Session,
-    company_id: int,
-    *,
-    period_type: PeriodType,
-    fiscal_year: int,
-    fiscal_quarter: Optional[int],
-    anchor: FinancialReport,
-) -> Optional[FinancialReport]:
-    q = (
-        db.query(FinancialReport)
-        .filter(
-            FinancialReport.company_id == company_id,
-            FinancialReport.period_type == period_type,
-            FinancialReport.fiscal_year == fiscal_year,
-            FinancialReport.accounting_standard == anchor.accounting_standard,
-            FinancialReport.consolidated == anchor.consolidated,
-        )
-    )
-    if fiscal_quarter is None:
-        q = q.filter(FinancialReport.fiscal_quarter.is_(None))
-    else:
-        q = q.filter(FinancialReport.fiscal_quarter == fiscal_quarter)
-    return q.first()
-
-
 def _interim_ltm_source_label(report: FinancialReport) -> str:
     if report.period_type == PeriodType.SEMI_ANNUAL:
         return "semi_annual_derived"
@@ -184,25 +162,20 @@ def _interim_ltm_source_label(report: FinancialReport) -> str:
 
 
 def _try_interim_ltm(
-    db: Session,
-    company_id: int,
+    timeline: ReportTimeline,
     latest: FinancialReport,
 ) -> Optional[Tuple[Dict[str, Optional[float]], str]]:
     """LTM = prior FY + current YTD − prior-year same YTD (если все три отчёта есть)."""
     if latest.period_type == PeriodType.ANNUAL:
         return None
 
-    prior_fy = _find_matching_report(
-        db,
-        company_id,
+    prior_fy = timeline.find(
         period_type=PeriodType.ANNUAL,
         fiscal_year=latest.fiscal_year - 1,
         fiscal_quarter=None,
         anchor=latest,
     )
-    prior_ytd = _find_matching_report(
-        db,
-        company_id,
+    prior_ytd = timeline.find(
         period_type=PeriodType(latest.period_type),
         fiscal_year=latest.fiscal_year - 1,
         fiscal_quarter=latest.fiscal_quarter,
@@ -239,7 +212,11 @@ def _flow_to_ltm_payload(flow: Dict[str, Optional[float]]) -> Dict[str, Optional
     }
 
 
-def get_ltm_data(db: Session, company_id: int) -> Optional[Dict]:
+def get_ltm_data(
+    db: Optional[Session],
+    company_id: int,
+    timeline: Optional[ReportTimeline] = None,
+) -> Optional[Dict]:
     """
     Вычисляет LTM финансовые данные для компании.
 
@@ -255,25 +232,19 @@ def get_ltm_data(db: Session, company_id: int) -> Optional[Dict]:
 
     ⚠️ Промежуточные отчёты должны содержать накопительные (YTD) значения
     за период с начала года — как в публикуемой отчётности эмитента.
+
+    Все отчёты берутся из ленты компании (report_timeline) — один запрос.
+    Если лента передана готовой, БД не нужна и db может быть None
+    (бэктест строит ленту на дату среза сам).
     """
+    if timeline is None:
+        if db is None:
+            raise ValueError("get_ltm_data: без ленты отчётов нужна сессия БД")
+        timeline = get_report_timeline(db, company_id)
     # Последний годовой отчёт
-    annual: Optional[FinancialReport] = (
-        db.query(FinancialReport)
-        .filter(
-            FinancialReport.company_id == company_id,
-            FinancialReport.period_type == PeriodType.ANNUAL,
-        )
-        .order_by(FinancialReport.report_date.desc())
-        .first()
-    )
-
+    annual = timeline.latest(PeriodType.ANNUAL)
     # Самый свежий отчёт для балансовых данных (любой тип)
-    latest: Optional[FinancialReport] = (
-        db.query(FinancialReport)
-        .filter(FinancialReport.company_id == company_id)
-        .order_by(FinancialReport.report_date.desc())
-        .first()
-    )
+    latest = timeline.latest()
 
     if latest is None:
         return None
@@ -286,7 +257,7 @@ def get_ltm_data(db: Session, company_id: int) -> Optional[Dict]:
         flow = _flow_fields_rub(latest, is_bank)
         source = "annual"
     else:
-        interim = _try_interim_ltm(db, company_id, latest)
+        interim = _try_interim_ltm(timeline, latest)
         if interim is not None:
             flow, source = interim
         elif _covers_full_year(latest):
@@ -344,9 +315,10 @@ def _previous_comparable_report(
 
 
 def _hybrid_banking_flow(
-    db: Session,
+    db: Optional[Session],
     company: Company,
     balance_report: FinancialReport,
+    timeline: Optional[ReportTimeline] = None,
 ) -> Tuple[Optional[float], Optional[str]]:
     """Приток от роста клиентских остатков, млн ₽, и его основание.
 
@@ -355,17 +327,31 @@ def _hybrid_banking_flow(
     акционерам. Считается до мультипликаторов: от этой величины зависит, по
     какому потоку строятся P/FCF, ND/FCF и FCF/NI. Для остальных типов
     компаний очистка не нужна — возвращаем None, и база остаётся прежней.
+    С лентой отчётов db не используется (может быть None).
     """
+    if not _needs_banking_flow(company):
+        return None, None
+    previous = (
+        timeline.previous_comparable(balance_report) if timeline is not None
+        else _previous_comparable_report(db, balance_report)
+    )
+    return _banking_flow_rub(balance_report, previous)
+
+
+def _needs_banking_flow(company: Company) -> bool:
     # Биржа — тот же случай, что гибрид: в операционный поток попадает движение
     # средств участников торгов и депонентов. Это чужие деньги, их нельзя
     # раздать акционерам и ими нельзя погасить долг.
-    if getattr(company, "company_type", None) not in (
+    return getattr(company, "company_type", None) in (
         CompanyType.HYBRID.value,
         CompanyType.EXCHANGE.value,
-    ):
-        return None, None
+    )
+
 
-    previous = _previous_comparable_report(db, balance_report)
+def _banking_flow_rub(
+    balance_report: FinancialReport,
+    previous: Optional[FinancialReport],
+) -> Tuple[Optional[float], Optional[str]]:
     banking_flow, basis = compute_banking_flow(balance_report, previous)
     if banking_flow is None:
         return None, None
@@ -374,43 +360,26 @@ def _hybrid_banking_flow(
     return _convert(banking_flow, balance_report.currency, rate), basis
 
 
-def calculate_current_multipliers(
-    db: Session,
-    company_id: int,
-    price_override: Optional[float] = None,
-) -> Optional[Dict]:
+def ltm_multipliers(
+    company: Company,
+    timeline: ReportTimeline,
+    ltm: Dict,
+    price: Optional[float],
+) -> Tuple[Dict[str, Optional[float]], Optional[float], Optional[str]]:
     """
-    Рассчитывает актуальные мультипликаторы для компании.
-
-    Args:
-        db: Сессия БД
-        company_id: ID компании
-        price_override: Если передан — использует эту цену вместо company.current_price
+    Мультипликаторы по LTM из `get_ltm_data` и цене акции (₽ или валюта отчёта).
 
-    Returns:
-        Словарь с мультипликаторами или None если данных недостаточно
+    Возвращает (мультипликаторы, приток гибрида в млн ₽, его основание).
+    К БД не обращается: всё берётся из ленты — поэтому ту же функцию зовёт
+    бэктест для ленты из отчётов, опубликованных к заданной дате.
     """
-    company: Optional[Company] = db.query(Company).filter(Company.id == company_id).first()
-    if company is None:
-        return None
-
-    ltm = get_ltm_data(db, company_id)
-    if ltm is None:
-        logger.warning("Нет отчётов для компании id=%d", company_id)
-        return None
-
     balance_report: FinancialReport = ltm["balance_report"]
 
-    # Определяем цену
-    price = price_override
-    if price is None:
-        price = _to_float(company.current_price)
-    if price is None:
-        logger.warning("Нет текущей цены для компании id=%d (%s)", company_id, company.ticker)
-
     # Банковский поток считается ДО мультипликаторов: от него зависит, по
     # какому свободному потоку строить P/FCF, ND/FCF и FCF/NI у гибрида.
-    banking_flow, banking_flow_basis = _hybrid_banking_flow(db, company, balance_report)
+    banking_flow, banking_flow_basis = _hybrid_banking_flow(
+        None, company, balance_report, timeline
+    )
 
     # Кол-во акций для market cap — приоритет: в обращении → средневзв. → размещённые.
     mults = calculate_multipliers(
@@ -451,6 +420,45 @@ def calculate_current_multipliers(
             ltm.get("ltm_operating_expenses"), balance_report
         ),
     )
+    return mults, banking_flow, banking_flow_basis
+
+
+def calculate_current_multipliers(
+    db: Session,
+    company_id: int,
+    price_override: Optional[float] = None,
+) -> Optional[Dict]:
+    """
+    Рассчитывает актуальные мультипликаторы для компании.
+
+    Args:
+        db: Сессия БД
+        company_id: ID компании
+        price_override: Если передан — использует эту цену вместо company.current_price
+
+    Returns:
+        Словарь с мультипликаторами или None если данных недостаточно
+    """
+    company: Optional[Company] = db.query(Company).filter(Company.id == company_id).first()
+    if company is None:
+        return None
+
+    timeline = get_report_timeline(db, company_id)
+    ltm = get_ltm_data(db, company_id, timeline)
+    if ltm is None:
+        logger.warning("Нет отчётов для компании id=%d", company_id)
+        return None
+
+    balance_report: FinancialReport = ltm["balance_report"]
+
+    # Определяем цену
+    price = price_override
+    if price is None:
+        price = _to_float(company.current_price)
+    if price is None:
+        logger.warning("Нет текущей цены для компании id=%d (%s)", company_id, company.ticker)
+
+    mults, banking_flow, banking_flow_basis = ltm_multipliers(company, timeline, ltm, price)
 
     rate = _to_float(balance_report.exchange_rate)
 
@@ -562,7 +570,8 @@ def compute_ltm_bank_metrics(db: Session, company_id: int) -> Optional[Dict]:
     is_exchange = company_type == CompanyType.EXCHANGE.value
     is_hybrid = company_type in (CompanyType.HYBRID.value, CompanyType.EXCHANGE.value)
 
-    ltm = get_ltm_data(db, company_id)
+    timeline = get_report_timeline(db, company_id)
+    ltm = get_ltm_data(db, company_id, timeline)
     if ltm is None:
         return None
 
@@ -616,7 +625,7 @@ def compute_ltm_bank_metrics(db: Session, company_id: int) -> Optional[Dict]:
         "hints": hints,
     }
     if is_hybrid:
-        payload.update(_core_flow_summary(db, company, balance_report, ltm))
+        payload.update(_core_flow_summary(db, company, balance_report, ltm, timeline))
     return payload
 
 
@@ -658,6 +667,7 @@ def _core_flow_summary(
     company: Company,
     balance_report: FinancialReport,
     ltm: Dict,
+    timeline: Optional[ReportTimeline] = None,
 ) -> Dict[str, Optional[float]]:
     """Свободный поток ядра для панели финсегмента.
 
@@ -666,7 +676,7 @@ def _core_flow_summary(
     ними. Место у них здесь — рядом с портфелем и депозитами, из движения
     которых этот приток и складывается.
     """
-    banking_flow, basis = _hybrid_banking_flow(db, company, balance_report)
+    banking_flow, basis = _hybrid_banking_flow(db, company, balance_report, timeline)
 
     rate = _to_float(balance_report.exchange_rate)
     ocf = ltm.get("ltm_operating_cash_flow")
@@ -829,6 +839,28 @@ def _report_flow_rub(report: FinancialReport, mults: Dict) -> Dict[str, Optional
     }
 
 
+def _has_report_content(report: FinancialReport) -> bool:
+    """Есть ли в отчёте хоть одна итоговая величина (не пустой черновик)."""
+    return any(
+        getattr(report, field, None) is not None
+        for field in ("revenue", "net_income", "equity", "total_assets")
+    )
+
+
+def _report_based_values(
+    report: FinancialReport,
+    banking_flow: Optional[float],
+) -> Dict[str, Optional[float]]:
+    """Колонки записи report_based: метрики из расчёта, поток и баланс — из отчёта."""
+    mults = calculate_multipliers(report, banking_flow=banking_flow)
+    values: Dict[str, Optional[float]] = {"report_id": report.id}
+    values.update(_picked(mults, _METRIC_FIELDS))
+    # Поток и баланс — из самого отчёта: для годового отчёта LTM = этот год.
+    values.update(_report_flow_rub(report, mults))
+    values.update(_balance_rub(report))
+    return values
+
+
 # ---------------------------------------------------------------------------
 # Cache (upsert) multiplier record
 # ---------------------------------------------------------------------------
@@ -866,6 +898,7 @@ def save_current_multiplier(
         if report:
             _apply(existing, _balance_rub(report))
 
+    bump_data_version(db, [company_id])
     db.commit()
     db.refresh(existing)
     return existing
@@ -958,6 +991,8 @@ def save_report_based_multiplier(
     Промежуточные отчёты (полугодовые/квартальные) в историю не попадают —
     для них кэш report_based не создаётся (см. LTM в calculate_current_multipliers).
     """
+    # Все ветки ниже заканчиваются commit — версия уходит вместе с ними.
+    bump_data_version(db, [report.company_id])
     if report.period_type != PeriodType.ANNUAL:
         delete_multipliers_for_report(db, report.id)
         db.commit()
@@ -971,11 +1006,7 @@ def save_report_based_multiplier(
     #
     # Пропускаем только пустые черновики: если нет ни одной итоговой величины,
     # строка не несёт ничего, кроме года.
-    has_content = any(
-        getattr(report, field, None) is not None
-        for field in ("revenue", "net_income", "equity", "total_assets")
-    )
-    if not has_content:
+    if not _has_report_content(report):
         # Мы не можем посчитать мультипликаторы — но «протухшие» записи
         # от предыдущих версий отчёта всё равно нужно вычистить.
         _delete_stale_report_based(db, report.id, keep_date=None)
@@ -990,7 +1021,7 @@ def save_report_based_multiplier(
         _hybrid_banking_flow(db, company, report) if company else (None, None)
     )
 
-    mults = calculate_multipliers(report, banking_flow=banking_flow)
+    values = _report_based_values(report, banking_flow)
 
     # 1) Основная запись: ищем ранее созданную для ЭТОГО report_id.
     existing: Optional[Multiplier] = (
@@ -1042,11 +1073,7 @@ def save_report_based_multiplier(
         keep_id=existing.id,
     )
 
-    _apply(existing, {"report_id": report.id})
-    _apply(existing, _picked(mults, _METRIC_FIELDS))
-    # Поток и баланс — из самого отчёта: для годового отчёта LTM = этот год.
-    _apply(existing, _report_flow_rub(report, mults))
-    _apply(existing, _balance_rub(report))
+    _apply(existing, values)
 
     db.commit()
     db.refresh(existing)
@@ -1063,30 +1090,61 @@ def backfill_report_based_multipliers(
 
     Нужно после массового импорта или прямой SQL-вставки отчётов, когда
     create_report / update_report не вызывались и кэш истории пуст.
+
+    История пересобирается целиком одной транзакцией: компания и отчёты
+    читаются по разу, предыдущий отчёт для притока клиентских средств
+    берётся из уже загруженного списка, старые записи report_based удаляются
+    одним DELETE, новые вставляются одним INSERT. Читатель истории видит
+    либо старую, либо новую версию, но не половину.
     """
+    company = db.get(Company, company_id)
     reports = (
         db.query(FinancialReport)
         .filter(FinancialReport.company_id == company_id)
-        .order_by(FinancialReport.report_date.asc())
+        .order_by(FinancialReport.report_date.asc(), FinancialReport.id.asc())
         .all()
     )
-    saved = 0
-    skipped = 0
+    needs_flow = company is not None and _needs_banking_flow(company)
+
+    # Ключ — дата: уникальный индекс (company_id, date, type). Два годовых
+    # отчёта на одну дату (МСФО и РСБУ) дают одну строку — как и при
+    # поочерёдном save_report_based_multiplier, побеждает последний.
+    rows: Dict[date, Dict[str, Optional[float]]] = {}
+    latest: Optional[FinancialReport] = None
+    prior: Optional[FinancialReport] = None
     for report in reports:
         if report.period_type != PeriodType.ANNUAL:
-            delete_multipliers_for_report(db, report.id)
-            skipped += 1
             continue
-        result = save_report_based_multiplier(db, report)
-        if result is not None:
-            saved += 1
-        else:
-            skipped += 1
+        # Сопоставимый отчёт — последний годовой строго раньше по дате
+        # (как в _previous_comparable_report), не сосед на ту же дату.
+        if latest is not None and latest.report_date < report.report_date:
+            prior = latest
+        latest = report
+        if not _has_report_content(report):
+            continue
+        banking_flow, _basis = (
+            _banking_flow_rub(report, prior) if needs_flow else (None, None)
+        )
+        rows[report.report_date] = {
+            "company_id": company_id,
+            "date": report.report_date,
+            "type": "report_based",
+            **_report_based_values(report, banking_flow),
+        }
+
+    db.execute(
+        delete(Multiplier)
+        .where(Multiplier.company_id == company_id, Multiplier.type == "report_based")
+        .execution_options(synchronize_session=False)
+    )
+    if rows:
+        db.execute(insert(Multiplier), list(rows.values()))
+    bump_data_version(db, [company_id])
     db.commit()
     return {
         "total_reports": len(reports),
-        "saved": saved,
-        "skipped": skipped,
+        "saved": len(rows),
+        "skipped": len(reports) - len(rows),
     }
 
 
@@ -1108,19 +1166,35 @@ def get_multipliers_history(
     промежуточные (полугодовые/квартальные) используются лишь для расчёта
     актуального LTM, но не как отдельные строки таблицы.
     """
-    q = (
-        db.query(Multiplier)
+    return list(db.scalars(_multipliers_history_stmt(company_id, mult_type, limit)))
+
+
+async def aget_multipliers_history(
+    db: AsyncSession,
+    company_id: int,
+    mult_type: Optional[str] = None,
+    limit: int = 365,
+) -> List[Multiplier]:
+    """Async-вариант get_multipliers_history для читающих эндпоинтов API."""
+    return list(await db.scalars(_multipliers_history_stmt(company_id, mult_type, limit)))
+
+
+def _multipliers_history_stmt(company_id: int, mult_type: Optional[str], limit: int) -> Select:
+    # report подгружается сразу: в async-сессии ленивой загрузки нет, а
+    # _multiplier_to_response берёт из отчёта дату публикации и цену.
+    stmt = (
+        select(Multiplier)
         .options(joinedload(Multiplier.report))
-        .filter(Multiplier.company_id == company_id)
+        .where(Multiplier.company_id == company_id)
     )
     if mult_type:
-        q = q.filter(Multiplier.type == mult_type)
+        stmt = stmt.where(Multiplier.type == mult_type)
     if mult_type == "report_based":
-        q = q.join(
+        stmt = stmt.join(
             FinancialReport,
             Multiplier.report_id == FinancialReport.id,
-        ).filter(FinancialReport.period_type == PeriodType.ANNUAL)
-    return q.order_by(Multiplier.date.desc()).limit(limit).all()
+        ).where(FinancialReport.period_type == PeriodType.ANNUAL)
+    return stmt.order_by(Multiplier.date.desc()).limit(limit)
 
 
 def get_latest_multiplier(
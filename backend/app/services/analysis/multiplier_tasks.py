@@ -0,0 +1,50 @@
+"""Фоновая пересборка истории мультипликаторов (выполняет app.worker).
+
+История report_based пуста после импорта отчётов в обход API. Раньше её
+пересчитывал прямо GET /multipliers/history — каждый параллельный запрос
+карточки запускал свой пересчёт. Теперь запрос только ставит задачу:
+ключ дедупликации один на компанию, поэтому сколько бы запросов ни пришло,
+пересборка идёт одна, а остальные ждут её или получают 202.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.background_task import BackgroundTask
+from app.services.tasks.queue import enqueue
+from app.services.tasks.registry import MULTIPLIERS_REBUILD_HISTORY
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_dedupe_key(company_id: int) -> str:
+    return f"multipliers.rebuild:{company_id}"
+
+
+def schedule_history_rebuild(db: Session, company_id: int) -> Optional[BackgroundTask]:
+    """Поставить пересборку (с commit). None — она уже стоит или идёт."""
+    task = enqueue(
+        db,
+        MULTIPLIERS_REBUILD_HISTORY,
+        {"company_id": company_id},
+        dedupe_key=rebuild_dedupe_key(company_id),
+    )
+    db.commit()
+    return task
+
+
+def rebuild_history_task(payload: dict[str, Any]) -> None:
+    """Задача `multipliers.rebuild_history`: пересобрать report_based компании."""
+    from app.services.analysis.multiplier_service import backfill_report_based_multipliers
+
+    company_id = int(payload["company_id"])
+    db = SessionLocal()
+    try:
+        result = backfill_report_based_multipliers(db, company_id)
+        logger.info("История мультипликаторов company_id=%d пересобрана: %s", company_id, result)
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+"""
+Лента отчётов одной компании — все отчёты одним запросом.
+
+Расчёт текущих мультипликаторов задаёт одной и той же горстке отчётов
+компании несколько вопросов подряд: последний отчёт, последний годовой,
+годовой и YTD прошлого года той же отчётности (формула LTM), предыдущий
+сопоставимый (приток клиентских средств гибрида). Раньше на каждый вопрос
+уходил свой запрос, а `compute_ltm_bank_metrics` задавал их заново.
+
+`ReportTimeline` читает отчёты компании один раз и отвечает на всё это из
+памяти. Лента живёт в `Session.info` — в пределах одной сессии (запроса
+API или шага воркера) — и сбрасывается при любой записи отчётов в этой
+сессии, а также на commit/rollback. Между запросами готовые ответы
+кэширует уже `response_cache` по `companies.data_version`, так что держать
+ORM-объекты дольше сессии не нужно (и опасно: после commit они истекают).
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.models.financial_report import FinancialReport
+
+_INFO_KEY = "report_timelines"
+
+# (period_type, fiscal_year, fiscal_quarter, accounting_standard, consolidated)
+ReportKey = Tuple[str, int, Optional[int], str, bool]
+
+
+def _plain(value: Any) -> Any:
+    """Enum → его значение: PeriodType.ANNUAL и "annual" — один ключ словаря."""
+    return getattr(value, "value", value)
+
+
+def report_key(
+    period_type: Any,
+    fiscal_year: int,
+    fiscal_quarter: Optional[int],
+    accounting_standard: Any,
+    consolidated: bool,
+) -> ReportKey:
+    return (
+        _plain(period_type),
+        int(fiscal_year),
+        fiscal_quarter,
+        _plain(accounting_standard),
+        bool(consolidated),
+    )
+
+
+class ReportTimeline:
+    """Отчёты компании по возрастанию (report_date, id) и индексы по ним."""
+
+    def __init__(self, company_id: int, reports: Sequence[FinancialReport]):
+        self.company_id = company_id
+        self.reports: Tuple[FinancialReport, ...] = tuple(
+            sorted(reports, key=lambda r: (r.report_date, r.id))
+        )
+        self._by_key: Dict[ReportKey, FinancialReport] = {}
+        self._by_period: Dict[str, list[FinancialReport]] = {}
+        for report in self.reports:
+            key = report_key(
+                report.period_type, report.fiscal_year, report.fiscal_quarter,
+                report.accounting_standard, report.consolidated,
+            )
+            self._by_key.setdefault(key, report)
+            self._by_period.setdefault(_plain(report.period_type), []).append(report)
+
+    def __len__(self) -> int:
+        return len(self.reports)
+
+    def latest(self, period_type: Any = None) -> Optional[FinancialReport]:
+        """Самый свежий отчёт (по report_date), при period_type — этого типа."""
+        if period_type is None:
+            return self.reports[-1] if self.reports else None
+        same = self._by_period.get(_plain(period_type))
+        return same[-1] if same else None
+
+    def find(
+        self,
+        *,
+        period_type: Any,
+        fiscal_year: int,
+        fiscal_quarter: Optional[int],
+        anchor: FinancialReport,
+    ) -> Optional[FinancialReport]:
+        """Отчёт за период в той же отчётности (стандарт, консолидация), что anchor."""
+        return self._by_key.get(report_key(
+            period_type, fiscal_year, fiscal_quarter,
+            anchor.accounting_standard, anchor.consolidated,
+        ))
+
+    def previous_comparable(self, report: FinancialReport) -> Optional[FinancialReport]:
+        """Последний отчёт того же типа периода строго раньше report_date."""
+        same = self._by_period.get(_plain(report.period_type), [])
+        idx = bisect_left([r.report_date for r in same], report.report_date)
+        return same[idx - 1] if idx else None
+
+
+def get_report_timeline(db: Session, company_id: int) -> ReportTimeline:
+    """Лента отчётов компании в этой сессии (один запрос на сессию и компанию)."""
+    timelines: Dict[int, ReportTimeline] = db.info.setdefault(_INFO_KEY, {})
+    if timelines and _has_pending_report_changes(db):
+        # Отчёт добавлен или изменён, но ещё не сброшен в БД: запрос из кэша
+        # его бы не увидел, а обычный запрос сделал бы autoflush.
+        timelines.clear()
+    timeline = timelines.get(company_id)
+    if timeline is None:
+        reports = db.scalars(
+            select(FinancialReport).where(FinancialReport.company_id == company_id)
+        ).all()
+        timeline = ReportTimeline(company_id, reports)
+        timelines[company_id] = timeline
+    return timeline
+
+
+def _has_pending_report_changes(db: Session) -> bool:
+    return any(
+        isinstance(obj, FinancialReport)
+        for pending in (db.new, db.dirty, db.deleted)
+        for obj in pending
+    )
+
+
+def _drop(session: Session, *_args: Any) -> None:
+    session.info.pop(_INFO_KEY, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _drop_on_report_flush(session: Session, _flush_context: Any) -> None:
+    if _INFO_KEY in session.info and _has_pending_report_changes(session):
+        _drop(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _drop_on_bulk_write(orm_execute_state: Any) -> None:
+    # UPDATE/DELETE/INSERT через db.execute() минуют identity map и flush.
+    if not orm_execute_state.is_select:
+        _drop(orm_execute_state.session)
+
+
+event.listen(Session, "after_commit", _drop)
+event.listen(Session, "after_soft_rollback", _drop)
+
+
+__all__ = ("ReportKey", "ReportTimeline", "get_report_timeline", "report_key")
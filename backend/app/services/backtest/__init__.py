@@ -0,0 +1 @@
+"""Бэктест скринов Грэма на истории: отчёты и цены без заглядывания вперёд."""
@@ -0,0 +1,549 @@
+"""
+Бэктест скрина Грэма: выборка на датах ребалансировки, портфель равных
+долей, дневная стоимость, оборот и издержки.
+
+Данные поднимаются тремя запросами на всю вселенную — компании, отчёты,
+цены (Core, две колонки, серверным курсором) — и раскладываются по
+компаниям в массивы:
+  * цены — `PriceSeries` в сегодняшней шкале (`adjust_for_splits`), чтобы
+    сплит не выглядел обвалом котировки;
+  * фундаментал — снимки по событиям публикации (snapshots.py) и массив их
+    дат `known`.
+
+Дальше ни одного обращения к БД: состояние компании на любой торговый день —
+два бинарных поиска (снимок и последняя цена), а дневной проход считает
+только стоимость держаных бумаг. Десять лет по 250 тикерам — это ~10 тыс.
+снимков LTM и 2 500 дней, секунды на одном ядре.
+
+Цены — закрытия без дивидендов: доходность ценовая. Бумага, переставшая
+торговаться, держится по последней цене до ближайшей ребалансировки.
+
+Результат кэшируется в памяти процесса по хешу параметров и отпечатку
+данных — числу компаний и сумме их `data_version`: запись отчёта или цены
+меняет сумму, и следующий запрос пересчитает бэктест.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.company import Company
+from app.models.financial_report import FinancialReport
+from app.models.stock_price import StockPrice
+from app.services.analysis.graham_analyser import classify_company
+from app.services.backtest.snapshots import Snapshot, build_snapshots
+from app.services.market.price_series import PriceSeries, adjust_for_splits
+
+logger = logging.getLogger(__name__)
+
+# Частота ребалансировки → длина периода в месяцах.
+REBALANCE_FREQUENCIES = {"monthly": 1, "quarterly": 3, "semiannual": 6, "annual": 12}
+
+# Ключ ранжирования → по возрастанию ли (дешевле — лучше).
+RANK_KEYS = {
+    "pe_pb": True,
+    "pe": True,
+    "pb": True,
+    "price_to_fcf": True,
+    "dividend_yield": False,
+    "roe": False,
+}
+
+VERDICTS = ("undervalued", "stable", "overvalued")
+
+# Цена старше этого на дату ребалансировки — бумага не торгуется, в выборку не берём.
+_MAX_PRICE_AGE_DAYS = 10
+_TRADING_DAYS_PER_YEAR = 252
+_PRICE_BATCH = 20_000
+
+
+@dataclass(frozen=True)
+class BacktestParams:
+    """
+    Параметры бэктеста. Пустой порог не проверяется; пустой `verdicts` —
+    вердикт отраслевого профиля не требуется.
+    """
+
+    date_from: date
+    date_to: date
+    rebalance: str = "quarterly"
+    # Вердикт classify_company по отраслевому профилю, как в карточке компании.
+    verdicts: tuple[str, ...] = ("undervalued",)
+    max_pe: Optional[float] = None
+    max_pb: Optional[float] = None
+    max_pe_pb: Optional[float] = None          # Грэм: P/E × P/B ≤ 22,5
+    min_dividend_yield: Optional[float] = None  # %
+    min_current_ratio: Optional[float] = None
+    max_debt_to_equity: Optional[float] = None
+    min_roe: Optional[float] = None            # %
+    rank_by: str = "pe_pb"
+    max_positions: Optional[int] = None
+    tickers: tuple[str, ...] = ()              # пусто — все компании с отчётами
+    verified_only: bool = False
+    # Срок публикации, если filing_date не заполнен.
+    annual_lag_days: int = 120
+    interim_lag_days: int = 60
+    # Компания, не публиковавшая отчёты дольше, из выборки выпадает.
+    max_report_age_days: int = 550
+    cost_bps: float = 0.0                      # издержки на оборот, б.п.
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "verdicts", tuple(self.verdicts))
+        object.__setattr__(self, "tickers", tuple(sorted({t.upper() for t in self.tickers})))
+        if self.date_from >= self.date_to:
+            raise ValueError("date_from должен быть раньше date_to")
+        if self.rebalance not in REBALANCE_FREQUENCIES:
+            raise ValueError(
+                f"Неизвестная частота {self.rebalance!r}; доступны: {', '.join(REBALANCE_FREQUENCIES)}"
+            )
+        if self.rank_by not in RANK_KEYS:
+            raise ValueError(f"Неизвестный ключ ранжирования {self.rank_by!r}; доступны: {', '.join(RANK_KEYS)}")
+        unknown = [v for v in self.verdicts if v not in VERDICTS]
+        if unknown:
+            raise ValueError(f"Неизвестный вердикт {', '.join(unknown)}; доступны: {', '.join(VERDICTS)}")
+        if self.max_positions is not None and self.max_positions < 1:
+            raise ValueError("max_positions должен быть положительным")
+        if min(self.annual_lag_days, self.interim_lag_days, self.max_report_age_days) < 0:
+            raise ValueError("Сроки публикации и возраст отчёта не бывают отрицательными")
+
+    def cache_key(self) -> str:
+        payload = json.dumps(asdict(self), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class CompanyData:
+    """Всё, что бэктесту нужно о компании: цены и снимки фундаментала."""
+
+    company_id: int
+    ticker: str
+    sector: Optional[str]
+    profile_key: Optional[str]
+    prices: PriceSeries
+    snapshots: list[Snapshot]
+    known: array = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.known = array("q", (s.known_from for s in self.snapshots))
+
+    def price_on(self, day: int, max_age: Optional[int] = None) -> Optional[float]:
+        """Последнее закрытие не позже `day`; при max_age — не старше стольких дней."""
+        i = bisect_right(self.prices.days, day) - 1
+        if i < 0 or (max_age is not None and day - self.prices.days[i] > max_age):
+            return None
+        return self.prices.closes[i]
+
+    def snapshot_on(self, day: int) -> Optional[Snapshot]:
+        """Снимок по отчётам, опубликованным не позже `day`."""
+        i = bisect_right(self.known, day) - 1
+        return self.snapshots[i] if i >= 0 else None
+
+
+@dataclass(frozen=True)
+class Rebalance:
+    day: date
+    tickers: tuple[str, ...]
+    turnover: float   # доля портфеля: max(покупки, продажи)
+    cost: float       # издержки, доля стоимости портфеля
+
+
+@dataclass
+class BacktestResult:
+    """Дневная стоимость портфеля и эталона (старт — 1,0) и сводка."""
+
+    params: BacktestParams
+    days: array
+    portfolio: array
+    benchmark: array
+    rebalances: list[Rebalance]
+    summary: dict[str, Optional[float]]
+    benchmark_summary: dict[str, Optional[float]]
+    universe_size: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "params": json.loads(json.dumps(asdict(self.params), default=str)),
+            "universe_size": self.universe_size,
+            "summary": self.summary,
+            "benchmark_summary": self.benchmark_summary,
+            "days": [date.fromordinal(d).isoformat() for d in self.days],
+            "portfolio": [round(v, 6) for v in self.portfolio],
+            "benchmark": [round(v, 6) for v in self.benchmark],
+            "rebalances": [
+                {
+                    "date": r.day.isoformat(),
+                    "tickers": list(r.tickers),
+                    "turnover": round(r.turnover, 4),
+                    "cost": round(r.cost, 6),
+                }
+                for r in self.rebalances
+            ],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Загрузка
+# ---------------------------------------------------------------------------
+
+def load_universe(db: Session, params: BacktestParams) -> list[CompanyData]:
+    """Компании с отчётами, их снимки и цены на период бэктеста — три запроса."""
+    stmt = select(Company).where(Company.id.in_(select(FinancialReport.company_id)))
+    if params.tickers:
+        stmt = stmt.where(Company.ticker.in_(params.tickers))
+    companies = db.scalars(stmt.order_by(Company.id)).all()
+    ids = [c.id for c in companies]
+    if not ids:
+        return []
+
+    # Отчёт с концом периода после date_to к date_to ещё не вышел.
+    report_stmt = select(FinancialReport).where(
+        FinancialReport.company_id.in_(ids),
+        FinancialReport.report_date <= params.date_to,
+    )
+    if params.verified_only:
+        report_stmt = report_stmt.where(FinancialReport.verified_by_analyst.is_(True))
+    reports: dict[int, list[FinancialReport]] = defaultdict(list)
+    for report in db.scalars(report_stmt):
+        reports[report.company_id].append(report)
+
+    prices = _load_prices(
+        db, ids, params.date_from - timedelta(days=_MAX_PRICE_AGE_DAYS), params.date_to,
+    )
+
+    universe = []
+    for company in companies:
+        snapshots = build_snapshots(
+            company,
+            reports.get(company.id, ()),
+            annual_lag_days=params.annual_lag_days,
+            interim_lag_days=params.interim_lag_days,
+        )
+        series = prices.get(company.id)
+        if not snapshots or series is None:
+            continue
+        universe.append(CompanyData(
+            company_id=company.id,
+            ticker=company.ticker,
+            sector=company.sector,
+            profile_key=company.sector_profile_key,
+            prices=adjust_for_splits(series, company.share_splits),
+            snapshots=snapshots,
+        ))
+    return universe
+
+
+def _load_prices(
+    db: Session, company_ids: Sequence[int], date_from: date, date_to: date,
+) -> dict[int, PriceSeries]:
+    stmt = (
+        select(StockPrice.company_id, StockPrice.date, StockPrice.price)
+        .where(
+            StockPrice.company_id.in_(company_ids),
+            StockPrice.date >= date_from,
+            StockPrice.date <= date_to,
+        )
+        .order_by(StockPrice.company_id, StockPrice.date)
+        .execution_options(yield_per=_PRICE_BATCH)
+    )
+    series: dict[int, PriceSeries] = {}
+    current: Optional[int] = None
+    days = closes = None
+    for company_id, day, price in db.execute(stmt):
+        if price is None:
+            continue
+        if company_id != current:
+            current, days, closes = company_id, array("q"), array("d")
+            series[company_id] = PriceSeries(days, closes)
+        days.append(day.toordinal())
+        closes.append(float(price))
+    return series
+
+
+# ---------------------------------------------------------------------------
+# Скрин
+# ---------------------------------------------------------------------------
+
+def _rank_value(metrics: dict[str, Optional[float]], rank_by: str) -> Optional[float]:
+    if rank_by == "pe_pb":
+        pe, pb = metrics["pe_ratio"], metrics["pb_ratio"]
+        return pe * pb if pe is not None and pb is not None else None
+    return metrics[{"pe": "pe_ratio", "pb": "pb_ratio"}.get(rank_by, rank_by)]
+
+
+def _passes(
+    metrics: dict[str, Optional[float]],
+    company: CompanyData,
+    snapshot: Snapshot,
+    params: BacktestParams,
+) -> bool:
+    def at_most(value: Optional[float], limit: Optional[float]) -> bool:
+        return limit is None or (value is not None and value <= limit)
+
+    def at_least(value: Optional[float], limit: Optional[float]) -> bool:
+        return limit is None or (value is not None and value >= limit)
+
+    pe_pb = _rank_value(metrics, "pe_pb")
+    if not (
+        at_most(metrics["pe_ratio"], params.max_pe)
+        and at_most(metrics["pb_ratio"], params.max_pb)
+        and at_most(pe_pb, params.max_pe_pb)
+        and at_least(metrics["dividend_yield"], params.min_dividend_yield)
+        and at_least(metrics["current_ratio"], params.min_current_ratio)
+        and at_most(metrics["debt_to_equity"], params.max_debt_to_equity)
+        and at_least(metrics["roe"], params.min_roe)
+    ):
+        return False
+    if not params.verdicts:
+        return True
+    verdict = classify_company(
+        metrics, snapshot.report_type, company.sector, company.profile_key,
+    )["classify"]
+    return verdict in params.verdicts
+
+
+def screen(universe: Sequence[CompanyData], day: int, params: BacktestParams) -> list[int]:
+    """Индексы компаний, прошедших скрин на день `day`, в порядке ранжирования."""
+    ascending = RANK_KEYS[params.rank_by]
+    ranked: list[tuple[float, str, int]] = []
+    for idx, company in enumerate(universe):
+        price = company.price_on(day, _MAX_PRICE_AGE_DAYS)
+        snapshot = company.snapshot_on(day)
+        if price is None or snapshot is None:
+            continue
+        if day - snapshot.report_date.toordinal() > params.max_report_age_days:
+            continue
+        metrics = snapshot.at_price(price)
+        if not _passes(metrics, company, snapshot, params):
+            continue
+        value = _rank_value(metrics, params.rank_by)
+        # Без значения ключа — в конец списка, при равенстве — по тикеру.
+        if value is None:
+            key = math.inf
+        else:
+            key = value if ascending else -value
+        ranked.append((key, company.ticker, idx))
+    ranked.sort()
+    picked = [idx for _, _, idx in ranked]
+    return picked[:params.max_positions] if params.max_positions else picked
+
+
+def _tradable(universe: Sequence[CompanyData], day: int) -> list[int]:
+    return [
+        idx for idx, company in enumerate(universe)
+        if company.price_on(day, _MAX_PRICE_AGE_DAYS) is not None
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Симуляция
+# ---------------------------------------------------------------------------
+
+def rebalance_indices(calendar: Sequence[int], months: int) -> list[int]:
+    """Первый торговый день каждого периода в `months` месяцев."""
+    indices = []
+    last = None
+    for i, day in enumerate(calendar):
+        d = date.fromordinal(day)
+        period = (d.year * 12 + d.month - 1) // months
+        if period != last:
+            indices.append(i)
+            last = period
+    return indices
+
+
+def _simulate(
+    universe: Sequence[CompanyData],
+    calendar: Sequence[int],
+    targets: dict[int, list[int]],
+    cost_rate: float,
+) -> tuple[array, list[tuple[float, float]]]:
+    """Стоимость портфеля равных долей по дням и (оборот, издержки) ребалансировок."""
+    values = array("d")
+    trades: list[tuple[float, float]] = []
+    cash = 1.0
+    units: dict[int, float] = {}
+    for i, day in enumerate(calendar):
+        prices = {k: universe[k].price_on(day) for k in units}
+        value = cash + sum(units[k] * prices[k] for k in units)
+        target = targets.get(i)
+        if target is not None:
+            new_prices = {k: universe[k].price_on(day) for k in target}
+            old = {k: units[k] * prices[k] / value for k in units}
+            new = {k: 1.0 / len(target) for k in target}
+            buys = sum(max(new.get(k, 0.0) - old.get(k, 0.0), 0.0) for k in new.keys() | old.keys())
+            sells = sum(max(old.get(k, 0.0) - new.get(k, 0.0), 0.0) for k in new.keys() | old.keys())
+            cost = (buys + sells) * cost_rate
+            trades.append((max(buys, sells), cost))
+            value *= 1.0 - cost
+            units = {k: value * w / new_prices[k] for k, w in new.items()}
+            cash = 0.0 if units else value
+        values.append(value)
+    return values, trades
+
+
+def summarize(
+    calendar: Sequence[int], values: Sequence[float], turnovers: Sequence[float],
+) -> dict[str, Optional[float]]:
+    """Доходность, CAGR, волатильность, максимальная просадка и оборот в год."""
+    if not values:
+        return {}
+    years = (calendar[-1] - calendar[0]) / 365.25
+    returns = [b / a - 1.0 for a, b in zip(values, values[1:]) if a > 0]
+    mean = sum(returns) / len(returns) if returns else 0.0
+    variance = sum((r - mean) ** 2 for r in returns) / len(returns) if returns else 0.0
+    peak = 1.0
+    drawdown = 0.0
+    for v in values:
+        peak = max(peak, v)
+        drawdown = min(drawdown, v / peak - 1.0)
+    final = values[-1]
+    return {
+        "total_return": round(final - 1.0, 6),
+        "cagr": round(final ** (1 / years) - 1.0, 6) if years > 0 and final > 0 else None,
+        "volatility": round(math.sqrt(variance * _TRADING_DAYS_PER_YEAR), 6),
+        "max_drawdown": round(drawdown, 6),
+        "turnover_per_year": round(sum(turnovers) / years, 4) if years > 0 else None,
+    }
+
+
+def run_backtest(universe: Sequence[CompanyData], params: BacktestParams) -> BacktestResult:
+    """Бэктест по загруженной вселенной — без БД."""
+    days = sorted({
+        d for company in universe
+        for d in company.prices.window(params.date_from, params.date_to).days
+    })
+    if not days:
+        raise ValueError("Нет цен в заданном периоде")
+    calendar = array("q", days)
+
+    indices = rebalance_indices(calendar, REBALANCE_FREQUENCIES[params.rebalance])
+    picks = {i: screen(universe, calendar[i], params) for i in indices}
+    benchmark_picks = {i: _tradable(universe, calendar[i]) for i in indices}
+    cost_rate = params.cost_bps / 10_000
+
+    portfolio, trades = _simulate(universe, calendar, picks, cost_rate)
+    benchmark, benchmark_trades = _simulate(universe, calendar, benchmark_picks, cost_rate)
+
+    rebalances = [
+        Rebalance(
+            day=date.fromordinal(calendar[i]),
+            tickers=tuple(universe[k].ticker for k in picks[i]),
+            turnover=turnover,
+            cost=cost,
+        )
+        for i, (turnover, cost) in zip(indices, trades)
+    ]
+    summary = summarize(calendar, portfolio, [t for t, _ in trades])
+    summary["avg_positions"] = round(
+        sum(len(r.tickers) for r in rebalances) / len(rebalances), 2,
+    )
+    return BacktestResult(
+        params=params,
+        days=calendar,
+        portfolio=portfolio,
+        benchmark=benchmark,
+        rebalances=rebalances,
+        summary=summary,
+        benchmark_summary=summarize(calendar, benchmark, [t for t, _ in benchmark_trades]),
+        universe_size=len(universe),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Кэш по параметрам
+# ---------------------------------------------------------------------------
+
+class _ResultCache:
+    """LRU результатов: (хеш параметров, отпечаток данных) → результат."""
+
+    def __init__(self, max_entries: int):
+        self._max = max_entries
+        self._data: OrderedDict[tuple[str, tuple[int, int]], BacktestResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, tuple[int, int]]) -> Optional[BacktestResult]:
+        with self._lock:
+            result = self._data.get(key)
+            if result is not None:
+                self._data.move_to_end(key)
+            return result
+
+    def put(self, key: tuple[str, tuple[int, int]], result: BacktestResult) -> None:
+        if self._max <= 0:
+            return
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_cache = _ResultCache(settings.BACKTEST_CACHE_MAX_ENTRIES)
+
+
+def data_fingerprint(db: Session) -> tuple[int, int]:
+    """(число компаний, сумма data_version) — меняется при любой записи данных компании."""
+    count, total = db.execute(
+        select(func.count(Company.id), func.coalesce(func.sum(Company.data_version), 0))
+    ).one()
+    return int(count), int(total)
+
+
+def get_backtest(db: Session, params: BacktestParams) -> BacktestResult:
+    """Результат бэктеста из кэша или посчитанный заново."""
+    key = (params.cache_key(), data_fingerprint(db))
+    result = _cache.get(key)
+    if result is not None:
+        return result
+    started = time.monotonic()
+    universe = load_universe(db, params)
+    loaded = time.monotonic()
+    result = run_backtest(universe, params)
+    logger.info(
+        "Бэктест %s…: %d компаний, %d дней; загрузка %.1f с, расчёт %.1f с",
+        key[0][:8], len(universe), len(result.days), loaded - started, time.monotonic() - loaded,
+    )
+    _cache.put(key, result)
+    return result
+
+
+def clear_cache() -> None:
+    """Сбросить кэш результатов процесса (тесты, ручная диагностика)."""
+    _cache.clear()
+
+
+__all__ = (
+    "REBALANCE_FREQUENCIES",
+    "RANK_KEYS",
+    "VERDICTS",
+    "BacktestParams",
+    "BacktestResult",
+    "CompanyData",
+    "Rebalance",
+    "clear_cache",
+    "data_fingerprint",
+    "get_backtest",
+    "load_universe",
+    "rebalance_indices",
+    "run_backtest",
+    "screen",
+    "summarize",
+)
@@ -0,0 +1,168 @@
+"""
+Фундаментал компании на дату — только из отчётов, опубликованных к ней.
+
+Мультипликаторы в БД посчитаны «на сегодня» или «на дату отчёта», а рынок в
+день X знал меньше: годовой отчёт за 2023 год выходит в апреле 2024-го, и до
+этого в LTM стоит прошлый год или YTD девяти месяцев. Бэктест, который
+берёт отчёт с даты `report_date`, покупает компанию по ещё не вышедшей
+прибыли.
+
+Поэтому у каждого отчёта есть дата, с которой он известен: `filing_date`, а
+без неё — `report_date` плюс типичный срок публикации (годовой МСФО —
+четыре месяца, промежуточный — два). Отчёты компании сортируются по этой
+дате, и на каждом событии публикации из уже вышедших отчётов собирается
+лента и считается LTM — теми же `get_ltm_data` и `ltm_multipliers`, что
+карточка компании. Между событиями фундаментал не меняется, поэтому на
+любой торговый день снимок находится бинарным поиском, а от цены зависят
+только P/E, P/B, P/FCF и дивидендная доходность.
+
+Суммы снимка — в рублях, акции и дивиденд на акцию — в сегодняшней шкале
+(после всех сплитов), как и цены из `adjust_for_splits`: капитализация
+«цена × акции» от шкалы не зависит.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Optional, Sequence
+
+from app.models.company import Company
+from app.models.enums import PeriodType
+from app.models.financial_report import FinancialReport
+from app.services.analysis.calc_multipliers import MILLION
+from app.services.analysis.multiplier_service import get_ltm_data, ltm_multipliers
+from app.services.analysis.report_timeline import ReportTimeline
+from app.services.share_splits import shares_factor
+from app.utils.currency_converter import convert_to_rub
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Что рынок знал о компании начиная с дня `known_from` (date.toordinal())."""
+
+    known_from: int
+    report_id: int
+    report_date: date
+    report_type: str
+    net_income: Optional[float]            # LTM, млн ₽
+    equity: Optional[float]                # млн ₽
+    fcf: Optional[float]                   # LTM, млн ₽ (у гибрида — поток ядра)
+    dividends_per_share: Optional[float]   # LTM, ₽ в сегодняшней шкале акций
+    shares: Optional[float]                # в сегодняшней шкале
+    roe: Optional[float]
+    debt_to_equity: Optional[float]
+    current_ratio: Optional[float]
+    cost_to_income: Optional[float]
+
+    def at_price(self, price: float) -> dict[str, Optional[float]]:
+        """Мультипликаторы по цене в сегодняшней шкале — те же формулы, что calc_multipliers."""
+        cap = price * self.shares if self.shares and price > 0 else None
+        return {
+            "pe_ratio": _ratio(cap, self.net_income),
+            "pb_ratio": _ratio(cap, self.equity),
+            "price_to_fcf": _ratio(cap, self.fcf),
+            "dividend_yield": (
+                self.dividends_per_share / price * 100
+                if self.dividends_per_share and price > 0 else None
+            ),
+            "roe": self.roe,
+            "debt_to_equity": self.debt_to_equity,
+            "current_ratio": self.current_ratio,
+            "cost_to_income": self.cost_to_income,
+        }
+
+
+def _ratio(cap_full: Optional[float], base_mln: Optional[float]) -> Optional[float]:
+    if cap_full is None or base_mln is None or base_mln <= 0:
+        return None
+    return cap_full / (base_mln * MILLION)
+
+
+def known_from(
+    report: FinancialReport,
+    *,
+    annual_lag_days: int,
+    interim_lag_days: int,
+) -> date:
+    """День, с которого отчёт известен рынку (по цене закрытия этого дня)."""
+    if report.filing_date is not None:
+        # Дата публикации раньше конца периода — опечатка, а не инсайд.
+        return max(report.filing_date, report.report_date)
+    annual = getattr(report.period_type, "value", report.period_type) == PeriodType.ANNUAL.value
+    return report.report_date + timedelta(days=annual_lag_days if annual else interim_lag_days)
+
+
+def build_snapshots(
+    company: Company,
+    reports: Sequence[FinancialReport],
+    *,
+    annual_lag_days: int,
+    interim_lag_days: int,
+) -> list[Snapshot]:
+    """Снимки фундаментала по событиям публикации, по возрастанию known_from."""
+    dated = sorted(
+        (
+            (known_from(r, annual_lag_days=annual_lag_days, interim_lag_days=interim_lag_days), r)
+            for r in reports
+        ),
+        key=lambda item: (item[0], item[1].report_date, item[1].id),
+    )
+    snapshots: list[Snapshot] = []
+    published: list[FinancialReport] = []
+    for i, (day, report) in enumerate(dated):
+        published.append(report)
+        if i + 1 < len(dated) and dated[i + 1][0] == day:
+            continue  # несколько отчётов в один день — один снимок
+        snapshot = _snapshot(company, published, day)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def current_snapshot(company: Company, reports: Sequence[FinancialReport]) -> Optional[Snapshot]:
+    """Снимок по всем отчётам компании — знаменатели мультипликаторов «на сейчас».
+
+    Ими пользуется поток цен в течение дня (app/services/market/live_feed.py):
+    на каждой сделке пересчитывается только `at_price`.
+    """
+    return _snapshot(company, reports, date.today())
+
+
+def _snapshot(company: Company, published: Sequence[FinancialReport], day: date) -> Optional[Snapshot]:
+    timeline = ReportTimeline(company.id, published)
+    ltm = get_ltm_data(None, company.id, timeline)
+    if ltm is None:
+        return None
+    mults, _, _ = ltm_multipliers(company, timeline, ltm, None)
+    balance: FinancialReport = ltm["balance_report"]
+
+    # Акции отчёта — в шкале его даты; сплиты после неё переводят их в сегодняшнюю.
+    factor = shares_factor(company.share_splits, balance.report_date)
+    shares = mults.get("shares_used")
+    dps = ltm.get("ltm_dividends_per_share")
+    fcf = mults.get("ltm_core_fcf")
+    return Snapshot(
+        known_from=day.toordinal(),
+        report_id=balance.id,
+        report_date=balance.report_date,
+        report_type=getattr(balance, "report_type", None) or "general",
+        net_income=ltm.get("ltm_net_income"),
+        equity=_rub(balance.equity, balance),
+        fcf=fcf if fcf is not None else mults.get("ltm_fcf"),
+        dividends_per_share=dps / factor if dps is not None else None,
+        shares=shares * factor if shares else None,
+        roe=mults.get("roe"),
+        debt_to_equity=mults.get("debt_to_equity"),
+        current_ratio=mults.get("current_ratio"),
+        cost_to_income=mults.get("cost_to_income"),
+    )
+
+
+def _rub(value: Any, report: FinancialReport) -> Optional[float]:
+    if value is None:
+        return None
+    rate = float(report.exchange_rate) if report.exchange_rate else None
+    return convert_to_rub(float(value), report.currency, rate)
+
+
+__all__ = ("Snapshot", "build_snapshots", "current_snapshot", "known_from")
@@ -1,4 +1,5 @@
-from sqlalchemy import func
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
@@ -8,6 +9,7 @@ from app.models.financial_report import FinancialReport
 from app.models.enums import CompanyType, company_type_to_report_type
 from app.schemas import CompanyCreate
 from app.services.analysis.sector_profiles import available_profiles
+from app.services.companies.data_version import bump_data_version
 from app.services.companies.share_class import (
     detect_preferred_share,
     instrument_can_be_preferred,
@@ -45,7 +47,11 @@ def get_company_by_id(db: Session, company_id: int) -> Optional[Company]:
     Returns:
         Объект Company или None, если не найдена
     """
-    return db.query(Company).filter(Company.id == company_id).first()
+    return db.get(Company, company_id)
+
+
+async def aget_company_by_id(db: AsyncSession, company_id: int) -> Optional[Company]:
+    return await db.get(Company, company_id)
 
 
 def get_company_by_ticker(db: Session, ticker: str) -> Optional[Company]:
@@ -133,6 +139,7 @@ def _apply_company_update(db_company: Company, company_data: CompanyCreate, db:
     # Профиль порогов — тоже ручной выбор: синхронизация с T-Invest его не трогает.
     if company_data.sector_profile_key is not None:
         db_company.sector_profile_key = company_data.sector_profile_key  # type: ignore
+    bump_data_version(db, [db_company.id])
     db.commit()
     db.refresh(db_company)
     return db_company
@@ -156,6 +163,7 @@ def set_preferred_share_flag(
         db_company.is_preferred_share = False  # type: ignore
     else:
         db_company.is_preferred_share = is_preferred  # type: ignore
+    bump_data_version(db, [company_id])
     db.commit()
     db.refresh(db_company)
     return db_company
@@ -178,6 +186,7 @@ def set_sector_profile_key(
     if cleaned and cleaned not in {p["key"] for p in available_profiles()}:
         raise ValueError(f"Неизвестный профиль: {profile_key}")
     db_company.sector_profile_key = cleaned or None  # type: ignore[assignment]
+    bump_data_version(db, [company_id])
     db.commit()
     db.refresh(db_company)
     return db_company
@@ -209,6 +218,7 @@ def set_company_type(
     db.query(FinancialReport).filter(FinancialReport.company_id == company_id).update(
         {FinancialReport.report_type: resolved}, synchronize_session=False
     )
+    bump_data_version(db, [company_id])
     db.commit()
     db.refresh(db_company)
     return db_company
@@ -259,10 +269,19 @@ def apply_business_description_from_llm(
 def get_all_companies(db: Session, skip: int = 0, limit: int = 200) -> List[Company]:
     """
     Получает все компании из БД.
-    def get_all_companies(db: Session, skip: int = 0, limit: int = 100) -> List[Company]:
-    return db.query(Company).offset(skip).limit(limit).all()
+
+    skip/limit принимаются ради совместимости API, но не применяются:
+    фронт строит список и фильтры по полному справочнику.
     """
-    return db.query(Company).all()
+    return list(db.scalars(_all_companies_stmt()))
+
+
+async def aget_all_companies(db: AsyncSession, skip: int = 0, limit: int = 200) -> List[Company]:
+    return list(await db.scalars(_all_companies_stmt()))
+
+
+def _all_companies_stmt() -> Select:
+    return select(Company)
 
 def sync_company(db: Session, company_data: CompanyCreate) -> Company:
     """
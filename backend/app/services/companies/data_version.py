@@ -0,0 +1,66 @@
+"""Версия данных компании — основа кэша ответов API.
+
+Карточка компании собирается из отчётов, цены, мультипликаторов и долей
+холдинга, а меняются они только при записи. Каждая такая запись увеличивает
+`companies.data_version` в той же транзакции; читающий эндпоинт сначала
+берёт версию (один запрос по первичному ключу) и, если она не изменилась,
+отдаёт готовый ответ из кэша или 304 (app/routers/response_cache.py).
+
+Версия — счётчик в БД, а не в памяти: пишут и API, и процесс воркера.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from sqlalchemy import Select, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.company import Company
+from app.models.holding_stake import HoldingStake
+
+# ((company_id, data_version), …) по возрастанию id; пусто — компании нет.
+Versions = tuple[tuple[int, int], ...]
+
+
+def bump_data_version(db: Session, company_ids: Iterable[Optional[int]]) -> None:
+    """Отметить изменение данных компаний (без commit — в транзакции записи)."""
+    ids = sorted({int(i) for i in company_ids if i is not None})
+    if not ids:
+        return
+    db.execute(
+        update(Company)
+        .where(Company.id.in_(ids))
+        # updated_at не трогаем: это время правки карточки, а не её данных.
+        .values(data_version=Company.data_version + 1, updated_at=Company.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _versions_stmt(company_id: int, *, with_subsidiaries: bool) -> Select:
+    stmt = select(Company.id, Company.data_version)
+    if with_subsidiaries:
+        # NAV холдинга зависит от цен и отчётов дочек — их версии входят в ключ.
+        subsidiaries = select(HoldingStake.subsidiary_company_id).where(
+            HoldingStake.holding_company_id == company_id,
+            HoldingStake.subsidiary_company_id.isnot(None),
+        )
+        stmt = stmt.where(or_(Company.id == company_id, Company.id.in_(subsidiaries)))
+    else:
+        stmt = stmt.where(Company.id == company_id)
+    return stmt.order_by(Company.id)
+
+
+def get_versions(db: Session, company_id: int, *, with_subsidiaries: bool = False) -> Versions:
+    rows = db.execute(_versions_stmt(company_id, with_subsidiaries=with_subsidiaries))
+    return tuple((int(cid), int(ver)) for cid, ver in rows)
+
+
+async def aget_versions(
+    db: AsyncSession, company_id: int, *, with_subsidiaries: bool = False
+) -> Versions:
+    rows = await db.execute(_versions_stmt(company_id, with_subsidiaries=with_subsidiaries))
+    return tuple((int(cid), int(ver)) for cid, ver in rows)
+
+
+__all__ = ("Versions", "aget_versions", "bump_data_version", "get_versions")
@@ -1,80 +1,235 @@
+"""
+Синхронизация справочника компаний с T-Invest одним проходом.
+
+Раньше каждая бумага шла через `sync_company`: поиск по FIGI, иногда по
+ISIN, commit и refresh — три-четыре запроса на инструмент, и сотни
+коммитов на полную синхронизацию, хотя меняется обычно пара строк.
+
+Теперь существующие компании читаются одним запросом, поля сравниваются в
+памяти, и в БД уходят только изменённые и новые строки — одним
+INSERT … ON CONFLICT (figi) DO UPDATE, который заодно увеличивает
+`data_version` обновлённых компаний. Бумаги, найденные только по ISIN
+(FIGI в T-Invest сменился), обновляются по первичному ключу — как раньше,
+FIGI у них не переписывается. Всё — одной транзакцией.
+
+Бренд (логотип, цвет) проверенных недавно бумаг берётся из БД, остальные
+`get_tinkoff_companies` догружает параллельно (app/utils/tinkoff_client.py).
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Sequence
+
+from pydantic import ValidationError
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from typing import List, Dict
-from app.utils.tinkoff_client import get_tinkoff_companies
-from app.schemas import CompanyCreate
-from app.services.companies.company_service import sync_company
+
+from app.config import settings
 from app.models.company import Company
+from app.schemas import CompanyCreate
+from app.services.companies.data_version import bump_data_version
+from app.services.companies.share_class import detect_preferred_share
+from app.utils.tinkoff_client import Brand, get_tinkoff_companies
+
+logger = logging.getLogger(__name__)
+
+# Поля, которые T-Invest перезаписывает (как _apply_company_update).
+# is_preferred_share и sector_profile_key — ручной выбор, их синхронизация не трогает.
+SYNC_FIELDS = (
+    "ticker",
+    "name",
+    "isin",
+    "sector",
+    "currency",
+    "lot",
+    "api_trade_available_flag",
+    "brand_logo_url",
+    "brand_color",
+    "brand_checked_at",
+)
+
+_EXISTING_COLUMNS = ("id", "figi", *SYNC_FIELDS)
+
+
+@dataclass
+class SyncPlan:
+    """Что записать: строки для upsert по FIGI и обновления по id (найденные по ISIN)."""
+
+    created: List[Dict[str, Any]] = field(default_factory=list)
+    changed: List[Dict[str, Any]] = field(default_factory=list)
+    by_id: List[Dict[str, Any]] = field(default_factory=list)
+    unchanged: int = 0
+    errors: int = 0
+
+    @property
+    def upsert_rows(self) -> List[Dict[str, Any]]:
+        return self.created + self.changed
+
+
+def brand_cache(
+    existing: Sequence[Mapping[str, Any]],
+    now: datetime,
+    ttl_days: int,
+) -> Dict[str, Brand]:
+    """FIGI → (логотип, цвет) бумаг, чей бренд спрашивали не раньше ttl_days назад."""
+    fresh_since = now - timedelta(days=ttl_days)
+    cache: Dict[str, Brand] = {}
+    for row in existing:
+        checked = row["brand_checked_at"]
+        if checked is None:
+            continue
+        if checked.tzinfo is None:  # SQLite возвращает наивное время
+            checked = checked.replace(tzinfo=timezone.utc)
+        if checked >= fresh_since:
+            cache[row["figi"]] = (row["brand_logo_url"], row["brand_color"])
+    return cache
+
+
+def _incoming_values(company_dict: Mapping[str, Any], now: datetime) -> Dict[str, Any]:
+    """Поля из ответа T-Invest, проверенные схемой CompanyCreate."""
+    data = CompanyCreate(
+        figi=company_dict["figi"],
+        ticker=company_dict["ticker"],
+        name=company_dict["name"],
+        isin=company_dict.get("isin") or "",
+        sector=company_dict.get("sector"),
+        currency=company_dict.get("currency", "RUB"),
+        lot=company_dict.get("lot", 1),
+        api_trade_available_flag=company_dict.get("api_trade_available_flag", False),
+        brand_logo_url=company_dict.get("brand_logo_url"),
+        brand_color=company_dict.get("brand_color"),
+    )
+    values = {"figi": data.figi, **{name: getattr(data, name, None) for name in SYNC_FIELDS}}
+    values["brand_checked_at"] = now if company_dict.get("brand_checked") else None
+    return values
+
+
+def _merge(current: Mapping[str, Any], incoming: Mapping[str, Any]) -> Dict[str, Any]:
+    """Строка после синхронизации: пустой ISIN и непроверенный бренд не затирают известные."""
+    merged = {name: incoming[name] for name in SYNC_FIELDS}
+    if not merged["isin"]:
+        merged["isin"] = current["isin"]
+    if merged["brand_checked_at"] is None:
+        merged["brand_checked_at"] = current["brand_checked_at"]
+    return merged
+
+
+def plan_company_sync(
+    existing: Sequence[Mapping[str, Any]],
+    incoming: Sequence[Mapping[str, Any]],
+    now: datetime,
+) -> SyncPlan:
+    """Сравнить ответ T-Invest с таблицей companies в памяти.
+
+    Поиск существующей записи — по FIGI, затем по ISIN (как в sync_company).
+    Повтор FIGI в ответе схлопывается в последнюю запись: ON CONFLICT не
+    может обновить одну строку дважды за запрос.
+    """
+    by_figi = {row["figi"]: row for row in existing if row["figi"]}
+    by_isin: Dict[str, Mapping[str, Any]] = {}
+    for row in existing:
+        if row["isin"]:
+            by_isin.setdefault(row["isin"], row)
+
+    plan = SyncPlan()
+    latest: Dict[str, Dict[str, Any]] = {}
+    for company_dict in incoming:
+        try:
+            values = _incoming_values(company_dict, now)
+        except (KeyError, ValidationError) as exc:
+            logger.warning(
+                "Синхронизация компаний: пропуск %s: %s", company_dict.get("figi", "unknown"), exc,
+            )
+            plan.errors += 1
+            continue
+        latest[values["figi"]] = values
+
+    for figi, values in latest.items():
+        current = by_figi.get(figi) or (by_isin.get(values["isin"]) if values["isin"] else None)
+        if current is None:
+            plan.created.append({
+                "figi": figi,
+                **values,
+                "is_preferred_share": detect_preferred_share(values["ticker"], values["name"]),
+            })
+            continue
+        merged = _merge(current, values)
+        if all(merged[name] == current[name] for name in SYNC_FIELDS):
+            plan.unchanged += 1
+        elif current["figi"] == figi:
+            plan.changed.append({"figi": figi, **merged, "is_preferred_share": False})
+        else:
+            plan.by_id.append({"id": current["id"], **merged})
+    return plan
+
+
+def _upsert_companies_stmt(dialect_name: str, rows: List[Dict[str, Any]]):
+    """INSERT … ON CONFLICT (figi) DO UPDATE только по полям синхронизации.
+
+    is_preferred_share передаётся для новых строк (автоопределение по тикеру)
+    и в SET не попадает: у существующих это ручной тумблер.
+    """
+    insert = sqlite_insert if dialect_name == "sqlite" else pg_insert
+    stmt = insert(Company).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["figi"],
+        set_={
+            **{name: stmt.excluded[name] for name in SYNC_FIELDS},
+            "data_version": Company.data_version + 1,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def _load_existing(db: Session) -> List[Dict[str, Any]]:
+    columns = [getattr(Company, name) for name in _EXISTING_COLUMNS]
+    return [dict(zip(_EXISTING_COLUMNS, row)) for row in db.execute(select(*columns))]
+
 
 def sync_companies_from_tinkoff(db: Session) -> Dict[str, int]:
     """
     Синхронизирует компании из Tinkoff API в базу данных.
-    
-    Процесс:
-    1. Получает список компаний из Tinkoff API
-    2. Преобразует данные в формат CompanyCreate
-    3. Для каждой компании вызывает sync_company (создает или обновляет)
-    
-    Args:
-        db: Сессия базы данных
-        
+
     Returns:
         Словарь со статистикой:
         {
-            'total': общее количество компаний из API,
-            'created': количество созданных,
-            'updated': количество обновленных,
-            'errors': количество ошибок
+            'total': количество компаний из API,
+            'created': создано,
+            'updated': обновлено (только строки, где что-то поменялось),
+            'unchanged': без изменений,
+            'errors': записей, не прошедших проверку
         }
     """
-
-    tinkoff_companies = get_tinkoff_companies()
+    now = datetime.now(timezone.utc)
+    existing = _load_existing(db)
+    tinkoff_companies = get_tinkoff_companies(
+        brand_cache(existing, now, settings.TINKOFF_BRAND_TTL_DAYS)
+    )
 
     if not tinkoff_companies:
-        return {
-            'total': 0,
-            'created': 0,
-            'updated': 0,
-            'errors': 0
-        }
-    
-    stats ={
-        'total': len(tinkoff_companies),
-        'created': 0,
-        'updated': 0,
-        'errors': 0
-    }
-
-    existing_figis = {c.figi for c in db.query(Company).all() if c.figi}
-
-    for company_dict in tinkoff_companies:
-        try:
-            company_data = CompanyCreate(
-                figi=company_dict['figi'],
-                ticker=company_dict['ticker'],
-                name=company_dict['name'],
-                isin=company_dict.get('isin') or '',
-                sector=company_dict.get('sector'),
-                currency=company_dict.get('currency', 'RUB'),
-                lot=company_dict.get('lot', 1),
-                api_trade_available_flag=company_dict.get('api_trade_available_flag', False),
-                brand_logo_url=company_dict.get('brand_logo_url'),
-                brand_color=company_dict.get('brand_color'),
-            )
+        return {'total': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': 0}
 
-            was_existing = company_data.figi in existing_figis
+    plan = plan_company_sync(existing, tinkoff_companies, now)
+    try:
+        rows = plan.upsert_rows
+        if rows:
+            db.execute(_upsert_companies_stmt(db.get_bind().dialect.name, rows))
+        if plan.by_id:
+            db.execute(update(Company), plan.by_id)
+            bump_data_version(db, [row["id"] for row in plan.by_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
 
-            sync_company(db, company_data)
-
-            if was_existing:
-                stats['updated'] += 1
-            else:
-                stats['created'] += 1
-                existing_figis.add(company_data.figi)
-
-        except Exception as e:
-            print(
-                f"Ошибка при синхронизации компании: {company_dict.get('figi', 'unknown')}: {e}"
-            )
-            stats['errors'] += 1
-
-    return stats
\ No newline at end of file
+    return {
+        'total': len(tinkoff_companies),
+        'created': len(plan.created),
+        'updated': len(plan.changed) + len(plan.by_id),
+        'unchanged': plan.unchanged,
+        'errors': plan.errors,
+    }
@@ -0,0 +1,258 @@
+"""Скачивание PDF e-disclosure задачей воркера (`disclosure.download_job`).
+
+API создаёт задание с элементом на каждый период и ставит задачу; качает
+процесс воркера — все тикеры одной параллельной пачкой, с докачкой
+оборванных `.part`-файлов (tools/edisclosure-scraper/download_manager.py).
+Прогресс в байтах лежит в строках элементов, а не в памяти процесса: его
+видно из любого процесса API и после рестарта — GET /disclosure/download-jobs/{id}
+и SSE …/events.
+
+Загрузчик сообщает прогресс из своих потоков на каждый кусок файла, поэтому
+в БД он пишется пачкой не чаще раза в _PROGRESS_FLUSH_SECONDS.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.disclosure import DisclosureDownloadItem, DisclosureDownloadJob, DisclosurePeriod
+from app.services.disclosure.edisclosure_client import download_reports_bulk
+from app.services.disclosure.paths import pdf_path_for
+from app.services.disclosure.sync_service import refresh_flags_only
+from app.services.events.publisher import track_changes
+from app.services.tasks.queue import enqueue
+from app.services.tasks.registry import DISCLOSURE_DOWNLOAD_JOB
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS_FLUSH_SECONDS = 1.0
+
+
+def job_topic(job_id: int) -> str:
+    """Тема шины событий: задание и его элементы."""
+    return f"disclosure.download_job.{job_id}"
+
+
+track_changes(DisclosureDownloadJob, kind="job", topics=lambda job: (job_topic(job.id),))
+track_changes(DisclosureDownloadItem, kind="item", topics=lambda item: (job_topic(item.job_id),))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _period_key(row: DisclosurePeriod) -> str:
+    return f"{row.ticker}:{row.period_key}"
+
+
+def enqueue_download(db: Session, period_ids: list[int]) -> DisclosureDownloadJob:
+    """Создать задание на скачивание выбранных периодов и поставить задачу воркеру."""
+    rows = (
+        db.query(DisclosurePeriod)
+        .filter(DisclosurePeriod.id.in_(period_ids))
+        .filter(DisclosurePeriod.file_url.isnot(None))
+        .all()
+    )
+    if not rows:
+        raise ValueError("Нет периодов со ссылкой на файл")
+
+    now = _utcnow()
+    job = DisclosureDownloadJob(
+        status="pending",
+        total_items=len(rows),
+        created_at=now,
+        updated_at=now,
+        last_message=f"В очереди {len(rows)} файлов",
+    )
+    db.add(job)
+    db.flush()
+    for row in rows:
+        db.add(DisclosureDownloadItem(
+            job_id=job.id, disclosure_period_id=row.id, key=_period_key(row), status="queued",
+        ))
+    enqueue(db, DISCLOSURE_DOWNLOAD_JOB, {"job_id": job.id})
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _report_entry(row: DisclosurePeriod) -> dict[str, Any]:
+    return {
+        "doc_type": row.doc_type or "",
+        "period": row.period_label or row.period_key,
+        "fiscal_year": row.fiscal_year,
+        "period_type": row.period_type,
+        "fiscal_quarter": row.fiscal_quarter,
+        "period_key": row.period_key,
+        "interim_rank": 0,
+        "file_url": row.file_url,
+        "file_label": "zip",
+        "published_at": row.published_at,
+    }
+
+
+def _count_statuses(db: Session, job: DisclosureDownloadJob) -> None:
+    counts = dict(
+        db.query(DisclosureDownloadItem.status, func.count())
+        .filter(DisclosureDownloadItem.job_id == job.id)
+        .group_by(DisclosureDownloadItem.status)
+        .all()
+    )
+    job.done_ok = counts.get("done", 0)
+    job.done_error = counts.get("error", 0)
+    job.updated_at = _utcnow()
+
+
+class _ProgressWriter:
+    """Прогресс из потоков загрузчика → строки элементов, пачкой раз в flush_seconds.
+
+    Колбэк только запоминает последнее состояние файла; в БД пишет свой поток
+    своей сессией (сессия SQLAlchemy не потокобезопасна).
+    """
+
+    def __init__(self, job_id: int, item_ids: dict[str, int], flush_seconds: float) -> None:
+        self._job_id = job_id
+        self._item_ids = item_ids
+        self._flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._latest: dict[int, Any] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="download-progress", daemon=True)
+
+    def __call__(self, state) -> None:
+        item_id = self._item_ids.get(state.key)
+        if item_id is None:
+            return
+        with self._lock:
+            self._latest[item_id] = (state.status, state.bytes_done, state.bytes_total, state.error)
+
+    def __enter__(self) -> "_ProgressWriter":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._flush_seconds):
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001 — прогресс не должен ронять загрузку
+                logger.exception("Download job %s: не удалось записать прогресс", self._job_id)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._latest = self._latest, {}
+        if not batch:
+            return
+        db = SessionLocal()
+        try:
+            items = db.query(DisclosureDownloadItem).filter(DisclosureDownloadItem.id.in_(batch)).all()
+            for item in items:
+                item.status, item.bytes_done, item.bytes_total, item.error = batch[item.id]
+            db.flush()
+            job = db.get(DisclosureDownloadJob, self._job_id)
+            if job is not None:
+                _count_statuses(db, job)
+            db.commit()
+        finally:
+            db.close()
+
+
+def run_download_task(payload: dict[str, Any]) -> None:
+    """Исполнитель задачи `disclosure.download_job` (его вызывает процесс воркера).
+
+    Повтор после падения воркера качает только то, что не скачано: готовые
+    элементы пропускаются, оборванные файлы докачиваются с `.part`.
+    """
+    job_id = int(payload["job_id"])
+    db = SessionLocal()
+    try:
+        job = db.get(DisclosureDownloadJob, job_id)
+        if job is None or job.status == "completed":
+            return
+        items = (
+            db.query(DisclosureDownloadItem)
+            .filter(DisclosureDownloadItem.job_id == job_id)
+            .filter(DisclosureDownloadItem.status != "done")
+            .all()
+        )
+        periods = {
+            p.id: p
+            for p in db.query(DisclosurePeriod).filter(
+                DisclosurePeriod.id.in_([i.disclosure_period_id for i in items])
+            )
+        }
+        by_ticker: dict[str, list] = {}
+        for item in items:
+            item.status, item.bytes_done, item.error = "queued", 0, None
+            period = periods.get(item.disclosure_period_id)
+            if period is None or not period.file_url:
+                item.status, item.error = "error", "Период удалён или без ссылки на файл"
+                continue
+            by_ticker.setdefault(period.ticker, []).append(_report_entry(period))
+        job.status = "running"
+        job.started_at = job.started_at or _utcnow()
+        job.last_message = f"Скачивание {sum(len(v) for v in by_ticker.values())} файлов"
+        _count_statuses(db, job)
+        db.commit()
+        item_ids = {i.key: int(i.id) for i in items if i.status == "queued"}
+    finally:
+        db.close()
+
+    downloaded: dict[str, str] = {}
+    failure: Optional[str] = None
+    with _ProgressWriter(job_id, item_ids, _PROGRESS_FLUSH_SECONDS) as progress:
+        try:
+            result = download_reports_bulk(by_ticker, progress=progress) if by_ticker else {}
+            downloaded = {f"{t}:{k}": v for t, paths in result.items() for k, v in paths.items()}
+        except Exception as exc:  # noqa: BLE001 — файлы уже повторялись в загрузчике
+            logger.exception("Download job %s: пачка не скачалась", job_id)
+            failure = str(exc)[:2000]
+    _finish(job_id, downloaded, failure)
+
+
+def _finish(job_id: int, downloaded: dict[str, str], failure: Optional[str]) -> None:
+    db = SessionLocal()
+    try:
+        job = db.get(DisclosureDownloadJob, job_id)
+        items = db.query(DisclosureDownloadItem).filter(DisclosureDownloadItem.job_id == job_id).all()
+        periods = {
+            p.id: p
+            for p in db.query(DisclosurePeriod).filter(
+                DisclosurePeriod.id.in_([i.disclosure_period_id for i in items])
+            )
+        }
+        for item in items:
+            if item.key in downloaded:
+                item.status = "done"
+            elif item.status != "done":
+                item.status = "error"
+                item.error = item.error or failure or "PDF не получен"
+            period = periods.get(item.disclosure_period_id)
+            if period is None:
+                continue
+            path = pdf_path_for(period.ticker, period.period_type, period.fiscal_year, period.fiscal_quarter)
+            if path.is_file():
+                period.on_disk = True
+                period.pdf_path = item.pdf_path = str(path)
+        db.flush()
+        _count_statuses(db, job)
+        job.status = "completed"
+        job.finished_at = _utcnow()
+        job.last_message = f"Готово: ok={job.done_ok}, err={job.done_error}"
+        db.commit()
+        refresh_flags_only(db)
+    finally:
+        db.close()
+
+
+__all__ = ("enqueue_download", "job_topic", "run_download_task")
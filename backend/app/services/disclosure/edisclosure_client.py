@@ -5,7 +5,7 @@ import json
 import logging
 import sys
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from app.config import BASE_DIR
 
@@ -75,32 +75,51 @@ def close_browser_session() -> None:
         pass
 
 
+def _report_entry(d: dict[str, Any]):
+    from scraper import ReportEntry  # type: ignore[import-not-found]
+
+    return ReportEntry(
+        doc_type=d.get("doc_type") or "",
+        period=d.get("period") or d.get("period_label") or "",
+        year=int(d["fiscal_year"]),
+        fiscal_year=int(d["fiscal_year"]),
+        period_type=d["period_type"],
+        fiscal_quarter=d.get("fiscal_quarter"),
+        period_key=d["period_key"],
+        interim_rank=int(d.get("interim_rank") or 0),
+        file_url=d["file_url"],
+        file_label=d.get("file_label") or "zip",
+        published_at=d.get("published_at"),
+    )
+
+
 def download_company_reports(
     ticker: str, report_dicts: list[dict[str, Any]]
 ) -> dict[str, str]:
     """Скачать выбранные периоды. report_dicts — как to_dict() ReportEntry."""
     ensure_scraper_importable()
-    from scraper import ReportEntry  # type: ignore[import-not-found]
     from downloader import download_reports  # type: ignore[import-not-found]
 
-    reports = []
-    for d in report_dicts:
-        reports.append(
-            ReportEntry(
-                doc_type=d.get("doc_type") or "",
-                period=d.get("period") or d.get("period_label") or "",
-                year=int(d["fiscal_year"]),
-                fiscal_year=int(d["fiscal_year"]),
-                period_type=d["period_type"],
-                fiscal_quarter=d.get("fiscal_quarter"),
-                period_key=d["period_key"],
-                interim_rank=int(d.get("interim_rank") or 0),
-                file_url=d["file_url"],
-                file_label=d.get("file_label") or "zip",
-                published_at=d.get("published_at"),
-            )
-        )
-    return download_reports(ticker, reports)
+    return download_reports(ticker, [_report_entry(d) for d in report_dicts])
+
+
+def download_reports_bulk(
+    by_ticker: dict[str, list[dict[str, Any]]],
+    *,
+    progress: Optional[Callable[[Any], None]] = None,
+) -> dict[str, dict[str, str]]:
+    """Скачать периоды нескольких компаний параллельно (с докачкой).
+
+    progress получает `DownloadProgress` скрапера; ключ — "TICKER:period_key".
+    Возвращает {ticker: {period_key: path}}.
+    """
+    ensure_scraper_importable()
+    from downloader import download_reports_bulk as _bulk  # type: ignore[import-not-found]
+
+    jobs = {
+        ticker: [_report_entry(d) for d in dicts] for ticker, dicts in by_ticker.items()
+    }
+    return _bulk(jobs, progress=progress)
 
 
 def filter_coverage(entries: list[dict[str, Any]], *, min_annual_year: int = 2010) -> list[dict[str, Any]]:
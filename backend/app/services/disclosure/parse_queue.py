@@ -1,91 +1,62 @@
-"""Очередь точечного парсинга PDF (конкретные периоды, без skip тикера)."""
+"""Очередь точечного парсинга PDF (конкретные периоды, без skip тикера).
+
+Задание разбирает процесс воркера (задача `disclosure.parse_job`, одно
+задание за раз); API только ставит задачу. Изменения задания и элементов
+уходят событиями в шину — SSE GET /disclosure/parse-jobs/{id}/events.
+"""
 from __future__ import annotations
 
 import logging
-import threading
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
 from app.models.company import Company
 from app.models.disclosure import DisclosureParseItem, DisclosureParseJob, DisclosurePeriod
-from app.services.disclosure.edisclosure_client import download_company_reports
 from app.services.disclosure.paths import pdf_path_for
 from app.services.disclosure.sync_service import refresh_flags_only
-from app.services.report_parser.extractor_service import (
-    ReportAlreadyExistsError,
-    parse_pdf_to_report,
-)
-from app.services.report_parser.llm_client import LLMQuotaExhaustedError
+from app.services.events.publisher import track_changes
+from app.services.report_parser.errors import LLMQuotaExhaustedError, ReportAlreadyExistsError
+from app.services.tasks.queue import active_task, enqueue
+from app.services.tasks.registry import DISCLOSURE_PARSE_JOB
 
 logger = logging.getLogger(__name__)
 
-_lock = threading.Lock()
-_thread: Optional[threading.Thread] = None
-_active_job_id: Optional[int] = None
+# Задания разбираются по одному — ключ задачи общий, номер задания в payload.
+_PARSE_TASK_KEY = "disclosure.parse_job"
 
 
-def _utcnow() -> datetime:
-    return datetime.now(timezone.utc)
+def job_topic(job_id: int) -> str:
+    """Тема шины событий: задание и его элементы."""
+    return f"disclosure.parse_job.{job_id}"
 
 
-def is_parse_worker_alive(job_id: Optional[int] = None) -> bool:
-    with _lock:
-        alive = _thread is not None and _thread.is_alive()
-        if job_id is None:
-            return alive
-        return alive and _active_job_id == job_id
+track_changes(DisclosureParseJob, kind="job", topics=lambda job: (job_topic(job.id),))
+track_changes(DisclosureParseItem, kind="item", topics=lambda item: (job_topic(item.job_id),))
 
 
-def download_periods(db: Session, period_ids: list[int]) -> dict:
-    """Скачать выбранные disclosure_periods на диск."""
-    rows = (
-        db.query(DisclosurePeriod)
-        .filter(DisclosurePeriod.id.in_(period_ids))
-        .all()
-    )
-    by_ticker: dict[str, list] = {}
-    for row in rows:
-        if not row.file_url:
-            continue
-        by_ticker.setdefault(row.ticker, []).append(
-            {
-                "doc_type": row.doc_type or "",
-                "period": row.period_label or row.period_key,
-                "fiscal_year": row.fiscal_year,
-                "period_type": row.period_type,
-                "fiscal_quarter": row.fiscal_quarter,
-                "period_key": row.period_key,
-                "interim_rank": 0,
-                "file_url": row.file_url,
-                "file_label": "zip",
-                "published_at": row.published_at,
-            }
-        )
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
 
-    downloaded: dict[str, str] = {}
-    errors: list[str] = []
-    for ticker, reports in by_ticker.items():
-        try:
-            result = download_company_reports(ticker, reports)
-            downloaded.update({f"{ticker}:{k}": v for k, v in result.items()})
-        except Exception as exc:  # noqa: BLE001
-            errors.append(f"{ticker}: {exc}")
 
-    # обновить on_disk
-    for row in rows:
-        path = pdf_path_for(
-            row.ticker, row.period_type, row.fiscal_year, row.fiscal_quarter
-        )
-        if path.is_file():
-            row.on_disk = True
-            row.pdf_path = str(path)
-    db.commit()
-    refresh_flags_only(db)
-    return {"downloaded": len(downloaded), "paths": downloaded, "errors": errors}
+def _active_parse_job_id(db: Session) -> Optional[int]:
+    task = active_task(db, _PARSE_TASK_KEY)
+    return int(task.payload["job_id"]) if task is not None else None
+
+
+def is_parse_worker_alive(job_id: Optional[int] = None) -> bool:
+    """Задание стоит в очереди воркера или выполняется (job_id=None — любое)."""
+    db = SessionLocal()
+    try:
+        active = _active_parse_job_id(db)
+    finally:
+        db.close()
+    if job_id is None:
+        return active is not None
+    return active == job_id
 
 
 def enqueue_parse(db: Session, period_ids: list[int], *, auto_start: bool = True) -> DisclosureParseJob:
@@ -162,72 +133,83 @@ def enqueue_parse(db: Session, period_ids: list[int], *, auto_start: bool = True
 
 
 def start_parse_job(db: Session, job_id: int) -> DisclosureParseJob:
-    global _thread, _active_job_id
     job = db.query(DisclosureParseJob).filter(DisclosureParseJob.id == job_id).first()
     if not job:
         raise LookupError(f"Job {job_id} не найден")
-    with _lock:
-        if _thread is not None and _thread.is_alive():
-            if _active_job_id == job_id:
-                return job
-            raise RuntimeError("Уже выполняется другой parse job")
-        job.status = "running"
-        if job.started_at is None:
-            job.started_at = _utcnow()
-        job.updated_at = _utcnow()
-        db.commit()
-        _active_job_id = job_id
-        _thread = threading.Thread(
-            target=_parse_loop,
-            args=(job_id,),
-            name=f"disclosure-parse-{job_id}",
-            daemon=True,
-        )
-        _thread.start()
+    active = _active_parse_job_id(db)
+    if active == job_id:
+        return job
+    if active is not None:
+        raise RuntimeError("Уже выполняется другой parse job")
+    job.status = "running"
+    if job.started_at is None:
+        job.started_at = _utcnow()
+    job.updated_at = _utcnow()
+    if enqueue(db, DISCLOSURE_PARSE_JOB, {"job_id": job_id}, dedupe_key=_PARSE_TASK_KEY) is None:
+        db.rollback()
+        raise RuntimeError("Уже выполняется другой parse job")
+    db.commit()
     db.refresh(job)
     return job
 
 
-def _parse_loop(job_id: int) -> None:
-    global _active_job_id
+def run_parse_task(payload: dict[str, Any]) -> None:
+    """Исполнитель задачи `disclosure.parse_job` (его вызывает процесс воркера)."""
+    job_id = int(payload["job_id"])
+    db = SessionLocal()
     try:
-        while True:
-            db = SessionLocal()
-            try:
-                job = db.query(DisclosureParseJob).filter(DisclosureParseJob.id == job_id).first()
-                if not job or job.status != "running":
-                    return
-                item = (
-                    db.query(DisclosureParseItem)
-                    .filter(DisclosureParseItem.job_id == job_id)
-                    .filter(DisclosureParseItem.status == "pending")
-                    .order_by(DisclosureParseItem.position.asc())
-                    .first()
+        # running-элементы остались от прошлой попытки, чей воркер упал.
+        stuck = (
+            db.query(DisclosureParseItem)
+            .filter(DisclosureParseItem.job_id == job_id)
+            .filter(DisclosureParseItem.status == "running")
+            .all()
+        )
+        for item in stuck:
+            item.status = "pending"
+            item.started_at = None
+        db.commit()
+    finally:
+        db.close()
+    _parse_loop(job_id)
+
+
+def _parse_loop(job_id: int) -> None:
+    while True:
+        db = SessionLocal()
+        try:
+            job = db.query(DisclosureParseJob).filter(DisclosureParseJob.id == job_id).first()
+            if not job or job.status != "running":
+                return
+            item = (
+                db.query(DisclosureParseItem)
+                .filter(DisclosureParseItem.job_id == job_id)
+                .filter(DisclosureParseItem.status == "pending")
+                .order_by(DisclosureParseItem.position.asc())
+                .first()
+            )
+            if item is None:
+                job.status = "completed"
+                job.finished_at = _utcnow()
+                job.last_message = (
+                    f"Готово: ok={job.done_ok}, err={job.done_error}, "
+                    f"skip={job.done_skipped}"
                 )
-                if item is None:
-                    job.status = "completed"
-                    job.finished_at = _utcnow()
-                    job.last_message = (
-                        f"Готово: ok={job.done_ok}, err={job.done_error}, "
-                        f"skip={job.done_skipped}"
-                    )
-                    job.updated_at = _utcnow()
-                    db.commit()
-                    refresh_flags_only(db)
-                    return
-                item_id = int(item.id)
+                job.updated_at = _utcnow()
                 db.commit()
-            finally:
-                db.close()
+                refresh_flags_only(db)
+                return
+            item_id = int(item.id)
+            db.commit()
+        finally:
+            db.close()
 
-            _process_item(job_id, item_id)
-    finally:
-        with _lock:
-            if _active_job_id == job_id:
-                _active_job_id = None
+        _process_item(job_id, item_id)
 
 
 def _process_item(job_id: int, item_id: int) -> None:
+    from app.services.report_parser.extractor_service import parse_pdf_to_report
+
     db = SessionLocal()
     try:
         job = db.query(DisclosureParseJob).filter(DisclosureParseJob.id == job_id).first()
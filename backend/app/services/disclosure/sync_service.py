@@ -1,11 +1,18 @@
-"""Синхронизация listing e-disclosure → disclosure_periods."""
+"""Синхронизация listing e-disclosure → disclosure_periods.
+
+Обход выполняет процесс воркера (задача `disclosure.sync`); API только
+создаёт запись DisclosureSyncRun и ставит задачу. Прогресс прогона уходит
+событиями в шину — SSE GET /disclosure/sync/events.
+"""
 from __future__ import annotations
 
 import logging
-import threading
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
 
+from sqlalchemy import Select, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
@@ -22,12 +29,18 @@ from app.services.disclosure.edisclosure_client import (
     load_edisclosure_mapping,
 )
 from app.services.disclosure.paths import interim_rank, pdf_path_for, period_key
+from app.services.events.publisher import track_changes
+from app.services.tasks.queue import ahas_active_task, enqueue, has_active_task
+from app.services.tasks.registry import DISCLOSURE_SYNC
 
 logger = logging.getLogger(__name__)
 
-_lock = threading.Lock()
-_thread: Optional[threading.Thread] = None
-_active_run_id: Optional[int] = None
+# Обход listing один на всю систему — ключ задачи общий.
+_SYNC_TASK_KEY = "disclosure.sync"
+# Тема шины событий: прогоны sync (в каждом событии — весь прогон).
+SYNC_TOPIC = "disclosure.sync"
+
+track_changes(DisclosureSyncRun, kind="sync_run", topics=lambda run: (SYNC_TOPIC,))
 
 
 def _utcnow() -> datetime:
@@ -35,46 +48,122 @@ def _utcnow() -> datetime:
 
 
 def is_sync_alive() -> bool:
-    with _lock:
-        return _thread is not None and _thread.is_alive()
+    """Sync стоит в очереди воркера или выполняется."""
+    db = SessionLocal()
+    try:
+        return has_active_task(db, kind=DISCLOSURE_SYNC)
+    finally:
+        db.close()
+
+
+async def ais_sync_alive(db: AsyncSession) -> bool:
+    return await ahas_active_task(db, kind=DISCLOSURE_SYNC)
+
+
+_LATEST_RUN_STMT = select(DisclosureSyncRun).order_by(DisclosureSyncRun.id.desc()).limit(1)
+
+# Число периодов по coverage_status — одним GROUP BY, без загрузки строк.
+_COVERAGE_COUNTS_STMT = (
+    select(DisclosurePeriod.coverage_status, func.count(DisclosurePeriod.id))
+    .group_by(DisclosurePeriod.coverage_status)
+)
 
 
 def get_latest_run(db: Session) -> Optional[DisclosureSyncRun]:
-    return (
-        db.query(DisclosureSyncRun)
-        .order_by(DisclosureSyncRun.id.desc())
-        .first()
-    )
+    return db.scalars(_LATEST_RUN_STMT).first()
+
+
+async def aget_latest_run(db: AsyncSession) -> Optional[DisclosureSyncRun]:
+    return (await db.scalars(_LATEST_RUN_STMT)).first()
+
+
+def coverage_counts(db: Session) -> dict[str, int]:
+    """Число периодов по coverage_status."""
+    return {status: int(n) for status, n in db.execute(_COVERAGE_COUNTS_STMT)}
+
 
+async def acoverage_counts(db: AsyncSession) -> dict[str, int]:
+    return {status: int(n) for status, n in await db.execute(_COVERAGE_COUNTS_STMT)}
 
-def start_sync(db: Session, *, tickers: Optional[list[str]] = None) -> DisclosureSyncRun:
-    global _thread, _active_run_id
-    with _lock:
-        if _thread is not None and _thread.is_alive():
-            raise RuntimeError("Синхронизация уже выполняется")
 
-        run = DisclosureSyncRun(
-            status="pending",
-            created_at=_utcnow(),
-            last_message="Ожидание запуска…",
+def coverage_stmt(
+    *,
+    mode: str,
+    status: Optional[str] = None,
+    ticker: Optional[str] = None,
+    period_type: Optional[str] = None,
+    limit: int = 500,
+    offset: int = 0,
+) -> Select:
+    """Периоды для таблицы покрытия (GET /disclosure/coverage).
+
+    Условия режимов missing/expected и порядок сортировки повторяют частичные
+    индексы ix_disclosure_periods_missing / _expected — меняя одно, меняй и
+    другое, иначе Postgres уйдёт в seq scan + sort.
+    """
+    stmt = select(DisclosurePeriod)
+    if ticker:
+        stmt = stmt.where(DisclosurePeriod.ticker == ticker.strip().upper())
+    if period_type:
+        stmt = stmt.where(DisclosurePeriod.period_type == period_type)
+    if status:
+        stmt = stmt.where(DisclosurePeriod.coverage_status == status)
+    if mode == "missing":
+        # на e-disclosure, нет в БД; interim только latest
+        stmt = stmt.where(
+            DisclosurePeriod.on_edisclosure.is_(True),
+            DisclosurePeriod.in_db.is_(False),
+            (DisclosurePeriod.period_type == "annual")
+            | (DisclosurePeriod.is_latest_interim.is_(True)),
         )
-        db.add(run)
-        db.commit()
-        db.refresh(run)
-        run_id = int(run.id)
-        _active_run_id = run_id
-        _thread = threading.Thread(
-            target=_sync_loop,
-            args=(run_id, tickers),
-            name=f"disclosure-sync-{run_id}",
-            daemon=True,
+    elif mode == "expected":
+        stmt = stmt.where(DisclosurePeriod.expectation == "expected")
+    return (
+        stmt.order_by(
+            DisclosurePeriod.ticker.asc(),
+            DisclosurePeriod.fiscal_year.desc(),
+            DisclosurePeriod.period_type.asc(),
         )
-        _thread.start()
-        return run
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def start_sync(
+    db: Session,
+    *,
+    tickers: Optional[list[str]] = None,
+    priority: Optional[int] = None,
+) -> DisclosureSyncRun:
+    """Создать запуск и поставить задачу воркеру. RuntimeError — sync уже идёт."""
+    run = DisclosureSyncRun(
+        status="pending",
+        created_at=_utcnow(),
+        last_message="Ожидание воркера…",
+    )
+    db.add(run)
+    db.flush()
+    task = enqueue(
+        db,
+        DISCLOSURE_SYNC,
+        {"run_id": int(run.id), "tickers": tickers},
+        dedupe_key=_SYNC_TASK_KEY,
+        priority=priority,
+    )
+    if task is None:
+        db.rollback()
+        raise RuntimeError("Синхронизация уже выполняется")
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def run_sync_task(payload: dict[str, Any]) -> None:
+    """Исполнитель задачи `disclosure.sync` (его вызывает процесс воркера)."""
+    _sync_loop(int(payload["run_id"]), payload.get("tickers"))
 
 
 def _sync_loop(run_id: int, tickers: Optional[list[str]]) -> None:
-    global _active_run_id
     db = SessionLocal()
     try:
         run = db.query(DisclosureSyncRun).filter(DisclosureSyncRun.id == run_id).first()
@@ -168,138 +257,155 @@ def _sync_loop(run_id: int, tickers: Optional[list[str]]) -> None:
         except Exception:  # noqa: BLE001
             pass
         db.close()
-        with _lock:
-            if _active_run_id == run_id:
-                _active_run_id = None
 
 
-def _upsert_company_periods(
-    db: Session,
-    company: Company,
-    covered: list[dict],
-    all_raw: list[dict],
-) -> int:
-    """Пишет coverage-filtered периоды; помечает latest interim."""
-    now = _utcnow()
-    ticker = str(company.ticker).strip().upper()
-    company_id = int(company.id)  # type: ignore[arg-type]
+# Натуральный ключ периода. Квартал у annual/H1 — NULL, а NULL != NULL, поэтому
+# уникальность держит индекс по COALESCE(fiscal_quarter, 0)
+# (uq_disclosure_period_coalesce) — его же указываем в ON CONFLICT.
+_NATURAL_KEY = (
+    DisclosurePeriod.company_id,
+    DisclosurePeriod.period_type,
+    DisclosurePeriod.fiscal_year,
+    # Литерал, а не параметр: выражение цели ON CONFLICT должно совпасть
+    # с выражением индекса текстуально.
+    func.coalesce(DisclosurePeriod.fiscal_quarter, literal_column("0")),
+)
 
-    # Сбросить is_latest_interim для компании
-    db.query(DisclosurePeriod).filter(
-        DisclosurePeriod.company_id == company_id
-    ).update({"is_latest_interim": False})
 
+def _latest_interim_key(covered: list[dict]) -> Optional[tuple]:
     interims = [e for e in covered if e.get("period_type") != "annual"]
-    latest_key = None
-    if interims:
-        best = max(
-            interims,
-            key=lambda e: (
-                int(e["fiscal_year"]),
-                int(e.get("interim_rank") or interim_rank(e["period_type"], e.get("fiscal_quarter"))),
-            ),
-        )
-        latest_key = (
-            best["period_type"],
-            int(best["fiscal_year"]),
-            best.get("fiscal_quarter"),
-        )
+    if not interims:
+        return None
+    best = max(
+        interims,
+        key=lambda e: (
+            int(e["fiscal_year"]),
+            int(e.get("interim_rank") or interim_rank(e["period_type"], e.get("fiscal_quarter"))),
+        ),
+    )
+    return (best["period_type"], int(best["fiscal_year"]), best.get("fiscal_quarter"))
+
 
-    n = 0
+def _listing_rows(company: Company, covered: list[dict], now: datetime) -> list[dict]:
+    """Строки INSERT для listing компании: по одной на натуральный ключ.
+
+    Дубли ключа в listing (тот же период в двух документах) схлопываются —
+    последний выигрывает, как и при прежней построчной записи: один
+    INSERT … ON CONFLICT не может обновить строку дважды.
+    """
+    ticker = str(company.ticker).strip().upper()
+    company_id = int(company.id)  # type: ignore[arg-type]
+    latest_key = _latest_interim_key(covered)
+    rows: dict[tuple, dict] = {}
     for e in covered:
         pt = e["period_type"]
         fy = int(e["fiscal_year"])
         fq = e.get("fiscal_quarter")
-        row = (
-            db.query(DisclosurePeriod)
-            .filter(DisclosurePeriod.company_id == company_id)
-            .filter(DisclosurePeriod.period_type == pt)
-            .filter(DisclosurePeriod.fiscal_year == fy)
-            .filter(
-                DisclosurePeriod.fiscal_quarter.is_(None)
-                if fq is None
-                else DisclosurePeriod.fiscal_quarter == fq
-            )
-            .first()
-        )
-        if row is None:
-            row = DisclosurePeriod(
-                company_id=company_id,
-                ticker=ticker,
-                period_type=pt,
-                fiscal_year=fy,
-                fiscal_quarter=fq,
-                period_key=e.get("period_key") or period_key(pt, fy, fq),
-                expectation="none",
-                coverage_status="unknown",
-                updated_at=now,
-            )
-            db.add(row)
-
-        row.ticker = ticker
-        row.period_key = e.get("period_key") or period_key(pt, fy, fq)
-        row.period_label = e.get("period") or e.get("period_label")
-        row.doc_type = e.get("doc_type")
-        row.published_at = e.get("published_at")
-        row.file_url = e.get("file_url")
-        row.on_edisclosure = True
-        row.is_latest_interim = (
-            pt != "annual" and latest_key == (pt, fy, fq)
-        )
-        row.last_seen_at = now
-        row.updated_at = now
-        n += 1
+        rows[(pt, fy, fq)] = {
+            "company_id": company_id,
+            "ticker": ticker,
+            "period_type": pt,
+            "fiscal_year": fy,
+            "fiscal_quarter": fq,
+            "period_key": e.get("period_key") or period_key(pt, fy, fq),
+            "period_label": e.get("period") or e.get("period_label"),
+            "doc_type": e.get("doc_type"),
+            "published_at": e.get("published_at"),
+            "file_url": e.get("file_url"),
+            "on_edisclosure": True,
+            "in_db": False,
+            "on_disk": False,
+            "is_latest_interim": pt != "annual" and latest_key == (pt, fy, fq),
+            "expectation": "none",
+            "coverage_status": "unknown",
+            "last_seen_at": now,
+            "updated_at": now,
+        }
+    return list(rows.values())
+
+
+def _upsert_listing_stmt(rows: list[dict]):
+    """INSERT … ON CONFLICT по натуральному ключу для всего listing компании.
+
+    Флаги in_db/on_disk/expectation/coverage_status у существующих строк не
+    трогаем — их пересчитывает _refresh_all_flags.
+    """
+    stmt = pg_insert(DisclosurePeriod).values(rows)
+    updated = (
+        "ticker", "period_key", "period_label", "doc_type", "published_at",
+        "file_url", "on_edisclosure", "is_latest_interim", "last_seen_at", "updated_at",
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=list(_NATURAL_KEY),
+        set_={name: stmt.excluded[name] for name in updated},
+    )
+
+
+def _upsert_company_periods(
+    db: Session,
+    company: Company,
+    covered: list[dict],
+    all_raw: list[dict],
+) -> int:
+    """Пишет coverage-filtered периоды; помечает latest interim.
+
+    Два запроса на компанию независимо от длины listing: сброс старого
+    latest interim и один bulk upsert, который ставит новый.
+    """
+    company_id = int(company.id)  # type: ignore[arg-type]
+    rows = _listing_rows(company, covered, _utcnow())
 
+    db.query(DisclosurePeriod).filter(
+        DisclosurePeriod.company_id == company_id,
+        DisclosurePeriod.is_latest_interim.is_(True),
+    ).update({"is_latest_interim": False}, synchronize_session=False)
+    if rows:
+        db.execute(_upsert_listing_stmt(rows))
     db.commit()
-    return n
+    return len(covered)
 
 
 def _ensure_expectation_stubs(db: Session) -> None:
-    """Для каждой компании с mapping создать ожидаемые периоды, если ещё нет."""
+    """Для каждой компании с mapping создать ожидаемые периоды, если ещё нет.
+
+    Один INSERT … ON CONFLICT на все компании: новые — заглушки waiting,
+    существующим только ставим expectation=expected.
+    """
     mapping = load_edisclosure_mapping()
     expected = expected_periods_for_today()
     now = _utcnow()
-    companies = db.query(Company).all()
-    for c in companies:
-        if not c.ticker:
+    rows: list[dict] = []
+    for cid, ticker in db.query(Company.id, Company.ticker).all():
+        if not ticker:
             continue
-        t = str(c.ticker).strip().upper()
+        t = str(ticker).strip().upper()
         if t not in mapping:
             continue
-        cid = int(c.id)  # type: ignore[arg-type]
         for exp in expected:
             pt = exp["period_type"]
             fy = exp["fiscal_year"]
             fq = exp["fiscal_quarter"]
-            row = (
-                db.query(DisclosurePeriod)
-                .filter(DisclosurePeriod.company_id == cid)
-                .filter(DisclosurePeriod.period_type == pt)
-                .filter(DisclosurePeriod.fiscal_year == fy)
-                .filter(
-                    DisclosurePeriod.fiscal_quarter.is_(None)
-                    if fq is None
-                    else DisclosurePeriod.fiscal_quarter == fq
-                )
-                .first()
-            )
-            if row is None:
-                row = DisclosurePeriod(
-                    company_id=cid,
-                    ticker=t,
-                    period_type=pt,
-                    fiscal_year=fy,
-                    fiscal_quarter=fq,
-                    period_key=period_key(pt, fy, fq),
-                    on_edisclosure=False,
-                    expectation="expected",
-                    coverage_status="waiting",
-                    updated_at=now,
-                )
-                db.add(row)
-            else:
-                row.expectation = "expected"
-                row.updated_at = now
+            rows.append({
+                "company_id": int(cid),
+                "ticker": t,
+                "period_type": pt,
+                "fiscal_year": fy,
+                "fiscal_quarter": fq,
+                "period_key": period_key(pt, fy, fq),
+                "on_edisclosure": False,
+                "in_db": False,
+                "on_disk": False,
+                "is_latest_interim": False,
+                "expectation": "expected",
+                "coverage_status": "waiting",
+                "updated_at": now,
+            })
+    if rows:
+        stmt = pg_insert(DisclosurePeriod).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=list(_NATURAL_KEY),
+            set_={"expectation": "expected", "updated_at": stmt.excluded.updated_at},
+        ))
     db.commit()
 
 
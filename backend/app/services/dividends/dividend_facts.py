@@ -0,0 +1,315 @@
+"""
+Таблица dividend_facts: пересчёт по компаниям и скрин всего рынка одним запросом.
+
+Раньше любой вопрос о дивидендах — серия лет подряд, пропуски, доходность —
+поднимал все отчёты компании в ORM и считался в Python. Для карточки одной
+компании это терпимо, а скрин «10 лет подряд, доходность от 7%» по сотням
+эмитентов превращался в сотни таких обходов.
+
+Теперь строки по годам собираются одним INSERT … SELECT прямо из
+financial_reports:
+
+- за год берётся один отчёт с выплатой: годовой раньше промежуточного,
+  консолидированный раньше отдельного, затем самый поздний
+  (ROW_NUMBER() OVER (PARTITION BY компания, год));
+- пропуск перед годом — разница с предыдущим годом выплаты (LAG);
+- серия — классические «острова»: у лет подряд разность
+  `год − ROW_NUMBER()` одинакова, и номер строки внутри такого острова —
+  длина серии, заканчивающейся этим годом.
+
+Пересчитывается всегда компания целиком (у неё десятки строк, не больше) и
+только при записи отчётов: report_service пересчитывает компанию в транзакции
+создания, правки и удаления отчёта (парсинг PDF пишет через него же). Чтение
+строки не трогает — кроме первого раза: `dividend_facts_version IS NULL`
+значит, что компания ещё не считалась (таблицу завели позже отчётов), и её
+досчитывают перед чтением. data_version для этого не годится: его поднимают
+и цены, и мультипликаторы, и правки карточки, а дивидендов они не меняют.
+
+Пересчёт — DELETE и INSERT по ключу (company_id, year). Два параллельных
+пересчёта одной компании в Postgres вставили бы одни и те же строки, поэтому
+компания сначала блокируется `pg_advisory_xact_lock` до конца транзакции.
+"""
+from __future__ import annotations
+
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    case,
+    delete,
+    desc,
+    func,
+    insert,
+    literal,
+    nulls_last,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from app.models.company import Company
+from app.models.dividend_fact import DividendFact
+from app.models.enums import PeriodType
+from app.models.financial_report import FinancialReport
+from app.services.analysis.calc_multipliers import MILLION
+
+# Поле сортировки скрина → колонка (по убыванию, пустые в конце).
+SCREEN_SORTS = ("streak", "yield", "payout", "current_yield")
+
+
+def _facts_select(company_ids: Sequence[int]):
+    """SELECT строк dividend_facts для компаний — в порядке колонок _FACT_COLUMNS."""
+    fr = FinancialReport
+    ranked = (
+        select(
+            fr.company_id,
+            fr.fiscal_year.label("year"),
+            fr.id.label("report_id"),
+            fr.report_date,
+            fr.dividends_per_share,
+            fr.special_dividends_per_share,
+            fr.price_per_share,
+            fr.shares_outstanding,
+            fr.net_income,
+            func.row_number().over(
+                partition_by=(fr.company_id, fr.fiscal_year),
+                order_by=(
+                    case((fr.period_type == PeriodType.ANNUAL, 0), else_=1),
+                    desc(fr.consolidated),
+                    desc(fr.report_date),
+                    desc(fr.id),
+                ),
+            ).label("pick"),
+        )
+        .where(fr.company_id.in_(company_ids), fr.dividends_paid.is_(True))
+        .subquery("ranked")
+    )
+
+    yearly = (
+        select(
+            ranked,
+            (
+                ranked.c.year
+                - func.row_number().over(partition_by=ranked.c.company_id, order_by=ranked.c.year)
+            ).label("island"),
+            (
+                ranked.c.year
+                - func.lag(ranked.c.year).over(partition_by=ranked.c.company_id, order_by=ranked.c.year)
+                - 1
+            ).label("gap_before"),
+        )
+        .where(ranked.c.pick == 1)
+        .subquery("yearly")
+    )
+
+    y = yearly.c
+    regular_dps = y.dividends_per_share - func.coalesce(y.special_dividends_per_share, 0)
+    has_price = and_(y.price_per_share.isnot(None), y.price_per_share > 0)
+    return select(
+        y.company_id,
+        y.year,
+        y.report_id,
+        y.report_date,
+        y.dividends_per_share,
+        y.special_dividends_per_share,
+        y.price_per_share,
+        case(
+            (and_(has_price, y.dividends_per_share.isnot(None)),
+             y.dividends_per_share * 100.0 / y.price_per_share),
+            else_=None,
+        ).label("dividend_yield"),
+        case(
+            (and_(has_price, y.dividends_per_share.isnot(None)),
+             regular_dps * 100.0 / y.price_per_share),
+            else_=None,
+        ).label("regular_dividend_yield"),
+        case(
+            (and_(y.net_income > 0, y.shares_outstanding > 0, y.dividends_per_share.isnot(None)),
+             y.dividends_per_share * y.shares_outstanding * 100.0 / (y.net_income * float(MILLION))),
+            else_=None,
+        ).label("payout_ratio"),
+        func.row_number().over(
+            partition_by=(y.company_id, y.island), order_by=y.year
+        ).label("streak"),
+        y.gap_before,
+    )
+
+
+_FACT_COLUMNS = (
+    "company_id",
+    "year",
+    "report_id",
+    "report_date",
+    "dividends_per_share",
+    "special_dividends_per_share",
+    "price_per_share",
+    "dividend_yield",
+    "regular_dividend_yield",
+    "payout_ratio",
+    "streak",
+    "gap_before",
+)
+
+
+# Пространство ключей advisory-блокировок: id компании — второй ключ.
+_LOCK_NAMESPACE = zlib.crc32(b"dividend_facts") & 0x7FFFFFFF
+
+
+def _lock_companies(db: Session, ids: Sequence[int]) -> None:
+    """Postgres: блокировки компаний до конца транзакции, по возрастанию id (без дедлоков)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return  # SQLite пишет одной транзакцией за раз
+    for cid in ids:
+        db.execute(select(func.pg_advisory_xact_lock(_LOCK_NAMESPACE, cid)))
+
+
+def refresh_dividend_facts(db: Session, company_ids: Iterable[Optional[int]]) -> None:
+    """Пересчитать строки компаний (без commit — в транзакции записи отчёта).
+
+    Параллельный пересчёт той же компании ждёт блокировки и после неё видит
+    уже закоммиченные строки соседа — DELETE их убирает, конфликта ключей нет.
+    dividend_facts_version получает data_version на момент пересчёта: не NULL
+    — компания посчитана.
+    """
+    ids = sorted({int(i) for i in company_ids if i is not None})
+    if not ids:
+        return
+    db.flush()
+    _lock_companies(db, ids)
+    versions = db.execute(
+        select(Company.id, Company.data_version).where(Company.id.in_(ids))
+    ).all()
+    db.execute(delete(DividendFact).where(DividendFact.company_id.in_(ids)))
+    db.execute(insert(DividendFact).from_select(_FACT_COLUMNS, _facts_select(ids)))
+    if versions:
+        companies = Company.__table__
+        db.execute(
+            update(companies)
+            .where(companies.c.id == bindparam("cid"))
+            # updated_at не трогаем — как bump_data_version.
+            .values(dividend_facts_version=bindparam("ver"), updated_at=companies.c.updated_at),
+            [{"cid": cid, "ver": ver} for cid, ver in versions],
+        )
+
+
+def refresh_stale_dividend_facts(db: Session, company_ids: Optional[Iterable[int]] = None) -> int:
+    """Досчитать компании, которые ещё ни разу не считались; commit, если было что.
+
+    Дальше строки держит в актуальном состоянии запись отчётов (report_service),
+    так что на чтении это один SELECT. company_ids=None — весь рынок (перед
+    скрином). Возвращает число пересчитанных.
+    """
+    stmt = select(Company.id).where(Company.dividend_facts_version.is_(None))
+    if company_ids is not None:
+        stmt = stmt.where(Company.id.in_(list(company_ids)))
+    stale = list(db.scalars(stmt))
+    if not stale:
+        return 0
+    refresh_dividend_facts(db, stale)
+    db.commit()
+    return len(stale)
+
+
+def get_dividend_facts(db: Session, company_id: int) -> List[DividendFact]:
+    """Строки компании по возрастанию года (первое чтение — см. refresh_stale_dividend_facts)."""
+    refresh_stale_dividend_facts(db, [company_id])
+    return list(db.scalars(
+        select(DividendFact).where(DividendFact.company_id == company_id).order_by(DividendFact.year)
+    ))
+
+
+def screen_dividend_payers(
+    db: Session,
+    *,
+    min_streak: int = 0,
+    min_yield: Optional[float] = None,
+    max_payout: Optional[float] = None,
+    regular_only: bool = True,
+    active_only: bool = True,
+    sort: str = "streak",
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Скрин плательщиков по последнему году выплат каждой компании — один запрос.
+
+    Args:
+        min_streak: Не меньше стольких лет выплат подряд (до последней выплаты)
+        min_yield: Доходность последнего года по цене отчёта не ниже, %
+        max_payout: Доля прибыли на дивиденды не выше, %
+        regular_only: Доходность без разовых (специальных) выплат
+        active_only: Последняя выплата — не раньше прошлого года (как в
+            calculate_dividend_continuity: дивиденд за год объявляют в следующем)
+        sort: Одно из SCREEN_SORTS, по убыванию
+        limit: Сколько строк вернуть
+    """
+    if sort not in SCREEN_SORTS:
+        raise ValueError(f"sort: одно из {', '.join(SCREEN_SORTS)}")
+    refresh_stale_dividend_facts(db)
+
+    f = DividendFact
+    latest = select(
+        f,
+        func.min(f.year).over(partition_by=f.company_id).label("first_year"),
+        func.row_number().over(partition_by=f.company_id, order_by=desc(f.year)).label("recency"),
+    ).subquery("latest")
+    d = latest.c
+
+    dps = d.dividends_per_share
+    if regular_only:
+        dps = dps - func.coalesce(d.special_dividends_per_share, 0)
+    yield_col = d.regular_dividend_yield if regular_only else d.dividend_yield
+    current_yield = case(
+        (Company.current_price > 0, dps * 100.0 / Company.current_price), else_=None
+    )
+
+    stmt = (
+        select(
+            Company.id.label("company_id"),
+            Company.ticker,
+            Company.name,
+            Company.sector,
+            d.first_year,
+            d.year.label("last_year"),
+            d.streak,
+            dps.label("dividends_per_share"),
+            yield_col.label("dividend_yield"),
+            d.payout_ratio,
+            current_yield.label("current_dividend_yield"),
+        )
+        .join(latest, and_(d.company_id == Company.id, d.recency == 1))
+        .where(d.streak >= min_streak)
+    )
+    if min_yield is not None:
+        stmt = stmt.where(yield_col >= min_yield)
+    if max_payout is not None:
+        stmt = stmt.where(d.payout_ratio <= max_payout)
+    if active_only:
+        stmt = stmt.where(d.year >= literal(datetime.now().year - 1))
+
+    order = {
+        "streak": (d.streak, yield_col),
+        "yield": (yield_col, d.streak),
+        "payout": (d.payout_ratio, d.streak),
+        "current_yield": (current_yield, d.streak),
+    }[sort]
+    stmt = stmt.order_by(*(nulls_last(desc(col)) for col in order), Company.ticker).limit(limit)
+
+    rows = []
+    for row in db.execute(stmt).mappings():
+        item = dict(row)
+        for key in ("dividends_per_share", "dividend_yield", "payout_ratio", "current_dividend_yield"):
+            if item[key] is not None:
+                item[key] = float(item[key])
+        rows.append(item)
+    return rows
+
+
+__all__ = (
+    "SCREEN_SORTS",
+    "get_dividend_facts",
+    "refresh_dividend_facts",
+    "refresh_stale_dividend_facts",
+    "screen_dividend_payers",
+)
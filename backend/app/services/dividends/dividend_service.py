@@ -3,32 +3,18 @@
 
 Бенджамин Грэм считал важным критерием для инвестиций непрерывность выплаты дивидендов.
 Он предпочитал компании, которые выплачивают дивиденды стабильно в течение многих лет.
+
+Годы выплат, серия и доходность читаются из таблицы dividend_facts
+(app/services/dividends/dividend_facts.py), а не из отчётов компании.
 """
 
 from sqlalchemy.orm import Session
-from typing import List, Dict, Optional, Sequence
+from typing import List, Dict, Optional
 from datetime import datetime
-from app.models.financial_report import FinancialReport
 from app.models.company import Company
 from app.schemas import DividendContinuityResult
-
-
-def _continuous_streak(payment_years: Sequence[int]) -> int:
-    """Сколько лет подряд платили, считая назад от последней выплаты.
-
-    Именно это имел в виду Грэм под непрерывностью: серия, которая длится до
-    последней выплаты. Считать от текущего года нельзя — компания, платившая
-    с 2010 по 2015 и с тех пор не платившая, получила бы «16 лет непрерывных
-    выплат» в 2026 году.
-    """
-    if not payment_years:
-        return 0
-    streak = 1
-    for i in range(len(payment_years) - 1, 0, -1):
-        if payment_years[i - 1] != payment_years[i] - 1:
-            break
-        streak += 1
-    return streak
+from app.services.companies.data_version import bump_data_version
+from app.services.dividends.dividend_facts import get_dividend_facts
 
 
 def calculate_dividend_continuity(
@@ -56,13 +42,10 @@ def calculate_dividend_continuity(
     if not company:
         raise ValueError(f"Company with id {company_id} not found")
     
-    # Получаем все отчеты компании, где выплачивались дивиденды
-    reports_with_dividends = db.query(FinancialReport).filter(
-        FinancialReport.company_id == company_id,
-        FinancialReport.dividends_paid == True
-    ).order_by(FinancialReport.report_date.asc()).all()
-    
-    if not reports_with_dividends:
+    # Строки dividend_facts по годам: серия уже посчитана оконными функциями.
+    facts = get_dividend_facts(db, company_id)
+
+    if not facts:
         return DividendContinuityResult(
             company_id=company_id,
             dividend_start_year=company.dividend_start_year,
@@ -72,21 +55,9 @@ def calculate_dividend_continuity(
             gap_years=[],
             recommendation="Компания не выплачивает дивиденды или данные отсутствуют"
         )
-    
-    # Извлекаем годы из отчетов
-    payment_years = sorted(set([report.report_date.year for report in reports_with_dividends]))
-    
-    if not payment_years:
-        return DividendContinuityResult(
-            company_id=company_id,
-            dividend_start_year=company.dividend_start_year,
-            years_of_continuous_payments=0,
-            is_continuous=False,
-            last_payment_year=None,
-            gap_years=[],
-            recommendation="Нет данных о выплате дивидендов"
-        )
-    
+
+    payment_years = [fact.year for fact in facts]
+
     # Определяем год начала выплат (из БД или из первого отчета)
     start_year = company.dividend_start_year or payment_years[0]
     last_year = payment_years[-1]
@@ -97,8 +68,11 @@ def calculate_dividend_continuity(
     actual_years = set(payment_years)
     gap_years = sorted(list(expected_years - actual_years))
     
-    # Длина серии, заканчивающейся последней выплатой.
-    years_of_continuous = _continuous_streak(payment_years)
+    # Длина серии, заканчивающейся последней выплатой, — именно это Грэм имел
+    # в виду под непрерывностью. Считать от текущего года нельзя: компания,
+    # платившая с 2010 по 2015 и с тех пор молчащая, получила бы «16 лет
+    # непрерывных выплат» в 2026 году.
+    years_of_continuous = facts[-1].streak
 
     # Дивиденд за прошлый год объявляют уже в этом — отставание на год нормально.
     has_recent_payment = last_year >= current_year - 1
@@ -145,23 +119,16 @@ def get_dividend_history(db: Session, company_id: int) -> List[Dict]:
     Returns:
         Список словарей с информацией о выплатах по годам
     """
-    reports = db.query(FinancialReport).filter(
-        FinancialReport.company_id == company_id,
-        FinancialReport.dividends_paid == True
-    ).order_by(FinancialReport.report_date.desc()).all()
-    
     history = []
-    for report in reports:
+    for fact in reversed(get_dividend_facts(db, company_id)):
         history.append({
-            "year": report.report_date.year,
-            "date": report.report_date.isoformat(),
-            "dividends_per_share": float(report.dividends_per_share) if report.dividends_per_share else None,
-            "price_per_share": float(report.price_per_share) if report.price_per_share else None,
-            "dividend_yield": (
-                (float(report.dividends_per_share) / float(report.price_per_share) * 100)
-                if report.dividends_per_share and report.price_per_share and report.price_per_share > 0
-                else None
-            )
+            "year": fact.year,
+            "date": fact.report_date.isoformat(),
+            "dividends_per_share": float(fact.dividends_per_share) if fact.dividends_per_share else None,
+            "price_per_share": float(fact.price_per_share) if fact.price_per_share else None,
+            "dividend_yield": fact.dividend_yield,
+            "payout_ratio": fact.payout_ratio,
+            "streak": fact.streak,
         })
     
     return history
@@ -178,18 +145,15 @@ def update_dividend_start_year(db: Session, company_id: int) -> Optional[int]:
     Returns:
         Год начала выплат или None
     """
-    # Находим самый ранний отчет с дивидендами
-    earliest_report = db.query(FinancialReport).filter(
-        FinancialReport.company_id == company_id,
-        FinancialReport.dividends_paid == True
-    ).order_by(FinancialReport.report_date.asc()).first()
-    
-    if earliest_report:
-        start_year = earliest_report.report_date.year
+    facts = get_dividend_facts(db, company_id)
+
+    if facts:
+        start_year = facts[0].year
         # Обновляем компанию
         company = db.query(Company).filter(Company.id == company_id).first()
         if company:
             company.dividend_start_year = start_year
+            bump_data_version(db, [company_id])
             db.commit()
         return start_year
     
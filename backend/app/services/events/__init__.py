@@ -0,0 +1 @@
+"""Шина событий о ходе фоновых задач: воркеры публикуют, SSE-эндпоинты раздают."""
@@ -0,0 +1,193 @@
+"""
+Внутрипроцессная шина событий с курсором для возобновления.
+
+Каждое событие получает сквозной номер и ложится в кольцевой буфер своей
+темы (`mass_parse.job.7`, `disclosure.sync`, …). Подписчик SSE помнит номер
+последнего полученного события; после обрыва браузер присылает его в
+Last-Event-ID, и шина досылает пропущенное из буфера. Если пропущенное уже
+вытеснено из буфера или номер из прошлой жизни процесса, подписчик получает
+`reset` — «состояние не восстановить, перечитай его через REST один раз».
+
+Номера начинаются с микросекунд времени старта процесса: после перезапуска
+API курсор клиента заведомо меньше первого номера, и это видно без хранения
+событий в БД.
+
+Публиковать можно из любого потока (воркер в API, мост LISTEN/NOTIFY);
+подписчики — корутины event loop API, их будит `call_soon_threadsafe`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+from app.config import settings
+
+HEARTBEAT_SECONDS = 15.0
+# Через сколько мс EventSource переподключается после обрыва.
+RETRY_MILLISECONDS = 3000
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    topic: str
+    kind: str
+    data: Dict[str, Any]
+
+
+# Вид события для подписчика: пропущенное не восстановить, нужно перечитать состояние.
+RESET = "reset"
+
+
+@dataclass
+class _Topic:
+    events: Deque[Event]
+    # Номер последнего вытесненного из буфера события темы.
+    evicted_upto: int = 0
+    waiters: Set["_Waiter"] = field(default_factory=set)
+
+
+class _Waiter:
+    __slots__ = ("loop", "wake")
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+
+
+def _wake(waiters: List[_Waiter]) -> None:
+    for waiter in waiters:
+        try:
+            waiter.loop.call_soon_threadsafe(waiter.wake.set)
+        except RuntimeError:
+            pass  # loop подписчика уже закрыт
+
+
+class EventBus:
+    def __init__(self, buffer_size: int = 500) -> None:
+        self._buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._topics: Dict[str, _Topic] = {}
+        self.first_id = time.time_ns() // 1000
+        self.last_id = self.first_id - 1
+
+    def _topic(self, name: str) -> _Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = _Topic(deque(maxlen=self._buffer_size))
+        return topic
+
+    def publish(self, topics: List[str] | tuple[str, ...], kind: str, data: Dict[str, Any]) -> int:
+        """Положить событие в буферы тем и разбудить их подписчиков; вернуть номер."""
+        with self._lock:
+            self.last_id += 1
+            waiters: List[_Waiter] = []
+            for name in topics:
+                topic = self._topic(name)
+                if len(topic.events) == topic.events.maxlen:
+                    topic.evicted_upto = topic.events[0].id
+                topic.events.append(Event(self.last_id, name, kind, data))
+                waiters.extend(topic.waiters)
+            event_id = self.last_id
+        _wake(waiters)
+        return event_id
+
+    def reset_all(self) -> None:
+        """Часть событий могла пройти мимо шины: всем подписчикам — reset."""
+        with self._lock:
+            self.last_id += 1
+            waiters: List[_Waiter] = []
+            for topic in self._topics.values():
+                topic.evicted_upto = self.last_id
+                waiters.extend(topic.waiters)
+        _wake(waiters)
+
+    def since(self, name: str, cursor: int) -> Optional[List[Event]]:
+        """События темы после cursor; None — часть из них потеряна (нужен reset)."""
+        with self._lock:
+            if cursor < self.first_id - 1 or cursor > self.last_id:
+                return None
+            topic = self._topics.get(name)
+            if topic is None:
+                return []
+            if cursor < topic.evicted_upto:
+                return None
+            return [e for e in topic.events if e.id > cursor]
+
+    async def listen(
+        self, name: str, cursor: Optional[int] = None, *, heartbeat: float = HEARTBEAT_SECONDS,
+    ) -> AsyncIterator[Optional[Event]]:
+        """События темы по порядку; None — пауза без событий (пинг).
+
+        Событие вида RESET несёт курсор, с которого продолжать после
+        перечитывания состояния. Без курсора (первое подключение) поток
+        начинается с него же: между ответом REST и подпиской состояние могло
+        измениться.
+        """
+        waiter = _Waiter()
+        with self._lock:
+            self._topic(name).waiters.add(waiter)
+        try:
+            while True:
+                waiter.wake.clear()
+                batch = None if cursor is None else self.since(name, cursor)
+                if batch is None:
+                    cursor = self.last_id
+                    yield Event(cursor, name, RESET, {})
+                    continue
+                for event in batch:
+                    cursor = event.id
+                    yield event
+                if batch:
+                    continue
+                try:
+                    await asyncio.wait_for(waiter.wake.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._topics[name].waiters.discard(waiter)
+
+
+def parse_cursor(value: Optional[str]) -> Optional[int]:
+    """Last-Event-ID из заголовка или query; мусор — как отсутствие курсора."""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def sse_stream(
+    name: str, cursor: Optional[int] = None, *, heartbeat: float = HEARTBEAT_SECONDS,
+    bus: Optional[EventBus] = None,
+) -> AsyncIterator[str]:
+    """Тема шины в формате text/event-stream: `id`, `event` = вид события, `data` — JSON."""
+    bus = bus or get_bus()
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    async for event in bus.listen(name, cursor, heartbeat=heartbeat):
+        if event is None:
+            yield ": ping\n\n"
+            continue
+        data = json.dumps(event.data, ensure_ascii=False, default=str)
+        yield f"id: {event.id}\nevent: {event.kind}\ndata: {data}\n\n"
+
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = EventBus(settings.JOB_EVENTS_BUFFER)
+    return _bus
+
+
+__all__ = ("RESET", "Event", "EventBus", "get_bus", "parse_cursor", "sse_stream")
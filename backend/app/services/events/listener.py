@@ -0,0 +1,101 @@
+"""
+Мост Postgres LISTEN → шина API: события воркера из другого процесса.
+
+Отдельное соединение (вне пула) слушает канал job_events в своём потоке и
+публикует каждое уведомление в шину процесса. Пока соединение лежит,
+уведомления теряются, поэтому после переподключения все темы сбрасываются —
+подписчики получают `reset` и один раз перечитывают состояние через REST.
+"""
+from __future__ import annotations
+
+import logging
+import select
+import threading
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+
+from app.services.events.bus import get_bus
+from app.services.events.publisher import PG_CHANNEL, publish_notification
+
+logger = logging.getLogger(__name__)
+
+_POLL_SECONDS = 1.0
+_RECONNECT_SECONDS = (1.0, 2.0, 5.0, 15.0, 30.0)
+
+
+class NotifyListener:
+    def __init__(self, engine: Engine) -> None:
+        self._engine = engine
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="job-events-listen", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        failures = 0
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                raw = self._engine.raw_connection()
+                # Соединение живёт, пока живёт поток, — пулу его не возвращаем.
+                raw.detach()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {PG_CHANNEL}")
+                if connected_before:
+                    get_bus().reset_all()
+                connected_before = True
+                failures = 0
+                try:
+                    self._drain(conn)
+                finally:
+                    conn.close()
+            except Exception:  # noqa: BLE001 — БД недоступна: ждём и переподключаемся
+                delay = _RECONNECT_SECONDS[min(failures, len(_RECONNECT_SECONDS) - 1)]
+                failures += 1
+                logger.exception("LISTEN %s: соединение потеряно, повтор через %.0f с", PG_CHANNEL, delay)
+                self._stop.wait(delay)
+
+    def _drain(self, conn) -> None:
+        while not self._stop.is_set():
+            readable, _, _ = select.select([conn], [], [], _POLL_SECONDS)
+            if not readable:
+                continue
+            conn.poll()
+            while conn.notifies:
+                note = conn.notifies.pop(0)
+                if publish_notification(note.payload):
+                    self.received += 1
+
+
+_listener: Optional[NotifyListener] = None
+
+
+def start_listener(engine: Engine) -> Optional[NotifyListener]:
+    """Слушать NOTIFY, если БД — Postgres; на SQLite воркер живёт в API и NOTIFY не нужен."""
+    global _listener
+    if engine.dialect.name != "postgresql":
+        return None
+    _listener = NotifyListener(engine)
+    _listener.start()
+    return _listener
+
+
+def stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+__all__ = ("NotifyListener", "start_listener", "stop_listener")
@@ -0,0 +1,166 @@
+"""
+Публикация изменений строк задач в шину — по событиям сессии SQLAlchemy.
+
+Модули задач (mass_parse.worker, disclosure.parse_queue, disclosure.sync_service)
+регистрируют свои модели через `track_changes`; коммиты прогресса в них
+остаются обычными `db.commit()`, а событие уходит само:
+
+  * after_flush снимает состояние изменённых строк отслеживаемых моделей
+    (повторные изменения одной строки в транзакции склеиваются — уйдёт
+    последнее);
+  * after_commit публикует их в шину этого процесса; откат — выбрасывает;
+  * на Postgres ещё и `pg_notify` в той же транзакции: уведомление увидят
+    только после коммита, а его получит API, если воркер — отдельный
+    процесс (`python -m app.worker`). Мост в шину API — events/listener.py;
+    свои уведомления процесс узнаёт по ORIGIN и не дублирует.
+
+Если один flush меняет больше _BULK_ROWS строк одних тем (создание задания
+на тысячи PDF, отмена с массовой сменой статусов), вместо построчных
+событий уходит один `reset`: клиенту дешевле перечитать список через REST.
+Массовые UPDATE мимо ORM событий не дают вовсе — после них клиент тоже
+получает состояние через REST.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.events.bus import RESET, get_bus
+
+logger = logging.getLogger(__name__)
+
+# Канал LISTEN/NOTIFY Postgres.
+PG_CHANNEL = "job_events"
+# Лимит payload у NOTIFY — 8000 байт; длинные тексты сообщений обрезаются.
+_NOTIFY_LIMIT = 7900
+_CLIP_CHARS = 500
+_BULK_ROWS = 50
+
+# Метка процесса: свои уведомления из LISTEN не публикуются повторно.
+ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_PENDING_KEY = "job_events_pending"
+
+
+@dataclass(frozen=True)
+class _Tracked:
+    kind: str
+    topics: Callable[[Any], Sequence[str]]
+    serialize: Callable[[Any], Dict[str, Any]]
+
+
+_tracked: Dict[type, _Tracked] = {}
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def row_state(obj: Any) -> Dict[str, Any]:
+    """Все колонки строки в виде, пригодном для JSON."""
+    return {attr.key: _jsonable(getattr(obj, attr.key)) for attr in inspect(obj).mapper.column_attrs}
+
+
+def track_changes(
+    model: type,
+    *,
+    kind: str,
+    topics: Callable[[Any], Sequence[str]],
+    serialize: Callable[[Any], Dict[str, Any]] = row_state,
+) -> None:
+    """Публиковать вставки и изменения строк model: событие kind в темы topics(obj)."""
+    _tracked[model] = _Tracked(kind, topics, serialize)
+
+
+def _collect(session: Session) -> list[Tuple[Tuple[str, ...], str, Dict[str, Any]]]:
+    changed = []
+    for obj in list(session.new) + list(session.dirty):
+        spec = _tracked.get(type(obj))
+        if spec is None:
+            continue
+        # dirty — и строки, где атрибут присвоили тем же значением.
+        if obj not in session.new and not session.is_modified(obj, include_collections=False):
+            continue
+        changed.append((tuple(spec.topics(obj)), spec.kind, spec.serialize(obj)))
+    return changed
+
+
+def _coalesce(changed: list) -> list:
+    per_topics = Counter(topics for topics, _, _ in changed)
+    bulk = [topics for topics, n in per_topics.items() if n > _BULK_ROWS]
+    if not bulk:
+        return changed
+    return [c for c in changed if c[0] not in bulk] + [(topics, RESET, {}) for topics in bulk]
+
+
+def _notify_payload(topics: Tuple[str, ...], kind: str, data: Dict[str, Any]) -> str:
+    payload = json.dumps({"origin": ORIGIN, "topics": topics, "kind": kind, "data": data},
+                         ensure_ascii=False)
+    if len(payload.encode()) <= _NOTIFY_LIMIT:
+        return payload
+    clipped = {k: v[:_CLIP_CHARS] if isinstance(v, str) else v for k, v in data.items()}
+    return json.dumps({"origin": ORIGIN, "topics": topics, "kind": kind, "data": clipped},
+                      ensure_ascii=False)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, _flush_context) -> None:
+    if not _tracked:
+        return
+    changed = _coalesce(_collect(session))
+    if not changed:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for topics, kind, data in changed:
+        pending[(topics, kind, data.get("id"))] = data
+    bind = session.get_bind()
+    if settings.JOB_EVENTS_PG_NOTIFY and bind.dialect.name == "postgresql":
+        connection = session.connection()
+        for topics, kind, data in changed:
+            connection.execute(select(func.pg_notify(PG_CHANNEL, _notify_payload(topics, kind, data))))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    pending: Optional[dict] = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    bus = get_bus()
+    for (topics, kind, _id), data in pending.items():
+        bus.publish(topics, kind, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def publish_notification(payload: str) -> bool:
+    """Уведомление NOTIFY другого процесса → шина этого; свои и битые пропускаются."""
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        logger.warning("Событие задачи: не JSON в NOTIFY %s", PG_CHANNEL)
+        return False
+    if message.get("origin") == ORIGIN:
+        return False
+    get_bus().publish(tuple(message["topics"]), message["kind"], message["data"])
+    return True
+
+
+__all__ = ("ORIGIN", "PG_CHANNEL", "publish_notification", "row_state", "track_changes")
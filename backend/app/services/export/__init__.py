@@ -0,0 +1 @@
+"""Потоковая выгрузка таблиц БД для ноутбуков: NDJSON, CSV, Arrow, Parquet."""
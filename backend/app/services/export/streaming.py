@@ -0,0 +1,340 @@
+"""Выгрузка таблиц серверным курсором с записью пачками.
+
+Запрос — Core `select` по колонкам таблицы с `yield_per`: в Postgres это
+именованный курсор psycopg2, строки приходят пачками по EXPORT_BATCH_SIZE и
+сразу превращаются в байты выбранного формата. ORM-объекты и схема
+`FinancialReport` с вычисляемыми полями не строятся, память не зависит от
+размера выгрузки — и HTTP-ответ, и CLI (`scripts/export_data.py`) пишут
+куски по мере чтения.
+
+Arrow и Parquet требуют pyarrow; он импортируется только для этих форматов.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, Select, Table, select
+from sqlalchemy.orm import Session
+from sqlalchemy.types import JSON, TypeEngine
+
+from app.config import settings
+from app.models.company import Company
+from app.models.enums import PeriodType
+from app.models.financial_report import FinancialReport
+from app.models.multiplier import Multiplier
+from app.models.stock_price import StockPrice
+
+FORMATS = ("ndjson", "csv", "arrow", "parquet")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    """Выгружаемая таблица: порядок строк и колонка для фильтра по датам."""
+    table: Table
+    order_by: tuple[str, ...]
+    date_column: Optional[str] = None
+
+    @property
+    def has_company(self) -> bool:
+        return "company_id" in self.table.c
+
+
+# Порядок — по уникальным индексам (компания, дата), чтобы Postgres отдавал
+# строки индексом, а не сортировал всю таблицу перед первой пачкой.
+EXPORT_TABLES: dict[str, ExportTable] = {
+    "financial_reports": ExportTable(
+        FinancialReport.__table__, ("company_id", "report_date", "id"), "report_date",
+    ),
+    "multipliers": ExportTable(Multiplier.__table__, ("company_id", "date", "type"), "date"),
+    "stock_prices": ExportTable(StockPrice.__table__, ("company_id", "date"), "date"),
+    "companies": ExportTable(Company.__table__, ("id",)),
+}
+
+_companies = Company.__table__
+
+
+@dataclass
+class ExportQuery:
+    """Что выгружать. Пустой `columns` — тикер и все колонки таблицы."""
+    table: str
+    columns: Sequence[str] = ()
+    company_ids: Sequence[int] = ()
+    tickers: Sequence[str] = ()
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    period_type: Optional[str] = None     # только financial_reports
+    multiplier_type: Optional[str] = None  # только multipliers
+    verified_only: bool = False           # только financial_reports
+
+
+@dataclass
+class ExportPlan:
+    """Проверенный запрос: SQL, имена и типы колонок результата."""
+    statement: Select
+    columns: list[str]
+    types: list[TypeEngine] = field(default_factory=list)
+
+
+def _spec(name: str) -> ExportTable:
+    try:
+        return EXPORT_TABLES[name]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестная таблица {name!r}; доступны: {', '.join(EXPORT_TABLES)}"
+        ) from None
+
+
+def available_columns(name: str) -> list[str]:
+    """Колонки, которые можно запросить у таблицы (тикер — через companies)."""
+    spec = _spec(name)
+    columns = [c.name for c in spec.table.columns]
+    return ["ticker", *columns] if spec.has_company else columns
+
+
+def build_plan(query: ExportQuery) -> ExportPlan:
+    """Собрать SELECT по запросу выгрузки.
+
+    Raises:
+        ValueError: неизвестная таблица/колонка или фильтр, которого у таблицы нет.
+    """
+    spec = _spec(query.table)
+    table = spec.table
+    allowed = available_columns(query.table)
+    columns = list(query.columns) or allowed
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(
+            f"Нет колонок {', '.join(unknown)} в {query.table}; доступны: {', '.join(allowed)}"
+        )
+
+    selected = [
+        _companies.c.ticker.label("ticker") if name == "ticker" and spec.has_company
+        else table.c[name]
+        for name in columns
+    ]
+    stmt = select(*selected)
+    if spec.has_company and "ticker" in columns:
+        stmt = stmt.select_from(table.join(_companies, _companies.c.id == table.c.company_id))
+
+    company_col = table.c.company_id if spec.has_company else table.c.id
+    if query.company_ids:
+        stmt = stmt.where(company_col.in_(list(query.company_ids)))
+    if query.tickers:
+        stmt = stmt.where(company_col.in_(
+            select(_companies.c.id).where(_companies.c.ticker.in_([t.upper() for t in query.tickers]))
+        ))
+
+    if query.date_from or query.date_to:
+        if spec.date_column is None:
+            raise ValueError(f"У {query.table} нет даты для фильтра date_from/date_to")
+        date_col = table.c[spec.date_column]
+        if query.date_from:
+            stmt = stmt.where(date_col >= query.date_from)
+        if query.date_to:
+            stmt = stmt.where(date_col <= query.date_to)
+
+    if query.period_type or query.verified_only:
+        if query.table != "financial_reports":
+            raise ValueError("period_type и verified_only — фильтры financial_reports")
+        if query.period_type:
+            try:
+                period = PeriodType(query.period_type.lower())
+            except ValueError:
+                raise ValueError(f"Неизвестный period_type {query.period_type!r}") from None
+            stmt = stmt.where(table.c.period_type == period)
+        if query.verified_only:
+            stmt = stmt.where(table.c.verified_by_analyst.is_(True))
+    if query.multiplier_type:
+        if query.table != "multipliers":
+            raise ValueError("multiplier_type — фильтр multipliers")
+        stmt = stmt.where(table.c.type == query.multiplier_type)
+
+    stmt = stmt.order_by(*(table.c[name] for name in spec.order_by))
+    return ExportPlan(statement=stmt, columns=columns, types=[c.type for c in selected])
+
+
+def iter_batches(
+    db: Session, plan: ExportPlan, *, batch_size: Optional[int] = None,
+) -> Iterator[Sequence[Sequence[Any]]]:
+    """Строки результата пачками; курсор серверный, в памяти — одна пачка."""
+    size = batch_size or settings.EXPORT_BATCH_SIZE
+    result = db.execute(plan.statement.execution_options(yield_per=size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+# ─── Форматы ────────────────────────────────────────────────────────────────
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def ndjson_chunks(plan: ExportPlan, batches: Iterator[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """По куску на пачку: строка JSON на запись."""
+    columns = plan.columns
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) + "\n"
+            for row in batch
+        ).encode("utf-8")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def csv_chunks(plan: ExportPlan, batches: Iterator[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """Заголовок, затем по куску на пачку."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(plan.columns)
+    for batch in batches:
+        writer.writerows([_csv_value(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise RuntimeError(
+            "Для arrow/parquet нужен пакет pyarrow (pip install pyarrow)"
+        ) from None
+    return pyarrow
+
+
+def require_pyarrow(fmt: str) -> None:
+    """Проверить до начала ответа, что формат можно отдать."""
+    if fmt in ("arrow", "parquet"):
+        _pyarrow()
+
+
+def _arrow_column(pa, sa_type: TypeEngine) -> tuple[Any, Callable[[Any], Any]]:
+    """(тип Arrow, приведение значения) для типа колонки SQLAlchemy."""
+    if isinstance(sa_type, Boolean):
+        return pa.bool_(), bool
+    if isinstance(sa_type, Integer):
+        return pa.int64(), int
+    if isinstance(sa_type, (Numeric, Float)):
+        return pa.float64(), float
+    if isinstance(sa_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if sa_type.timezone else None), lambda v: v
+    if isinstance(sa_type, Date):
+        return pa.date32(), lambda v: v
+    if isinstance(sa_type, JSON):
+        return pa.string(), lambda v: json.dumps(v, ensure_ascii=False)
+    return pa.string(), lambda v: v.value if isinstance(v, Enum) else str(v)
+
+
+class _Sink:
+    """Файл для писателей pyarrow: копит байты, пока их не заберёт генератор."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_chunks(
+    plan: ExportPlan, batches: Iterator[Sequence[Sequence[Any]]], *, parquet: bool,
+) -> Iterator[bytes]:
+    pa = _pyarrow()
+    converters = [_arrow_column(pa, t) for t in plan.types]
+    schema = pa.schema([
+        pa.field(name, arrow_type) for name, (arrow_type, _) in zip(plan.columns, converters)
+    ])
+    sink = _Sink()
+    writer = (
+        pa.parquet.ParquetWriter(sink, schema, compression="zstd") if parquet
+        else pa.ipc.new_stream(sink, schema)
+    )
+    try:
+        for batch in batches:
+            arrays = [
+                pa.array([None if v is None else convert(v) for v in values], type=arrow_type)
+                for values, (arrow_type, convert) in zip(zip(*batch), converters)
+            ]
+            # Каждая пачка — отдельная row group Parquet / record batch Arrow.
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def arrow_chunks(plan: ExportPlan, batches: Iterator[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """Arrow IPC stream: схема, затем record batch на пачку."""
+    return _arrow_chunks(plan, batches, parquet=False)
+
+
+def parquet_chunks(plan: ExportPlan, batches: Iterator[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """Parquet с row group на пачку; футер — последним куском."""
+    return _arrow_chunks(plan, batches, parquet=True)
+
+
+_WRITERS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+    "arrow": arrow_chunks,
+    "parquet": parquet_chunks,
+}
+
+
+def export_chunks(
+    db: Session, plan: ExportPlan, fmt: str, *, batch_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Байты выгрузки в формате `fmt` — по куску на пачку строк."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Неизвестный формат {fmt!r}; доступны: {', '.join(FORMATS)}")
+    return _WRITERS[fmt](plan, iter_batches(db, plan, batch_size=batch_size))
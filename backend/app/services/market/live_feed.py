@@ -0,0 +1,386 @@
+"""
+Оценка компаний в течение дня: поток цен T-Invest → мультипликаторы → SSE.
+
+Цены попадают в БД раз в день (update_all_company_prices), и каждая запись
+поднимает data_version — пересчитывается всё, что от компании зависит. Для
+котировок внутри дня так нельзя: сделки идут десятками в секунду.
+
+Поэтому поток живёт отдельно от БД, в процессе API:
+
+- `LastPriceTable` — последняя цена по FIGI. Тики склеиваются: сколько бы
+  сделок ни пришло между рассылками, клиенту уйдёт одна, последняя;
+- знаменатели (LTM-прибыль, капитал, FCF, дивиденд на акцию, число акций)
+  берутся из того же снимка, что у бэктеста (`current_snapshot`), один раз
+  на версию данных компании. От цены зависят только P/E, P/B, P/FCF,
+  дивидендная доходность и капитализация — это несколько делений на сделку;
+- `LiveHub` раздаёт обновления подписчикам SSE. У каждого подписчика свой
+  буфер «компания → последнее значение»: медленный клиент не копит очередь,
+  а получает свежие цифры, когда дочитает.
+
+Раз в TINVEST_STREAM_REFRESH_SECONDS сверяется data_version компаний:
+записали отчёт — знаменатели компании перечитываются, появилась бумага —
+поток переподписывается.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.company import Company
+from app.models.financial_report import FinancialReport
+from app.services.analysis.calc_multipliers import MILLION
+from app.services.backtest.snapshots import Snapshot, current_snapshot
+
+if TYPE_CHECKING:
+    from app.services.market.tinvest_stream import Tick
+
+logger = logging.getLogger(__name__)
+
+# Мультипликаторы, зависящие от цены, — всё, что пересчитывается на сделке.
+PRICE_FIELDS = ("pe_ratio", "pb_ratio", "price_to_fcf", "dividend_yield")
+# Комментарий SSE, чтобы прокси не закрывали молчащее соединение.
+HEARTBEAT_SECONDS = 15.0
+_MAX_BACKOFF_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class LiveCompany:
+    """Знаменатели компании на версию её данных."""
+
+    company_id: int
+    ticker: str
+    figi: str
+    data_version: int
+    snapshot: Optional[Snapshot]   # None — отчётов нет, считается только цена
+
+
+def valuation(company: LiveCompany, price: float, time: Optional[datetime]) -> Dict[str, Any]:
+    """Цена и зависящие от неё мультипликаторы — те же формулы, что Snapshot.at_price."""
+    out: Dict[str, Any] = {
+        "company_id": company.company_id,
+        "ticker": company.ticker,
+        "price": price,
+        "time": time.isoformat() if time else None,
+        "market_cap": None,
+        **dict.fromkeys(PRICE_FIELDS),
+    }
+    snapshot = company.snapshot
+    if snapshot is not None:
+        at_price = snapshot.at_price(price)
+        out.update({name: at_price[name] for name in PRICE_FIELDS})
+        if snapshot.shares:
+            out["market_cap"] = price * snapshot.shares / MILLION  # млн ₽, как в карточке
+    return out
+
+
+def load_companies(db: Session, company_ids: Optional[Iterable[int]] = None) -> Dict[str, LiveCompany]:
+    """FIGI → знаменатели; два запроса на любое число компаний."""
+    stmt = select(Company).order_by(Company.id)
+    if company_ids is not None:
+        stmt = stmt.where(Company.id.in_(list(company_ids)))
+    companies = db.scalars(stmt).all()
+    if not companies:
+        return {}
+    reports: Dict[int, List[FinancialReport]] = defaultdict(list)
+    for report in db.scalars(
+        select(FinancialReport).where(FinancialReport.company_id.in_([c.id for c in companies]))
+    ):
+        reports[report.company_id].append(report)
+    return {
+        c.figi: LiveCompany(
+            company_id=c.id,
+            ticker=c.ticker,
+            figi=c.figi,
+            data_version=c.data_version,
+            snapshot=current_snapshot(c, reports[c.id]) if reports.get(c.id) else None,
+        )
+        for c in companies
+    }
+
+
+class LastPriceTable:
+    """Последняя цена по FIGI и множество FIGI, изменившихся с прошлой рассылки."""
+
+    def __init__(self) -> None:
+        self._prices: Dict[str, Tuple[float, Optional[datetime]]] = {}
+        self._dirty: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def update(self, tick: Tick) -> None:
+        previous = self._prices.get(tick.figi)
+        self._prices[tick.figi] = (tick.price, tick.time)
+        if previous is None or previous[0] != tick.price:
+            self._dirty.add(tick.figi)
+
+    def touch(self, figis: Iterable[str]) -> None:
+        """Разослать заново (поменялись знаменатели, цена та же)."""
+        self._dirty.update(f for f in figis if f in self._prices)
+
+    def get(self, figi: str) -> Optional[Tuple[float, Optional[datetime]]]:
+        return self._prices.get(figi)
+
+    def items(self):
+        return self._prices.items()
+
+    def drain(self) -> set[str]:
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+
+class _Subscriber:
+    def __init__(self, company_ids: Optional[frozenset[int]]) -> None:
+        self.company_ids = company_ids
+        self.pending: Dict[int, Dict[str, Any]] = {}
+        self.ready = asyncio.Event()
+
+
+class LiveHub:
+    """Рассылка обновлений подписчикам SSE со склейкой по компании."""
+
+    def __init__(self) -> None:
+        self._subscribers: set[_Subscriber] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, company_ids: Optional[Iterable[int]] = None) -> _Subscriber:
+        subscriber = _Subscriber(frozenset(company_ids) if company_ids else None)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def publish(self, updates: List[Dict[str, Any]]) -> None:
+        for subscriber in self._subscribers:
+            wanted = [
+                u for u in updates
+                if subscriber.company_ids is None or u["company_id"] in subscriber.company_ids
+            ]
+            if not wanted:
+                continue
+            subscriber.pending.update((u["company_id"], u) for u in wanted)
+            subscriber.ready.set()
+
+    async def next_batch(self, subscriber: _Subscriber, timeout: float) -> List[Dict[str, Any]]:
+        """Накопленное для подписчика; пусто — за timeout ничего не пришло."""
+        try:
+            await asyncio.wait_for(subscriber.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        subscriber.ready.clear()
+        batch, subscriber.pending = list(subscriber.pending.values()), {}
+        return batch
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class LiveFeed:
+    """Подписка на поток, склейка тиков, пересчёт и рассылка — задачи одного event loop."""
+
+    def __init__(
+        self,
+        *,
+        url: str,
+        token: str,
+        flush_seconds: float,
+        refresh_seconds: float,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ) -> None:
+        self.url = url
+        self.token = token
+        self.flush_seconds = flush_seconds
+        self.refresh_seconds = refresh_seconds
+        self._session_factory = session_factory
+        self.table = LastPriceTable()
+        self.hub = LiveHub()
+        self.companies: Dict[str, LiveCompany] = {}
+        self._stream_task: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # ─── Жизненный цикл ───────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        self.companies = await asyncio.to_thread(self._load, None)
+        self._restart_stream()
+        self._tasks = [
+            asyncio.create_task(self._every(self.flush_seconds, self.flush), name="live-flush"),
+            asyncio.create_task(self._every(self.refresh_seconds, self.refresh), name="live-refresh"),
+        ]
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, *([self._stream_task] if self._stream_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks, self._stream_task = [], None
+
+    def _restart_stream(self) -> None:
+        if self._stream_task is not None:
+            self._stream_task.cancel()
+        self._stream_task = asyncio.create_task(
+            self._run_stream(sorted(self.companies)), name="live-stream"
+        )
+
+    async def _run_stream(self, figis: List[str]) -> None:
+        if not figis:
+            return
+        # websockets нужен только запущенному потоку, а не импорту market_router.
+        from app.services.market.tinvest_stream import stream_last_prices
+
+        failures = 0
+        while True:
+            try:
+                async for tick in stream_last_prices(self.url, self.token, figis):
+                    failures = 0
+                    self.table.update(tick)
+                logger.warning("Поток цен T-Invest: сервер закрыл соединение")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001 — сеть: переподключаемся
+                logger.warning("Поток цен T-Invest: %s", exc)
+            failures += 1
+            await asyncio.sleep(min(2 ** (failures - 1), _MAX_BACKOFF_SECONDS))
+
+    @staticmethod
+    async def _every(seconds: float, step: Callable[[], Any]) -> None:
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                result = step()
+                if asyncio.iscoroutine(result):
+                    await result
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 — следующий шаг попробует снова
+                logger.exception("Поток цен: ошибка шага %s", getattr(step, "__name__", step))
+
+    # ─── Шаги ──────────────────────────────────────────────────────────────
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Пересчитать и разослать компании, по которым были сделки с прошлого раза."""
+        updates = []
+        for figi in self.table.drain():
+            company = self.companies.get(figi)
+            last = self.table.get(figi)
+            if company is not None and last is not None:
+                updates.append(valuation(company, *last))
+        if updates:
+            self.hub.publish(updates)
+        return updates
+
+    async def refresh(self) -> None:
+        """Перечитать знаменатели компаний, чья data_version сменилась."""
+        versions = await asyncio.to_thread(self._versions)
+        known = {c.company_id: c for c in self.companies.values()}
+        changed = [cid for cid, (_, ver) in versions.items()
+                   if cid not in known or known[cid].data_version != ver]
+        gone = [c.figi for cid, c in known.items() if cid not in versions]
+        if not changed and not gone:
+            return
+        fresh = await asyncio.to_thread(self._load, changed) if changed else {}
+        old_figis = set(self.companies)
+        companies = {f: c for f, c in self.companies.items() if f not in gone}
+        for company in list(companies.values()):
+            if company.company_id in changed:
+                companies.pop(company.figi)  # FIGI мог смениться
+        companies.update(fresh)
+        self.companies = companies
+        self.table.touch(fresh)
+        logger.info("Поток цен: знаменатели обновлены у %d компаний", len(fresh))
+        if set(companies) != old_figis:
+            self._restart_stream()
+
+    def snapshot(self, company_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Текущие значения по всем компаниям с известной ценой — первое событие SSE."""
+        wanted = frozenset(company_ids) if company_ids else None
+        out = []
+        for figi, (price, time) in self.table.items():
+            company = self.companies.get(figi)
+            if company is None or (wanted is not None and company.company_id not in wanted):
+                continue
+            out.append(valuation(company, price, time))
+        return out
+
+    async def events(
+        self, company_ids: Optional[Iterable[int]] = None, *, heartbeat: float = HEARTBEAT_SECONDS,
+    ) -> AsyncIterator[str]:
+        """Поток SSE: снимок, затем пачки обновлений; пустая пауза — комментарий-пинг."""
+        subscriber = self.hub.subscribe(company_ids)
+        try:
+            yield sse_event("snapshot", self.snapshot(company_ids))
+            while True:
+                batch = await self.hub.next_batch(subscriber, heartbeat)
+                yield sse_event("prices", batch) if batch else ": ping\n\n"
+        finally:
+            self.hub.unsubscribe(subscriber)
+
+    # ─── БД (в потоке: сессии синхронные) ─────────────────────────────────
+
+    def _load(self, company_ids: Optional[List[int]]) -> Dict[str, LiveCompany]:
+        with self._session_factory() as db:
+            return load_companies(db, company_ids)
+
+    def _versions(self) -> Dict[int, Tuple[str, int]]:
+        with self._session_factory() as db:
+            rows = db.execute(select(Company.id, Company.figi, Company.data_version))
+            return {cid: (figi, ver) for cid, figi, ver in rows}
+
+
+_feed: Optional[LiveFeed] = None
+
+
+def get_feed() -> Optional[LiveFeed]:
+    """Запущенный поток этого процесса; None — TINVEST_STREAM_ENABLED выключен."""
+    return _feed
+
+
+async def start_feed() -> Optional[LiveFeed]:
+    global _feed
+    token = settings.TINKOFF_TOKEN
+    if not token or token == "your_token_here":
+        logger.warning("TINKOFF_TOKEN не настроен — поток цен T-Invest не запущен")
+        return None
+    _feed = LiveFeed(
+        url=settings.TINVEST_STREAM_URL,
+        token=token,
+        flush_seconds=settings.TINVEST_STREAM_FLUSH_SECONDS,
+        refresh_seconds=settings.TINVEST_STREAM_REFRESH_SECONDS,
+    )
+    await _feed.start()
+    return _feed
+
+
+async def stop_feed() -> None:
+    global _feed
+    if _feed is not None:
+        await _feed.stop()
+        _feed = None
+
+
+__all__ = (
+    "LastPriceTable",
+    "LiveCompany",
+    "LiveFeed",
+    "LiveHub",
+    "PRICE_FIELDS",
+    "get_feed",
+    "load_companies",
+    "start_feed",
+    "stop_feed",
+    "valuation",
+)
@@ -22,6 +22,7 @@ from sqlalchemy.orm import Session
 from app.models.company import Company
 from app.models.financial_report import FinancialReport
 from app.models.stock_price import StockPrice
+from app.services.companies.data_version import bump_data_version
 from app.utils.moex_client import get_price_history
 
 logger = logging.getLogger(__name__)
@@ -133,6 +134,8 @@ def backfill_company_prices(
             added += 1
 
     if added:
+        # Новая версия сбрасывает кэш ряда цен (price_series) и ответов API.
+        bump_data_version(db, [company.id])
         db.commit()
         logger.info("Бэкфилл %s: добавлено %d записей", ticker, added)
 
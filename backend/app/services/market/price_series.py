@@ -0,0 +1,263 @@
+"""
+Ряд дневных цен компании для графиков: компактные массивы, сплиты, прореживание.
+
+Пятнадцать лет торгов — около 3 800 строк `stock_prices`. Поднимать их
+ORM-объектами на каждый запрос графика дорого, а отдавать браузеру целиком
+бессмысленно: на экране всё равно несколько сотен пикселей по ширине.
+
+Поэтому:
+  * ряд читается из БД двумя колонками (дата, цена) и хранится в памяти
+    процесса как два `array` — порядковые номера дат (int64) и цены
+    закрытия (float64), ~16 байт на день вместо ORM-объекта;
+  * ключ кэша — `companies.data_version`: бэкфилл цен и обновление текущей
+    цены увеличивают версию (в том числе из процесса воркера), и следующий
+    запрос перечитает ряд;
+  * цены в БД хранятся как торговались (см. app/services/share_splits.py);
+    приведение к сегодняшней шкале делается здесь — делением отрезков ряда
+    между датами сплитов, без прохода по датам с `shares_factor` на каждой;
+  * прореживание до заданного числа точек — LTTB (форма линии сохраняется,
+    пики не срезаются) или OHLC-корзины (для свечного графика).
+"""
+from __future__ import annotations
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.stock_price import StockPrice
+from app.services.share_splits import normalize_splits
+
+DOWNSAMPLE_METHODS = ("lttb", "ohlc")
+
+
+@dataclass(frozen=True)
+class PriceSeries:
+    """Дневной ряд: `days[i]` — date.toordinal(), `closes[i]` — цена закрытия."""
+
+    days: array
+    closes: array
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def window(self, date_from: Optional[date], date_to: Optional[date]) -> "PriceSeries":
+        """Срез по датам включительно — бинарным поиском, без копирования при пустых границах."""
+        if date_from is None and date_to is None:
+            return self
+        lo = 0 if date_from is None else bisect_left(self.days, date_from.toordinal())
+        hi = len(self.days) if date_to is None else bisect_right(self.days, date_to.toordinal())
+        return PriceSeries(self.days[lo:hi], self.closes[lo:hi])
+
+
+@dataclass(frozen=True)
+class Downsampled:
+    """Результат прореживания. open/high/low заполнены только для OHLC."""
+
+    days: Sequence[int]
+    close: Sequence[float]
+    open: Optional[Sequence[float]] = None
+    high: Optional[Sequence[float]] = None
+    low: Optional[Sequence[float]] = None
+
+
+# ---------------------------------------------------------------------------
+# Загрузка и кэш
+# ---------------------------------------------------------------------------
+
+def _series_stmt(company_id: int) -> Select:
+    return (
+        select(StockPrice.date, StockPrice.price)
+        .where(StockPrice.company_id == company_id)
+        .order_by(StockPrice.date)
+    )
+
+
+def _build(rows: Any) -> PriceSeries:
+    days = array("q")
+    closes = array("d")
+    for day, price in rows:
+        days.append(day.toordinal())
+        closes.append(float(price))
+    return PriceSeries(days, closes)
+
+
+class _SeriesCache:
+    """LRU рядов по компаниям: company_id → (data_version, ряд)."""
+
+    def __init__(self, max_companies: int):
+        self._max = max_companies
+        self._data: OrderedDict[int, tuple[int, PriceSeries]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, company_id: int, version: int) -> Optional[PriceSeries]:
+        with self._lock:
+            entry = self._data.get(company_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._data.move_to_end(company_id)
+            return entry[1]
+
+    def put(self, company_id: int, version: int, series: PriceSeries) -> None:
+        if self._max <= 0:
+            return
+        with self._lock:
+            self._data[company_id] = (version, series)
+            self._data.move_to_end(company_id)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_cache = _SeriesCache(settings.PRICE_SERIES_CACHE_MAX_COMPANIES)
+
+
+def get_price_series(db: Session, company_id: int, version: int) -> PriceSeries:
+    """Ряд цен компании на версию данных `version` (из кэша или из БД)."""
+    series = _cache.get(company_id, version)
+    if series is None:
+        series = _build(db.execute(_series_stmt(company_id)))
+        _cache.put(company_id, version, series)
+    return series
+
+
+async def aget_price_series(db: AsyncSession, company_id: int, version: int) -> PriceSeries:
+    series = _cache.get(company_id, version)
+    if series is None:
+        series = _build(await db.execute(_series_stmt(company_id)))
+        _cache.put(company_id, version, series)
+    return series
+
+
+def clear_cache() -> None:
+    """Сбросить кэш рядов процесса (тесты, ручная диагностика)."""
+    _cache.clear()
+
+
+# ---------------------------------------------------------------------------
+# Сплиты
+# ---------------------------------------------------------------------------
+
+def adjust_for_splits(series: PriceSeries, splits: Any) -> PriceSeries:
+    """
+    Цены в сегодняшней шкале: всё, что торговалось до дробления, делится на
+    его коэффициент (для 10:1 — 3 196,8 ₽ → 319,68 ₽).
+
+    Ряд режется датами сплитов на отрезки; на каждом отрезке множитель
+    постоянен — произведение коэффициентов всех сплитов после него, то же,
+    что `shares_factor` для любой даты отрезка.
+    """
+    entries = normalize_splits(splits)
+    if not entries or not len(series):
+        return series
+    closes = array("d", series.closes)
+    for entry in entries:
+        # date сплита — первый день в новой шкале: он и дальше не делятся.
+        cut = bisect_left(series.days, date.fromisoformat(entry["date"]).toordinal())
+        if cut:
+            ratio = entry["ratio"]
+            closes[:cut] = array("d", (c / ratio for c in closes[:cut]))
+    return PriceSeries(series.days, closes)
+
+
+# ---------------------------------------------------------------------------
+# Прореживание
+# ---------------------------------------------------------------------------
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], threshold: int) -> list[int]:
+    """
+    Largest-Triangle-Three-Buckets: индексы `threshold` точек, сохраняющих
+    форму линии. Первая и последняя точки остаются всегда.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        raise ValueError("LTTB: нужно не меньше трёх точек")
+
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Средняя точка следующей корзины — третья вершина треугольника.
+        next_lo = int((i + 1) * every) + 1
+        next_hi = min(int((i + 2) * every) + 1, n)
+        count = next_hi - next_lo
+        avg_x = sum(xs[next_lo:next_hi]) / count
+        avg_y = sum(ys[next_lo:next_hi]) / count
+
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def ohlc_buckets(series: PriceSeries, buckets: int) -> Downsampled:
+    """Свечи: ряд делится на `buckets` корзин поровну по числу торговых дней.
+
+    Дата свечи — первый день корзины; open/close — первая и последняя цена.
+    """
+    n = len(series)
+    buckets = max(1, min(buckets, n))
+    days: list[int] = []
+    opens: list[float] = []
+    highs: list[float] = []
+    lows: list[float] = []
+    closes: list[float] = []
+    for b in range(buckets):
+        lo = b * n // buckets
+        hi = (b + 1) * n // buckets
+        chunk = series.closes[lo:hi]
+        days.append(series.days[lo])
+        opens.append(chunk[0])
+        highs.append(max(chunk))
+        lows.append(min(chunk))
+        closes.append(chunk[-1])
+    return Downsampled(days, closes, opens, highs, lows)
+
+
+def downsample(series: PriceSeries, points: int, method: str = "lttb") -> Downsampled:
+    """Не больше `points` точек; короткий ряд отдаётся как есть."""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Неизвестный метод прореживания: {method}")
+    if method == "ohlc":
+        if not len(series):
+            return Downsampled([], [], [], [], [])
+        return ohlc_buckets(series, points)
+    if points >= len(series):
+        return Downsampled(series.days, series.closes)
+    idx = lttb_indices(series.days, series.closes, points)
+    return Downsampled([series.days[i] for i in idx], [series.closes[i] for i in idx])
+
+
+__all__ = (
+    "DOWNSAMPLE_METHODS",
+    "Downsampled",
+    "PriceSeries",
+    "adjust_for_splits",
+    "aget_price_series",
+    "clear_cache",
+    "downsample",
+    "get_price_series",
+    "lttb_indices",
+    "ohlc_buckets",
+)
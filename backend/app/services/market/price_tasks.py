@@ -0,0 +1,53 @@
+"""Фоновые задачи обновления цен (ставит планировщик, выполняет app.worker).
+
+Ошибка пробрасывается — очередь повторит задачу с паузой; бэкфилл
+идемпотентен, так что повтор после частичного прогона безопасен.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def daily_price_update_task(payload: dict[str, Any]) -> None:
+    """
+    Задача `market.daily_price_update`:
+      1. Бэкфилл — MOEX докачивает все пропущенные дни (в т.ч. если сервер
+         был выключен несколько дней).
+      2. Текущая цена — T-Invest обновляет сегодняшнее значение.
+    """
+    from app.services.market.price_history_service import backfill_all_companies
+    from app.services.market.tinvest_price_service import update_all_company_prices
+
+    logger.info("Ежедневное обновление цен: старт")
+    db = SessionLocal()
+    try:
+        backfill_result = backfill_all_companies(db)
+        if backfill_result:
+            logger.info("Бэкфилл завершён: %s", backfill_result)
+
+        prices = update_all_company_prices(db)
+        updated = sum(1 for v in prices.values() if v is not None)
+        logger.info("Текущие цены обновлены: %d компаний", updated)
+    finally:
+        db.close()
+
+
+def price_backfill_task(payload: dict[str, Any]) -> None:
+    """Задача `market.price_backfill`: докачать все пропуски в ценах."""
+    from app.services.market.price_history_service import backfill_all_companies
+
+    logger.info("Проверка и бэкфилл пропущенных цен")
+    db = SessionLocal()
+    try:
+        result = backfill_all_companies(db)
+        if result:
+            logger.info("Бэкфилл завершён: %s", result)
+        else:
+            logger.info("Бэкфилл: пробелов не обнаружено")
+    finally:
+        db.close()
@@ -18,6 +18,7 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.config import settings
 from app.models.company import Company
 from app.models.stock_price import StockPrice
+from app.services.companies.data_version import bump_data_version
 from app.utils.http_session import external_session, tls_hint
 
 logger = logging.getLogger(__name__)
@@ -120,6 +121,7 @@ def update_company_price(db: Session, company: Company) -> Optional[float]:
     company.price_updated_at = now  # type: ignore
 
     _upsert_stock_price(db, company_id=company.id, price_date=today, price=price)
+    bump_data_version(db, [company.id])
 
     db.commit()
     db.refresh(company)
@@ -170,6 +172,7 @@ def update_all_company_prices(db: Session) -> Dict[str, Optional[float]]:
     now = datetime.now(timezone.utc)
     today = now.date()
     result: Dict[str, Optional[float]] = {}
+    updated_ids: List[int] = []
 
     for figi, price in prices.items():
         company = figi_to_company.get(figi)
@@ -180,9 +183,11 @@ def update_all_company_prices(db: Session) -> Dict[str, Optional[float]]:
             company.current_price = price  # type: ignore
             company.price_updated_at = now  # type: ignore
             _upsert_stock_price(db, company_id=company.id, price_date=today, price=price)
+            updated_ids.append(company.id)
 
         result[company.ticker] = price
 
+    bump_data_version(db, updated_ids)
     db.commit()
     logger.info("Обновлено цен компаний: %d", sum(1 for v in result.values() if v is not None))
     return result
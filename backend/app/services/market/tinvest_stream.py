@@ -0,0 +1,113 @@
+"""
+Поток последних цен T-Invest (MarketDataStreamService/MarketDataStream) через WebSocket.
+
+REST-метод GetLastPrices (tinvest_price_service) отвечает на вопрос «сколько
+стоит сейчас», а стрим сам присылает каждую новую цену сделки. Протокол —
+JSON поверх WebSocket с подпротоколом `json`:
+
+    → {"subscribeLastPriceRequest": {"subscriptionAction": "SUBSCRIPTION_ACTION_SUBSCRIBE",
+                                     "instruments": [{"instrumentId": FIGI}, …]}}
+    ← {"subscribeLastPriceResponse": {...}}          — итог подписки
+    ← {"lastPrice": {"figi": …, "price": {"units", "nano"}, "time": …}}
+    ← {"ping": {...}}                                 — keep-alive сервера
+
+Здесь только одно соединение: подписаться и отдавать тики. Переподключение,
+склейка тиков и пересчёт мультипликаторов — в app/services/market/live_feed.py.
+Для тестов и локальной разработки без токена есть заглушка с тем же
+протоколом: app/services/market/tinvest_stream_stub.py.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import ssl
+from datetime import datetime
+from typing import AsyncIterator, NamedTuple, Optional, Sequence
+
+from websockets.asyncio.client import connect
+
+from app.services.market.tinvest_price_service import _parse_tinvest_price
+from app.utils.http_session import ca_bundle
+
+logger = logging.getLogger(__name__)
+
+# Инструментов в одном сообщении подписки: длинный список сервер режет.
+SUBSCRIBE_CHUNK = 300
+
+
+class Tick(NamedTuple):
+    figi: str
+    price: float
+    time: Optional[datetime]
+
+
+def subscribe_messages(figis: Sequence[str]) -> list[str]:
+    """Сообщения подписки на последние цены — по SUBSCRIBE_CHUNK инструментов."""
+    return [
+        json.dumps({
+            "subscribeLastPriceRequest": {
+                "subscriptionAction": "SUBSCRIPTION_ACTION_SUBSCRIBE",
+                "instruments": [{"instrumentId": figi} for figi in figis[i:i + SUBSCRIBE_CHUNK]],
+            }
+        })
+        for i in range(0, len(figis), SUBSCRIBE_CHUNK)
+    ]
+
+
+def parse_tick(message: str | bytes) -> Optional[Tick]:
+    """Тик из сообщения стрима; ответы на подписку, ping и мусор → None."""
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    last = data.get("lastPrice") if isinstance(data, dict) else None
+    if not isinstance(last, dict) or not last.get("figi"):
+        return None
+    price = _parse_tinvest_price(last.get("price"))
+    if price is None:
+        return None
+    return Tick(last["figi"], price, _parse_time(last.get("time")))
+
+
+def _parse_time(value: object) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        # "2026-10-19T10:15:03.123456789Z": наносекунды datetime не разбирает.
+        head, _, frac = value.rstrip("Z").partition(".")
+        return datetime.fromisoformat(f"{head}.{frac[:6]}+00:00" if frac else f"{head}+00:00")
+    except ValueError:
+        return None
+
+
+def _ssl_context(url: str) -> Optional[ssl.SSLContext]:
+    # Корень Минцифры, как у REST-запросов (EXTRA_CA_CERTS, app/utils/http_session.py).
+    return ssl.create_default_context(cafile=ca_bundle()) if url.startswith("wss://") else None
+
+
+async def stream_last_prices(url: str, token: str, figis: Sequence[str]) -> AsyncIterator[Tick]:
+    """Открыть стрим, подписаться на figis и отдавать тики, пока соединение живо.
+
+    Ошибки соединения пробрасываются: решать, когда переподключаться, —
+    вызывающему.
+    """
+    headers = {"Authorization": f"Bearer {token.strip()}"}
+    async with connect(
+        url,
+        subprotocols=["json"],
+        additional_headers=headers,
+        ssl=_ssl_context(url),
+        # Прокси из окружения не берём — как external_session.
+        proxy=None,
+        open_timeout=15,
+    ) as ws:
+        for message in subscribe_messages(list(figis)):
+            await ws.send(message)
+        logger.info("Поток цен T-Invest: подписка на %d инструментов", len(figis))
+        async for message in ws:
+            tick = parse_tick(message)
+            if tick is not None:
+                yield tick
+
+
+__all__ = ("SUBSCRIBE_CHUNK", "Tick", "parse_tick", "stream_last_prices", "subscribe_messages")
@@ -0,0 +1,112 @@
+"""
+Локальная заглушка стрима последних цен T-Invest — тот же JSON-протокол по WebSocket.
+
+Нужна тестам и разработке без токена и без биржевой сессии:
+
+    python -m app.services.market.tinvest_stream_stub --port 8765 BBG004730N88 BBG004731032
+    TINVEST_STREAM_URL=ws://127.0.0.1:8765 TINVEST_STREAM_ENABLED=true uvicorn app.main:app
+
+Из командной строки заглушка раз в interval секунд шлёт случайное блуждание
+цены по каждому FIGI; в тестах цены задаются вызовом `push`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+from typing import Optional
+
+from websockets.asyncio.server import Server, ServerConnection, serve
+
+
+def _quotation(price: float) -> dict:
+    units = int(price)
+    return {"units": str(units), "nano": int(round((price - units) * 1_000_000_000))}
+
+
+class StubLastPriceServer:
+    """WebSocket-сервер с протоколом MarketDataStream: подписки и рассылка lastPrice."""
+
+    def __init__(self) -> None:
+        self._server: Optional[Server] = None
+        self._subscribers: dict[ServerConnection, set[str]] = {}
+        self.tokens: list[Optional[str]] = []   # Authorization каждого подключения
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "сервер не запущен"
+        host, port = next(iter(self._server.sockets)).getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = await serve(self._handle, host, port, subprotocols=["json"])
+        return self.url
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def drop_connections(self) -> None:
+        """Оборвать всех клиентов — проверка переподключения."""
+        for ws in list(self._subscribers):
+            await ws.close()
+
+    def subscribed(self) -> set[str]:
+        return set().union(*self._subscribers.values()) if self._subscribers else set()
+
+    async def push(self, figi: str, price: float, time: str = "2026-10-19T10:00:00.123456789Z") -> None:
+        """Отправить сделку по figi всем, кто на него подписан."""
+        message = json.dumps({"lastPrice": {"figi": figi, "price": _quotation(price), "time": time}})
+        for ws, figis in list(self._subscribers.items()):
+            if figi in figis:
+                await ws.send(message)
+
+    async def _handle(self, ws: ServerConnection) -> None:
+        self.connections += 1
+        self.tokens.append(ws.request.headers.get("Authorization") if ws.request else None)
+        self._subscribers[ws] = set()
+        try:
+            async for message in ws:
+                request = json.loads(message).get("subscribeLastPriceRequest")
+                if not request:
+                    continue
+                figis = [i["instrumentId"] for i in request.get("instruments", [])]
+                self._subscribers[ws].update(figis)
+                await ws.send(json.dumps({"subscribeLastPriceResponse": {
+                    "lastPriceSubscriptions": [
+                        {"figi": f, "subscriptionStatus": "SUBSCRIPTION_STATUS_SUCCESS"} for f in figis
+                    ],
+                }}))
+        finally:
+            self._subscribers.pop(ws, None)
+
+
+async def _random_walk(server: StubLastPriceServer, figis: list[str], interval: float) -> None:
+    prices = {figi: 100.0 for figi in figis}
+    while True:
+        await asyncio.sleep(interval)
+        for figi in figis:
+            prices[figi] = round(prices[figi] * (1 + random.gauss(0, 0.001)), 2)
+            await server.push(figi, prices[figi])
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = StubLastPriceServer()
+    print(f"Заглушка стрима T-Invest: {await server.start(args.host, args.port)}")
+    try:
+        await _random_walk(server, args.figi, args.interval)
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("figi", nargs="+")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.2, help="секунд между сделками")
+    asyncio.run(_main(parser.parse_args()))
@@ -1,6 +1,7 @@
 """CRUD и управление заданиями массового парсинга."""
 from __future__ import annotations
 
+import logging
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
@@ -14,6 +15,13 @@ from app.models.mass_parse import MassParseItem, MassParseJob
 from app.services.mass_parse.scanner import ScanPreview, scan_reports_dir
 from app.services.mass_parse.worker import is_worker_alive, start_worker
 
+logger = logging.getLogger(__name__)
+
+
+# sync — запрос на каждый PDF; batch — Batch API провайдера (дешевле, без TPM-пауз,
+# но ответ приходит за часы).
+LLM_MODES = ("sync", "batch")
+
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
@@ -49,7 +57,10 @@ def create_job(
     force: bool = False,
     accounting_standard: str = "IFRS",
     consolidated: bool = True,
+    llm_mode: str = "sync",
 ) -> MassParseJob:
+    if llm_mode not in LLM_MODES:
+        raise ValueError(f"llm_mode должен быть одним из {LLM_MODES}, получено {llm_mode!r}")
     preview = preview_scan(
         db,
         reports_root=reports_root,
@@ -74,6 +85,7 @@ def create_job(
         force=force,
         accounting_standard=accounting_standard,
         consolidated=consolidated,
+        llm_mode=llm_mode,
         total_items=preview.queued,
         done_ok=0,
         done_skipped=0,
@@ -206,6 +218,10 @@ def resume_job(db: Session, job_id: int) -> MassParseJob:
         raise LookupError(f"Job {job_id} не найден")
     if job.status not in ("paused", "pending"):
         raise ValueError(f"Resume только для paused/pending (сейчас {job.status})")
+    if job.llm_batch_id:
+        # running-элементы ждут ответа отправленного батча — воркер дочитает его.
+        db.commit()
+        return start_job(db, job_id)
     # Сбросить зависшие running → pending
     stuck = (
         db.query(MassParseItem)
@@ -237,6 +253,23 @@ def cancel_job(db: Session, job_id: int) -> MassParseJob:
         .filter(MassParseItem.status == "pending")
         .all()
     )
+    if job.llm_batch_id:
+        # Элементы отправленного батча тоже отменяем; сам батч отменит воркер,
+        # а если он не запущен — отменяем здесь.
+        pending += (
+            db.query(MassParseItem)
+            .filter(MassParseItem.job_id == job_id)
+            .filter(MassParseItem.status == "running")
+            .all()
+        )
+        if not is_worker_alive(job_id):
+            from app.services.report_parser.llm_batch import cancel_batch
+
+            try:
+                cancel_batch(job.llm_batch_id)
+            except Exception as exc:  # noqa: BLE001 — батч истечёт сам через 24 ч
+                logger.warning("Mass-parse: не удалось отменить batch %s: %s", job.llm_batch_id, exc)
+            job.llm_batch_id = None
     for item in pending:
         item.status = "cancelled"
         item.finished_at = _utcnow()
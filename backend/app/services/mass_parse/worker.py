@@ -1,68 +1,126 @@
-"""Фоновый воркер массового парсинга (один поток на процесс)."""
+"""Воркер массового парсинга — исполнитель фоновой задачи `mass_parse.job`.
+
+Задание выполняет процесс `python -m app.worker` (очередь mass_parse, одно
+задание за раз); API лишь ставит задачу через `start_worker`. Состояние
+задания — в mass_parse_items, поэтому после падения воркера задачу по
+истечении аренды забирает другой и продолжает с первого pending-элемента.
+
+Два режима задания (`MassParseJob.llm_mode`):
+  * sync  — PDF по одному, синхронный запрос в LLM на каждый;
+  * batch — пачка PDF готовится целиком и уходит в Batch API провайдера
+    одним файлом; воркер опрашивает батч и сохраняет ответы пачкой.
+
+Каждый коммит прогресса задания и элементов уходит событием в шину
+(app/services/events) — его раздаёт SSE GET /mass-parse/jobs/{id}/events.
+"""
 from __future__ import annotations
 
 import logging
-import threading
 import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional
 
+from app.config import settings
 from app.database import SessionLocal
 from app.models.company import Company
 from app.models.mass_parse import MassParseItem, MassParseJob
-from app.services.report_parser.extractor_service import (
-    ReportAlreadyExistsError,
-    parse_pdf_to_report,
-)
-from app.services.report_parser.llm_client import (
+from app.services.events.publisher import row_state, track_changes
+from app.services.report_parser.errors import (
     LLMQuotaExhaustedError,
     LLMRateLimitError,
     LLMTransientError,
+    ReportAlreadyExistsError,
 )
+from app.services.tasks.queue import enqueue, has_active_task
+from app.services.tasks.registry import MASS_PARSE_JOB
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from app.services.report_parser.extractor_service import PreparedExtraction
+    from app.services.report_parser.llm_batch import BatchStatus
 
-_lock = threading.Lock()
-_thread: Optional[threading.Thread] = None
-_active_job_id: Optional[int] = None
+logger = logging.getLogger(__name__)
 
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def _task_key(job_id: int) -> str:
+    return f"mass_parse:{job_id}"
+
+
 def is_worker_alive(job_id: Optional[int] = None) -> bool:
-    with _lock:
-        alive = _thread is not None and _thread.is_alive()
-        if job_id is None:
-            return alive
-        return alive and _active_job_id == job_id
+    """Задание стоит в очереди воркера или выполняется (job_id=None — любое)."""
+    db = SessionLocal()
+    try:
+        key = None if job_id is None else _task_key(job_id)
+        return has_active_task(db, kind=MASS_PARSE_JOB, dedupe_key=key)
+    finally:
+        db.close()
+
+
+# Темы шины событий: список заданий и одно задание вместе с его элементами.
+JOBS_TOPIC = "mass_parse.jobs"
+
+
+def job_topic(job_id: int) -> str:
+    return f"mass_parse.job.{job_id}"
+
+
+def job_counts(job: MassParseJob) -> tuple[int, int]:
+    """(обработано, осталось) по счётчикам задания."""
+    processed = int(job.done_ok or 0) + int(job.done_skipped or 0) + int(job.done_error or 0)
+    pending = max(0, int(job.total_items or 0) - processed)
+    # running item ещё не в счётчиках
+    if job.status == "running" and job.current_item_id:
+        pending = max(0, pending - 1)
+    return processed, pending
+
+
+def _job_event(job: MassParseJob) -> dict:
+    state = row_state(job)
+    state["processed_count"], state["pending_count"] = job_counts(job)
+    return state
+
+
+track_changes(MassParseJob, kind="job", topics=lambda job: (JOBS_TOPIC, job_topic(job.id)),
+              serialize=_job_event)
+track_changes(MassParseItem, kind="item", topics=lambda item: (job_topic(item.job_id),))
+
+
+def _reset_stuck_items(db, job_id: int, message: str) -> int:
+    """running → pending: элементы, начатые и не законченные упавшим воркером."""
+    stuck = (
+        db.query(MassParseItem)
+        .filter(MassParseItem.job_id == job_id)
+        .filter(MassParseItem.status == "running")
+        .all()
+    )
+    for item in stuck:
+        item.status = "pending"
+        item.message = message
+        item.started_at = None
+    return len(stuck)
 
 
 def recover_orphaned_running_jobs() -> int:
-    """При старте API: running без живого воркера → paused (можно продолжить)."""
+    """При старте воркера: running без задачи в очереди → paused (можно продолжить)."""
     db = SessionLocal()
     try:
         jobs = db.query(MassParseJob).filter(MassParseJob.status == "running").all()
         n = 0
         for job in jobs:
-            if is_worker_alive(job.id):
+            if has_active_task(db, kind=MASS_PARSE_JOB, dedupe_key=_task_key(job.id)):
                 continue
             job.status = "paused"
             job.last_message = "Прервано перезапуском сервера — можно продолжить (Resume)."
             job.updated_at = _utcnow()
-            stuck = (
-                db.query(MassParseItem)
-                .filter(MassParseItem.job_id == job.id)
-                .filter(MassParseItem.status == "running")
-                .all()
-            )
-            for item in stuck:
-                item.status = "pending"
-                item.message = "Сброшено после перезапуска сервера"
-                item.started_at = None
             n += 1
+            if job.llm_batch_id:
+                # Батч у провайдера живёт дальше — Resume дочитает его ответы.
+                continue
+            _reset_stuck_items(db, job.id, "Сброшено после перезапуска сервера")
         if n:
             db.commit()
             logger.warning("Mass-parse: %s orphaned running job(s) → paused", n)
@@ -72,28 +130,37 @@ def recover_orphaned_running_jobs() -> int:
 
 
 def start_worker(job_id: int) -> bool:
-    """Запустить поток для job_id. False если уже крутится другой/этот job."""
-    global _thread, _active_job_id
-    with _lock:
-        if _thread is not None and _thread.is_alive():
-            if _active_job_id == job_id:
-                return True
-            return False
-        _active_job_id = job_id
-        _thread = threading.Thread(
-            target=_run_job_loop,
-            args=(job_id,),
-            name=f"mass-parse-{job_id}",
-            daemon=True,
-        )
-        _thread.start()
+    """Поставить задание в очередь воркера (повторная постановка — no-op)."""
+    db = SessionLocal()
+    try:
+        enqueue(db, MASS_PARSE_JOB, {"job_id": job_id}, dedupe_key=_task_key(job_id))
+        db.commit()
         return True
+    finally:
+        db.close()
+
+
+def run_job_task(payload: dict[str, Any]) -> None:
+    """Исполнитель задачи `mass_parse.job` (его вызывает процесс воркера)."""
+    job_id = int(payload["job_id"])
+    if _job_llm_mode(job_id) != "batch":
+        # Задача на задание одна, так что running-элементы остались от
+        # прошлой попытки, чей воркер упал посреди PDF.
+        db = SessionLocal()
+        try:
+            if _reset_stuck_items(db, job_id, "Сброшено после падения воркера"):
+                db.commit()
+        finally:
+            db.close()
+    _run_job_loop(job_id)
 
 
 def _run_job_loop(job_id: int) -> None:
-    global _active_job_id
     logger.info("Mass-parse worker started for job_id=%s", job_id)
     try:
+        if _job_llm_mode(job_id) == "batch":
+            _run_batch_loop(job_id)
+            return
         while True:
             db = SessionLocal()
             try:
@@ -118,16 +185,7 @@ def _run_job_loop(job_id: int) -> None:
                     .first()
                 )
                 if item is None:
-                    job.status = "completed"
-                    job.finished_at = _utcnow()
-                    job.updated_at = _utcnow()
-                    job.current_item_id = None
-                    job.last_message = (
-                        f"Готово: ok={job.done_ok}, skipped={job.done_skipped}, "
-                        f"error={job.done_error}"
-                    )
-                    db.commit()
-                    logger.info("Mass-parse job %s completed", job_id)
+                    _complete_job(db, job)
                     return
 
                 item_id = int(item.id)
@@ -159,13 +217,34 @@ def _run_job_loop(job_id: int) -> None:
         finally:
             db.close()
     finally:
-        with _lock:
-            if _active_job_id == job_id:
-                _active_job_id = None
         logger.info("Mass-parse worker finished for job_id=%s", job_id)
 
 
+def _job_llm_mode(job_id: int) -> str:
+    db = SessionLocal()
+    try:
+        job = db.query(MassParseJob).filter(MassParseJob.id == job_id).first()
+        return (job.llm_mode if job else None) or "sync"
+    finally:
+        db.close()
+
+
+def _complete_job(db, job: MassParseJob) -> None:
+    job.status = "completed"
+    job.finished_at = _utcnow()
+    job.updated_at = _utcnow()
+    job.current_item_id = None
+    job.last_message = (
+        f"Готово: ok={job.done_ok}, skipped={job.done_skipped}, "
+        f"error={job.done_error}"
+    )
+    db.commit()
+    logger.info("Mass-parse job %s completed", job.id)
+
+
 def _process_one_item(job_id: int, item_id: int) -> None:
+    from app.services.report_parser.extractor_service import parse_pdf_to_report
+
     db = SessionLocal()
     try:
         job = db.query(MassParseJob).filter(MassParseJob.id == job_id).first()
@@ -239,12 +318,17 @@ def _process_one_item(job_id: int, item_id: int) -> None:
                     source_pdf_path=str(pdf_path),
                     pdf_label=pdf_path.name,
                 )
+                message = f"report_id={outcome.created_report_id}"
+                if outcome.token_budget:
+                    message += (
+                        f", ~{outcome.estimated_tokens}/{outcome.token_budget} токенов"
+                    )
                 _finish_item(
                     db,
                     job,
                     item,
                     status="success",
-                    message=f"report_id={outcome.created_report_id}",
+                    message=message,
                     report_id=outcome.created_report_id,
                 )
                 return
@@ -384,3 +468,240 @@ def _finish_item(
     job.last_message = f"{item.ticker} {item.fiscal_year}: {status} — {message[:200]}"
     job.updated_at = _utcnow()
     db.commit()
+
+
+# ─── Batch-режим ─────────────────────────────────────────────────────────────
+#
+# Цикл: взять до MASS_PARSE_BATCH_SIZE pending-элементов → отобрать страницы и
+# собрать JSONL → отправить батч (элементы → running, id батча — в job) →
+# опрашивать до завершения → сохранить ответы → следующая пачка. id батча
+# хранится в БД, поэтому пауза и перезапуск сервера не теряют отправленное:
+# Resume продолжит опрос того же батча.
+
+
+def _custom_id(item: MassParseItem) -> str:
+    return f"item-{item.id}"
+
+
+def _prepare_item(db, job: MassParseJob, item: MassParseItem) -> Optional[PreparedExtraction]:
+    """Проверки и отбор страниц для элемента; None — элемент уже завершён (skipped/error)."""
+    from app.services.report_parser.extractor_service import prepare_report_request
+
+    if item.company_id is None or item.fiscal_year is None:
+        _finish_item(db, job, item, status="skipped", message="Нет company_id или fiscal_year")
+        return None
+    pdf_path = Path(item.pdf_path)
+    if not pdf_path.is_file():
+        _finish_item(db, job, item, status="error", message=f"Файл не найден: {pdf_path}")
+        return None
+    company = db.query(Company).filter(Company.id == item.company_id).first()
+    if not company:
+        _finish_item(
+            db, job, item, status="error",
+            message=f"Компания id={item.company_id} не найдена",
+        )
+        return None
+    try:
+        return prepare_report_request(
+            db,
+            pdf_source=pdf_path,
+            company=company,
+            fiscal_year=int(item.fiscal_year),
+            force=bool(job.force),
+            period_type="annual",
+            accounting_standard=job.accounting_standard,
+            consolidated=bool(job.consolidated),
+            source_pdf_path=str(pdf_path),
+            pdf_label=pdf_path.name,
+        )
+    except ReportAlreadyExistsError as exc:
+        _finish_item(db, job, item, status="skipped", message=str(exc) or "Отчёт уже существует")
+    except Exception as exc:  # noqa: BLE001 — item error не роняет job
+        db.rollback()
+        logger.warning("Mass-parse batch prepare %s %s: %s", item.ticker, item.fiscal_year, exc)
+        _finish_item(db, job, item, status="error", message=str(exc)[:2000])
+    return None
+
+
+def _submit_next_batch(job_id: int) -> Optional[str]:
+    """id батча, который надо дождаться (новый или уже отправленный); None — стоп."""
+    from app.services.report_parser.llm_batch import batch_request_line, submit_batch
+
+    db = SessionLocal()
+    try:
+        while True:
+            job = db.query(MassParseJob).filter(MassParseJob.id == job_id).first()
+            if not job or job.status != "running":
+                return None
+            if job.llm_batch_id:
+                return job.llm_batch_id
+
+            items = (
+                db.query(MassParseItem)
+                .filter(MassParseItem.job_id == job_id)
+                .filter(MassParseItem.status == "pending")
+                .order_by(MassParseItem.position.asc())
+                .limit(max(1, settings.MASS_PARSE_BATCH_SIZE))
+                .all()
+            )
+            if not items:
+                _complete_job(db, job)
+                return None
+
+            lines: list[str] = []
+            queued: list[MassParseItem] = []
+            for n, item in enumerate(items, start=1):
+                job.last_message = f"Batch: подготовка {n}/{len(items)} — {item.ticker} {item.fiscal_year}"
+                job.updated_at = _utcnow()
+                db.commit()
+                prepared = _prepare_item(db, job, item)
+                if prepared is not None:
+                    system_prompt, user_prompt, images = prepared.single_request()
+                    lines.append(batch_request_line(
+                        _custom_id(item),
+                        system_prompt=system_prompt, user_prompt=user_prompt, images=images,
+                    ))
+                    queued.append(item)
+                db.refresh(job)
+                if job.status != "running":
+                    # Пауза во время подготовки: ничего не отправлено.
+                    return None
+            if not lines:
+                continue  # вся пачка отсеялась проверками — берём следующую
+
+            try:
+                batch_id = submit_batch(lines, metadata={"mass_parse_job": str(job_id)})
+            except LLMQuotaExhaustedError as exc:
+                job.status = "paused"
+                job.last_message = f"Пауза: квота LLM исчерпана при отправке батча: {exc}"[:2000]
+                job.updated_at = _utcnow()
+                db.commit()
+                return None
+
+            now = _utcnow()
+            for item in queued:
+                item.status = "running"
+                item.started_at = now
+                item.message = f"В батче {batch_id}"
+            job.llm_batch_id = batch_id
+            job.last_message = f"Batch {batch_id} отправлен: {len(queued)} PDF"
+            job.updated_at = now
+            db.commit()
+            return batch_id
+    finally:
+        db.close()
+
+
+def _wait_for_batch(job_id: int, batch_id: str) -> Optional[BatchStatus]:
+    """Опрашивать батч до завершения; None — job поставлен на паузу/отменён."""
+    from app.services.report_parser.llm_batch import cancel_batch, get_batch
+
+    while True:
+        try:
+            status: Optional[BatchStatus] = get_batch(batch_id)
+        except LLMTransientError as exc:
+            logger.warning("Mass-parse batch %s: статус не получен: %s", batch_id, exc)
+            status = None
+
+        db = SessionLocal()
+        try:
+            job = db.query(MassParseJob).filter(MassParseJob.id == job_id).first()
+            if not job:
+                return None
+            if job.status == "cancelled":
+                if status is None or not status.finished:
+                    try:
+                        cancel_batch(batch_id)
+                    except Exception as exc:  # noqa: BLE001 — батч истечёт сам
+                        logger.warning("Mass-parse: не удалось отменить batch %s: %s", batch_id, exc)
+                job.llm_batch_id = None
+                db.commit()
+                return None
+            if job.status != "running":
+                return None  # пауза: id батча остаётся в job, Resume продолжит опрос
+            if status is not None:
+                job.last_message = (
+                    f"Batch {batch_id}: {status.status}, "
+                    f"готово {status.completed}/{status.total}, ошибок {status.failed}"
+                )
+                job.updated_at = _utcnow()
+                db.commit()
+                if status.finished:
+                    return status
+        finally:
+            db.close()
+        time.sleep(max(1, settings.MASS_PARSE_BATCH_POLL_SECONDS))
+
+
+def _apply_batch_results(job_id: int, status: BatchStatus) -> None:
+    """Сохранить ответы батча: те же автокоррекции и проверки, что в sync-режиме.
+
+    Страницы PDF отбираются заново (детерминированно, без LLM) — так не нужно
+    хранить метаданные подготовки между отправкой и ответом.
+    """
+    from app.services.report_parser.extractor_service import save_report_from_llm
+    from app.services.report_parser.llm_batch import fetch_batch_results
+
+    results = fetch_batch_results(status)
+    db = SessionLocal()
+    try:
+        job = db.query(MassParseJob).filter(MassParseJob.id == job_id).first()
+        if not job:
+            return
+        items = (
+            db.query(MassParseItem)
+            .filter(MassParseItem.job_id == job_id)
+            .filter(MassParseItem.status == "running")
+            .order_by(MassParseItem.position.asc())
+            .all()
+        )
+        for item in items:
+            result = results.get(_custom_id(item))
+            if result is None:
+                _finish_item(
+                    db, job, item, status="error",
+                    message=f"Нет ответа в батче {status.id} (статус {status.status})",
+                )
+                continue
+            if isinstance(result, Exception):
+                _finish_item(db, job, item, status="error", message=str(result)[:2000])
+                continue
+            prepared = _prepare_item(db, job, item)
+            if prepared is None:
+                continue
+            try:
+                outcome = save_report_from_llm(db, prepared, result)
+            except ReportAlreadyExistsError as exc:
+                _finish_item(db, job, item, status="skipped", message=str(exc))
+                continue
+            except Exception as exc:  # noqa: BLE001 — item error не роняет job
+                db.rollback()
+                job = db.query(MassParseJob).filter(MassParseJob.id == job_id).first()
+                item = db.query(MassParseItem).filter(MassParseItem.id == item.id).first()
+                logger.exception(
+                    "Mass-parse batch save error job=%s %s %s: %s",
+                    job_id, item.ticker, item.fiscal_year, exc,
+                )
+                _finish_item(db, job, item, status="error", message=str(exc)[:2000])
+                continue
+            _finish_item(
+                db, job, item, status="success",
+                message=f"report_id={outcome.created_report_id} (batch {status.id})",
+                report_id=outcome.created_report_id,
+            )
+        job.llm_batch_id = None
+        job.updated_at = _utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _run_batch_loop(job_id: int) -> None:
+    while True:
+        batch_id = _submit_next_batch(job_id)
+        if batch_id is None:
+            return
+        status = _wait_for_batch(job_id, batch_id)
+        if status is None:
+            return
+        _apply_batch_results(job_id, status)
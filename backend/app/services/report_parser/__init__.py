@@ -5,22 +5,56 @@
     (auto_extracted=True, verified_by_analyst=False).
   * `extract_financial_pages` — выбор релевантных страниц PDF.
   * `ExtractedReport` — pydantic-схема результата извлечения LLM.
+
+Имена загружаются при первом обращении (PEP 562): импорт пакета — скажем,
+ради `report_parser.errors` — не тянет PyMuPDF и OpenAI SDK, и API
+стартует без них. Стек PDF и LLM поднимается на первом разборе PDF.
 """
-from app.services.report_parser.extractor_service import (
-    ComparisonResult,
-    ComparisonSummary,
-    ExtractionOutcome,
-    ReportFieldDiff,
-    ReportNotFoundForComparison,
-    compare_pdf_with_existing,
-    compute_report_diff,
-    parse_pdf_to_report,
-)
-from app.services.report_parser.pdf_extractor import (
-    PdfExtractionResult,
-    extract_financial_pages,
-)
-from app.services.report_parser.schemas import ExtractedReport
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.services.report_parser.extractor_service import (
+        ComparisonResult,
+        ComparisonSummary,
+        ExtractionOutcome,
+        ReportFieldDiff,
+        ReportNotFoundForComparison,
+        compare_pdf_with_existing,
+        compute_report_diff,
+        parse_pdf_to_report,
+    )
+    from app.services.report_parser.pdf_extractor import (
+        PdfExtractionResult,
+        extract_financial_pages,
+    )
+    from app.services.report_parser.schemas import ExtractedReport
+
+_LAZY = {
+    "ComparisonResult": "extractor_service",
+    "ComparisonSummary": "extractor_service",
+    "ExtractionOutcome": "extractor_service",
+    "ReportFieldDiff": "extractor_service",
+    "ReportNotFoundForComparison": "errors",
+    "compare_pdf_with_existing": "extractor_service",
+    "compute_report_diff": "extractor_service",
+    "parse_pdf_to_report": "extractor_service",
+    "PdfExtractionResult": "pdf_extractor",
+    "extract_financial_pages": "pdf_extractor",
+    "ExtractedReport": "schemas",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = (
     "ComparisonResult",
@@ -0,0 +1,58 @@
+"""Ошибки конвейера разбора PDF — без зависимостей.
+
+Классы живут отдельно от llm_client (OpenAI SDK, tenacity) и extractor_service
+(PyMuPDF), чтобы роутеры, воркеры и перевод ошибок в HTTP-коды
+(app/routers/pipeline_errors.py) ловили их, не загружая стек PDF и LLM при
+импорте. Модули конвейера реэкспортируют их под прежними именами.
+"""
+from __future__ import annotations
+
+
+class LLMTransientError(RuntimeError):
+    """Временная ошибка: сеть, таймаут, пустой ответ. Ретраим."""
+
+
+class LLMRateLimitError(LLMTransientError):
+    """HTTP 429 — TPM/RPM лимит у провайдера. Ретраим с учётом Retry-After."""
+
+    def __init__(self, message: str, retry_after: float = 15.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMParseError(RuntimeError):
+    """Нераспарсиваемый / невалидный ответ модели. Не ретраим."""
+
+
+class LLMQuotaExhaustedError(RuntimeError):
+    """Free tier / AllocationQuota исчерпан. Ретраи бесполезны — сменить модель или биллинг."""
+
+
+class LLMNotConfiguredError(RuntimeError):
+    """В настройках не задан API-ключ / провайдер LLM."""
+
+
+class ReportAlreadyExistsError(RuntimeError):
+    """В БД уже есть отчёт с такими ключевыми атрибутами (без --force)."""
+
+    def __init__(self, report_id: int):
+        super().__init__(
+            f"Отчёт уже существует в БД (id={report_id}). "
+            f"Используй force=True чтобы пересоздать."
+        )
+        self.report_id = report_id
+
+
+class ReportNotFoundForComparison(RuntimeError):
+    """Нет существующего отчёта в БД — с чем сравнивать нечего."""
+
+
+__all__ = (
+    "LLMNotConfiguredError",
+    "LLMParseError",
+    "LLMQuotaExhaustedError",
+    "LLMRateLimitError",
+    "LLMTransientError",
+    "ReportAlreadyExistsError",
+    "ReportNotFoundForComparison",
+)
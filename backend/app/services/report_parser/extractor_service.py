@@ -20,17 +20,23 @@ from app.config import settings
 from app.models.company import Company
 from app.services.share_splits import shares_at_date, shares_factor
 from app.services.ticker_history import resolve_ticker
-from app.models.enums import company_type_to_report_type
+from app.models.enums import ReportSource, company_type_to_report_type
 from app.models.financial_report import FinancialReport
 from app.schemas import FinancialReportCreate
 from app.services.reports import report_service
-from app.services.report_parser.llm_client import (
+from app.services.report_parser.errors import (
     LLMNotConfiguredError,
     LLMParseError,
     LLMTransientError,
+    ReportAlreadyExistsError,
+    ReportNotFoundForComparison,
+)
+from app.services.report_parser.llm_client import (
     extract_company_description_via_llm,
     extract_report_via_llm,
+    extract_section_via_llm,
 )
+from app.services.report_parser.lookups import SpeculativeLookups
 from app.services.report_parser.pdf_extractor import (
     PdfExtractionResult,
     extract_company_info_pages,
@@ -39,10 +45,28 @@ from app.services.report_parser.pdf_extractor import (
 from app.services.report_parser.prompts import (
     SYSTEM_PROMPT_COMPANY_DESCRIPTION,
     build_company_description_user_prompt,
+    build_gap_fill_system_prompt,
+    build_section_system_prompt,
     build_system_prompt,
     build_user_prompt,
 )
 from app.services.report_parser.schemas import ExtractedReport, rescale_to_millions
+from app.services.report_parser.sections import (
+    SECTIONS,
+    SECTIONS_BY_NAME,
+    SectionJob,
+    fields_schema,
+    merge_section_reports,
+    run_sections,
+    section_text,
+    sections_for_fields,
+    sections_text,
+)
+from app.services.report_parser.table_extractor import (
+    TABLE_FIELDS,
+    TableExtraction,
+    extract_tables,
+)
 from app.services.companies.company_service import apply_business_description_from_llm
 from app.utils.moex_client import (
     get_closing_price_on_or_before,
@@ -158,6 +182,26 @@ class ComparisonResult:
 # ─── Результат ────────────────────────────────────────────────────────────────
 
 
+@dataclass
+class ComparativeOutcome:
+    """Сравнительная колонка прошлого года, прочитанная из таблиц того же PDF.
+
+    Отчёта за прошлый год нет — из колонки создаётся черновик
+    (`created_report_id`); есть — колонка сверяется с ним (`diffs`), а
+    расхождения считаются пересчётом (restatement) прошлого периода.
+    """
+    fiscal_year: int
+    extracted: ExtractedReport
+    existing_report_id: Optional[int] = None
+    created_report_id: Optional[int] = None
+    diffs: list[ReportFieldDiff] = field(default_factory=list)
+    skipped_reason: Optional[str] = None
+
+    @property
+    def restatements(self) -> list[ReportFieldDiff]:
+        return [d for d in self.diffs if d.status == "mismatch"]
+
+
 @dataclass
 class ExtractionOutcome:
     """Что получилось после обработки одного PDF."""
@@ -171,6 +215,10 @@ class ExtractionOutcome:
     extracted: Optional[ExtractedReport] = None
     selected_pages: int = 0
     total_pages: int = 0
+    token_budget: Optional[int] = None  # None — отбор страниц по количеству
+    estimated_tokens: int = 0           # оценка токенов текста страниц в промпте
+    sections: list[str] = field(default_factory=list)  # разделы, если извлекали по разделам
+    comparative: Optional[ComparativeOutcome] = None  # колонка прошлого года, если собирали
 
     @property
     def success(self) -> bool:
@@ -179,20 +227,6 @@ class ExtractionOutcome:
         )
 
 
-# ─── Исключения ──────────────────────────────────────────────────────────────
-
-
-class ReportAlreadyExistsError(RuntimeError):
-    """В БД уже есть отчёт с такими ключевыми атрибутами (без --force)."""
-
-    def __init__(self, report_id: int):
-        super().__init__(
-            f"Отчёт уже существует в БД (id={report_id}). "
-            f"Используй force=True чтобы пересоздать."
-        )
-        self.report_id = report_id
-
-
 # ─── Вспомогательные ─────────────────────────────────────────────────────────
 
 
@@ -218,6 +252,23 @@ def _resolve_report_date(
     return f"{year}-12-31"
 
 
+def _expected_report_date(
+    period_type: str, fiscal_year: int, fiscal_quarter: Optional[int] = None,
+) -> date:
+    """Дата конца периода «по календарю» — догадка до ответа модели.
+
+    Для годовых совпадает с `_resolve_report_date` всегда; для промежуточных —
+    пока модель не прочитала в отчёте иную дату.
+    """
+    pt_norm = str(period_type or "annual").strip().lower().replace("-", "_")
+    if pt_norm == "semi_annual":
+        return date(fiscal_year, 6, 30)
+    if pt_norm == "quarterly" and fiscal_quarter in (1, 2, 3):
+        month = 3 * fiscal_quarter
+        return date(fiscal_year, month, 31 if month == 3 else 30)
+    return date(fiscal_year, 12, 31)
+
+
 def _fetch_moex_shares_issued(
     ticker: Optional[str],
     report_date: Optional[date] = None,
@@ -296,6 +347,7 @@ def _enrich_with_moex_prices(
     exchange_rate: Optional[float] = None,
     period_type: Optional[str] = None,
     fiscal_year: Optional[int] = None,
+    lookups: Optional[SpeculativeLookups] = None,
 ) -> tuple[Optional[float], Optional[float]]:
     """Вернуть (price_per_share, price_at_filing) из MOEX для данного отчёта.
 
@@ -320,8 +372,14 @@ def _enrich_with_moex_prices(
     report_d = _parse_iso_date(report_iso)
     filing_d = _parse_iso_date(extracted.filing_date)
 
-    price_on_report_rub = _fetch_moex_price_for_report(ticker, report_d, former_tickers)
-    price_on_filing_rub = _fetch_moex_price_for_report(ticker, filing_d, former_tickers)
+    if lookups is not None:
+        # Обе даты — параллельно; цена на report_date обычно уже в кэше.
+        lookups.prefetch(_fetch_moex_price_for_report, ticker, filing_d, former_tickers)
+        price_on_report_rub = lookups.get(_fetch_moex_price_for_report, ticker, report_d, former_tickers)
+        price_on_filing_rub = lookups.get(_fetch_moex_price_for_report, ticker, filing_d, former_tickers)
+    else:
+        price_on_report_rub = _fetch_moex_price_for_report(ticker, report_d, former_tickers)
+        price_on_filing_rub = _fetch_moex_price_for_report(ticker, filing_d, former_tickers)
 
     # Для RUB-отчёта возвращаем цены как есть.
     currency = (extracted.currency or "RUB").upper()
@@ -867,6 +925,232 @@ def _build_extraction_notes(
     return "\n\n".join(parts)
 
 
+def _normalize_units(
+    extracted: ExtractedReport,
+) -> tuple[ExtractedReport, list[Optional[str]]]:
+    """Auto-fix единиц ДО rescale (пока числа ещё «сырые»), затем rescale.
+
+    Сначала деньги (млрд ↔ млн), затем акции — порядок важен, т.к. акции
+    не зависят от money scale, но лишняя инвариантность удобна.
+    """
+    extracted, money_autofix_msg = _auto_fix_money_units(extracted)
+    extracted, shares_autofix_msg = _auto_fix_shares_units(extracted)
+    return rescale_to_millions(extracted), [money_autofix_msg, shares_autofix_msg]
+
+
+def _extract_by_sections(
+    extraction: PdfExtractionResult,
+    *,
+    report_type: str,
+    prompt_kwargs: dict[str, Any],
+) -> tuple[ExtractedReport, list[Optional[str]]]:
+    """Параллельно извлечь разделы и слить их (см. sections.py).
+
+    Упавшие разделы (сеть, невалидный JSON) перезапускаются ещё раз поодиночке,
+    готовые не переспрашиваются. Если раздел так и не извлёкся — поднимаем его
+    ошибку: отчёт без баланса или ОПиУ сохранять нельзя.
+    """
+    jobs = [
+        SectionJob(
+            spec=spec,
+            system_prompt=build_section_system_prompt(
+                report_type, section_label=spec.label, fields=spec.fields,
+            ),
+            user_prompt=build_user_prompt(
+                **prompt_kwargs, pdf_text=section_text(extraction, spec),
+            ),
+        )
+        for spec in SECTIONS
+    ]
+
+    def _extract(job: SectionJob) -> ExtractedReport:
+        return extract_section_via_llm(
+            system_prompt=job.system_prompt,
+            user_prompt=job.user_prompt,
+            response_model=job.spec.schema,
+        )
+
+    run = run_sections(jobs, _extract)
+    retryable = [
+        job for job in jobs
+        if isinstance(run.errors.get(job.spec.name), (LLMTransientError, LLMParseError))
+    ]
+    if retryable:
+        logger.warning(
+            "Повторяем упавшие разделы: %s.", ", ".join(j.spec.name for j in retryable),
+        )
+        run_sections(retryable, _extract, run=run)
+    if run.errors:
+        raise run.errors[run.failed[0]]
+
+    normalized: dict[str, ExtractedReport] = {}
+    messages: list[Optional[str]] = []
+    for name, report in run.results.items():
+        normalized[name], fixes = _normalize_units(report)
+        label = SECTIONS_BY_NAME[name].label
+        messages.extend(f"[{label}] {msg}" for msg in fixes if msg)
+    merged, conflicts = merge_section_reports(normalized)
+    return merged, messages + conflicts
+
+
+# debt_principal схема велит оставлять null.
+_GAP_FILL_SKIP_FIELDS = frozenset({"debt_principal"})
+
+# Таблицы не знают периода и даты публикации: без них промежуточный отчёт
+# получил бы report_date {год}-12-31, а price_at_filing не посчиталась бы.
+# Поэтому дозапрос идёт всегда, даже если все показатели прочитались.
+_GAP_FILL_PERIOD_FIELDS: tuple[str, ...] = ("fiscal_quarter", "report_date", "filing_date")
+
+# Период и основа отчётности — только от LLM, таблицы их не заполняют.
+_GAP_FILL_LLM_ONLY_FIELDS: tuple[str, ...] = (
+    "period_type", "accounting_standard", "consolidated", *_GAP_FILL_PERIOD_FIELDS,
+)
+
+_CONFIDENCE_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+
+def _merge_tables_with_llm(
+    tables: TableExtraction,
+    table_report: ExtractedReport,
+    llm_report: ExtractedReport,
+    fields: tuple[str, ...],
+) -> ExtractedReport:
+    """Уверенные поля — из таблиц, дозапрошенные — от LLM (оба в млн).
+
+    Неуверенное значение таблицы остаётся, только если LLM поле не заполнила.
+    """
+    data = table_report.model_dump()
+    for key in fields:
+        value = getattr(llm_report, key)
+        if value is not None or key not in tables.values:
+            data[key] = value
+    if not tables.currency:
+        data["currency"] = llm_report.currency
+    for key in _GAP_FILL_LLM_ONLY_FIELDS:
+        data[key] = getattr(llm_report, key)
+    levels = [c for c in (table_report.confidence, llm_report.confidence) if c]
+    if levels:
+        data["confidence"] = min(levels, key=lambda c: _CONFIDENCE_ORDER[c])
+    notes = [n.strip() for n in (table_report.extraction_notes, llm_report.extraction_notes)
+             if n and n.strip()]
+    data["extraction_notes"] = "\n".join(notes) or None
+    return ExtractedReport.model_validate(data)
+
+
+def _extract_with_tables(
+    extraction: PdfExtractionResult,
+    *,
+    report_type: str,
+    prompt_kwargs: dict[str, Any],
+) -> Optional[tuple[ExtractedReport, list[Optional[str]], list[str]]]:
+    """Быстрый путь текстового PDF: таблицы по координатам слов + дозапрос пропусков.
+
+    LLM получает одну подсхему только с полями, которые таблицы не дали
+    уверенно, плюс период и даты отчёта, и только страницы их разделов. None — таблицы не прочитались
+    (скан, нестандартная вёрстка): пусть работает обычный путь.
+    """
+    tables = extract_tables(
+        extraction.page_words,
+        expected_year=prompt_kwargs.get("expected_year"),
+        report_type=report_type,
+    )
+    trusted = tables.trusted()
+    if not trusted:
+        return None
+    table_report = rescale_to_millions(
+        tables.to_report(report_type=report_type, fiscal_year=prompt_kwargs.get("expected_year"))
+    ).model_copy(update={"extraction_notes": tables.summary()})
+    # Банковские поля у компании (и наоборот) модель всё равно вернёт null.
+    skip = _GAP_FILL_SKIP_FIELDS | {
+        spec.key for spec in _COMPARABLE_FIELDS if report_type not in spec.relevant_for
+    }
+    missing = tuple(
+        key for spec in SECTIONS for key in spec.fields
+        if key not in trusted and key not in skip and key not in _GAP_FILL_PERIOD_FIELDS
+    )
+    logger.info(
+        "PDF=%s: из таблиц прочитано %d полей, дозапрос LLM: %s.",
+        extraction.pdf_path.name, len(trusted), ", ".join(missing) or "только период",
+    )
+    # Период — в шапке любой формы, его поля страниц не добавляют; если
+    # дозапрашивать больше нечего, хватит баланса (перед ним — заключение
+    # аудитора с датой подписания).
+    specs = sections_for_fields(missing) or [SECTIONS_BY_NAME["balance"]]
+    missing += _GAP_FILL_PERIOD_FIELDS
+    llm_report = extract_section_via_llm(
+        system_prompt=build_gap_fill_system_prompt(report_type, fields=missing),
+        user_prompt=build_user_prompt(**prompt_kwargs, pdf_text=sections_text(extraction, specs)),
+        response_model=fields_schema(missing),
+        images=extraction.page_images if extraction.is_scanned else None,
+    )
+    llm_report, messages = _normalize_units(llm_report)
+    merged = _merge_tables_with_llm(tables, table_report, llm_report, missing)
+    return merged, messages, [spec.name for spec in specs]
+
+
+def _extract_normalized(
+    extraction: PdfExtractionResult,
+    *,
+    report_type: str,
+    prompt_kwargs: dict[str, Any],
+    section_mode: Optional[bool],
+) -> tuple[ExtractedReport, list[Optional[str]], list[str]]:
+    """Извлечение с нормализацией единиц: таблицы + дозапрос, одним запросом или по разделам.
+
+    Returns:
+        (отчёт в млн / штуках, сообщения автокоррекций, использованные разделы)
+    """
+    if settings.LLM_TABLE_FAST_PATH and extraction.page_words:
+        fast = _extract_with_tables(
+            extraction, report_type=report_type, prompt_kwargs=prompt_kwargs,
+        )
+        if fast is not None:
+            return fast
+    use_sections = settings.LLM_SECTION_MODE if section_mode is None else section_mode
+    if use_sections and extraction.is_scanned:
+        # Картинки не привязаны к разделам — vision-запрос режет нечего.
+        logger.info("PDF=%s: vision-режим — извлекаем одним запросом.", extraction.pdf_path.name)
+        use_sections = False
+    if use_sections:
+        extracted, messages = _extract_by_sections(
+            extraction, report_type=report_type, prompt_kwargs=prompt_kwargs,
+        )
+        return extracted, messages, [spec.name for spec in SECTIONS]
+
+    system_prompt, user_prompt, images = _single_request(
+        extraction, report_type=report_type, prompt_kwargs=prompt_kwargs,
+    )
+    extracted = extract_report_via_llm(
+        system_prompt=system_prompt, user_prompt=user_prompt, images=images,
+    )
+    extracted, messages = _normalize_units(extracted)
+    return extracted, messages, []
+
+
+def _single_request(
+    extraction: PdfExtractionResult,
+    *,
+    report_type: str,
+    prompt_kwargs: dict[str, Any],
+) -> tuple[str, str, Optional[list[bytes]]]:
+    """Промпты одного запроса на весь отчёт: (system, user, картинки).
+
+    Для скан-PDF передаём страницы картинками — vision-модель прочитает их
+    напрямую (tesseract не нужен).
+    """
+    return (
+        build_system_prompt(report_type),
+        build_user_prompt(**prompt_kwargs, pdf_text=extraction.text),
+        extraction.page_images if extraction.is_scanned else None,
+    )
+
+
+def _resolve_token_budget(token_budget: Optional[int]) -> Optional[int]:
+    """Явный бюджет вызова важнее настроек; 0 и отрицательные — режим «по страницам»."""
+    budget = settings.LLM_PAGE_TOKEN_BUDGET if token_budget is None else token_budget
+    return budget if budget and budget > 0 else None
+
+
 def _find_existing_report(
     db: Session,
     *,
@@ -892,23 +1176,40 @@ def _find_existing_report(
     return q.first()
 
 
-def _try_update_company_description_from_pdf(
-    db: Session,
-    *,
+def _is_replaceable_draft(report: FinancialReport) -> bool:
+    """Непроверенный черновик из сравнительной колонки: настоящий PDF его заменяет.
+
+    В черновике только табличные поля (нет акций, DPS, даты публикации), а
+    порядок разбора годов не гарантирован — отчёт за N-1 часто приходит после
+    отчёта за N, который этот черновик и создал.
+    """
+    return (
+        report.source == ReportSource.COMPARATIVE_COLUMN
+        and not report.verified_by_analyst
+    )
+
+
+def _extract_company_description(
     pdf_source: Union[Path, bytes],
-    company: Company,
+    ticker: Optional[str],
+    company_name: Optional[str],
     pdf_label: str,
-) -> None:
-    """Best-effort: описание компании из раздела «1. Информация о компании»."""
+) -> Optional[str]:
+    """Best-effort: описание компании из раздела «1. Информация о компании».
+
+    Отдельный вызов LLM — только после того, как отчёт прошёл проверки и
+    сохранён: параллельно с извлечением он делил бы с ним лимит TPM и
+    пропадал зря, если отчёт отвергнут.
+    """
     if not settings.llm_configured:
-        return
+        return None
     try:
         info = extract_company_info_pages(pdf_source, pdf_label=pdf_label)
         if info is None:
-            return
+            return None
         user_prompt = build_company_description_user_prompt(
-            ticker=company.ticker,  # type: ignore[arg-type]
-            company_name=company.name,  # type: ignore[arg-type]
+            ticker=ticker,  # type: ignore[arg-type]
+            company_name=company_name,  # type: ignore[arg-type]
             pdf_text=info.text,
             is_scanned=info.is_scanned,
         )
@@ -917,22 +1218,74 @@ def _try_update_company_description_from_pdf(
             user_prompt=user_prompt,
             images=info.page_images if info.is_scanned else None,
         )
-        if extracted.description and apply_business_description_from_llm(
-            db, company.id, extracted.description  # type: ignore[arg-type]
+        return extracted.description or None
+    except Exception as exc:  # noqa: BLE001 — не ломаем сохранение отчёта
+        logger.warning(
+            "[%s] Не удалось извлечь описание компании из PDF: %s", ticker, exc,
+        )
+        return None
+
+
+def _try_update_company_description_from_pdf(
+    db: Session,
+    *,
+    pdf_source: Union[Path, bytes],
+    company: Company,
+    pdf_label: str,
+) -> None:
+    """Best-effort: обновить описание компании из PDF (после сохранения отчёта)."""
+    description = _extract_company_description(
+        pdf_source, company.ticker, company.name, pdf_label,
+    )
+    try:
+        if description and apply_business_description_from_llm(
+            db, company.id, description  # type: ignore[arg-type]
         ):
             logger.info(
                 "[%s] Описание компании обновлено из LLM (%d символов).",
                 company.ticker,
-                len(extracted.description),
+                len(description),
             )
     except Exception as exc:  # noqa: BLE001 — не ломаем сохранение отчёта
         logger.warning(
-            "[%s] Не удалось извлечь описание компании из PDF: %s",
-            company.ticker,
-            exc,
+            "[%s] Не удалось сохранить описание компании: %s", company.ticker, exc,
         )
 
 
+def _guess_report_currency(db: Session, company_id: int) -> Optional[str]:
+    """Валюта последнего отчёта компании — догадка для спекулятивного курса."""
+    row = (
+        db.query(FinancialReport.currency)
+        .filter(FinancialReport.company_id == company_id)
+        .order_by(FinancialReport.fiscal_year.desc())
+        .first()
+    )
+    return (row[0] or "RUB").upper() if row else None
+
+
+def _prefetch_market_data(
+    db: Session,
+    lookups: SpeculativeLookups,
+    prepared: "PreparedExtraction",
+) -> None:
+    """Запустить в фоне то, что понадобится после ответа LLM.
+
+    Только справочники без LLM (цена MOEX, ISSUESIZE, курс): описание
+    компании — тоже вызов LLM, его делает сохранение отчёта.
+    Аргументы совпадают с теми, что `_save_extracted_report` подставит при
+    ожидаемой дате периода и прежней валюте; иначе там уйдут новые запросы.
+    """
+    company = prepared.company
+    report_d = _expected_report_date(
+        prepared.period_type, prepared.fiscal_year, prepared.fiscal_quarter,
+    )
+    lookups.prefetch(_fetch_moex_price_for_report, company.ticker, report_d, company.former_tickers)
+    lookups.prefetch(_fetch_moex_shares_issued, company.ticker, report_d, company.share_splits)
+    currency = _guess_report_currency(db, company.id)  # type: ignore[arg-type]
+    if currency and currency != "RUB":
+        lookups.prefetch(_fetch_fx_rate_for_report, currency, report_d)
+
+
 # ─── Основной пайплайн для одного PDF ────────────────────────────────────────
 
 
@@ -950,6 +1303,9 @@ def parse_pdf_to_report(
     consolidated: bool = True,
     source_pdf_path: Optional[str] = None,
     pdf_label: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    section_mode: Optional[bool] = None,
+    harvest_comparatives: Optional[bool] = None,
 ) -> ExtractionOutcome:
     """
     Прогнать PDF через AI-пайплайн и (при dry_run=False) создать FinancialReport
@@ -966,6 +1322,14 @@ def parse_pdf_to_report(
             определяющие уникальный ключ отчёта.
         source_pdf_path: что записать в `financial_reports.source_pdf_path`.
         pdf_label: человекочитаемое имя PDF для логов и заметок (если передали bytes).
+        token_budget: бюджет токенов на текст страниц; None — из настроек
+            (LLM_PAGE_TOKEN_BUDGET, 0 — отбор по числу страниц).
+        section_mode: извлекать параллельно по разделам (баланс, ОПиУ, ОДДС,
+            дивиденды) вместо одного запроса; None — из LLM_SECTION_MODE.
+        harvest_comparatives: прочитать из таблиц годового отчёта колонку
+            прошлого года — черновик отчёта за fiscal_year-1, если его нет,
+            иначе сверка с ним (`outcome.comparative`); None — из
+            LLM_HARVEST_COMPARATIVES.
 
     Raises:
         ReportAlreadyExistsError: если отчёт уже есть и force=False.
@@ -974,6 +1338,126 @@ def parse_pdf_to_report(
         RuntimeError: если PDF не содержит финансовых таблиц.
         ValueError: если fiscal_year находится в будущем.
     """
+    prepared = prepare_report_request(
+        db,
+        pdf_source=pdf_source,
+        company=company,
+        fiscal_year=fiscal_year,
+        force=force,
+        period_type=period_type,
+        fiscal_quarter=fiscal_quarter,
+        accounting_standard=accounting_standard,
+        consolidated=consolidated,
+        source_pdf_path=source_pdf_path,
+        pdf_label=pdf_label,
+        token_budget=token_budget,
+    )
+    extraction = prepared.extraction
+
+    with SpeculativeLookups() as lookups:
+        # Курс, цены MOEX и ISSUESIZE — в фоне, пока модель читает отчёт.
+        _prefetch_market_data(db, lookups, prepared)
+
+        # 3-5) Промпты, вызов LLM и нормализация единиц (исключения
+        #    LLMNotConfiguredError/LLMParseError/LLMTransientError поднимутся
+        #    наружу — их ловит вызывающий код).
+        extracted, autofix_msgs, sections = _extract_normalized(
+            extraction,
+            report_type=prepared.report_type,
+            prompt_kwargs=prepared.prompt_kwargs,
+            section_mode=section_mode,
+        )
+        if extraction.is_scanned:
+            logger.info(
+                "[%s %s] PDF обработан в vision-режиме: отправлено %d страниц-картинок.",
+                company.ticker, fiscal_year, len(extraction.page_images),
+            )
+
+        # 5.5) Колонка прошлого года из тех же таблиц — без запроса к LLM.
+        # Пересчёты прошлого периода попадают во флаги нового отчёта.
+        comparative: Optional[ComparativeOutcome] = None
+        if settings.LLM_HARVEST_COMPARATIVES if harvest_comparatives is None else harvest_comparatives:
+            prior = _harvest_comparative(prepared, currency=extracted.currency)
+            if prior is not None:
+                comparative = _check_comparative(db, prepared, prior)
+                autofix_msgs = [*autofix_msgs, *_restatement_notes(comparative)]
+
+        outcome = _save_extracted_report(
+            db, prepared, extracted=extracted, autofix_msgs=autofix_msgs, dry_run=dry_run,
+            lookups=lookups,
+        )
+        if comparative is not None:
+            if comparative.existing_report_id is None and not dry_run:
+                _save_comparative_draft(db, prepared, comparative, lookups=lookups)
+            outcome.comparative = comparative
+    outcome.sections = sections
+    return outcome
+
+
+# ─── Подготовка запроса и сохранение ответа (общие для sync и batch) ────────
+
+
+@dataclass
+class PreparedExtraction:
+    """PDF, готовый к запросу в LLM: отобранные страницы и ключ будущего отчёта.
+
+    Между подготовкой и сохранением может пройти сколько угодно времени
+    (batch-режим ждёт ответа провайдера часами), поэтому сохранение заново
+    проверяет, нет ли уже такого отчёта в БД.
+    """
+    company: Company
+    fiscal_year: int
+    report_type: str  # 'general' | 'bank'
+    pdf_label: str
+    pdf_source: Union[Path, bytes]
+    source_pdf_path: Optional[str]
+    extraction: PdfExtractionResult
+    force: bool = False
+    period_type: str = "annual"
+    fiscal_quarter: Optional[int] = None
+    accounting_standard: str = "IFRS"
+    consolidated: bool = True
+
+    @property
+    def prompt_kwargs(self) -> dict[str, Any]:
+        return dict(
+            ticker=self.company.ticker,
+            expected_year=self.fiscal_year,
+            company_name=self.company.name,
+            sector=self.company.sector,
+            is_scanned=self.extraction.is_scanned,
+        )
+
+    def single_request(self) -> tuple[str, str, Optional[list[bytes]]]:
+        """(system, user, картинки) одного запроса на весь отчёт."""
+        return _single_request(
+            self.extraction, report_type=self.report_type, prompt_kwargs=self.prompt_kwargs,
+        )
+
+
+def prepare_report_request(
+    db: Session,
+    *,
+    pdf_source: Union[Path, bytes],
+    company: Company,
+    fiscal_year: int,
+    force: bool = False,
+    period_type: str = "annual",
+    fiscal_quarter: Optional[int] = None,
+    accounting_standard: str = "IFRS",
+    consolidated: bool = True,
+    source_pdf_path: Optional[str] = None,
+    pdf_label: Optional[str] = None,
+    token_budget: Optional[int] = None,
+) -> PreparedExtraction:
+    """Шаги до LLM: проверка года и дубликата, отбор страниц PDF.
+
+    Raises:
+        ValueError: fiscal_year в будущем.
+        ReportAlreadyExistsError: отчёт уже есть, force=False и это не черновик
+            из сравнительной колонки (его заменяет настоящий отчёт).
+        RuntimeError: PDF не содержит финансовых таблиц.
+    """
     # Guard: защита от случайно введённого «будущего» года.
     # Публичная компания не может выпустить годовой отчёт за ещё не
     # завершившийся год. Допускаем только текущий календарный (может быть
@@ -996,14 +1480,6 @@ def parse_pdf_to_report(
     else:
         label = pdf_label or "uploaded.pdf"
 
-    outcome = ExtractionOutcome(
-        ticker=company.ticker,  # type: ignore[arg-type]
-        fiscal_year=fiscal_year,
-        report_type=resolved_report_type,
-        dry_run=dry_run,
-        pdf_label=label,
-    )
-
     # 1) Дубликат?
     existing = _find_existing_report(
         db,
@@ -1014,50 +1490,99 @@ def parse_pdf_to_report(
         accounting_standard=accounting_standard,
         consolidated=consolidated,
     )
-    if existing and not force:
+    if existing and not force and not _is_replaceable_draft(existing):
         raise ReportAlreadyExistsError(existing.id)  # type: ignore[arg-type]
 
     # 2) Выбор релевантных страниц PDF
     extraction: PdfExtractionResult = extract_financial_pages(
-        pdf_source, pdf_label=label
+        pdf_source, pdf_label=label, token_budget=_resolve_token_budget(token_budget),
     )
-    outcome.selected_pages = len(extraction.selected_pages)
-    outcome.total_pages = extraction.total_pages
-
-    # 3) Промпты
-    system_prompt = build_system_prompt(resolved_report_type)
-    user_prompt = build_user_prompt(
-        ticker=company.ticker,  # type: ignore[arg-type]
-        expected_year=fiscal_year,
-        company_name=company.name,  # type: ignore[arg-type]
-        sector=company.sector,  # type: ignore[arg-type]
-        pdf_text=extraction.text,
-        is_scanned=extraction.is_scanned,
+    return PreparedExtraction(
+        company=company,
+        fiscal_year=fiscal_year,
+        report_type=resolved_report_type,
+        pdf_label=label,
+        pdf_source=pdf_source,
+        source_pdf_path=source_pdf_path,
+        extraction=extraction,
+        force=force,
+        period_type=period_type,
+        fiscal_quarter=fiscal_quarter,
+        accounting_standard=accounting_standard,
+        consolidated=consolidated,
     )
 
-    # 4) Вызов LLM (исключения LLMNotConfiguredError/LLMParseError/LLMTransientError
-    #    поднимутся наружу — их ловит вызывающий код).
-    #    Для скан-PDF передаём страницы как PNG — vision-модель прочитает их
-    #    напрямую (tesseract не нужен).
-    extracted = extract_report_via_llm(
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
-        images=extraction.page_images if extraction.is_scanned else None,
-    )
-    if extraction.is_scanned:
-        logger.info(
-            "[%s %s] PDF обработан в vision-режиме: отправлено %d страниц-PNG.",
-            company.ticker, fiscal_year, len(extraction.page_images),
+
+def save_report_from_llm(
+    db: Session, prepared: PreparedExtraction, extracted: ExtractedReport,
+) -> ExtractionOutcome:
+    """Сохранить «сырой» ответ модели, полученный вне `parse_pdf_to_report`
+    (batch-режим): автокоррекция единиц, санити-проверки, MOEX, запись в БД.
+
+    Raises:
+        ReportAlreadyExistsError: отчёт появился, пока ждали ответа, и force=False.
+        ValueError: не удалось получить курс для отчёта в иностранной валюте.
+    """
+    extracted, autofix_msgs = _normalize_units(extracted)
+    # Без спекуляции (ответ пришёл из батча), но внешние запросы — параллельно.
+    with SpeculativeLookups() as lookups:
+        return _save_extracted_report(
+            db, prepared, extracted=extracted, autofix_msgs=autofix_msgs, dry_run=False,
+            lookups=lookups,
         )
 
-    # 5) Auto-fix units ДО rescale (пока числа ещё «сырые»).
-    # Сначала деньги (млрд ↔ млн), затем акции — порядок важен, т.к. акции
-    # не зависят от money scale, но лишняя инвариантность удобна.
-    extracted, money_autofix_msg = _auto_fix_money_units(extracted)
-    extracted, shares_autofix_msg = _auto_fix_shares_units(extracted)
 
-    # 5.1) Конвертация единиц в миллионы / акций в штуки
-    extracted = rescale_to_millions(extracted)
+def _save_extracted_report(
+    db: Session,
+    prepared: PreparedExtraction,
+    *,
+    extracted: ExtractedReport,
+    autofix_msgs: list[Optional[str]],
+    dry_run: bool,
+    lookups: SpeculativeLookups,
+) -> ExtractionOutcome:
+    """Шаги после LLM: санити-проверки, заметки, MOEX-обогащение, запись в БД.
+
+    Внешние запросы идут через `lookups`: совпавшие с догадкой до LLM берутся
+    из кэша, остальные стартуют здесь разом, а не по очереди.
+    """
+    company = prepared.company
+    fiscal_year = prepared.fiscal_year
+    resolved_report_type = prepared.report_type
+    label = prepared.pdf_label
+    extraction = prepared.extraction
+    period_type = prepared.period_type
+    fiscal_quarter = prepared.fiscal_quarter
+    accounting_standard = prepared.accounting_standard
+    consolidated = prepared.consolidated
+    source_pdf_path = prepared.source_pdf_path
+    force = prepared.force
+    pdf_source = prepared.pdf_source
+
+    outcome = ExtractionOutcome(
+        ticker=company.ticker,  # type: ignore[arg-type]
+        fiscal_year=fiscal_year,
+        report_type=resolved_report_type,
+        dry_run=dry_run,
+        pdf_label=label,
+        selected_pages=len(extraction.selected_pages),
+        total_pages=extraction.total_pages,
+        token_budget=extraction.token_budget,
+        estimated_tokens=extraction.estimated_tokens,
+    )
+
+    existing = _find_existing_report(
+        db,
+        company_id=company.id,  # type: ignore[arg-type]
+        fiscal_year=fiscal_year,
+        fiscal_quarter=fiscal_quarter,
+        period_type=period_type,
+        accounting_standard=accounting_standard,
+        consolidated=consolidated,
+    )
+    if existing and not force and not _is_replaceable_draft(existing):
+        raise ReportAlreadyExistsError(existing.id)  # type: ignore[arg-type]
+    replace_existing = existing is not None and (force or _is_replaceable_draft(existing))
 
     # 5.2) Санити-чек: совпадает ли fiscal_year
     if extracted.fiscal_year != fiscal_year:
@@ -1078,7 +1603,7 @@ def parse_pdf_to_report(
         pdf_label=label,
         selected_pages=len(extraction.selected_pages),
         total_pages=extraction.total_pages,
-        extra_warnings=[money_autofix_msg, shares_autofix_msg, ni_sync_msg],
+        extra_warnings=[*autofix_msgs, ni_sync_msg],
     )
 
     # 7) Для банка NULL'им current_assets/current_liabilities.
@@ -1104,9 +1629,18 @@ def parse_pdf_to_report(
     report_iso = _resolve_report_date(
         extracted, period_type=period_type, fiscal_year=fiscal_year,
     )
+    report_d = _parse_iso_date(report_iso)
+    # Цены и реестр не зависят от курса — пусть идут, пока ждём курс.
+    lookups.prefetch(_fetch_moex_price_for_report, company.ticker, report_d, company.former_tickers)
+    lookups.prefetch(
+        _fetch_moex_price_for_report,
+        company.ticker, _parse_iso_date(extracted.filing_date), company.former_tickers,
+    )
+    lookups.prefetch(_fetch_moex_shares_issued, company.ticker, report_d, company.share_splits)
     if extracted.currency and extracted.currency.upper() != "RUB":
-        report_d = _parse_iso_date(report_iso)
-        auto_exchange_rate = _fetch_fx_rate_for_report(extracted.currency, report_d)
+        auto_exchange_rate = lookups.get(
+            _fetch_fx_rate_for_report, extracted.currency.upper(), report_d,
+        )
         if auto_exchange_rate is not None:
             logger.info(
                 "[%s %s] Курс %s/RUB автоматически подтянут на %s: %.4f.",
@@ -1138,6 +1672,7 @@ def parse_pdf_to_report(
         exchange_rate=auto_exchange_rate,
         period_type=period_type,
         fiscal_year=fiscal_year,
+        lookups=lookups,
     )
     if moex_price_on_report is not None or moex_price_on_filing is not None:
         logger.info(
@@ -1149,11 +1684,10 @@ def parse_pdf_to_report(
 
     # 7.3) Реестр акций (ISSUESIZE) с MOEX → shares_issued. Не путать со
     # средневзвешенным из примечания к EPS (то кладём в shares_weighted_avg).
-    report_date_for_shares = _parse_iso_date(
-        _resolve_report_date(extracted, period_type=period_type, fiscal_year=fiscal_year)
-    )
-    moex_shares_issued = _fetch_moex_shares_issued(
-        company.ticker,  # type: ignore[arg-type]
+    report_date_for_shares = report_d
+    moex_shares_issued = lookups.get(
+        _fetch_moex_shares_issued,
+        company.ticker,
         report_date_for_shares,
         company.share_splits,
     )
@@ -1232,11 +1766,13 @@ def parse_pdf_to_report(
     # (FK с ON DELETE SET NULL обнулит `report_id` у всех исторических
     # мультипликаторов). Вместо этого делаем UPDATE по месту: id сохраняется,
     # мультипликаторы (upsert по (company_id, date, type)) плавно
-    # переcчитываются, URL/закладки продолжают работать.
-    if existing and force:
+    # переcчитываются, URL/закладки продолжают работать. Так же заменяется
+    # черновик из сравнительной колонки — уже без force.
+    if replace_existing:
         logger.warning(
-            "[%s %s] Обновляем существующий отчёт (id=%d, force=True).",
+            "[%s %s] Обновляем существующий отчёт (id=%d, %s).",
             company.ticker, fiscal_year, existing.id,
+            "force=True" if force else "черновик из сравнительной колонки",
         )
         created = report_service.update_report(
             db=db, report_id=existing.id, report_data=payload,  # type: ignore[arg-type]
@@ -1261,7 +1797,7 @@ def parse_pdf_to_report(
     logger.info(
         "[%s %s] %s отчёт id=%s (auto_extracted=True, verified=False).",
         company.ticker, fiscal_year,
-        "Обновлён" if (existing and force) else "Создан",
+        "Обновлён" if replace_existing else "Создан",
         created.id,
     )
     _try_update_company_description_from_pdf(
@@ -1273,6 +1809,171 @@ def parse_pdf_to_report(
     return outcome
 
 
+# ─── Сравнительная колонка прошлого года ────────────────────────────────────
+
+
+def _harvest_comparative(
+    prepared: PreparedExtraction, *, currency: Optional[str],
+) -> Optional[ExtractedReport]:
+    """Уверенно прочитанные поля колонки прошлого года (в млн), без LLM.
+
+    Только годовые текстовые PDF: у сканов нет слов с координатами, а в
+    промежуточной отчётности сравнительный баланс — на конец прошлого года,
+    ОПиУ — за тот же период прошлого года, и отчётом они не складываются.
+    Валюта — как у основного отчёта: это тот же документ.
+    """
+    extraction = prepared.extraction
+    if prepared.period_type != "annual" or not extraction.page_words:
+        return None
+    prior_year = prepared.fiscal_year - 1
+    tables = extract_tables(
+        extraction.page_words, expected_year=prior_year, report_type=prepared.report_type,
+    )
+    if not tables.trusted():
+        return None
+    report = rescale_to_millions(tables.to_report(
+        report_type=prepared.report_type, fiscal_year=prior_year, trusted_only=True,
+    ))
+    return report.model_copy(update={
+        "currency": currency or report.currency,
+        "extraction_notes": (
+            f"Сравнительная колонка за {prior_year} из отчёта за {prepared.fiscal_year} "
+            f"({prepared.source_pdf_path or prepared.pdf_label}). {tables.summary()}"
+        ),
+    })
+
+
+def _check_comparative(
+    db: Session, prepared: PreparedExtraction, comparative: ExtractedReport,
+) -> ComparativeOutcome:
+    """Найти отчёт за прошлый год с тем же ключом и сверить с ним колонку."""
+    result = ComparativeOutcome(fiscal_year=comparative.fiscal_year, extracted=comparative)
+    existing = _find_existing_report(
+        db,
+        company_id=prepared.company.id,  # type: ignore[arg-type]
+        fiscal_year=comparative.fiscal_year,
+        fiscal_quarter=None,
+        period_type="annual",
+        accounting_standard=prepared.accounting_standard,
+        consolidated=prepared.consolidated,
+    )
+    if existing is None:
+        return result
+    result.existing_report_id = existing.id  # type: ignore[assignment]
+    if existing.currency and existing.currency != comparative.currency:
+        result.skipped_reason = (
+            f"валюта отчёта id={existing.id} {existing.currency}, "
+            f"колонки — {comparative.currency}"
+        )
+        return result
+    diffs, _ = compute_report_diff(existing, comparative, report_type=prepared.report_type)
+    # Колонка — это только таблицы: поля вне них не сверяем.
+    result.diffs = [d for d in diffs if d.extracted_value is not None]
+    return result
+
+
+def _restatement_notes(result: ComparativeOutcome) -> list[str]:
+    """Флаги для extraction_notes: поля прошлого года, пересчитанные в новом отчёте."""
+    notes = []
+    for d in result.restatements:
+        pct = f" ({d.pct_diff:+.1f}%)" if d.pct_diff is not None else ""
+        notes.append(
+            f"ПЕРЕСЧЁТ {result.fiscal_year}: {d.label} в отчёте id={result.existing_report_id} "
+            f"— {d.existing_value}, в сравнительной колонке — {d.extracted_value}{pct}."
+        )
+    if notes:
+        logger.warning("Сравнительная колонка %s: %s", result.fiscal_year, " ".join(notes))
+    return notes
+
+
+def _save_comparative_draft(
+    db: Session,
+    prepared: PreparedExtraction,
+    result: ComparativeOutcome,
+    *,
+    lookups: SpeculativeLookups,
+) -> None:
+    """Черновик отчёта за прошлый год из сравнительной колонки.
+
+    Как и основной отчёт: auto_extracted=True, verified_by_analyst=False, курс
+    и цены MOEX на конец прошлого года. Источник — `comparative_column`, а
+    source_pdf_path пуст: PDF — отчёт за другой год, повторное извлечение из
+    него (reverification) дало бы цифры текущего года; откуда взята колонка,
+    записано в extraction_notes. Не вышло (нет курса, не прошла
+    валидация) — причина в `result.skipped_reason`, основной отчёт уже записан.
+    """
+    company = prepared.company
+    extracted, ni_sync_msg = _sync_net_income_fields(result.extracted)
+    report_iso = _resolve_report_date(
+        extracted, period_type="annual", fiscal_year=result.fiscal_year,
+    )
+    report_d = _parse_iso_date(report_iso)
+
+    exchange_rate: Optional[float] = None
+    if extracted.currency.upper() != "RUB":
+        exchange_rate = lookups.get(
+            _fetch_fx_rate_for_report, extracted.currency.upper(), report_d,
+        )
+        if exchange_rate is None:
+            result.skipped_reason = f"нет курса {extracted.currency}/RUB на {report_d}"
+            return
+    price_on_report, _ = _enrich_with_moex_prices(
+        extracted,
+        ticker=company.ticker,  # type: ignore[arg-type]
+        former_tickers=company.former_tickers,
+        exchange_rate=exchange_rate,
+        period_type="annual",
+        fiscal_year=result.fiscal_year,
+        lookups=lookups,
+    )
+    shares_issued = lookups.get(
+        _fetch_moex_shares_issued, company.ticker, report_d, company.share_splits,
+    )
+
+    values = {name: getattr(extracted, name) for name in TABLE_FIELDS}
+    if prepared.report_type == "bank":
+        values.update(current_assets=None, current_liabilities=None)
+    try:
+        payload = FinancialReportCreate(
+            company_id=company.id,  # type: ignore[arg-type]
+            period_type="annual",  # type: ignore[arg-type]
+            fiscal_year=result.fiscal_year,
+            fiscal_quarter=None,
+            accounting_standard=prepared.accounting_standard,  # type: ignore[arg-type]
+            consolidated=prepared.consolidated,
+            source="comparative_column",  # type: ignore[arg-type]
+            report_date=report_iso,
+            price_per_share=price_on_report,
+            shares_issued=shares_issued,
+            currency=extracted.currency,
+            exchange_rate=exchange_rate,
+            auto_extracted=True,
+            verified_by_analyst=False,
+            extraction_notes=_build_extraction_notes(
+                extracted=extracted,
+                pdf_label=prepared.pdf_label,
+                selected_pages=len(prepared.extraction.selected_pages),
+                total_pages=prepared.extraction.total_pages,
+                extra_warnings=[ni_sync_msg],
+            ),
+            extraction_model=settings.extraction_model_label,
+            source_pdf_path=None,
+            **values,
+        )
+    except ValueError as exc:
+        result.skipped_reason = f"черновик не прошёл валидацию: {exc}"
+        logger.warning(
+            "[%s %s] Сравнительная колонка: %s", company.ticker, result.fiscal_year, exc,
+        )
+        return
+    created = report_service.create_report(db=db, report_data=payload)
+    result.created_report_id = created.id  # type: ignore[assignment]
+    logger.info(
+        "[%s %s] Создан черновик id=%s из сравнительной колонки отчёта за %s.",
+        company.ticker, result.fiscal_year, created.id, prepared.fiscal_year,
+    )
+
+
 # ─── Режим сравнения с уже существующим отчётом ─────────────────────────────
 
 
@@ -1459,6 +2160,8 @@ def compare_pdf_with_existing(
     accounting_standard: str = "IFRS",
     consolidated: bool = True,
     pdf_label: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    section_mode: Optional[bool] = None,
 ) -> ComparisonResult:
     """
     Прогнать PDF через LLM и сравнить с уже существующим отчётом в БД
@@ -1492,31 +2195,27 @@ def compare_pdf_with_existing(
             f"{accounting_standard}) для сравнения. Используйте обычный upload."
         )
 
-    extraction: PdfExtractionResult = extract_financial_pages(pdf_source, pdf_label=label)
-
-    system_prompt = build_system_prompt(resolved_report_type)
-    user_prompt = build_user_prompt(
-        ticker=company.ticker,  # type: ignore[arg-type]
-        expected_year=fiscal_year,
-        company_name=company.name,  # type: ignore[arg-type]
-        sector=company.sector,  # type: ignore[arg-type]
-        pdf_text=extraction.text,
-        is_scanned=extraction.is_scanned,
+    extraction: PdfExtractionResult = extract_financial_pages(
+        pdf_source, pdf_label=label, token_budget=_resolve_token_budget(token_budget),
     )
 
-    extracted = extract_report_via_llm(
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
-        images=extraction.page_images if extraction.is_scanned else None,
+    extracted, autofix_msgs, _ = _extract_normalized(
+        extraction,
+        report_type=resolved_report_type,
+        prompt_kwargs=dict(
+            ticker=company.ticker,
+            expected_year=fiscal_year,
+            company_name=company.name,
+            sector=company.sector,
+            is_scanned=extraction.is_scanned,
+        ),
+        section_mode=section_mode,
     )
     if extraction.is_scanned:
         logger.info(
-            "[COMPARE %s %s] PDF в vision-режиме: %d страниц-PNG.",
+            "[COMPARE %s %s] PDF в vision-режиме: %d страниц-картинок.",
             company.ticker, fiscal_year, len(extraction.page_images),
         )
-    extracted, money_autofix_msg = _auto_fix_money_units(extracted)
-    extracted, shares_autofix_msg = _auto_fix_shares_units(extracted)
-    extracted = rescale_to_millions(extracted)
     if extracted.fiscal_year != fiscal_year:
         extracted = extracted.model_copy(update={"fiscal_year": fiscal_year})
     extracted, ni_sync_msg = _sync_net_income_fields(extracted)
@@ -1529,7 +2228,7 @@ def compare_pdf_with_existing(
         pdf_label=label,
         selected_pages=len(extraction.selected_pages),
         total_pages=extraction.total_pages,
-        extra_warnings=[money_autofix_msg, shares_autofix_msg, ni_sync_msg],
+        extra_warnings=[*autofix_msgs, ni_sync_msg],
     )
     extracted = extracted.model_copy(update={"extraction_notes": enriched_notes})
 
@@ -1560,10 +2259,6 @@ def compare_pdf_with_existing(
     )
 
 
-class ReportNotFoundForComparison(RuntimeError):
-    """Нет существующего отчёта в БД — с чем сравнивать нечего."""
-
-
 __all__ = (
     "ComparisonResult",
     "ComparisonSummary",
@@ -1575,6 +2270,9 @@ __all__ = (
     "ReportFieldDiff",
     "ReportNotFoundForComparison",
     "compare_pdf_with_existing",
+    "PreparedExtraction",
     "compute_report_diff",
     "parse_pdf_to_report",
+    "prepare_report_request",
+    "save_report_from_llm",
 )
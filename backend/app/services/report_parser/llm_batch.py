@@ -0,0 +1,185 @@
+"""Batch API провайдера (формат OpenAI Batch): JSONL запросов → батч → ответы.
+
+Для ночных очередей в сотни PDF синхронные запросы упираются в TPM-лимиты и
+простаивают на ожидании. Batch API принимает весь пакет одним файлом,
+выполняет его в своём окне (до 24 ч) вне онлайн-лимитов и отдаёт файл
+ответов, сопоставленных по `custom_id`. OpenAI и DashScope принимают один и тот
+же формат строки::
+
+    {"custom_id": "...", "method": "POST", "url": "/v1/chat/completions", "body": {...}}
+
+Тело запроса — json_object-режим (как для DashScope в llm_client): structured
+outputs в батче поддерживают не все провайдеры, а ответ всё равно проходит
+валидацию ExtractedReport.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+from openai.types.chat import ChatCompletion
+
+from app.services.report_parser.llm_client import (
+    LLMParseError,
+    LLMTransientError,
+    _get_client,
+    _json_request,
+    _model_for_request,
+    _payload_from_completion,
+    _raise_as_transient,
+    _report_from_payload,
+)
+from app.services.report_parser.schemas import ExtractedReport
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Статусы, после которых батч уже не изменится. expired/cancelled тоже
+# отдают файл с ответами на успевшие запросы.
+_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass
+class BatchStatus:
+    """Состояние батча у провайдера."""
+    id: str
+    status: str  # validating | in_progress | finalizing | completed | failed | expired | cancelling | cancelled
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _TERMINAL_STATUSES
+
+
+BatchResult = Union[ExtractedReport, LLMTransientError, LLMParseError]
+
+
+def batch_request_line(
+    custom_id: str,
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    images: Optional[list[bytes]] = None,
+) -> str:
+    """Одна строка JSONL-файла батча для извлечения отчёта."""
+    request = _json_request(
+        model=_model_for_request(images),
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        images=images,
+    )
+    # extra_body SDK подмешивает в тело запроса — в файле батча делаем это сами.
+    extra_body = request.pop("extra_body") or {}
+    body = {**request, **extra_body}
+    return json.dumps(
+        {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body},
+        ensure_ascii=False,
+    )
+
+
+def submit_batch(lines: list[str], *, metadata: Optional[dict[str, str]] = None) -> str:
+    """Загрузить JSONL и создать батч. Возвращает id батча."""
+    if not lines:
+        raise ValueError("Пустой батч: нет запросов для отправки")
+    client = _get_client()
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    try:
+        uploaded = client.files.create(file=("mass-parse.jsonl", data), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata=metadata,
+        )
+    except Exception as exc:
+        _raise_as_transient(exc, context="batch_submit")
+    logger.info(
+        "LLM batch %s создан: %d запросов, %.1f МБ.", batch.id, len(lines), len(data) / 1e6,
+    )
+    return batch.id
+
+
+def get_batch(batch_id: str) -> BatchStatus:
+    """Текущее состояние батча."""
+    try:
+        batch = _get_client().batches.retrieve(batch_id)
+    except Exception as exc:
+        _raise_as_transient(exc, context="batch_retrieve")
+    counts = batch.request_counts
+    return BatchStatus(
+        id=batch.id,
+        status=batch.status,
+        total=counts.total if counts else 0,
+        completed=counts.completed if counts else 0,
+        failed=counts.failed if counts else 0,
+        output_file_id=batch.output_file_id,
+        error_file_id=batch.error_file_id,
+    )
+
+
+def cancel_batch(batch_id: str) -> None:
+    """Отменить батч у провайдера (успевшие ответы останутся в файле)."""
+    try:
+        _get_client().batches.cancel(batch_id)
+    except Exception as exc:
+        _raise_as_transient(exc, context="batch_cancel")
+
+
+def _parse_result_line(raw: dict[str, Any]) -> BatchResult:
+    error = raw.get("error")
+    response = raw.get("response") or {}
+    status_code = response.get("status_code")
+    if error or status_code != 200:
+        body_error = (response.get("body") or {}).get("error") or error or {}
+        message = body_error.get("message") if isinstance(body_error, dict) else str(body_error)
+        return LLMTransientError(f"Batch: HTTP {status_code}: {message or 'без описания'}")
+    try:
+        completion = ChatCompletion.model_validate(response["body"])
+        payload = _payload_from_completion(completion, what=f" (batch {raw.get('custom_id')})")
+        return _report_from_payload(payload, ExtractedReport)
+    except (LLMTransientError, LLMParseError) as exc:
+        return exc
+    except Exception as exc:  # noqa: BLE001 — битая строка не роняет весь батч
+        return LLMParseError(f"Ответ батча не разобран: {exc}")
+
+
+def fetch_batch_results(status: BatchStatus) -> dict[str, BatchResult]:
+    """Скачать ответы (и ошибки) завершённого батча: custom_id → отчёт или ошибка.
+
+    Отчёты — «сырые», в единицах PDF: автокоррекция и rescale — на стороне
+    вызывающего кода, как и для синхронного запроса.
+    """
+    client = _get_client()
+    results: dict[str, BatchResult] = {}
+    for file_id in (status.output_file_id, status.error_file_id):
+        if not file_id:
+            continue
+        try:
+            content = client.files.content(file_id).text
+        except Exception as exc:
+            _raise_as_transient(exc, context="batch_results")
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            results[raw["custom_id"]] = _parse_result_line(raw)
+    return results
+
+
+__all__ = (
+    "BatchResult",
+    "BatchStatus",
+    "batch_request_line",
+    "cancel_batch",
+    "fetch_batch_results",
+    "get_batch",
+    "submit_batch",
+)
@@ -1,18 +1,25 @@
 """OpenAI-совместимый клиент для LLM (OpenAI / Ollama / OpenRouter).
 
 Настройки читаются из `app.config.settings` (LLM_* переменные).
+
+Клиент один на процесс (`_get_client`) с общим пулом keep-alive соединений;
+для async-кода есть `aextract_*` с таймаутом на запрос и хеджированием.
 """
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import logging
 import re
-from typing import Any, NoReturn, Optional
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, NoReturn, Optional, TypeVar
 
-from openai import OpenAI, RateLimitError
+import httpx
+from openai import NOT_GIVEN, AsyncOpenAI, NotGiven, OpenAI, RateLimitError
 from openai.types.chat import ChatCompletion
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 from tenacity import (
     retry,
     retry_if_exception_type,
@@ -20,33 +27,18 @@ from tenacity import (
 )
 
 from app.config import settings
+from app.services.report_parser.errors import (
+    LLMNotConfiguredError,
+    LLMParseError,
+    LLMQuotaExhaustedError,
+    LLMRateLimitError,
+    LLMTransientError,
+)
 from app.services.report_parser.schemas import ExtractedReport, ExtractedCompanyDescription
 
 logger = logging.getLogger(__name__)
 
-
-class LLMTransientError(RuntimeError):
-    """Временная ошибка: сеть, таймаут, пустой ответ. Ретраим."""
-
-
-class LLMRateLimitError(LLMTransientError):
-    """HTTP 429 — TPM/RPM лимит у провайдера. Ретраим с учётом Retry-After."""
-
-    def __init__(self, message: str, retry_after: float = 15.0) -> None:
-        super().__init__(message)
-        self.retry_after = retry_after
-
-
-class LLMParseError(RuntimeError):
-    """Нераспарсиваемый / невалидный ответ модели. Не ретраим."""
-
-
-class LLMQuotaExhaustedError(RuntimeError):
-    """Free tier / AllocationQuota исчерпан. Ретраи бесполезны — сменить модель или биллинг."""
-
-
-class LLMNotConfiguredError(RuntimeError):
-    """В настройках не задан API-ключ / провайдер LLM."""
+T = TypeVar("T")
 
 
 def _parse_retry_after(exc: RateLimitError) -> float:
@@ -105,7 +97,8 @@ def _raise_as_transient(exc: Exception, *, context: str) -> NoReturn:
     raise LLMTransientError(msg) from exc
 
 
-def _build_client() -> OpenAI:
+def _api_key() -> str:
+    """Проверенный API-ключ из настроек (или заглушка для Ollama)."""
     if not settings.llm_configured:
         raise LLMNotConfiguredError(
             "LLM не сконфигурирован. Задай LLM_API_KEY (или LLM_BASE_URL "
@@ -128,15 +121,131 @@ def _build_client() -> OpenAI:
             "(формат sk-...) в LLM_API_KEY корневого .env и ПЕРЕЗАПУСТИ backend "
             "(настройки читаются один раз при старте)."
         ) from exc
+    return api_key
+
+
+def _http_limits() -> httpx.Limits:
+    """Пул соединений к провайдеру: keep-alive вместо TLS-рукопожатия на запрос."""
+    return httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+
 
+def _build_client() -> OpenAI:
+    api_key = _api_key()
     return OpenAI(
         base_url=settings.LLM_BASE_URL,
         api_key=api_key,
         timeout=settings.LLM_REQUEST_TIMEOUT,
         max_retries=0,
+        http_client=httpx.Client(
+            limits=_http_limits(), timeout=settings.LLM_REQUEST_TIMEOUT,
+        ),
     )
 
 
+# Один клиент на процесс: пул соединений общий для API-запросов, воркера
+# массового парсинга и параллельных разделов. httpx.Client потокобезопасен.
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+
+# AsyncOpenAI привязан к event loop, в котором открыл соединения, — держим
+# по клиенту на loop. Ключ слабый: собранный GC loop уходит из словаря вместе
+# с клиентом (открытые соединения держат свой loop живым, и такие клиенты
+# закрывает reset_clients / areset_clients).
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_client() -> OpenAI:
+    """Общий для процесса синхронный клиент (создаётся при первом вызове)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def _get_async_client() -> AsyncOpenAI:
+    """Асинхронный клиент текущего event loop с тем же пулом настроек."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            base_url=settings.LLM_BASE_URL,
+            api_key=_api_key(),
+            timeout=settings.LLM_REQUEST_TIMEOUT,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=_http_limits(), timeout=settings.LLM_REQUEST_TIMEOUT,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+# Сколько ждать закрытия пула чужого (работающего) event loop.
+_ASYNC_CLOSE_TIMEOUT = 5.0
+
+
+def _close_async_client(loop: asyncio.AbstractEventLoop, client: AsyncOpenAI) -> None:
+    """Закрыть пул AsyncOpenAI из синхронного кода — на его же loop, если тот жив."""
+    try:
+        current = asyncio.get_running_loop()
+    except RuntimeError:
+        current = None
+    try:
+        if loop is current:
+            # Вызваны из корутины этого loop: ждать нельзя — закрытие задачей.
+            loop.create_task(client.close())
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result(_ASYNC_CLOSE_TIMEOUT)
+        else:
+            # Loop остановлен или закрыт: сокеты закрываются и так, а ошибку
+            # «Event loop is closed» от его транспортов глотаем. asyncio.run —
+            # в отдельном потоке, на случай вызова из другого работающего loop.
+            thread = threading.Thread(
+                target=_run_quietly, args=(client.close(),), name="llm-client-close",
+            )
+            thread.start()
+            thread.join(_ASYNC_CLOSE_TIMEOUT)
+    except Exception:  # noqa: BLE001 — остановку процесса это не должно ронять
+        logger.debug("Не удалось закрыть AsyncOpenAI", exc_info=True)
+
+
+def _run_quietly(coro) -> None:
+    try:
+        asyncio.run(coro)
+    except Exception:  # noqa: BLE001
+        logger.debug("Закрытие AsyncOpenAI на закрытом loop", exc_info=True)
+
+
+def reset_clients() -> None:
+    """Закрыть общий клиент и async-клиенты всех loop (смена настроек в тестах /
+    остановка процесса). Из корутины лучше `areset_clients`."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+    clients = list(_async_clients.items())
+    _async_clients.clear()
+    for loop, client in clients:
+        _close_async_client(loop, client)
+
+
+async def areset_clients() -> None:
+    """То же для lifespan API: клиент текущего loop закрывается с await."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+    await asyncio.to_thread(reset_clients)
+
+
 def _extract_json_string(content: str) -> str:
     """Достать тело JSON из ответа модели (снять markdown-ограды если есть)."""
     stripped = content.strip()
@@ -182,13 +291,20 @@ def _provider_extra_body() -> dict[str, Any]:
     return {}
 
 
+def _image_mime(img: bytes) -> str:
+    """MIME по сигнатуре: pdf_extractor отдаёт PNG или JPEG — что вышло меньше."""
+    if img[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    return "image/png"
+
+
 def _build_user_content(
     user_prompt: str, images: Optional[list[bytes]]
 ) -> Any:
     """Сформировать content для user-сообщения: только текст или text+images.
 
-    Используется для PDF-сканов: pymupdf рендерит страницы в PNG, мы отправляем
-    их вместе с текстом — gpt-4o-mini / gpt-4o умеют читать таблицы из картинок.
+    Используется для PDF-сканов: pymupdf рендерит страницы в PNG/JPEG, мы
+    отправляем их вместе с текстом — vision-модели читают таблицы из картинок.
     """
     if not images:
         return user_prompt
@@ -202,7 +318,7 @@ def _build_user_content(
             {
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/png;base64,{b64}",
+                    "url": f"data:{_image_mime(img)};base64,{b64}",
                     # 'auto' — OpenAI сам решит уровень детализации. Для
                     # финансовых таблиц обычно выбирает 'high' (дороже, но
                     # читает мелкие цифры в строках).
@@ -213,28 +329,62 @@ def _build_user_content(
     return parts
 
 
-def _call_with_structured_outputs(
-    client: OpenAI,
+def _model_for_request(images: Optional[list[bytes]]) -> str:
+    """Текст → LLM_MODEL; запрос с картинками → LLM_VISION_MODEL (если задан)."""
+    if images and settings.LLM_VISION_MODEL:
+        return settings.LLM_VISION_MODEL
+    return settings.LLM_MODEL
+
+
+def _messages(
+    system_prompt: str, user_prompt: str, images: Optional[list[bytes]],
+) -> list[dict[str, Any]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": _build_user_content(user_prompt, images)},
+    ]
+
+
+def _structured_request(
     *,
+    model: str,
     system_prompt: str,
     user_prompt: str,
-    images: Optional[list[bytes]] = None,
-) -> ExtractedReport:
-    """Вызов через OpenAI Structured Outputs — гарантированно вернёт JSON
-    соответствующий схеме ExtractedReport."""
-    try:
-        completion = client.beta.chat.completions.parse(
-            model=_model_for_request(images),
-            temperature=settings.LLM_TEMPERATURE,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": _build_user_content(user_prompt, images)},
-            ],
-            response_format=ExtractedReport,
-        )
-    except Exception as exc:
-        _raise_as_transient(exc, context="structured")
+    images: Optional[list[bytes]],
+    response_model: type[BaseModel],
+) -> dict[str, Any]:
+    """Аргументы `beta.chat.completions.parse` — общие для sync и async."""
+    return {
+        "model": model,
+        "temperature": settings.LLM_TEMPERATURE,
+        "messages": _messages(system_prompt, user_prompt, images),
+        "response_format": response_model,
+    }
+
+
+def _json_request(
+    *,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    images: Optional[list[bytes]],
+) -> dict[str, Any]:
+    """Аргументы `chat.completions.create` в json_object-режиме.
+
+    DashScope: не задаём max_tokens (обрезка ломает JSON); передаём
+    enable_thinking=False, чтобы json_object не падал.
+    """
+    extra_body = _provider_extra_body()
+    return {
+        "model": model,
+        "temperature": settings.LLM_TEMPERATURE,
+        "messages": _messages(system_prompt, user_prompt, images),
+        "response_format": {"type": "json_object"},
+        "extra_body": extra_body or None,
+    }
 
+
+def _parsed_from_completion(completion: Any) -> BaseModel:
     if not completion.choices:
         raise LLMTransientError("LLM вернул пустой список choices")
     parsed = completion.choices[0].message.parsed
@@ -246,40 +396,18 @@ def _call_with_structured_outputs(
     return parsed
 
 
-def _model_for_request(images: Optional[list[bytes]]) -> str:
-    """Текст → LLM_MODEL; запрос с PNG → LLM_VISION_MODEL (если задан)."""
-    if images and settings.LLM_VISION_MODEL:
-        return settings.LLM_VISION_MODEL
-    return settings.LLM_MODEL
-
-
-def _call_with_json_object(
-    client: OpenAI,
-    *,
-    system_prompt: str,
-    user_prompt: str,
-    images: Optional[list[bytes]] = None,
-) -> ExtractedReport:
-    """JSON-режим для провайдеров без полноценных structured outputs
-    (Ollama, DashScope/Qwen): response_format=json_object + ручной парсинг."""
-    extra_body = _provider_extra_body()
-    model = _model_for_request(images)
+def _report_from_parsed(parsed: BaseModel) -> ExtractedReport:
+    """Подсхему раздела приводим к ExtractedReport — с его валидаторами."""
+    if isinstance(parsed, ExtractedReport):
+        return parsed
     try:
-        completion: ChatCompletion = client.chat.completions.create(
-            model=model,
-            temperature=settings.LLM_TEMPERATURE,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": _build_user_content(user_prompt, images)},
-            ],
-            response_format={"type": "json_object"},
-            # DashScope: не задаём max_tokens (обрезка ломает JSON);
-            # передаём enable_thinking=False, чтобы json_object не падал.
-            extra_body=extra_body or None,
-        )
-    except Exception as exc:
-        _raise_as_transient(exc, context="json_object")
+        return ExtractedReport.model_validate(parsed.model_dump())
+    except ValidationError as exc:
+        raise LLMParseError(f"Ошибка валидации ExtractedReport: {exc}") from exc
 
+
+def _payload_from_completion(completion: ChatCompletion, *, what: str) -> dict[str, Any]:
+    """Текст ответа json_object-режима → dict (снимая markdown-ограды)."""
     if not completion.choices:
         raise LLMTransientError("LLM вернул пустой список choices")
 
@@ -289,11 +417,22 @@ def _call_with_json_object(
 
     json_str = _extract_json_string(content)
     try:
-        payload: dict[str, Any] = json.loads(json_str)
+        return json.loads(json_str)
     except json.JSONDecodeError as exc:
-        logger.error("LLM вернул невалидный JSON. Сырой ответ:\n%s", content)
+        logger.error("LLM вернул невалидный JSON%s. Сырой ответ:\n%s", what, content)
         raise LLMParseError(f"Невалидный JSON: {exc}") from exc
 
+
+def _report_from_payload(
+    payload: dict[str, Any], response_model: type[BaseModel],
+) -> ExtractedReport:
+    """Провалидировать JSON-ответ как ExtractedReport.
+
+    Для подсхемы раздела лишние ключи ответа отбрасываются — модель иногда
+    «на всякий случай» заполняет и чужие поля, а их владелец — другой раздел.
+    """
+    if response_model is not ExtractedReport and isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k in response_model.model_fields}
     try:
         return ExtractedReport.model_validate(payload)
     except ValidationError as exc:
@@ -305,6 +444,61 @@ def _call_with_json_object(
         raise LLMParseError(f"Ошибка валидации ExtractedReport: {exc}") from exc
 
 
+def _description_from_payload(payload: dict[str, Any]) -> ExtractedCompanyDescription:
+    try:
+        return ExtractedCompanyDescription.model_validate(payload)
+    except ValidationError as exc:
+        raise LLMParseError(
+            f"Ошибка валидации ExtractedCompanyDescription: {exc}"
+        ) from exc
+
+
+def _call_with_structured_outputs(
+    client: OpenAI,
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    images: Optional[list[bytes]] = None,
+    response_model: type[BaseModel] = ExtractedReport,
+) -> ExtractedReport:
+    """Вызов через OpenAI Structured Outputs — гарантированно вернёт JSON
+    соответствующий схеме ExtractedReport.
+
+    `response_model` — подсхема раздела (см. sections.py): модель видит только
+    поля своего раздела, ответ приводится к ExtractedReport с его валидаторами.
+    """
+    try:
+        completion = client.beta.chat.completions.parse(**_structured_request(
+            model=_model_for_request(images), system_prompt=system_prompt,
+            user_prompt=user_prompt, images=images, response_model=response_model,
+        ))
+    except Exception as exc:
+        _raise_as_transient(exc, context="structured")
+    return _report_from_parsed(_parsed_from_completion(completion))
+
+
+def _call_with_json_object(
+    client: OpenAI,
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    images: Optional[list[bytes]] = None,
+    response_model: type[BaseModel] = ExtractedReport,
+) -> ExtractedReport:
+    """JSON-режим для провайдеров без полноценных structured outputs
+    (Ollama, DashScope/Qwen): response_format=json_object + ручной парсинг."""
+    try:
+        completion: ChatCompletion = client.chat.completions.create(**_json_request(
+            model=_model_for_request(images), system_prompt=system_prompt,
+            user_prompt=user_prompt, images=images,
+        ))
+    except Exception as exc:
+        _raise_as_transient(exc, context="json_object")
+    return _report_from_payload(
+        _payload_from_completion(completion, what=""), response_model,
+    )
+
+
 def _wait_strategy(retry_state: Any) -> float:
     """Стратегия ожидания между ретраями:
       * для 429 RateLimit — ждём ровно столько, сколько рекомендовал OpenAI
@@ -342,12 +536,12 @@ def extract_report_via_llm(
 ) -> ExtractedReport:
     """Отправить промпты в LLM и получить валидный ExtractedReport.
 
-    Если передан список ``images`` (PNG-байты), они прикрепляются к
+    Если передан список ``images`` (PNG/JPEG-байты), они прикрепляются к
     user-сообщению в OpenAI-vision формате. Используется для скан-PDF,
     где текст не извлекается программно и нужно OCR через саму модель
     (gpt-4o / gpt-4o-mini умеют читать таблицы с картинок).
     """
-    client = _build_client()
+    client = _get_client()
     if _provider_supports_structured_outputs():
         return _call_with_structured_outputs(
             client, system_prompt=system_prompt, user_prompt=user_prompt,
@@ -365,6 +559,37 @@ def extract_report_via_llm(
     )
 
 
+@retry(
+    retry=retry_if_exception_type(LLMTransientError),
+    stop=stop_after_attempt(5),
+    wait=_wait_strategy,
+    reraise=True,
+)
+def extract_section_via_llm(
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    response_model: type[BaseModel],
+    images: Optional[list[bytes]] = None,
+) -> ExtractedReport:
+    """Извлечь один раздел отчёта (баланс, ОПиУ, ОДДС…) по его подсхеме.
+
+    Возвращает ExtractedReport, в котором заполнены только поля раздела.
+    Ретраи — свои у каждого раздела: упавший запрос не тянет за собой
+    повтор уже готовых.
+    """
+    client = _get_client()
+    if _provider_supports_structured_outputs():
+        return _call_with_structured_outputs(
+            client, system_prompt=system_prompt, user_prompt=user_prompt,
+            images=images, response_model=response_model,
+        )
+    return _call_with_json_object(
+        client, system_prompt=system_prompt, user_prompt=user_prompt,
+        images=images, response_model=response_model,
+    )
+
+
 def _call_company_description_structured(
     client: OpenAI,
     *,
@@ -373,27 +598,14 @@ def _call_company_description_structured(
     images: Optional[list[bytes]] = None,
 ) -> ExtractedCompanyDescription:
     try:
-        completion = client.beta.chat.completions.parse(
-            model=settings.LLM_MODEL,
-            temperature=settings.LLM_TEMPERATURE,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": _build_user_content(user_prompt, images)},
-            ],
-            response_format=ExtractedCompanyDescription,
-        )
+        completion = client.beta.chat.completions.parse(**_structured_request(
+            model=settings.LLM_MODEL, system_prompt=system_prompt,
+            user_prompt=user_prompt, images=images,
+            response_model=ExtractedCompanyDescription,
+        ))
     except Exception as exc:
         _raise_as_transient(exc, context="company_description_structured")
-
-    if not completion.choices:
-        raise LLMTransientError("LLM вернул пустой список choices")
-    parsed = completion.choices[0].message.parsed
-    if parsed is None:
-        refusal = completion.choices[0].message.refusal
-        raise LLMParseError(
-            f"LLM не вернул parsed-ответ. Refusal: {refusal or 'нет'}"
-        )
-    return parsed
+    return _parsed_from_completion(completion)  # type: ignore[return-value]
 
 
 def _call_company_description_json(
@@ -403,41 +615,16 @@ def _call_company_description_json(
     user_prompt: str,
     images: Optional[list[bytes]] = None,
 ) -> ExtractedCompanyDescription:
-    extra_body = _provider_extra_body()
     try:
-        completion: ChatCompletion = client.chat.completions.create(
-            model=settings.LLM_MODEL,
-            temperature=settings.LLM_TEMPERATURE,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": _build_user_content(user_prompt, images)},
-            ],
-            response_format={"type": "json_object"},
-            extra_body=extra_body or None,
-        )
+        completion: ChatCompletion = client.chat.completions.create(**_json_request(
+            model=settings.LLM_MODEL, system_prompt=system_prompt,
+            user_prompt=user_prompt, images=images,
+        ))
     except Exception as exc:
         _raise_as_transient(exc, context="company_description_json")
-
-    if not completion.choices:
-        raise LLMTransientError("LLM вернул пустой список choices")
-
-    content = (completion.choices[0].message.content or "").strip()
-    if not content:
-        raise LLMTransientError("LLM вернул пустое сообщение")
-
-    json_str = _extract_json_string(content)
-    try:
-        payload: dict[str, Any] = json.loads(json_str)
-    except json.JSONDecodeError as exc:
-        logger.error("LLM вернул невалидный JSON (описание). Сырой ответ:\n%s", content)
-        raise LLMParseError(f"Невалидный JSON: {exc}") from exc
-
-    try:
-        return ExtractedCompanyDescription.model_validate(payload)
-    except ValidationError as exc:
-        raise LLMParseError(
-            f"Ошибка валидации ExtractedCompanyDescription: {exc}"
-        ) from exc
+    return _description_from_payload(
+        _payload_from_completion(completion, what=" (описание)"),
+    )
 
 
 @retry(
@@ -453,7 +640,7 @@ def extract_company_description_via_llm(
     images: Optional[list[bytes]] = None,
 ) -> ExtractedCompanyDescription:
     """Извлечь описание компании из раздела примечаний отчёта."""
-    client = _build_client()
+    client = _get_client()
     if _provider_supports_structured_outputs():
         return _call_company_description_structured(
             client, system_prompt=system_prompt, user_prompt=user_prompt, images=images,
@@ -461,3 +648,164 @@ def extract_company_description_via_llm(
     return _call_company_description_json(
         client, system_prompt=system_prompt, user_prompt=user_prompt, images=images,
     )
+
+
+# ─── Асинхронный API ─────────────────────────────────────────────────────────
+#
+# Те же запросы через AsyncOpenAI: для конкурентных извлечений из async-кода
+# без потока на каждый запрос. Ретраи — та же стратегия tenacity (она умеет
+# корутины). Дополнительно — таймаут на запрос и хеджирование: если ответа нет
+# дольше `hedge_after` секунд, отправляем дубликат и берём тот, что придёт
+# первым. Хвост латентности у провайдеров длинный (p99 в разы больше медианы),
+# а дубликат стоит токенов только в медленном случае.
+
+
+async def _hedged(
+    make_call: Callable[[], Awaitable[T]], hedge_after: Optional[float],
+) -> T:
+    """Выполнить запрос; после `hedge_after` сек без ответа — запустить дубликат.
+
+    Побеждает первый УСПЕШНЫЙ ответ, второй запрос отменяется. Если упали оба —
+    поднимается ошибка первого завершившегося.
+    """
+    if not hedge_after or hedge_after <= 0:
+        return await make_call()
+
+    primary = asyncio.ensure_future(make_call())
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    logger.info("LLM: нет ответа за %.1f сек — отправляем дубликат запроса.", hedge_after)
+    hedge = asyncio.ensure_future(make_call())
+    pending: set[asyncio.Future[T]] = {primary, hedge}
+    first_error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                first_error = first_error or task.exception()
+        assert first_error is not None
+        raise first_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _request_timeout(timeout: Optional[float]) -> float | NotGiven:
+    # None в SDK значит «без таймаута» — а нам нужно «таймаут клиента».
+    return NOT_GIVEN if timeout is None else timeout
+
+
+async def _acall_report(
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    images: Optional[list[bytes]],
+    response_model: type[BaseModel],
+    timeout: Optional[float],
+) -> ExtractedReport:
+    client = _get_async_client()
+    model = _model_for_request(images)
+    if _provider_supports_structured_outputs():
+        try:
+            completion = await client.beta.chat.completions.parse(
+                **_structured_request(
+                    model=model, system_prompt=system_prompt, user_prompt=user_prompt,
+                    images=images, response_model=response_model,
+                ),
+                timeout=_request_timeout(timeout),
+            )
+        except Exception as exc:
+            _raise_as_transient(exc, context="async_structured")
+        return _report_from_parsed(_parsed_from_completion(completion))
+    try:
+        completion = await client.chat.completions.create(
+            **_json_request(
+                model=model, system_prompt=system_prompt, user_prompt=user_prompt,
+                images=images,
+            ),
+            timeout=_request_timeout(timeout),
+        )
+    except Exception as exc:
+        _raise_as_transient(exc, context="async_json_object")
+    return _report_from_payload(_payload_from_completion(completion, what=""), response_model)
+
+
+@retry(
+    retry=retry_if_exception_type(LLMTransientError),
+    stop=stop_after_attempt(5),
+    wait=_wait_strategy,
+    reraise=True,
+)
+async def aextract_report_via_llm(
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    images: Optional[list[bytes]] = None,
+    response_model: type[BaseModel] = ExtractedReport,
+    timeout: Optional[float] = None,
+    hedge_after: Optional[float] = None,
+) -> ExtractedReport:
+    """Асинхронный `extract_report_via_llm` (и `extract_section_via_llm`,
+    если передана подсхема раздела в `response_model`).
+
+    Args:
+        timeout: таймаут одного запроса, сек; None — LLM_REQUEST_TIMEOUT.
+        hedge_after: через сколько секунд без ответа слать дубликат;
+            None — LLM_HEDGE_AFTER_SECONDS (0 — без хеджирования).
+    """
+    hedge = settings.LLM_HEDGE_AFTER_SECONDS if hedge_after is None else hedge_after
+    return await _hedged(
+        lambda: _acall_report(
+            system_prompt=system_prompt, user_prompt=user_prompt, images=images,
+            response_model=response_model, timeout=timeout,
+        ),
+        hedge,
+    )
+
+
+@retry(
+    retry=retry_if_exception_type(LLMTransientError),
+    stop=stop_after_attempt(5),
+    wait=_wait_strategy,
+    reraise=True,
+)
+async def aextract_company_description_via_llm(
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    images: Optional[list[bytes]] = None,
+    timeout: Optional[float] = None,
+) -> ExtractedCompanyDescription:
+    """Асинхронный `extract_company_description_via_llm` (без хеджирования:
+    описание не на критическом пути сохранения отчёта)."""
+    client = _get_async_client()
+    if _provider_supports_structured_outputs():
+        try:
+            completion = await client.beta.chat.completions.parse(
+                **_structured_request(
+                    model=settings.LLM_MODEL, system_prompt=system_prompt,
+                    user_prompt=user_prompt, images=images,
+                    response_model=ExtractedCompanyDescription,
+                ),
+                timeout=_request_timeout(timeout),
+            )
+        except Exception as exc:
+            _raise_as_transient(exc, context="async_company_description_structured")
+        return _parsed_from_completion(completion)  # type: ignore[return-value]
+    try:
+        completion = await client.chat.completions.create(
+            **_json_request(
+                model=settings.LLM_MODEL, system_prompt=system_prompt,
+                user_prompt=user_prompt, images=images,
+            ),
+            timeout=_request_timeout(timeout),
+        )
+    except Exception as exc:
+        _raise_as_transient(exc, context="async_company_description_json")
+    return _description_from_payload(
+        _payload_from_completion(completion, what=" (описание)"),
+    )
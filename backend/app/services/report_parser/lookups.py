@@ -0,0 +1,83 @@
+"""Спекулятивные внешние запросы, пока идёт вызов LLM.
+
+После ответа модели пайплайн ходит в MOEX/ЦБ (курс, цены на две даты,
+ISSUESIZE) и ещё раз в LLM за описанием компании — последовательно это
+2–10 с сетевых ожиданий на каждый PDF. Большинство аргументов известно
+заранее: дата конца периода следует из года/квартала, валюта — обычно та же,
+что в прошлых отчётах компании. Эти запросы запускаются в фоне параллельно с
+извлечением, а после ответа берутся из кэша по ключу «функция + аргументы».
+Если модель вернула другую дату или валюту, ключ не совпадёт и запрос уйдёт
+заново — спекуляция никогда не подменяет результат.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _freeze(value: Any) -> Hashable:
+    """Аргументы → ключ кэша (списки former_tickers/share_splits нехэшируемы)."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class SpeculativeLookups:
+    """Кэш фоновых вызовов по (функция, аргументы).
+
+    Функции должны быть best-effort (ошибку вернуть как None, а не бросить) и
+    не трогать сессию БД — они выполняются в чужом потоке.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lookup")
+        self._lock = threading.Lock()
+        self._futures: dict[Hashable, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, fn: Callable[..., Any], *args: Any) -> None:
+        """Запустить вызов в фоне (повторный с теми же аргументами — no-op)."""
+        self._submit((fn, _freeze(args)), fn, args)
+
+    def _submit(self, key: Hashable, fn: Callable[..., Any], args: tuple) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future, True
+            future = self._pool.submit(fn, *args)
+            self._futures[key] = future
+            return future, False
+
+    def get(self, fn: Callable[..., T], *args: Any) -> T:
+        """Результат вызова: из кэша, если его уже запускали, иначе — сейчас."""
+        future, cached = self._submit((fn, _freeze(args)), fn, args)
+        with self._lock:
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return future.result()
+
+    def close(self) -> None:
+        """Отменить невостребованные запросы; уже идущие дорабатывают в фоне."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self.hits or self.misses:
+            logger.debug("Спекулятивные запросы: попаданий %d, промахов %d", self.hits, self.misses)
+
+    def __enter__(self) -> "SpeculativeLookups":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+__all__ = ("SpeculativeLookups",)
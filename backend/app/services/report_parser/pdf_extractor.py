@@ -11,6 +11,7 @@ from __future__ import annotations
 
 import logging
 import re
+from collections import Counter
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, Optional, Union
@@ -155,11 +156,28 @@ class PdfExtractionResult:
     text: str                  # склеенный текст выбранных страниц
     matched_sections: dict[int, list[str]]
     is_scanned: bool = False   # True если PDF — скан (почти нет извлекаемого текста)
-    page_images: list[bytes] = None  # type: ignore[assignment]  # PNG-страниц для vision LLM
+    page_images: list[bytes] = None  # type: ignore[assignment]  # PNG/JPEG-страницы для vision LLM
+    # Режим бюджета токенов: лимит и оценка фактически упакованного текста.
+    # None — страницы отбирались по количеству (max_pages).
+    token_budget: Optional[int] = None
+    estimated_tokens: int = 0
+    # Текст каждой выбранной страницы (с маркером) и попадания по группам
+    # SECTION_KEYWORDS — по ним sections.py режет запрос на разделы.
+    page_chunks: dict[int, str] = None  # type: ignore[assignment]
+    hits_by_page: dict[int, dict[int, int]] = None  # type: ignore[assignment]
+    # Слова выбранных текстовых страниц с координатами (x0, y0, x1, y1, текст, …)
+    # — из них table_extractor собирает таблицы без LLM.
+    page_words: dict[int, list[tuple]] = None  # type: ignore[assignment]
 
     def __post_init__(self) -> None:
         if self.page_images is None:
             self.page_images = []
+        if self.page_chunks is None:
+            self.page_chunks = {}
+        if self.hits_by_page is None:
+            self.hits_by_page = {}
+        if self.page_words is None:
+            self.page_words = {}
 
 
 def _normalize(text: str) -> str:
@@ -241,28 +259,317 @@ def _expand_neighbors(indices: Iterable[int], total: int, window: int = 1) -> li
     return sorted(selected)
 
 
+# ─── Упаковка страниц по бюджету токенов ────────────────────────────────────
+
+# Грубая оценка «символов на токен» для смеси русского текста и цифр таблиц.
+# У BPE-токенизаторов Qwen/GPT кириллица дороже латиницы (~2.5–3 символа на
+# токен против ~4), таблицы с пробелами-разделителями разрядов — ещё дороже.
+# Точность ±20% достаточна: бюджет — ограничитель, а не биллинг.
+_CHARS_PER_TOKEN = 2.8
+
+# Служебная надбавка за маркер «───── СТРАНИЦА N из M ─────».
+_PAGE_MARKER_TOKENS = 12
+# Пометка в конце страницы, обрезанной по бюджету токенов.
+_TRUNCATED_NOTE = "\n[…СТРАНИЦА ОБРЕЗАНА ПО БЮДЖЕТУ ТОКЕНОВ]"
+_TRUNCATED_NOTE_TOKENS = 16
+
+# Сколько строк сверху и снизу страницы считаем зоной колонтитулов.
+_BOILERPLATE_EDGE_LINES = 3
+
+# Строка из зоны колонтитулов, повторяющаяся на такой доле страниц, —
+# колонтитул («ПАО «Компания» | Консолидированная отчётность за 2024 год»).
+_BOILERPLATE_MIN_SHARE = 0.3
+
+# Номера страниц и «Стр. 12 из 140» — мусор, даже если не повторяются.
+_PAGE_NUMBER_LINE_RE = re.compile(
+    r"^\s*(?:(?:стр\.?|страница|page)\s*)?\d{1,4}(?:\s*(?:из|of|/)\s*\d{1,4})?\s*$",
+    re.IGNORECASE,
+)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Оценка числа токенов текста без вызова токенизатора."""
+    if not text:
+        return 0
+    return int(len(text) / _CHARS_PER_TOKEN) + 1
+
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    """Обрезать текст до оценки в tokens токенов (с пометкой об обрезке)."""
+    if _estimate_tokens(text) <= tokens:
+        return text
+    limit = max(0, int((tokens - _TRUNCATED_NOTE_TOKENS) * _CHARS_PER_TOKEN))
+    return text[:limit].rstrip() + _TRUNCATED_NOTE
+
+
+def _boilerplate_key(line: str) -> str:
+    """Ключ сравнения строк колонтитулов.
+
+    Цифры НЕ маскируем: строка «Выручка 300» в верху таблицы иначе совпала бы
+    с «Выручка 250» на соседней странице. Номера страниц ловит
+    `_PAGE_NUMBER_LINE_RE`.
+    """
+    return _normalize(line).strip()
+
+
+def _find_boilerplate_lines(page_texts: list[str]) -> set[str]:
+    """Ключи строк, которые повторяются в колонтитулах большинства страниц."""
+    if len(page_texts) < 4:
+        return set()
+    counts: Counter[str] = Counter()
+    for raw in page_texts:
+        lines = [ln for ln in raw.splitlines() if ln.strip()]
+        edge = lines[:_BOILERPLATE_EDGE_LINES] + lines[-_BOILERPLATE_EDGE_LINES:]
+        counts.update({_boilerplate_key(ln) for ln in edge})
+    threshold = max(3, int(len(page_texts) * _BOILERPLATE_MIN_SHARE))
+    return {key for key, n in counts.items() if key and n >= threshold}
+
+
+def _strip_boilerplate(text: str, boilerplate: set[str]) -> str:
+    """Убрать колонтитулы, номера страниц и пустые строки подряд."""
+    kept: list[str] = []
+    for line in text.splitlines():
+        if not line.strip():
+            if kept and kept[-1]:
+                kept.append("")
+            continue
+        if _PAGE_NUMBER_LINE_RE.match(line):
+            continue
+        if _boilerplate_key(line) in boilerplate:
+            continue
+        kept.append(line.rstrip())
+    return "\n".join(kept).strip()
+
+
+def _pack_pages_by_budget(
+    matched_sections: dict[int, list[str]],
+    hits_by_page: dict[int, dict[int, int]],
+    page_tokens: dict[int, int],
+    *,
+    total: int,
+    budget: int,
+    window: int,
+) -> tuple[list[int], int]:
+    """
+    Набрать страницы в пределах бюджета токенов.
+
+    Порядок — тот же, что у `_prioritized_pages`: сначала лучшая страница
+    каждого раздела, потом остальные по числу совпадений. Соседние страницы
+    (продолжения таблиц) добираются вторым проходом, ближние раньше дальних,
+    — иначе соседи баланса съели бы бюджет раньше, чем дошла очередь до
+    страницы с дивидендами. Страница, которая не влезает целиком, пропускается,
+    но упаковка продолжается: следующая может оказаться короче.
+
+    Если в бюджет не влезла даже лучшая страница, она берётся одна — иначе
+    LLM получила бы пустое тело отчёта. Текст такой страницы вызывающий
+    обрезает до бюджета (`_truncate_to_tokens`), расход считается равным бюджету.
+
+    Returns:
+        (отсортированные индексы страниц, израсходованные токены)
+    """
+    ranked = _prioritized_pages(matched_sections, hits_by_page, len(matched_sections))
+    chosen: set[int] = set()
+    used = 0
+
+    def _try_add(idx: int) -> None:
+        nonlocal used
+        if idx in chosen or not 0 <= idx < total:
+            return
+        cost = page_tokens.get(idx, 0) + _PAGE_MARKER_TOKENS
+        if used + cost > budget:
+            return
+        chosen.add(idx)
+        used += cost
+
+    for idx in ranked:
+        _try_add(idx)
+    if not chosen and ranked:
+        return [ranked[0]], budget
+    for distance in range(1, window + 1):
+        for idx in ranked:
+            if idx not in chosen:
+                continue
+            _try_add(idx - distance)
+            _try_add(idx + distance)
+
+    return sorted(chosen), used
+
+
 # Порог в символах на странице, ниже которого страница считается сканом
 # (или таблицей, сохранённой в виде картинки в PDF).
 _SCAN_PAGE_TEXT_THRESHOLD = 100
 
-# Максимум страниц, которые мы можем отправить как PNG в vision-LLM.
+# Максимум страниц, которые мы можем отправить картинками в vision-LLM.
 # С detail="high" каждая страница съедает ~700-1700 токенов, плюс сам
 # текстовый промпт. 10 страниц = ~15-20K токенов, что безопасно
 # укладывается в TPM-лимит (200K/min на OpenAI Tier 1) при
 # параллельных запросах.
 _MAX_SCAN_PAGES_FOR_VISION = 10
 
-# DPI для рендеринга страниц в PNG. 150 даёт хороший баланс читаемости /
-# размера (типичная A4 ≈ 300 КБ PNG).
+# DPI для рендеринга страниц по умолчанию — для сканов, где размер шрифта
+# из текстового слоя не узнать. 150 даёт хороший баланс читаемости / размера.
 _RENDER_DPI = 150
 
+# Адаптивный DPI: подбираем так, чтобы строчная цифра таблицы занимала
+# ~_TARGET_GLYPH_PX пикселей по высоте кегля. Мельче — модель путает 3/8 и 6/8,
+# крупнее — лишние тайлы и токены без прироста точности.
+_TARGET_GLYPH_PX = 20
+_MIN_RENDER_DPI = 100
+_MAX_RENDER_DPI = 220
 
-def _render_page_png(page: "pymupdf.Page", dpi: int = _RENDER_DPI) -> bytes:
-    """Отрендерить одну страницу PDF в PNG-байты для vision-модели."""
+# Качество JPEG: ниже 75 на сером фоне таблиц появляются артефакты вокруг цифр.
+_JPEG_QUALITY = 80
+
+# Поля вокруг найденной области таблицы (в pt), чтобы не срезать шапку столбцов.
+_CROP_PADDING_PT = 14
+
+# Картинка, закрывающая почти всю страницу, — фон или сам скан, а не таблица.
+_BACKGROUND_IMAGE_AREA_SHARE = 0.9
+
+# Параметры тарификации картинок detail="high" у OpenAI-совместимых API:
+# вписать в 2048×2048, короткую сторону — до 768, затем тайлы 512×512.
+_IMAGE_BASE_TOKENS = 85
+_IMAGE_TILE_TOKENS = 170
+
+
+@dataclass
+class PageImage:
+    """Подготовленная для vision-модели страница и что на ней сэкономили."""
+    data: bytes
+    fmt: str            # 'png' | 'jpeg'
+    dpi: int
+    width: int
+    height: int
+    alt_bytes: int      # размер отвергнутого формата
+    tokens: int         # оценка токенов картинки
+    baseline_tokens: int  # оценка для цветной полной страницы при _RENDER_DPI
+
+
+def _estimate_image_tokens(width: int, height: int) -> int:
+    """Оценка токенов картинки в режиме detail="high"."""
+    if width <= 0 or height <= 0:
+        return 0
+    scale = min(1.0, 2048 / max(width, height))
+    w, h = width * scale, height * scale
+    scale = min(1.0, 768 / min(w, h))
+    w, h = w * scale, h * scale
+    tiles = -(-int(w) // 512) * -(-int(h) // 512)
+    return _IMAGE_BASE_TOKENS + _IMAGE_TILE_TOKENS * tiles
+
+
+def _content_rect(page: "pymupdf.Page") -> "pymupdf.Rect":
+    """Область таблицы: объединение слов, векторной графики и вставленных картинок.
+
+    Картинку во всю страницу считаем подложкой, только если поверх неё есть
+    текстовая таблица (НОВАТЭК) — иначе обрезка никогда не сработала бы на
+    гибридных страницах. Если текста поверх почти нет (скан, где таблица —
+    растр во всю страницу, а текстом только номер страницы), картинка и есть
+    содержимое: страница не обрезается. Если содержимого не нашлось — вся
+    страница.
+    """
+    page_rect = page.rect
+    page_area = abs(page_rect) or 1.0
+    rect = pymupdf.Rect()  # пустой — union с ним даёт второй аргумент
+    words = page.get_text("words")
+    for w in words:
+        rect |= pymupdf.Rect(w[:4])
+    for d in page.get_drawings():
+        r = d.get("rect")
+        if r is not None and abs(r) < page_area * _BACKGROUND_IMAGE_AREA_SHARE:
+            rect |= r
+    full_page_image = False
+    for info in page.get_image_info():
+        r = pymupdf.Rect(info["bbox"])
+        if abs(r) < page_area * _BACKGROUND_IMAGE_AREA_SHARE:
+            rect |= r
+        else:
+            full_page_image = True
+    if full_page_image and sum(len(w[4]) for w in words) < _SCAN_PAGE_TEXT_THRESHOLD:
+        return page_rect
+    if rect.is_empty:
+        return page_rect
+    padded = pymupdf.Rect(
+        rect.x0 - _CROP_PADDING_PT, rect.y0 - _CROP_PADDING_PT,
+        rect.x1 + _CROP_PADDING_PT, rect.y1 + _CROP_PADDING_PT,
+    )
+    return padded & page_rect
+
+
+def _adaptive_dpi(page: "pymupdf.Page") -> int:
+    """DPI по медианному кеглю текстового слоя; без текста — _RENDER_DPI."""
+    sizes: list[float] = []
+    for block in page.get_text("dict").get("blocks", []):
+        for line in block.get("lines", []):
+            for span in line.get("spans", []):
+                if span.get("text", "").strip() and span.get("size"):
+                    sizes.append(float(span["size"]))
+    if not sizes:
+        return _RENDER_DPI
+    sizes.sort()
+    median = sizes[len(sizes) // 2]
+    dpi = int(_TARGET_GLYPH_PX * 72 / max(median, 1.0))
+    return max(_MIN_RENDER_DPI, min(_MAX_RENDER_DPI, dpi))
+
+
+def _render_page_image(page: "pymupdf.Page") -> PageImage:
+    """Отрендерить страницу для vision-модели как можно компактнее.
+
+    Серый цвет (таблицам цвет не нужен, PNG втрое меньше), обрезка до области
+    таблицы, DPI по размеру шрифта и меньший из PNG/JPEG.
+    """
+    dpi = _adaptive_dpi(page)
+    clip = _content_rect(page)
     scale = dpi / 72.0
-    matrix = pymupdf.Matrix(scale, scale)
-    pix = page.get_pixmap(matrix=matrix, alpha=False)
-    return pix.tobytes("png")
+    pix = page.get_pixmap(
+        matrix=pymupdf.Matrix(scale, scale),
+        colorspace=pymupdf.csGRAY,
+        clip=clip,
+        alpha=False,
+    )
+    png = pix.tobytes("png")
+    jpeg = pix.tobytes("jpeg", jpg_quality=_JPEG_QUALITY)
+    fmt, data, alt = ("jpeg", jpeg, png) if len(jpeg) < len(png) else ("png", png, jpeg)
+
+    base_scale = _RENDER_DPI / 72.0
+    return PageImage(
+        data=data,
+        fmt=fmt,
+        dpi=dpi,
+        width=pix.width,
+        height=pix.height,
+        alt_bytes=len(alt),
+        tokens=_estimate_image_tokens(pix.width, pix.height),
+        baseline_tokens=_estimate_image_tokens(
+            int(page.rect.width * base_scale), int(page.rect.height * base_scale),
+        ),
+    )
+
+
+def _render_pages_for_vision(
+    doc: "pymupdf.Document", indices: Iterable[int], *, label: str,
+) -> list[bytes]:
+    """Подготовить страницы для vision-LLM и залогировать экономию."""
+    images: list[PageImage] = []
+    for idx in indices:
+        try:
+            images.append(_render_page_image(doc[idx]))
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Не смог отрендерить страницу %d: %s", idx + 1, exc)
+    if images:
+        sent = sum(len(img.data) for img in images)
+        alt = sum(img.alt_bytes for img in images)
+        tokens = sum(img.tokens for img in images)
+        baseline = sum(img.baseline_tokens for img in images)
+        logger.info(
+            "PDF=%s: %d страниц для vision — %d КБ (выбор формата сэкономил "
+            "%d КБ), ~%d токенов картинок (цветные полные страницы: ~%d, "
+            "сэкономлено ~%d). Форматы: %s, DPI: %s.",
+            label, len(images), sent // 1024, (alt - sent) // 1024,
+            tokens, baseline, baseline - tokens,
+            ",".join(img.fmt for img in images),
+            ",".join(str(img.dpi) for img in images),
+        )
+    return [img.data for img in images]
 
 
 def _looks_like_scan(page_texts: list[str]) -> bool:
@@ -286,7 +593,7 @@ def _looks_like_garbled_encoding(page_texts: list[str]) -> bool:
     """Текст есть, но почти без кириллицы (битый ToUnicode, как у ALRS 2024/2025).
 
     Ключевые фразы не матчятся → без vision прогон падает. Считаем такие PDF
-    «сканами» и отдаём PNG vision-модели.
+    «сканами» и отдаём картинки страниц vision-модели.
     """
     sample = "\n".join(page_texts[: min(20, len(page_texts))])
     if len(sample.strip()) < 500:
@@ -300,6 +607,7 @@ def extract_financial_pages(
     max_pages: int = 60,
     *,
     pdf_label: str = "in-memory PDF",
+    token_budget: Optional[int] = None,
 ) -> PdfExtractionResult:
     """
     Прочитать PDF (из файла или bytes), выбрать страницы с финансовыми таблицами.
@@ -308,17 +616,20 @@ def extract_financial_pages(
       1. Текстовый PDF — ищем релевантные страницы по ключевым фразам,
          возвращаем их склеенный текст.
       2. Скан-PDF — ключевые фразы не ищутся (текста почти нет); рендерим
-         разумное количество страниц в PNG и отдаём их vision-LLM.
+         разумное количество страниц в картинки и отдаём их vision-LLM.
 
     Args:
         pdf_source: путь к PDF или его содержимое как bytes.
         neighbor_window: сколько соседних страниц добавлять вокруг каждой найденной.
         max_pages: ограничение сверху на количество собранных страниц.
         pdf_label: как называть PDF в логах/ошибках если передали bytes.
+        token_budget: если задан — вместо лимита страниц упаковываем текстовые
+            страницы в бюджет токенов (колонтитулы вырезаются, порядок — по
+            покрытию разделов). max_pages в этом режиме не применяется.
 
     Returns:
         PdfExtractionResult с выбранными страницами, текстом и (для сканов)
-        page_images в виде PNG-байтов.
+        page_images в виде байтов PNG/JPEG (формат — по сигнатуре).
 
     Raises:
         FileNotFoundError: если PDF-файл не существует.
@@ -364,11 +675,30 @@ def extract_financial_pages(
 
         # ─── Ветка 1: обычный текстовый PDF ──────────────────────────────
         if matched_sections:
-            selected = _expand_neighbors(
-                matched_sections.keys(), total=total_pages, window=neighbor_window
-            )
+            boilerplate: set[str] = set()
+            estimated_tokens = 0
+            if token_budget:
+                boilerplate = _find_boilerplate_lines(page_texts)
+                page_tokens = {
+                    idx: _estimate_tokens(_strip_boilerplate(raw, boilerplate))
+                    for idx, raw in enumerate(page_texts)
+                }
+                selected, estimated_tokens = _pack_pages_by_budget(
+                    matched_sections, hits_by_page, page_tokens,
+                    total=total_pages, budget=token_budget, window=neighbor_window,
+                )
+                logger.info(
+                    "PDF=%s: бюджет %d токенов — упаковано %d страниц (~%d токенов), "
+                    "колонтитулов вырезано: %d.",
+                    label, token_budget, len(selected), estimated_tokens,
+                    len(boilerplate),
+                )
+            else:
+                selected = _expand_neighbors(
+                    matched_sections.keys(), total=total_pages, window=neighbor_window
+                )
 
-            if len(selected) > max_pages:
+            if not token_budget and len(selected) > max_pages:
                 top_pages = _prioritized_pages(matched_sections, hits_by_page, max_pages)
                 selected = _expand_neighbors(
                     top_pages, total=total_pages, window=neighbor_window
@@ -380,15 +710,25 @@ def extract_financial_pages(
                 )
 
             chunks: list[str] = []
+            page_chunks: dict[int, str] = {}
+            page_words: dict[int, list[tuple]] = {}
             for idx in selected:
                 marker = f"\n\n───── СТРАНИЦА {idx + 1} из {total_pages} ─────\n"
                 body = page_texts[idx].strip()
-                if len(body) < _SCAN_PAGE_TEXT_THRESHOLD:
+                if boilerplate:
+                    body = _strip_boilerplate(body, boilerplate)
+                if token_budget:
+                    # Не влезла даже лучшая страница — она одна, обрезанная.
+                    body = _truncate_to_tokens(body, token_budget - _PAGE_MARKER_TOKENS)
+                if len(page_texts[idx].strip()) < _SCAN_PAGE_TEXT_THRESHOLD:
                     body = (
                         "[НА ЭТОЙ СТРАНИЦЕ МАЛО ИЗВЛЕКАЕМОГО ТЕКСТА — "
                         "смотри прикреплённое изображение страницы]"
                     )
+                else:
+                    page_words[idx] = doc[idx].get_text("words")
                 chunks.append(marker + body)
+                page_chunks[idx] = marker + body
 
             text = "\n".join(chunks).strip()
 
@@ -399,17 +739,14 @@ def extract_financial_pages(
                 idx for idx in selected
                 if len(page_texts[idx].strip()) < _SCAN_PAGE_TEXT_THRESHOLD
             ]
-            page_images: list[bytes] = []
-            for idx in sparse[:_MAX_SCAN_PAGES_FOR_VISION]:
-                try:
-                    page_images.append(_render_page_png(doc[idx]))
-                except Exception as exc:  # noqa: BLE001
-                    logger.error("Не смог отрендерить страницу %d: %s", idx + 1, exc)
+            page_images = _render_pages_for_vision(
+                doc, sparse[:_MAX_SCAN_PAGES_FOR_VISION], label=label,
+            )
 
             if page_images:
                 logger.warning(
                     "PDF=%s: гибридный режим — %d выбранных страниц без текста "
-                    "отправлены как PNG (vision).",
+                    "отправлены как картинки (vision).",
                     label, len(page_images),
                 )
 
@@ -428,6 +765,11 @@ def extract_financial_pages(
                 # True → extractor_service приложит page_images к запросу LLM.
                 is_scanned=bool(page_images),
                 page_images=page_images,
+                token_budget=token_budget or None,
+                estimated_tokens=estimated_tokens or _estimate_tokens(text),
+                page_chunks=page_chunks,
+                hits_by_page=hits_by_page,
+                page_words=page_words,
             )
 
         # ─── Ветка 2: скан-PDF — рендерим страницы для vision-LLM ─────────
@@ -441,16 +783,11 @@ def extract_financial_pages(
 
             logger.warning(
                 "PDF=%s: выглядит как СКАН (мало извлекаемого текста). "
-                "Рендерим %d страниц в PNG для vision-LLM (gpt-4o-mini).",
+                "Рендерим %d страниц в картинки для vision-LLM.",
                 label, n,
             )
 
-            page_images: list[bytes] = []
-            for idx in selected:
-                try:
-                    page_images.append(_render_page_png(doc[idx]))
-                except Exception as exc:  # noqa: BLE001
-                    logger.error("Не смог отрендерить страницу %d: %s", idx, exc)
+            page_images = _render_pages_for_vision(doc, selected, label=label)
 
             # Текст даже если коряво извлечённый, всё равно отдадим как hint.
             chunks = [
@@ -471,6 +808,7 @@ def extract_financial_pages(
                 matched_sections={},
                 is_scanned=True,
                 page_images=page_images,
+                estimated_tokens=_estimate_tokens(text),
             )
 
         # ─── Ветка 3: текст есть, но ключевые слова не найдены ────────────
@@ -580,8 +918,7 @@ def extract_company_info_pages(
         is_scan = len(text.strip()) < _SCAN_PAGE_TEXT_THRESHOLD
         page_images: list[bytes] = []
         if is_scan:
-            for idx in selected:
-                page_images.append(_render_page_png(doc[idx]))
+            page_images = _render_pages_for_vision(doc, selected, label=label)
 
         logger.info(
             "PDF=%s: раздел «Информация о компании» — страницы %s (скан=%s).",
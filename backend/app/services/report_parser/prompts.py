@@ -472,6 +472,43 @@ def build_system_prompt(report_type: str) -> str:
     return SYSTEM_PROMPT_GENERAL
 
 
+_SECTION_NOTICE = """
+
+РЕЖИМ РАЗДЕЛА: в этом запросе — только раздел «{section_label}». \
+Остальные разделы отчёта извлекаются параллельными запросами. \
+Заполни ТОЛЬКО поля: {fields}; а также период и вид отчётности \
+(fiscal_year, period_type, fiscal_quarter, report_date, accounting_standard, \
+consolidated), currency, units_scale и extraction_notes — единицы указывай \
+по шапке ИМЕННО этой таблицы. \
+Пункты чек-листа про другие поля пропусти, их в ответе быть не должно.
+"""
+
+
+def build_section_system_prompt(
+    report_type: str, *, section_label: str, fields: tuple[str, ...],
+) -> str:
+    """Системный промпт для извлечения одного раздела (см. sections.py)."""
+    return build_system_prompt(report_type) + _SECTION_NOTICE.format(
+        section_label=section_label, fields=", ".join(fields),
+    )
+
+
+_GAP_FILL_NOTICE = """
+
+РЕЖИМ ДОЗАПОЛНЕНИЯ: остальные показатели уже прочитаны из таблиц отчёта \
+программно. Заполни ТОЛЬКО поля: {fields}; а также период и основу \
+отчётности (period_type, fiscal_quarter, report_date, accounting_standard, \
+consolidated), currency, units_scale и extraction_notes — единицы указывай \
+по шапке той таблицы или примечания, откуда берёшь числа. Пункты чек-листа про другие поля пропусти, их в ответе \
+быть не должно.
+"""
+
+
+def build_gap_fill_system_prompt(report_type: str, *, fields: tuple[str, ...]) -> str:
+    """Системный промпт дозапроса полей, которые не прочитались из таблиц."""
+    return build_system_prompt(report_type) + _GAP_FILL_NOTICE.format(fields=", ".join(fields))
+
+
 def build_user_prompt(
     *,
     ticker: str,
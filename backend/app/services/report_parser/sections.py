@@ -0,0 +1,306 @@
+"""Извлечение отчёта по разделам: баланс, ОПиУ, ОДДС, капитал и дивиденды.
+
+Один большой запрос (все страницы + все поля) ждёт самый медленный кусок и
+целиком повторяется при любой ошибке. В режиме разделов страницы режутся по
+тем же группам `SECTION_KEYWORDS`, что и при отборе страниц, каждый раздел
+уходит отдельным запросом со своей подсхемой `ExtractedReport`, запросы идут
+параллельно, а ответы сливаются детерминированно — в порядке `SECTIONS`.
+
+Единицы у разделов могут отличаться (баланс в млн, EPS в тыс. штук), поэтому
+каждый ответ нормализуется к миллионам ДО слияния — это делает вызывающий
+код через `normalize`.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional
+
+from pydantic import BaseModel, create_model
+
+from app.services.report_parser.pdf_extractor import PdfExtractionResult
+from app.services.report_parser.schemas import ExtractedReport
+
+logger = logging.getLogger(__name__)
+
+
+# Поля, которые возвращает каждый раздел: по ним сверяем разделы между собой.
+# Период (report_date, fiscal_quarter) нужен каждому разделу: без него
+# промежуточный отчёт получил бы дату конца года (_resolve_report_date).
+_COMMON_FIELDS: tuple[str, ...] = (
+    "fiscal_year",
+    "period_type",
+    "fiscal_quarter",
+    "report_date",
+    "report_type",
+    "accounting_standard",
+    "consolidated",
+    "currency",
+    "units_scale",
+    "extraction_notes",
+    "confidence",
+)
+
+# Общие поля, расхождение которых между разделами — повод для флага аналитику.
+_CHECKED_COMMON_FIELDS: tuple[str, ...] = (
+    "fiscal_year",
+    "period_type",
+    "fiscal_quarter",
+    "report_date",
+    "report_type",
+    "accounting_standard",
+    "consolidated",
+    "currency",
+)
+
+_CONFIDENCE_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+
+def _section_schema(name: str, fields: tuple[str, ...]) -> type[BaseModel]:
+    """Подсхема ExtractedReport: те же описания полей, но только нужные разделу."""
+    source = ExtractedReport.model_fields
+    definitions: dict[str, Any] = {
+        key: (source[key].annotation, source[key])
+        for key in (*_COMMON_FIELDS, *fields)
+    }
+    return create_model(name, **definitions)
+
+
+@dataclass(frozen=True)
+class SectionSpec:
+    """Раздел отчёта: какие группы ключевых фраз его находят и какие поля он заполняет."""
+    name: str
+    label: str
+    groups: tuple[int, ...]  # индексы групп SECTION_KEYWORDS
+    fields: tuple[str, ...]
+    schema: type[BaseModel]
+
+
+def _spec(name: str, label: str, groups: tuple[int, ...], fields: tuple[str, ...]) -> SectionSpec:
+    schema_name = "Extracted" + "".join(part.title() for part in name.split("_")) + "Section"
+    return SectionSpec(name, label, groups, fields, _section_schema(schema_name, fields))
+
+
+# Порядок важен: он же порядок слияния и приоритет при ничьей в общих полях.
+SECTIONS: tuple[SectionSpec, ...] = (
+    _spec(
+        "balance", "Отчёт о финансовом положении (баланс)", (0, 7, 8),
+        (
+            "total_assets", "total_liabilities", "current_assets",
+            "current_liabilities", "equity", "cash_and_equivalents", "debt",
+            "filing_date",
+        ),
+    ),
+    _spec(
+        "income", "Отчёт о прибылях и убытках", (1, 2),
+        (
+            "revenue", "net_income", "net_income_reported",
+            "net_interest_income", "fee_commission_income",
+            "operating_expenses", "provisions",
+        ),
+    ),
+    _spec(
+        "cash_flow", "Отчёт о движении денежных средств", (4, 5),
+        (
+            "operating_cash_flow", "capex", "lease_principal", "lease_interest",
+            "interest_paid", "debt_principal", "depreciation_amortization",
+        ),
+    ),
+    _spec(
+        "equity_notes", "Капитал, прибыль на акцию и дивиденды", (3, 6),
+        (
+            "shares_outstanding", "shares_units_scale", "dividends_per_share",
+            "dividends_paid", "special_dividends_per_share",
+            "special_dividends_note",
+        ),
+    ),
+)
+
+SECTIONS_BY_NAME: dict[str, SectionSpec] = {spec.name: spec for spec in SECTIONS}
+
+
+@lru_cache(maxsize=32)
+def fields_schema(fields: tuple[str, ...]) -> type[BaseModel]:
+    """Подсхема под произвольный набор полей — для дозапроса пропусков таблиц."""
+    return _section_schema("ExtractedGapFill", fields)
+
+
+def _section_pages(
+    extraction: PdfExtractionResult, spec: SectionSpec, window: int,
+) -> Optional[set[int]]:
+    """Страницы раздела с соседями; None — раздел не найден по ключевым фразам."""
+    chunks = extraction.page_chunks
+    core = [
+        idx for idx, hits in extraction.hits_by_page.items()
+        if idx in chunks and any(hits.get(g) for g in spec.groups)
+    ]
+    if not core:
+        logger.info(
+            "PDF=%s: раздел «%s» не найден по ключевым фразам — отдаём весь текст.",
+            extraction.pdf_path.name, spec.label,
+        )
+        return None
+    return {
+        j for idx in core for j in range(idx - window, idx + window + 1) if j in chunks
+    }
+
+
+def section_text(
+    extraction: PdfExtractionResult, spec: SectionSpec, *, window: int = 1,
+) -> str:
+    """Текст страниц раздела: страницы с попаданиями в его группы плюс соседи.
+
+    Соседи нужны для таблиц, перетекающих на следующую страницу. Если раздел
+    не нашёлся по ключевым фразам — отдаём весь отобранный текст: пусть
+    модель поищет сама, чем вернёт пустой раздел.
+    """
+    return sections_text(extraction, (spec,), window=window)
+
+
+def sections_text(
+    extraction: PdfExtractionResult, specs: Iterable[SectionSpec], *, window: int = 1,
+) -> str:
+    """Текст страниц нескольких разделов без повторов (см. `section_text`)."""
+    pages: set[int] = set()
+    for spec in specs:
+        found = _section_pages(extraction, spec, window)
+        if found is None:
+            return extraction.text
+        pages |= found
+    chunks = extraction.page_chunks
+    return "\n".join(chunks[idx] for idx in sorted(pages)).strip()
+
+
+def sections_for_fields(fields: Iterable[str]) -> list[SectionSpec]:
+    """Разделы, которым принадлежат поля, — в порядке SECTIONS."""
+    wanted = set(fields)
+    return [spec for spec in SECTIONS if wanted & set(spec.fields)]
+
+
+# ─── Параллельный прогон ────────────────────────────────────────────────────
+
+
+@dataclass
+class SectionJob:
+    """Готовый к отправке запрос по одному разделу."""
+    spec: SectionSpec
+    system_prompt: str
+    user_prompt: str
+
+
+@dataclass
+class SectionRun:
+    """Итог параллельного прогона: ответы и ошибки по разделам."""
+    results: dict[str, ExtractedReport] = field(default_factory=dict)
+    errors: dict[str, BaseException] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> list[str]:
+        return [spec.name for spec in SECTIONS if spec.name in self.errors]
+
+
+def run_sections(
+    jobs: list[SectionJob],
+    extract: Callable[[SectionJob], ExtractedReport],
+    *,
+    max_workers: Optional[int] = None,
+    run: Optional[SectionRun] = None,
+) -> SectionRun:
+    """Отправить разделы параллельно. Ошибка раздела не отменяет остальные.
+
+    Передай прошлый `run`, чтобы дозапустить только упавшие разделы: готовые
+    ответы сохранятся, ошибки перезапущенных разделов перезапишутся.
+    """
+    run = run or SectionRun()
+    if not jobs:
+        return run
+    workers = max_workers or len(jobs)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-section") as pool:
+        futures = {job.spec.name: pool.submit(extract, job) for job in jobs}
+        for name, future in futures.items():
+            try:
+                run.results[name] = future.result()
+                run.errors.pop(name, None)
+            except Exception as exc:  # noqa: BLE001 — решает вызывающий код
+                logger.warning("Раздел «%s» не извлечён: %s", name, exc)
+                run.errors[name] = exc
+    return run
+
+
+# ─── Слияние ────────────────────────────────────────────────────────────────
+
+
+def _vote(values: list[tuple[str, Any]]) -> tuple[Any, Optional[str]]:
+    """Большинство голосов; ничья — за разделом, который раньше в SECTIONS."""
+    present = [(name, v) for name, v in values if v is not None]
+    if not present:
+        return None, None
+    counts = Counter(v for _, v in present)
+    top = max(counts.values())
+    winner = next(v for _, v in present if counts[v] == top)
+    if len(counts) == 1:
+        return winner, None
+    detail = ", ".join(f"{name}={v}" for name, v in present)
+    return winner, detail
+
+
+def merge_section_reports(
+    results: dict[str, ExtractedReport],
+) -> tuple[ExtractedReport, list[str]]:
+    """Собрать один ExtractedReport из ответов разделов.
+
+    Каждое поле берётся у раздела-владельца. Общие поля (валюта, период,
+    стандарт, тип отчёта) решаются голосованием; расхождения возвращаются списком для
+    extraction_notes. Ответы уже нормализованы к миллионам и штукам.
+
+    Returns:
+        (слитый отчёт, описания конфликтов)
+    """
+    ordered = [(spec, results[spec.name]) for spec in SECTIONS if spec.name in results]
+    data: dict[str, Any] = {"units_scale": "millions", "shares_units_scale": "units"}
+    conflicts: list[str] = []
+
+    for spec, report in ordered:
+        for key in spec.fields:
+            data[key] = getattr(report, key)
+
+    for key in _CHECKED_COMMON_FIELDS:
+        value, detail = _vote([(spec.name, getattr(report, key)) for spec, report in ordered])
+        if value is not None:
+            data[key] = value
+        if detail:
+            conflicts.append(
+                f"Разделы разошлись в {key}: {detail}. Принято {value}."
+            )
+
+    levels = [r.confidence for _, r in ordered if r.confidence]
+    if levels:
+        data["confidence"] = min(levels, key=lambda c: _CONFIDENCE_ORDER[c])
+
+    notes = [
+        f"[{spec.label}] {report.extraction_notes.strip()}"
+        for spec, report in ordered
+        if report.extraction_notes and report.extraction_notes.strip()
+    ]
+    if notes:
+        data["extraction_notes"] = "\n".join(notes)
+
+    return ExtractedReport.model_validate(data), conflicts
+
+
+__all__ = (
+    "SECTIONS",
+    "SECTIONS_BY_NAME",
+    "SectionJob",
+    "SectionRun",
+    "SectionSpec",
+    "fields_schema",
+    "merge_section_reports",
+    "run_sections",
+    "section_text",
+    "sections_for_fields",
+    "sections_text",
+)
@@ -0,0 +1,700 @@
+"""Детерминированное чтение таблиц баланса, ОПиУ и ОДДС из текстового PDF.
+
+У текстовых МСФО-отчётов таблицы лежат в PDF словами с координатами —
+LLM для них не нужна. Строки таблицы собираются из слов PyMuPDF
+(`page.get_text("words")`) по вертикали, колонка текущего года находится по
+шапке с годами, число строки — по правому краю (суммы выровнены вправо),
+подпись — по словарю строк `FIELD_RULES` на русском и английском.
+
+Каждое найденное поле несёт уверенность: high — точная строка из словаря на
+странице с известными единицами; medium — запасная подпись или единицы,
+взятые с другой страницы; low — строки противоречат друг другу или не
+сходится баланс. extractor_service доверяет только high, остальное
+дозапрашивает у LLM одним маленьким запросом.
+
+Числа возвращаются в ИСХОДНЫХ единицах (`units_scale`), как у ответа LLM:
+к миллионам их приводит тот же `rescale_to_millions`.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Any, Iterable, Optional, Sequence
+
+from app.services.report_parser.schemas import ExtractedReport
+
+logger = logging.getLogger(__name__)
+
+# Слово PyMuPDF: x0, y0, x1, y1, текст, block, line, word (хвост не нужен).
+Word = Sequence[Any]
+
+# ─── Словарь строк ──────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """Как найти поле: в каком отчёте, по каким подписям и как собрать значение.
+
+    aliases — нормализованные подписи (см. `normalize_label`), `*` — любой
+    хвост/вставка. combine="first" берёт строку по первой подходящей подписи
+    (порядок подписей — приоритет), "sum" складывает все подходящие строки
+    (долг = краткосрочные + долгосрочные кредиты). Правила одного поля
+    пробуются по порядку, первое с результатом побеждает.
+    """
+    field: str
+    statement: str  # balance | income | cash_flow
+    aliases: tuple[str, ...]
+    confidence: str = "high"
+    combine: str = "first"
+    activity: Optional[str] = None  # operating | investing | financing (только ОДДС)
+    absolute: bool = False          # поле хранится положительным (capex, проценты)
+    report_types: tuple[str, ...] = ("general", "bank")
+
+
+_GENERAL = ("general",)
+_BANK = ("bank",)
+
+FIELD_RULES: tuple[FieldRule, ...] = (
+    # ── Баланс ──
+    FieldRule("total_assets", "balance", (
+        "итого активы", "итого активов", "всего активы", "всего активов",
+        "активы всего", "total assets",
+    )),
+    FieldRule("total_liabilities", "balance", (
+        "итого обязательства", "итого обязательств", "всего обязательства",
+        "всего обязательств", "обязательства всего", "total liabilities",
+    )),
+    FieldRule("current_assets", "balance", (
+        "итого оборотные активы", "итого оборотных активов", "итого текущие активы",
+        "итого текущих активов", "итого краткосрочные активы",
+        "итого краткосрочных активов", "total current assets",
+    ), report_types=_GENERAL),
+    FieldRule("current_liabilities", "balance", (
+        "итого краткосрочные обязательства", "итого краткосрочных обязательств",
+        "итого текущие обязательства", "итого текущих обязательств",
+        "total current liabilities",
+    ), report_types=_GENERAL),
+    FieldRule("equity", "balance", (
+        "итого капитал относящийся к акционерам*",
+        "итого акционерный капитал относящийся к акционерам*",
+        "итого капитал акционеров*", "итого капитал приходящийся на акционеров*",
+        "капитал относящийся к акционерам*", "капитал приходящийся на акционеров*",
+        "капитал акционеров материнской*", "итого капитал собственников*",
+        "total equity attributable to*", "equity attributable to*",
+    )),
+    FieldRule("equity", "balance", (
+        "итого капитал", "итого собственный капитал", "итого акционерный капитал",
+        "капитал итого", "total equity", "total shareholders equity",
+    ), confidence="medium"),
+    FieldRule("cash_and_equivalents", "balance", (
+        "денежные средства и их эквиваленты", "денежные средства и эквиваленты",
+        "денежные средства и эквиваленты денежных средств",
+        "cash and cash equivalents",
+    )),
+    FieldRule("debt", "balance", (
+        "краткосрочные кредиты и займы*", "долгосрочные кредиты и займы*",
+        "краткосрочные заемные средства*", "долгосрочные заемные средства*",
+        "краткосрочная задолженность по кредитам и займам*",
+        "долгосрочная задолженность по кредитам и займам*",
+        "short-term borrowings*", "long-term borrowings*",
+        "current borrowings*", "non-current borrowings*",
+    ), combine="sum"),
+    FieldRule("debt", "balance", (
+        "кредиты и займы", "заемные средства", "borrowings", "loans and borrowings",
+    ), confidence="medium", combine="sum"),
+    # ── ОПиУ ──
+    FieldRule("revenue", "income", (
+        "итого выручка*", "выручка итого", "выручка всего", "total revenue*",
+        "выручка*", "revenue*", "revenues*",
+    ), report_types=_GENERAL),
+    FieldRule("net_income", "income", (
+        "чистая прибыль относящаяся к акционерам*",
+        "чистая прибыль приходящаяся на акционеров*",
+        "прибыль относящаяся к акционерам*", "прибыль приходящаяся на акционеров*",
+        "прибыль за год относящаяся к акционерам*",
+        "прибыль за год приходящаяся на акционеров*",
+        "чистая прибыль относящаяся к собственникам*",
+        "прибыль за год относящаяся к собственникам*",
+        "прибыль относящаяся на акционеров*", "прибыль относимая на акционеров*",
+        "прибыль причитающаяся акционерам*", "чистая прибыль причитающаяся акционерам*",
+        "profit * attributable to * owners of the*",
+        "profit * attributable to * shareholders of the*",
+        "profit * attributable to * equity holders of the*",
+    )),
+    FieldRule("net_income_reported", "income", (
+        "чистая прибыль", "прибыль", "прибыль за год", "чистая прибыль за год",
+        "прибыль за отчетный год", "чистая прибыль за отчетный год",
+        "прибыль за период", "чистая прибыль за период",
+        "profit for the year", "net profit", "net profit for the year", "net income",
+    )),
+    FieldRule("net_interest_income", "income", (
+        "чистые процентные доходы*", "net interest income*",
+    ), report_types=_BANK),
+    FieldRule("fee_commission_income", "income", (
+        "чистые комиссионные доходы*", "net fee and commission income*",
+    ), report_types=_BANK),
+    # ── ОДДС ──
+    FieldRule("operating_cash_flow", "cash_flow", (
+        "чист* денежн* операционной деятельности",
+        "net cash * operating activities",
+        "net cash from operating activities",
+    ), activity="operating"),
+    FieldRule("capex", "cash_flow", (
+        "капитальные затраты*", "капитальные вложения*",
+        "приобретение основных средств и нематериальных активов*",
+        "purchase of property plant and equipment and intangible assets*",
+        "capital expenditure*",
+    ), activity="investing", absolute=True, report_types=_GENERAL),
+    FieldRule("capex", "cash_flow", (
+        "приобретение основных средств*", "приобретение нематериальных активов*",
+        "purchase of property plant and equipment*", "purchase of intangible assets*",
+        "purchases of property plant and equipment*", "purchases of intangible assets*",
+    ), confidence="medium", combine="sum", activity="investing", absolute=True,
+        report_types=_GENERAL),
+    FieldRule("lease_principal", "cash_flow", (
+        "погашение обязательств* по аренде*", "погашение основной суммы * аренд*",
+        "выплат* по обязательствам по аренде*", "выплат* обязательств* по аренде*",
+        "платежи по аренде*",
+        "payment of lease liabilities*", "payments of lease liabilities*",
+        "repayment of lease liabilities*", "principal elements of lease payments*",
+    ), activity="financing", absolute=True, report_types=_GENERAL),
+    FieldRule("interest_paid", "cash_flow", (
+        "проценты уплаченные*", "уплаченные проценты*", "проценты выплаченные*",
+        "interest paid*",
+    ), activity="financing", absolute=True, report_types=_GENERAL),
+    FieldRule("depreciation_amortization", "cash_flow", (
+        "износ и амортизация*", "амортизация и износ*", "износ истощение и амортизация*",
+        "амортизация основных средств и нематериальных активов*",
+        "амортизация", "depreciation and amortisation*", "depreciation and amortization*",
+        "depreciation depletion and amortisation*", "depreciation depletion and amortization*",
+    ), activity="operating", absolute=True, report_types=_GENERAL),
+    # В сжатом ОДДС амортизации нет — берём строку расходов ОПиУ.
+    FieldRule("depreciation_amortization", "income", (
+        "износ и амортизация*", "износ истощение и амортизация*",
+        "амортизация основных средств и нематериальных активов*",
+        "depreciation and amortisation*", "depreciation and amortization*",
+        "depreciation depletion and amortisation*", "depreciation depletion and amortization*",
+    ), confidence="medium", absolute=True, report_types=_GENERAL),
+)
+
+# Поля, которые умеет читать таблица (для подсказок и логов).
+TABLE_FIELDS: tuple[str, ...] = tuple(dict.fromkeys(rule.field for rule in FIELD_RULES))
+
+
+# ─── Нормализация ───────────────────────────────────────────────────────────
+
+
+_PUNCT_RE = re.compile(r"[«»\"'“”„`’,;:()\[\]/]+")
+_FOOTNOTE_RE = re.compile(r"(?:\s+\d{1,2}(?:\s*,\s*\d{1,2})*|\*+)$")
+
+
+def normalize_label(text: str) -> str:
+    """Подпись строки для сравнения: регистр, ё, кавычки, скобки, сноски."""
+    text = text.lower().replace("ё", "е").replace("–", "-").replace("—", "-")
+    text = _PUNCT_RE.sub(" ", text)
+    text = re.sub(r"\s+", " ", text).strip(" .-")
+    return _FOOTNOTE_RE.sub("", text).strip(" .-")
+
+
+_DASHES = {"-", "–", "—", "−"}
+_NUM_TOKEN_RE = re.compile(r"^\(?[-−–]?\d[\d\s,.'’]*\)?$")
+_PIECE_RE = re.compile(r"^\d{3}(?:[.,]\d+)?\)?$")
+_YEAR_RE = re.compile(r"^(?:\d{1,2}[./]\d{1,2}[./])?((?:19|20)\d{2})(?:г\.?|года?)?[.,]?$")
+
+
+def _is_numeric(text: str) -> bool:
+    return text in _DASHES or bool(_NUM_TOKEN_RE.match(text))
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """«(1 426 264)» → -1426264.0, «-» → 0.0, «1,234,567» и «1'234'567» → 1234567.0."""
+    text = re.sub(r"[\s'’]", "", text)
+    if text in _DASHES:
+        return 0.0
+    negative = False
+    if text.startswith("(") and text.endswith(")"):
+        negative, text = True, text[1:-1]
+    if text[:1] in _DASHES:
+        negative, text = True, text[1:]
+    if re.fullmatch(r"\d{1,3}(?:,\d{3})+", text):
+        text = text.replace(",", "")
+    elif re.fullmatch(r"\d{1,3}(?:\.\d{3}){2,}", text):
+        text = text.replace(".", "")
+    else:
+        text = text.replace(",", ".")
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+# ─── Строки страницы ────────────────────────────────────────────────────────
+
+
+@dataclass
+class _Line:
+    words: list[Word]
+
+    @property
+    def text(self) -> str:
+        return " ".join(str(w[4]) for w in self.words)
+
+
+def _group_lines(words: Iterable[Word]) -> list[_Line]:
+    """Слова → строки по вертикальному центру (допуск — половина высоты слова)."""
+    items = sorted(
+        (w for w in words if str(w[4]).strip()),
+        key=lambda w: ((w[1] + w[3]) / 2, w[0]),
+    )
+    lines: list[tuple[float, float, list[Word]]] = []  # (центр, допуск, слова)
+    for w in items:
+        center = (w[1] + w[3]) / 2
+        if lines and abs(center - lines[-1][0]) <= lines[-1][1]:
+            lines[-1][2].append(w)
+            continue
+        lines.append((center, max(1.5, (w[3] - w[1]) * 0.5), [w]))
+    return [_Line(sorted(ws, key=lambda w: w[0])) for _, _, ws in lines]
+
+
+def _line_years(line: _Line) -> dict[int, float]:
+    years: dict[int, float] = {}
+    for w in line.words:
+        m = _YEAR_RE.match(str(w[4]))
+        if m and int(m.group(1)) not in years:
+            years[int(m.group(1))] = float(w[2])
+    return years
+
+
+def _header_years(lines: list[_Line]) -> Optional[tuple[int, dict[int, float]]]:
+    """Шапка таблицы: (индекс строки, год → правый край колонки).
+
+    Обычно это первая строка с двумя и более годами. Отчёт без сравнительных
+    данных (одна колонка) узнаём по короткой строке с одним годом —
+    «Прим. 31 декабря 2023 г.»; длинная строка с годом — это заголовок.
+    """
+    for idx, line in enumerate(lines):
+        if len(_line_years(line)) >= 2:
+            return idx, _line_years(line)
+    for idx, line in enumerate(lines[:_TITLE_LINES + 4]):
+        years = _line_years(line)
+        if len(years) == 1 and len(line.words) <= _SINGLE_HEADER_MAX_WORDS:
+            return idx, years
+    return None
+
+
+@dataclass
+class _Row:
+    label: str
+    context: str           # последний заголовок-«:» (например «Чистая прибыль, относящаяся к:»)
+    activity: Optional[str]
+    value: Optional[float]
+
+
+_ACTIVITY_RE = (
+    ("operating", re.compile(r"операционн\w* деятельност|operating activit")),
+    ("investing", re.compile(r"инвестиционн\w* деятельност|investing activit")),
+    ("financing", re.compile(r"финансов\w* деятельност|financing activit")),
+)
+
+
+def _value_groups(words: list[Word]) -> list[tuple[int, float, float]]:
+    """Числовые группы строки: (индекс первого слова, правый край, значение).
+
+    Разряды «1 426 264» приходят отдельными словами с маленьким зазором —
+    склеиваем, пока следующее слово похоже на тройку цифр.
+    """
+    groups: list[tuple[int, float, float]] = []
+    i = 0
+    while i < len(words):
+        text = str(words[i][4])
+        if not _is_numeric(text):
+            i += 1
+            continue
+        start, parts, right = i, [text], float(words[i][2])
+        height = float(words[i][3] - words[i][1]) or 10.0
+        while (
+            i + 1 < len(words)
+            and parts[-1] not in _DASHES
+            and not parts[-1].endswith(")")
+            and _PIECE_RE.match(str(words[i + 1][4]))
+            and float(words[i + 1][0]) - right <= height * 0.6
+        ):
+            i += 1
+            parts.append(str(words[i][4]))
+            right = float(words[i][2])
+        value = parse_amount("".join(parts))
+        if value is not None:
+            groups.append((start, right, value))
+        i += 1
+    return groups
+
+
+def _table_rows(
+    lines: list[_Line], anchors: dict[int, float], year: int, activity: Optional[str],
+) -> tuple[list[_Row], Optional[str]]:
+    """Строки таблицы под шапкой; значение — из колонки года `year`."""
+    edges = sorted(anchors.values())
+    tolerance = (
+        min(b - a for a, b in zip(edges, edges[1:])) * 0.45
+        if len(edges) > 1 else _SINGLE_COLUMN_TOLERANCE
+    )
+    target = anchors[year]
+
+    rows: list[_Row] = []
+    pending: list[str] = []
+    context = ""
+    for line in lines:
+        groups = [
+            (start, right, value) for start, right, value in _value_groups(line.words)
+            if min(abs(right - edge) for edge in edges) <= tolerance
+        ]
+        if not groups:
+            text = line.text
+            norm = normalize_label(text)
+            for name, pattern in _ACTIVITY_RE:
+                if pattern.search(norm):
+                    activity = name
+            pending.append(text)
+            continue
+
+        label = normalize_label(" ".join(str(w[4]) for w in line.words[:groups[0][0]]))
+        head = " ".join(pending).strip()
+        if head.endswith(":"):
+            context = normalize_label(head)
+        elif head and label[:1].islower() and str(line.words[0][4])[:1].islower():
+            label = normalize_label(head + " " + label)
+        pending = []
+        # Итог раздела («… от операционной деятельности») сам называет раздел.
+        row_activity = next(
+            (name for name, pattern in _ACTIVITY_RE if pattern.search(label)), activity,
+        )
+        value = next(
+            (v for _, right, v in groups if abs(right - target) <= tolerance), None,
+        )
+        if label:
+            rows.append(_Row(label, context, row_activity, value))
+    return rows, activity
+
+
+# ─── Классификация страниц, единицы, валюта ─────────────────────────────────
+
+
+_TITLE_PATTERNS: tuple[tuple[str, re.Pattern[str]], ...] = (
+    ("cash_flow", re.compile(
+        r"отчет\w* о движении денежных средств|statements? of cash flows?|cash flow statement"
+    )),
+    ("income", re.compile(
+        r"отчет\w* о (?:совокупном доходе|прибыл\w* (?:и|или) убытк\w*|финансовых результатах)"
+        r"|statements? of (?:comprehensive income|profit or loss|income)|income statement"
+    )),
+    ("balance", re.compile(
+        r"отчет\w* о финансовом положении|бухгалтерский баланс|балансов\w+ отчет"
+        r"|statements? of financial position|balance sheet"
+    )),
+    # Отчёт об изменениях в капитале — тоже заголовок: он обрывает «продолжение».
+    ("equity", re.compile(r"отчет\w* об изменениях в (?:собственном )?капитале|changes in equity")),
+)
+
+_TITLE_LINES = 8
+_SINGLE_HEADER_MAX_WORDS = 6
+# Одна колонка: шапка бывает по центру колонки, а числа — по правому краю.
+_SINGLE_COLUMN_TOLERANCE = 40.0
+_TITLE_MAX_WORDS = 16
+
+_UNITS_RE = (
+    ("thousands", re.compile(r"в тысячах|тыс\.? ?(?:руб|долл|рос|\$)|in thousands|thousands of")),
+    ("millions", re.compile(r"в миллионах|млн\.? ?(?:руб|долл|рос|\$)|in millions|millions of")),
+    ("billions", re.compile(r"в миллиардах|млрд\.? ?(?:руб|долл|рос|\$)|in billions|billions of")),
+)
+
+_CURRENCY_RE = (
+    ("RUB", re.compile(r"рубл|руб\.|\bруб\b|\brub\b|roubles?|rubles?")),
+    ("USD", re.compile(r"долл|\busd\b|us\$|u\.s\. dollars|us dollars")),
+    ("EUR", re.compile(r"\bевро\b|\beur\b|euros?\b")),
+    ("CNY", re.compile(r"юан|\bcny\b|\brmb\b")),
+)
+
+
+def _statement_title(lines: list[_Line]) -> Optional[str]:
+    """Отчёт по заголовку страницы.
+
+    Заголовок — короткая строка с заглавной буквы, где название отчёта стоит
+    в начале («Консолидированный отчёт о …»): в примечаниях те же слова
+    встречаются посреди фразы («… отчетов о финансовом положении»).
+    """
+    for line in lines[:_TITLE_LINES]:
+        norm = normalize_label(line.text)
+        words = norm.split()
+        if (
+            not words or len(words) > _TITLE_MAX_WORDS or not line.text[:1].isupper()
+            or len(_line_years(line)) > 1  # подзаголовок таблицы в примечании
+        ):
+            continue
+        for name, pattern in _TITLE_PATTERNS:
+            m = pattern.search(norm)
+            if m and len(norm[:m.start()].split()) <= 3:
+                return name
+    return None
+
+
+def _units_and_currency(lines: list[_Line]) -> tuple[Optional[str], Optional[str]]:
+    """Единицы и валюта из шапки страницы: «(в миллионах российских рублей)»."""
+    text = " ".join(line.text for line in lines[:_TITLE_LINES + 4]).lower().replace("ё", "е")
+    for scale, pattern in _UNITS_RE:
+        m = pattern.search(text)
+        if m:
+            tail = text[m.start():m.end() + 40]
+            currency = next((code for code, cre in _CURRENCY_RE if cre.search(tail)), None)
+            return scale, currency
+    return None, None
+
+
+# ─── Результат ──────────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class TableValue:
+    """Поле, прочитанное из таблицы: значение в исходных единицах и откуда оно."""
+    value: float
+    confidence: str  # high | medium | low
+    page: int        # 0-индексированная
+    label: str
+
+
+@dataclass
+class TableExtraction:
+    """Итог разбора таблиц: поля, единицы и какие страницы чем оказались."""
+    values: dict[str, TableValue] = field(default_factory=dict)
+    units_scale: Optional[str] = None
+    currency: Optional[str] = None
+    statements: dict[int, str] = field(default_factory=dict)  # страница → balance/income/cash_flow
+    warnings: list[str] = field(default_factory=list)
+
+    def trusted(self) -> dict[str, TableValue]:
+        return {k: v for k, v in self.values.items() if v.confidence == "high"}
+
+    def to_report(
+        self, *, report_type: str, fiscal_year: Optional[int], trusted_only: bool = False,
+    ) -> ExtractedReport:
+        """Найденные поля (или только уверенные) одним ExtractedReport в исходных единицах."""
+        values = self.trusted() if trusted_only else self.values
+        data: dict[str, Any] = {k: v.value for k, v in values.items()}
+        data.update(
+            report_type=report_type,
+            fiscal_year=fiscal_year,
+            units_scale=self.units_scale or "millions",
+            confidence="high" if values and all(
+                v.confidence == "high" for v in values.values()
+            ) else "medium",
+        )
+        if self.currency:
+            data["currency"] = self.currency
+        return ExtractedReport.model_validate(data)
+
+    def summary(self) -> str:
+        """Строка для extraction_notes: что прочитано из таблиц и где."""
+        pages = ", ".join(
+            f"{name} — стр. {idx + 1}" for idx, name in sorted(self.statements.items())
+        )
+        trusted = sorted(self.trusted())
+        parts = [
+            f"Из таблиц PDF ({pages or 'страницы не найдены'}; единицы: "
+            f"{self.units_scale or '?'}): {', '.join(trusted) or 'ничего'}."
+        ]
+        unsure = sorted(set(self.values) - set(trusted))
+        if unsure:
+            parts.append(f"Без уверенности: {', '.join(unsure)}.")
+        parts.extend(self.warnings)
+        return " ".join(parts)
+
+
+# ─── Разбор ─────────────────────────────────────────────────────────────────
+
+
+def _match_rule(rule: FieldRule, rows: list[tuple[int, _Row]]) -> Optional[tuple[float, int, str, bool]]:
+    """(значение, страница, подпись, противоречие) по правилу или None."""
+    candidates = [
+        (page, row) for page, row in rows
+        if row.value is not None and (rule.activity is None or row.activity == rule.activity)
+    ]
+
+    def matches(row: _Row, alias: str) -> bool:
+        if fnmatchcase(row.label, alias):
+            return True
+        return bool(row.context) and fnmatchcase(f"{row.context} {row.label}", alias)
+
+    if rule.combine == "sum":
+        picked = [
+            (page, row) for page, row in candidates
+            if any(matches(row, alias) for alias in rule.aliases)
+        ]
+        if not picked:
+            return None
+        total = sum(abs(row.value) if rule.absolute else row.value for _, row in picked)
+        label = " + ".join(row.label for _, row in picked)
+        return total, picked[0][0], label, False
+
+    for alias in rule.aliases:
+        hits = [(page, row) for page, row in candidates if matches(row, alias)]
+        if hits:
+            page, row = hits[0]
+            value = abs(row.value) if rule.absolute else row.value
+            # Одна и та же подпись с разными числами (итог раздела и итог
+            # примечания) — не угадываем, отдаём LLM.
+            conflict = len({r.value for _, r in hits}) > 1
+            return value, page, row.label, conflict
+    return None
+
+
+def extract_tables(
+    page_words: dict[int, list[Word]],
+    *,
+    expected_year: Optional[int],
+    report_type: str = "general",
+) -> TableExtraction:
+    """Прочитать баланс, ОПиУ и ОДДС из слов выбранных страниц.
+
+    Страница относится к отчёту по заголовку в первых строках; страница без
+    заголовка, но с шапкой лет сразу после отчёта считается его продолжением.
+    Колонка — `expected_year` (без него — самый поздний год шапки); если
+    такого года в шапке нет, страница пропускается: чужой год хуже пропуска.
+    """
+    result = TableExtraction()
+    rows: dict[str, list[tuple[int, _Row]]] = {"balance": [], "income": [], "cash_flow": []}
+    units: dict[int, tuple[Optional[str], Optional[str]]] = {}
+    previous: Optional[tuple[int, str]] = None  # последняя страница С заголовком
+    activity: Optional[str] = None
+
+    for page in sorted(page_words):
+        lines = _group_lines(page_words[page])
+        if not lines:
+            continue
+        title = _statement_title(lines)
+        if title is not None:
+            previous = (page, title)
+        elif previous and previous[0] == page - 1:
+            # Продолжение — только одна страница сразу после заголовка.
+            title = previous[1]
+        if title not in rows:
+            continue
+        # Берём только первый блок страниц отчёта: дальше идут примечания и
+        # сегменты с похожими таблицами и подписями.
+        seen = [p for p, name in result.statements.items() if name == title]
+        if seen and max(seen) != page - 1:
+            continue
+        header = _header_years(lines)
+        if header is None:
+            continue
+        idx, anchors = header
+        column_year = (
+            expected_year if expected_year in anchors
+            else (None if expected_year else max(anchors))
+        )
+        if column_year is None:
+            logger.info("Стр. %d: в шапке нет %s года — пропускаем.", page + 1, expected_year)
+            continue
+        if title != "cash_flow" or result.statements.get(page - 1) != "cash_flow":
+            activity = None
+        page_rows, activity = _table_rows(lines[idx + 1:], anchors, column_year, activity)
+        if title != "cash_flow":
+            for row in page_rows:
+                row.activity = None
+        rows[title].extend((page, row) for row in page_rows)
+        result.statements[page] = title
+        units[page] = _units_and_currency(lines)
+
+    known = [scale for scale, _ in units.values() if scale]
+    result.units_scale = Counter(known).most_common(1)[0][0] if known else None
+    currencies = [cur for _, cur in units.values() if cur]
+    result.currency = Counter(currencies).most_common(1)[0][0] if currencies else None
+    if len(set(known)) > 1:
+        result.warnings.append(f"Единицы на страницах разные: {sorted(set(known))}.")
+
+    for rule in FIELD_RULES:
+        if rule.field in result.values or report_type not in rule.report_types:
+            continue
+        found = _match_rule(rule, rows[rule.statement])
+        if found is None:
+            continue
+        value, page, label, conflict = found
+        confidence = rule.confidence
+        page_scale = units.get(page, (None, None))[0]
+        if conflict or result.units_scale is None or len(set(known)) > 1:
+            confidence = "low"
+        elif page_scale is None and confidence == "high":
+            confidence = "medium"
+        result.values[rule.field] = TableValue(value, confidence, page, label)
+
+    _cross_check(result, rows["balance"])
+    _fill_net_income_pair(result)
+    return result
+
+
+def _downgrade(result: TableExtraction, name: str, reason: str) -> None:
+    value = result.values.get(name)
+    if value is not None and value.confidence != "low":
+        result.values[name] = TableValue(value.value, "low", value.page, value.label)
+        result.warnings.append(reason)
+
+
+def _close(a: float, b: float) -> bool:
+    """Итоги таблицы сходятся точно, с точностью до округления подытогов."""
+    return abs(a - b) <= max(2.0, abs(b) * 1e-6)
+
+
+def _cross_check(result: TableExtraction, balance_rows: list[tuple[int, _Row]]) -> None:
+    """Балансовое тождество: активы = обязательства + капитал (итоговые строки)."""
+    totals = {
+        row.label: row.value for _, row in balance_rows if row.value is not None
+    }
+    assets = result.values.get("total_assets")
+    liabilities_and_equity = next(
+        (totals[k] for k in (
+            "итого обязательства и капитал", "итого капитал и обязательства",
+            "итого обязательства и собственный капитал", "итого пассивы",
+            "total liabilities and equity", "total equity and liabilities",
+        ) if k in totals),
+        None,
+    )
+    if assets and liabilities_and_equity is not None and not _close(assets.value, liabilities_and_equity):
+        _downgrade(result, "total_assets", "Итог активов не равен итогу пассивов.")
+
+    liabilities = result.values.get("total_liabilities")
+    total_equity = next(
+        (totals[k] for k in ("итого капитал", "итого собственный капитал", "total equity")
+         if k in totals),
+        None,
+    )
+    if assets and liabilities and total_equity is not None and not _close(
+        assets.value, liabilities.value + total_equity,
+    ):
+        _downgrade(result, "total_liabilities", "Обязательства + капитал ≠ активы.")
+
+
+def _fill_net_income_pair(result: TableExtraction) -> None:
+    """Без строки распределения прибыли net_income = отчётная прибыль (см. схему).
+
+    Уверенность medium: строка распределения могла не попасть в разбор, и
+    тогда LLM дозаполнит поле.
+    """
+    reported = result.values.get("net_income_reported")
+    if reported and "net_income" not in result.values:
+        result.values["net_income"] = TableValue(
+            reported.value, "medium", reported.page, reported.label,
+        )
+
+
+__all__ = (
+    "FIELD_RULES",
+    "FieldRule",
+    "TABLE_FIELDS",
+    "TableExtraction",
+    "TableValue",
+    "extract_tables",
+    "normalize_label",
+    "parse_amount",
+)
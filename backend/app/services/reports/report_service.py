@@ -1,3 +1,5 @@
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
@@ -7,6 +9,8 @@ from app.models.company import Company
 from app.schemas import FinancialReportCreate
 from app.schemas.report import ReportFigures
 from app.services.analysis import multiplier_service
+from app.services.companies.data_version import bump_data_version
+from app.services.dividends.dividend_facts import refresh_dividend_facts
 from app.models.enums import company_type_to_report_type
 from app.utils.date_parse import parse_date
 
@@ -76,12 +80,13 @@ def create_report(db: Session, report_data: FinancialReportCreate) -> FinancialR
         ),
     )
     db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
-    
-    # Если отчет содержит дивиденды, обновляем год начала выплат
+    bump_data_version(db, [report_data.company_id])
+    # Если отчет содержит дивиденды, обновляем год начала выплат — в той же транзакции
     if report_data.dividends_paid:
         _update_dividend_start_year_if_needed(db, report_data.company_id, report_data.fiscal_year)
+    refresh_dividend_facts(db, [report_data.company_id])
+    db.commit()
+    db.refresh(db_report)
 
     # Автоматически кэшируем report_based мультипликаторы
     multiplier_service.save_report_based_multiplier(db=db, report=db_report)
@@ -93,6 +98,7 @@ def _update_dividend_start_year_if_needed(db: Session, company_id: int, report_y
     """
     Внутренняя функция для обновления года начала выплаты дивидендов.
     Обновляет только если текущий год раньше сохраненного или если год не установлен.
+    Без commit: вызывается в транзакции записи отчёта.
     
     Args:
         db: Сессия базы данных
@@ -103,7 +109,6 @@ def _update_dividend_start_year_if_needed(db: Session, company_id: int, report_y
     if company:
         if company.dividend_start_year is None or report_year < company.dividend_start_year:
             company.dividend_start_year = report_year  # type: ignore
-            db.commit()
 
 
 def get_report_by_id(db: Session, report_id: int) -> Optional[FinancialReport]:
@@ -117,7 +122,59 @@ def get_report_by_id(db: Session, report_id: int) -> Optional[FinancialReport]:
     Returns:
         Объект FinancialReport или None, если не найден
     """
-    return db.query(FinancialReport).filter(FinancialReport.id == report_id).first()
+    return db.get(FinancialReport, report_id)
+
+
+async def aget_report_by_id(db: AsyncSession, report_id: int) -> Optional[FinancialReport]:
+    return await db.get(FinancialReport, report_id)
+
+
+# ─── Чтение списков ──────────────────────────────────────────────────────────
+# Запрос собирается один раз в *_stmt и выполняется двумя путями: sync-сессией
+# (воркер, пишущие эндпоинты) и AsyncSession (читающие эндпоинты API, функции
+# с префиксом «a»). Так оба пути гарантированно отдают одно и то же.
+
+
+def _reports_by_company_stmt(company_id: int, skip: int, limit: int) -> Select:
+    return (
+        select(FinancialReport)
+        .where(FinancialReport.company_id == company_id)
+        .order_by(FinancialReport.report_date.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+
+
+def _all_reports_stmt(skip: int, limit: int) -> Select:
+    return (
+        select(FinancialReport)
+        .order_by(FinancialReport.report_date.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+
+
+def _latest_report_stmt(company_id: int) -> Select:
+    return (
+        select(FinancialReport)
+        .where(FinancialReport.company_id == company_id)
+        .order_by(FinancialReport.report_date.desc())
+        .limit(1)
+    )
+
+
+def _unverified_reports_stmt(company_id: Optional[int], skip: int, limit: int) -> Select:
+    stmt = select(FinancialReport).where(FinancialReport.verified_by_analyst.is_(False))
+    if company_id is not None:
+        stmt = stmt.where(FinancialReport.company_id == company_id)
+    return stmt.order_by(FinancialReport.report_date.desc()).offset(skip).limit(limit)
+
+
+def _counts_by_company_stmt(*, unverified_only: bool) -> Select:
+    stmt = select(FinancialReport.company_id, func.count(FinancialReport.id))
+    if unverified_only:
+        stmt = stmt.where(FinancialReport.verified_by_analyst.is_(False))
+    return stmt.group_by(FinancialReport.company_id)
 
 
 def get_reports_by_company(
@@ -138,14 +195,13 @@ def get_reports_by_company(
     Returns:
         Список объектов FinancialReport
     """
-    return (
-        db.query(FinancialReport)
-        .filter(FinancialReport.company_id == company_id)
-        .order_by(FinancialReport.report_date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    return list(db.scalars(_reports_by_company_stmt(company_id, skip, limit)))
+
+
+async def aget_reports_by_company(
+    db: AsyncSession, company_id: int, skip: int = 0, limit: int = 100
+) -> List[FinancialReport]:
+    return list(await db.scalars(_reports_by_company_stmt(company_id, skip, limit)))
 
 
 def get_all_reports(db: Session, skip: int = 0, limit: int = 200) -> List[FinancialReport]:
@@ -160,13 +216,11 @@ def get_all_reports(db: Session, skip: int = 0, limit: int = 200) -> List[Financ
     Returns:
         Список объектов FinancialReport
     """
-    return (
-        db.query(FinancialReport)
-        .order_by(FinancialReport.report_date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    return list(db.scalars(_all_reports_stmt(skip, limit)))
+
+
+async def aget_all_reports(db: AsyncSession, skip: int = 0, limit: int = 200) -> List[FinancialReport]:
+    return list(await db.scalars(_all_reports_stmt(skip, limit)))
 
 
 def update_report(
@@ -194,6 +248,10 @@ def update_report(
         raise ValueError(f"Некорректная report_date: {report_data.report_date!r}")
     filing_date_obj = parse_date(report_data.filing_date) if report_data.filing_date else None
     
+    # Отчёт может переехать к другой компании — меняются данные обеих.
+    touched_companies = [db_report.company_id, report_data.company_id]
+    bump_data_version(db, touched_companies)
+
     # Обновляем поля
     db_report.company_id = report_data.company_id  # type: ignore
     # Атрибуты отчёта
@@ -231,6 +289,7 @@ def update_report(
     # extraction_* поля — технические и не меняются через обычный апдейт.
     db_report.extraction_notes = report_data.extraction_notes  # type: ignore
 
+    refresh_dividend_facts(db, touched_companies)
     db.commit()
     db.refresh(db_report)
 
@@ -270,6 +329,8 @@ def delete_report(db: Session, report_id: int) -> bool:
 
     # 2) Удаляем сам отчёт.
     db.delete(db_report)
+    bump_data_version(db, [db_report.company_id])
+    refresh_dividend_facts(db, [db_report.company_id])
     db.commit()
     return True
 
@@ -285,12 +346,11 @@ def get_latest_report(db: Session, company_id: int) -> Optional[FinancialReport]
     Returns:
         Объект FinancialReport или None, если отчетов нет
     """
-    return (
-        db.query(FinancialReport)
-        .filter(FinancialReport.company_id == company_id)
-        .order_by(FinancialReport.report_date.desc())
-        .first()
-    )
+    return db.scalars(_latest_report_stmt(company_id)).first()
+
+
+async def aget_latest_report(db: AsyncSession, company_id: int) -> Optional[FinancialReport]:
+    return (await db.scalars(_latest_report_stmt(company_id))).first()
 
 
 # ─── Верификация отчётов аналитиком ──────────────────────────────────────────
@@ -303,6 +363,7 @@ def mark_report_verified(db: Session, report_id: int) -> Optional[FinancialRepor
         return None
     db_report.verified_by_analyst = True  # type: ignore
     db_report.verified_at = datetime.now(timezone.utc)  # type: ignore
+    bump_data_version(db, [db_report.company_id])
     db.commit()
     db.refresh(db_report)
     return db_report
@@ -315,6 +376,7 @@ def mark_report_unverified(db: Session, report_id: int) -> Optional[FinancialRep
         return None
     db_report.verified_by_analyst = False  # type: ignore
     db_report.verified_at = None  # type: ignore
+    bump_data_version(db, [db_report.company_id])
     db.commit()
     db.refresh(db_report)
     return db_report
@@ -330,17 +392,16 @@ def get_unverified_reports(
     Возвращает список непроверенных отчётов (verified_by_analyst=False),
     опционально отфильтрованных по company_id.
     """
-    query = db.query(FinancialReport).filter(
-        FinancialReport.verified_by_analyst.is_(False)
-    )
-    if company_id is not None:
-        query = query.filter(FinancialReport.company_id == company_id)
-    return (
-        query.order_by(FinancialReport.report_date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    return list(db.scalars(_unverified_reports_stmt(company_id, skip, limit)))
+
+
+async def aget_unverified_reports(
+    db: AsyncSession,
+    company_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 200,
+) -> List[FinancialReport]:
+    return list(await db.scalars(_unverified_reports_stmt(company_id, skip, limit)))
 
 
 def count_unverified_by_company(db: Session) -> dict[int, int]:
@@ -348,17 +409,12 @@ def count_unverified_by_company(db: Session) -> dict[int, int]:
     Возвращает словарь {company_id: число непроверенных отчётов}.
     Используется фронтом, чтобы подсветить компании с неподтверждёнными данными.
     """
-    from sqlalchemy import func as sa_func
-
-    rows = (
-        db.query(
-            FinancialReport.company_id,
-            sa_func.count(FinancialReport.id),
-        )
-        .filter(FinancialReport.verified_by_analyst.is_(False))
-        .group_by(FinancialReport.company_id)
-        .all()
-    )
+    rows = db.execute(_counts_by_company_stmt(unverified_only=True))
+    return {company_id: count for company_id, count in rows}
+
+
+async def acount_unverified_by_company(db: AsyncSession) -> dict[int, int]:
+    rows = await db.execute(_counts_by_company_stmt(unverified_only=True))
     return {company_id: count for company_id, count in rows}
 
 
@@ -367,14 +423,10 @@ def count_reports_by_company(db: Session) -> dict[int, int]:
     Число финансовых отчётов по каждой компании (все отчёты).
     Компании без отчётов в результат не попадают — на фронте считают как 0.
     """
-    from sqlalchemy import func as sa_func
-
-    rows = (
-        db.query(
-            FinancialReport.company_id,
-            sa_func.count(FinancialReport.id),
-        )
-        .group_by(FinancialReport.company_id)
-        .all()
-    )
+    rows = db.execute(_counts_by_company_stmt(unverified_only=False))
+    return {company_id: count for company_id, count in rows}
+
+
+async def acount_reports_by_company(db: AsyncSession) -> dict[int, int]:
+    rows = await db.execute(_counts_by_company_stmt(unverified_only=False))
     return {company_id: count for company_id, count in rows}
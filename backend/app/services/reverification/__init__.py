@@ -0,0 +1 @@
+"""Перепроверка отчётов БД по исходным PDF: карточки качества извлечения."""
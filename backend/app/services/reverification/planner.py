@@ -0,0 +1,105 @@
+"""Какие отчёты перепроверять: версия экстрактора и отпечатки PDF.
+
+Перепроверка инкрементальная: карточка отчёта хранит версию экстрактора и
+отпечаток PDF, по которым она получена. Отчёт попадает в прогон, только если
+для текущей версии карточки нет или PDF на диске с тех пор заменили.
+"""
+from __future__ import annotations
+
+import hashlib
+import stat
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.financial_report import FinancialReport
+from app.models.reverification import ReportScorecard
+
+# Файлы, от которых зависит ответ экстрактора: промпты, схемы ответа,
+# разбивка по разделам. Поменяли любой — версия другая, отчёты проверяются заново.
+_PARSER_DIR = Path(__file__).resolve().parent.parent / "report_parser"
+_VERSIONED_FILES = ("prompts.py", "schemas.py", "sections.py", "table_extractor.py")
+
+
+def extractor_version() -> str:
+    """
+    "провайдер:модель#хэш": модель и хэш того, что влияет на извлечение, —
+    промптов, схем, vision-модели, режима разделов, табличного пути и
+    бюджета токенов.
+    """
+    digest = hashlib.sha1()
+    for part in (
+        settings.extraction_model_label,
+        settings.LLM_VISION_MODEL,
+        str(settings.LLM_SECTION_MODE),
+        str(settings.LLM_PAGE_TOKEN_BUDGET),
+        str(settings.LLM_TABLE_FAST_PATH),
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    for name in _VERSIONED_FILES:
+        digest.update((_PARSER_DIR / name).read_bytes())
+    return f"{settings.extraction_model_label}#{digest.hexdigest()[:12]}"
+
+
+# ---------------------------------------------------------------------------
+# Выбор отчётов
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Candidate:
+    report_id: int
+    company_id: int
+    pdf_path: Path
+    fingerprint: str
+
+
+def pdf_fingerprint(path: Path) -> Optional[str]:
+    """"размер:mtime_ns" файла; None — файла нет (или это не файл)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def plan_candidates(
+    db: Session, version: str, *, company_id: Optional[int] = None,
+) -> tuple[list[Candidate], int]:
+    """
+    Отчёты с PDF на диске, ещё не проверенные версией `version` по этому же
+    файлу, и число уже проверенных (их прогон пропускает).
+    """
+    stmt = (
+        select(FinancialReport.id, FinancialReport.company_id, FinancialReport.source_pdf_path)
+        .where(FinancialReport.source_pdf_path.isnot(None))
+        .where(FinancialReport.source_pdf_path != "")
+        .order_by(FinancialReport.id)
+    )
+    if company_id is not None:
+        stmt = stmt.where(FinancialReport.company_id == company_id)
+    checked = dict(
+        db.execute(
+            select(ReportScorecard.report_id, ReportScorecard.pdf_fingerprint)
+            .where(ReportScorecard.extractor_version == version)
+        ).all()
+    )
+
+    todo: list[Candidate] = []
+    unchanged = 0
+    for report_id, report_company_id, raw_path in db.execute(stmt):
+        path = Path(raw_path).expanduser()
+        fingerprint = pdf_fingerprint(path)
+        if fingerprint is None:
+            continue
+        if checked.get(report_id) == fingerprint:
+            unchanged += 1
+            continue
+        todo.append(Candidate(report_id, report_company_id, path, fingerprint))
+    return todo, unchanged
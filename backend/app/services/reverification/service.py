@@ -0,0 +1,214 @@
+"""CRUD и управление прогонами перепроверки, сводная точность по карточкам."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.company import Company
+from app.models.reverification import ReportFieldScore, ReportScorecard, ReverificationRun
+from app.services.reverification.planner import extractor_version
+from app.services.reverification.worker import is_worker_alive, start_worker
+
+GROUP_BY = ("field", "issuer", "model")
+
+# Статусы поля, которые входят в точность: поле было у аналитика.
+_SCORED = ("match", "close", "mismatch", "missing_ai")
+_CORRECT = ("match", "close")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# Прогоны
+# ---------------------------------------------------------------------------
+
+def get_run(db: Session, run_id: int) -> Optional[ReverificationRun]:
+    return db.get(ReverificationRun, run_id)
+
+
+def list_runs(db: Session, limit: int = 20) -> list[ReverificationRun]:
+    return list(
+        db.scalars(
+            select(ReverificationRun).order_by(ReverificationRun.id.desc()).limit(limit)
+        )
+    )
+
+
+def create_run(
+    db: Session, *, company_id: Optional[int] = None, concurrency: Optional[int] = None,
+) -> ReverificationRun:
+    now = _utcnow()
+    run = ReverificationRun(
+        status="pending",
+        extractor_version=extractor_version(),
+        model=settings.extraction_model_label,
+        company_id=company_id,
+        concurrency=max(1, concurrency or settings.REVERIFY_CONCURRENCY),
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def start_run(db: Session, run_id: int) -> ReverificationRun:
+    """Запуск и продолжение после паузы: воркер возьмёт только непроверенные отчёты."""
+    run = get_run(db, run_id)
+    if not run:
+        raise LookupError(f"Прогон {run_id} не найден")
+    if run.status in ("completed", "cancelled"):
+        raise ValueError(f"Прогон в статусе {run.status} нельзя запустить")
+    if run.status == "running" and is_worker_alive(run_id):
+        return run
+    if run.extractor_version != extractor_version():
+        raise ValueError(
+            "Промпты или модель изменились после создания прогона — создайте новый прогон."
+        )
+
+    run.status = "running"
+    if run.started_at is None:
+        run.started_at = _utcnow()
+    run.finished_at = None
+    run.last_message = "Запуск…"
+    run.updated_at = _utcnow()
+    db.commit()
+    start_worker(run_id)
+    db.refresh(run)
+    return run
+
+
+def pause_run(db: Session, run_id: int) -> ReverificationRun:
+    """Мягкая пауза: начатые отчёты доделаются, новые не начнутся."""
+    run = get_run(db, run_id)
+    if not run:
+        raise LookupError(f"Прогон {run_id} не найден")
+    if run.status != "running":
+        raise ValueError(f"Пауза доступна только для running (сейчас {run.status})")
+    run.status = "paused"
+    run.last_message = "Пауза запрошена — после начатых отчётов остановимся."
+    run.updated_at = _utcnow()
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def cancel_run(db: Session, run_id: int) -> ReverificationRun:
+    run = get_run(db, run_id)
+    if not run:
+        raise LookupError(f"Прогон {run_id} не найден")
+    if run.status in ("completed", "cancelled"):
+        return run
+    run.status = "cancelled"
+    run.finished_at = _utcnow()
+    run.last_message = "Отменено пользователем"
+    run.updated_at = _utcnow()
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+# ---------------------------------------------------------------------------
+# Сводная точность
+# ---------------------------------------------------------------------------
+
+@dataclass
+class AccuracyRow:
+    key: str
+    label: str
+    reports: int
+    errors: int
+    correct: int
+    mismatched: int
+    missing_in_ai: int
+
+    @property
+    def accuracy(self) -> Optional[float]:
+        scored = self.correct + self.mismatched + self.missing_in_ai
+        return self.correct / scored if scored else None
+
+
+def _sum_if(condition) -> object:
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _by_field(db: Session, version: str) -> list[AccuracyRow]:
+    status = ReportFieldScore.status
+    stmt = (
+        select(
+            ReportFieldScore.field,
+            func.count(),
+            _sum_if(status.in_(_CORRECT)),
+            _sum_if(status == "mismatch"),
+            _sum_if(status == "missing_ai"),
+        )
+        .join(ReportScorecard, ReportScorecard.id == ReportFieldScore.scorecard_id)
+        .where(ReportScorecard.extractor_version == version)
+        .where(status.in_(_SCORED))
+        .group_by(ReportFieldScore.field)
+    )
+    return [
+        AccuracyRow(field, field, int(n), 0, int(ok), int(bad), int(miss))
+        for field, n, ok, bad, miss in db.execute(stmt)
+    ]
+
+
+def _scorecard_sums() -> tuple:
+    card = ReportScorecard
+    return (
+        func.count(),
+        _sum_if(card.status == "error"),
+        func.coalesce(func.sum(card.matched + card.close), 0),
+        func.coalesce(func.sum(card.mismatched), 0),
+        func.coalesce(func.sum(card.missing_in_ai), 0),
+    )
+
+
+def _by_issuer(db: Session, version: str) -> list[AccuracyRow]:
+    stmt = (
+        select(ReportScorecard.company_id, Company.ticker, *_scorecard_sums())
+        .join(Company, Company.id == ReportScorecard.company_id)
+        .where(ReportScorecard.extractor_version == version)
+        .group_by(ReportScorecard.company_id, Company.ticker)
+    )
+    return [
+        AccuracyRow(str(cid), ticker, int(n), int(err), int(ok), int(bad), int(miss))
+        for cid, ticker, n, err, ok, bad, miss in db.execute(stmt)
+    ]
+
+
+def _by_model(db: Session) -> list[AccuracyRow]:
+    stmt = (
+        select(ReportScorecard.extractor_version, ReportScorecard.model, *_scorecard_sums())
+        .group_by(ReportScorecard.extractor_version, ReportScorecard.model)
+    )
+    return [
+        AccuracyRow(version, model, int(n), int(err), int(ok), int(bad), int(miss))
+        for version, model, n, err, ok, bad, miss in db.execute(stmt)
+    ]
+
+
+def accuracy(
+    db: Session, group_by: str, *, version: Optional[str] = None,
+) -> list[AccuracyRow]:
+    """
+    Точность по полям, эмитентам или версиям экстрактора — худшие сверху.
+    field/issuer считаются по одной версии (по умолчанию текущей), model —
+    по всем, чтобы сравнить промпты и модели между собой.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by должен быть одним из {GROUP_BY}, получено {group_by!r}")
+    if group_by == "model":
+        rows = _by_model(db)
+    else:
+        version = version or extractor_version()
+        rows = _by_field(db, version) if group_by == "field" else _by_issuer(db, version)
+    return sorted(rows, key=lambda r: (r.accuracy is None, r.accuracy or 0.0, r.key))
@@ -0,0 +1,292 @@
+"""Воркер перепроверки — исполнитель фоновой задачи `reports.reverify`.
+
+Прогон проходит по отчётам с PDF на диске (`planner.plan_candidates`) и для
+каждого делает то же, что режим сравнения: извлечение LLM + diff с БД без
+записи в отчёт (`compare_pdf_with_existing`). Отчёты обрабатываются пулом
+потоков размером `ReverificationRun.concurrency` — время уходит на ожидание
+LLM, а не на CPU. У каждого потока своя сессия.
+
+Карточка отчёта коммитится сразу после его сверки, поэтому прогон
+возобновляем: после паузы, падения воркера или исчерпанной квоты повторный
+запуск возьмёт только отчёты без карточки для этой версии экстрактора.
+Временные ошибки LLM (сеть, 429) карточку не пишут — отчёт попадёт в
+следующий прогон; ошибки разбора пишут карточку со status="error", чтобы
+не тратить на тот же PDF токены каждую ночь.
+"""
+from __future__ import annotations
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models.company import Company
+from app.models.financial_report import FinancialReport
+from app.models.reverification import ReportFieldScore, ReportScorecard, ReverificationRun
+from app.services.reverification.planner import Candidate, extractor_version, plan_candidates
+from app.services.tasks.queue import enqueue, has_active_task
+from app.services.tasks.registry import REPORTS_REVERIFY
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _task_key(run_id: int) -> str:
+    return f"reverify:{run_id}"
+
+
+def is_worker_alive(run_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return has_active_task(db, kind=REPORTS_REVERIFY, dedupe_key=_task_key(run_id))
+    finally:
+        db.close()
+
+
+def start_worker(run_id: int) -> None:
+    """Поставить прогон в очередь воркера (повторная постановка — no-op)."""
+    db = SessionLocal()
+    try:
+        enqueue(db, REPORTS_REVERIFY, {"run_id": run_id}, dedupe_key=_task_key(run_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Один отчёт
+# ---------------------------------------------------------------------------
+
+def _score(summary: Any) -> Optional[float]:
+    correct = summary.matched + summary.close
+    scored = correct + summary.mismatched + summary.missing_in_ai
+    return correct / scored if scored else None
+
+
+def _save_scorecard(
+    db, candidate: Candidate, *, run_id: int, version: str, model: str,
+    result: Any = None, error: Optional[str] = None,
+) -> None:
+    previous = db.scalar(
+        select(ReportScorecard)
+        .where(ReportScorecard.report_id == candidate.report_id)
+        .where(ReportScorecard.extractor_version == version)
+    )
+    if previous is not None:
+        # Та же версия, но PDF заменили — старая карточка больше не про этот файл.
+        db.delete(previous)
+        db.flush()
+
+    card = ReportScorecard(
+        report_id=candidate.report_id,
+        company_id=candidate.company_id,
+        run_id=run_id,
+        extractor_version=version,
+        model=model,
+        pdf_fingerprint=candidate.fingerprint,
+        status="error" if error else "ok",
+        error=error,
+        created_at=_utcnow(),
+    )
+    if result is not None:
+        summary = result.summary
+        card.total_fields = summary.total_fields
+        card.matched = summary.matched
+        card.close = summary.close
+        card.mismatched = summary.mismatched
+        card.missing_in_ai = summary.missing_in_ai
+        card.missing_in_existing = summary.missing_in_existing
+        card.score = _score(summary)
+        card.max_pct_diff = summary.max_pct_diff
+        card.fields = [
+            ReportFieldScore(field=d.field, status=d.status, pct_diff=d.pct_diff)
+            for d in result.diffs
+        ]
+    db.add(card)
+    db.commit()
+
+
+def _verify_one(candidate: Candidate, *, run_id: int, version: str, model: str) -> str:
+    """Сверить отчёт с PDF и записать карточку. Возвращает "ok" | "error" | "gone"."""
+    # Импорт здесь: PyMuPDF и клиент LLM нужны только процессу воркера.
+    from app.services.report_parser.extractor_service import compare_pdf_with_existing
+    from app.services.report_parser.llm_client import (
+        LLMNotConfiguredError,
+        LLMQuotaExhaustedError,
+        LLMTransientError,
+    )
+
+    db = SessionLocal()
+    try:
+        report = db.get(FinancialReport, candidate.report_id)
+        if report is None:
+            return "gone"
+        company = db.get(Company, report.company_id)
+        try:
+            result = compare_pdf_with_existing(
+                db,
+                pdf_source=candidate.pdf_path,
+                company=company,
+                fiscal_year=report.fiscal_year,
+                period_type=report.period_type,
+                fiscal_quarter=report.fiscal_quarter,
+                accounting_standard=report.accounting_standard,
+                consolidated=report.consolidated,
+            )
+        except (LLMTransientError, LLMQuotaExhaustedError, LLMNotConfiguredError):
+            raise
+        except (RuntimeError, ValueError) as exc:
+            # Нет таблиц в PDF, невалидный ответ модели — повтор не поможет.
+            logger.warning("Reverify report_id=%s: %s", candidate.report_id, exc)
+            db.rollback()
+            _save_scorecard(db, candidate, run_id=run_id, version=version, model=model,
+                            error=str(exc)[:2000])
+            return "error"
+        _save_scorecard(db, candidate, run_id=run_id, version=version, model=model,
+                        result=result)
+        return "ok"
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Прогон
+# ---------------------------------------------------------------------------
+
+def _load_run(run_id: int) -> Optional[tuple[str, str, Optional[int], int]]:
+    """Параметры running-прогона; None — прогона нет или он не running."""
+    db = SessionLocal()
+    try:
+        run = db.get(ReverificationRun, run_id)
+        if run is None:
+            logger.error("Reverification run %s not found", run_id)
+            return None
+        if run.status != "running":
+            logger.info("Reverification run %s stopped with status=%s", run_id, run.status)
+            return None
+        if run.extractor_version != extractor_version():
+            run.status = "paused"
+            run.last_message = (
+                "Промпты или модель изменились после создания прогона — создайте новый прогон."
+            )
+            run.updated_at = _utcnow()
+            db.commit()
+            return None
+        return run.extractor_version, run.model, run.company_id, max(1, run.concurrency)
+    finally:
+        db.close()
+
+
+def _plan(run_id: int, version: str, company_id: Optional[int]) -> list[Candidate]:
+    db = SessionLocal()
+    try:
+        todo, unchanged = plan_candidates(db, version, company_id=company_id)
+        run = db.get(ReverificationRun, run_id)
+        # Счётчики — за этот запуск: проверенное до паузы попадает в skipped.
+        run.total_items = len(todo) + unchanged
+        run.done_skipped = unchanged
+        run.done_ok = 0
+        run.done_error = 0
+        run.last_message = f"К проверке: {len(todo)}, уже проверено: {unchanged}"
+        run.updated_at = _utcnow()
+        db.commit()
+        return todo
+    finally:
+        db.close()
+
+
+def _record(run_id: int, outcomes: list[tuple[str, str]], stop: Optional[str]) -> str:
+    """Учесть завершённые отчёты; вернуть текущий статус прогона (его меняет API)."""
+    db = SessionLocal()
+    try:
+        run = db.get(ReverificationRun, run_id)
+        for outcome, message in outcomes:
+            if outcome == "ok":
+                run.done_ok += 1
+            elif outcome == "gone":
+                run.done_skipped += 1
+            else:
+                run.done_error += 1
+            if message:
+                run.last_message = message
+        if stop and run.status == "running":
+            run.status = "paused"
+            run.last_message = stop
+        run.updated_at = _utcnow()
+        db.commit()
+        return run.status
+    finally:
+        db.close()
+
+
+def _finish(run_id: int) -> None:
+    db = SessionLocal()
+    try:
+        run = db.get(ReverificationRun, run_id)
+        if run.status == "running":
+            run.status = "completed"
+            run.finished_at = _utcnow()
+            run.last_message = (
+                f"Готово: проверено {run.done_ok}, ошибок {run.done_error}, "
+                f"без изменений {run.done_skipped}"
+            )
+            run.updated_at = _utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+
+def run_reverify_task(payload: dict[str, Any]) -> None:
+    """Исполнитель задачи `reports.reverify` (его вызывает процесс воркера)."""
+    from app.services.report_parser.llm_client import LLMQuotaExhaustedError
+
+    run_id = int(payload["run_id"])
+    params = _load_run(run_id)
+    if params is None:
+        return
+    version, model, company_id, concurrency = params
+    pending: Iterator[Candidate] = iter(_plan(run_id, version, company_id))
+    logger.info("Reverification run %s started (concurrency=%s)", run_id, concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="reverify") as pool:
+        in_flight: dict[Future, Candidate] = {}
+
+        def submit(n: int) -> None:
+            for candidate in pending:
+                in_flight[pool.submit(
+                    _verify_one, candidate, run_id=run_id, version=version, model=model,
+                )] = candidate
+                n -= 1
+                if n <= 0:
+                    return
+
+        submit(concurrency)
+        draining = False
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            outcomes: list[tuple[str, str]] = []
+            stop: Optional[str] = None
+            for future in done:
+                candidate = in_flight.pop(future)
+                try:
+                    outcomes.append((future.result(), ""))
+                except LLMQuotaExhaustedError as exc:
+                    stop = f"Квота LLM исчерпана — прогон на паузе: {exc}"
+                    outcomes.append(("failed", ""))
+                except Exception as exc:  # noqa: BLE001 — отчёт уйдёт в следующий запуск
+                    logger.warning("Reverify report_id=%s failed: %s", candidate.report_id, exc)
+                    outcomes.append(("failed", f"report_id={candidate.report_id}: {exc}"))
+            status = _record(run_id, outcomes, stop)
+            # Пауза/отмена/квота: начатые отчёты доделываются, новые не берём.
+            draining = draining or status != "running"
+            if not draining:
+                submit(len(done))
+
+    _finish(run_id)
+    logger.info("Reverification run %s worker exited", run_id)
@@ -0,0 +1,6 @@
+"""Фоновые задачи: очередь на таблице `background_tasks` и процесс-исполнитель.
+
+API только ставит задачи (`queue.enqueue`) и читает их статус; выполняет их
+отдельный процесс `python -m app.worker`, который можно масштабировать
+независимо от uvicorn.
+"""
@@ -0,0 +1,248 @@
+"""Операции над очередью `background_tasks`.
+
+Выдача задачи (`claim`) идёт в одной транзакции:
+  1. `pg_advisory_xact_lock` по имени очереди — выдачи в одну очередь из
+     разных процессов идут по одной, поэтому счётчик занятых слотов точен и
+     лимит параллельности очереди глобальный, а не на процесс;
+  2. `SELECT … FOR UPDATE SKIP LOCKED` — самая приоритетная готовая задача:
+     queued с наступившим run_after или running с истёкшей арендой
+     (её воркер умер — задача переходит к новому).
+
+Воркер продлевает аренду `heartbeat`; вернуть задачу — `complete` / `fail`.
+Все функции коммитят сами, кроме `enqueue`: постановка идёт в транзакции
+вызывающего кода вместе с записью, ради которой ставится задача.
+"""
+from __future__ import annotations
+
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import Select, and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.background_task import ACTIVE_TASK_STATUSES, BackgroundTask
+from app.services.tasks.registry import get_kind
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повтором упавшей задачи: 30 с, 2 мин, 8 мин … но не больше часа.
+_RETRY_BASE_SECONDS = 30
+_RETRY_MAX_SECONDS = 3600
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = _RETRY_BASE_SECONDS * 4 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, _RETRY_MAX_SECONDS))
+
+
+def _queue_lock_key(queue: str) -> int:
+    # Стабильный между процессами ключ (hash() в Python рандомизирован).
+    return zlib.crc32(f"background_tasks:{queue}".encode("utf-8"))
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[dict[str, Any]] = None,
+    *,
+    dedupe_key: Optional[str] = None,
+    priority: Optional[int] = None,
+    run_after: Optional[datetime] = None,
+) -> Optional[BackgroundTask]:
+    """Поставить задачу (без commit). None — активная задача с таким ключом уже есть."""
+    spec = get_kind(kind)
+    now = _utcnow()
+    task = BackgroundTask(
+        queue=spec.queue,
+        kind=kind,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        priority=spec.priority if priority is None else priority,
+        status="queued",
+        attempts=0,
+        max_attempts=spec.max_attempts,
+        run_after=run_after or now,
+        created_at=now,
+        updated_at=now,
+    )
+    try:
+        # Гонку двух постановок решает уникальный индекс по активному ключу;
+        # savepoint откатывает только эту вставку, а не транзакцию вызывающего.
+        with db.begin_nested():
+            db.add(task)
+    except IntegrityError:
+        logger.info("Задача %s (%s) уже в очереди — повтор не ставим", kind, dedupe_key)
+        return None
+    return task
+
+
+def active_task(db: Session, dedupe_key: str) -> Optional[BackgroundTask]:
+    return (
+        db.query(BackgroundTask)
+        .filter(BackgroundTask.dedupe_key == dedupe_key)
+        .filter(BackgroundTask.status.in_(ACTIVE_TASK_STATUSES))
+        .first()
+    )
+
+
+def has_active_task(db: Session, *, kind: str, dedupe_key: Optional[str] = None) -> bool:
+    """Есть ли задача, которая ещё будет выполнена или выполняется сейчас."""
+    return db.scalars(_active_task_id_stmt(kind, dedupe_key)).first() is not None
+
+
+async def ahas_active_task(db: AsyncSession, *, kind: str, dedupe_key: Optional[str] = None) -> bool:
+    return (await db.scalars(_active_task_id_stmt(kind, dedupe_key))).first() is not None
+
+
+def _active_task_id_stmt(kind: str, dedupe_key: Optional[str]) -> Select:
+    stmt = (
+        select(BackgroundTask.id)
+        .where(BackgroundTask.kind == kind)
+        .where(BackgroundTask.status.in_(ACTIVE_TASK_STATUSES))
+    )
+    if dedupe_key is not None:
+        stmt = stmt.where(BackgroundTask.dedupe_key == dedupe_key)
+    return stmt.limit(1)
+
+
+def claim(
+    db: Session,
+    queue: str,
+    *,
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+) -> Optional[BackgroundTask]:
+    """Взять следующую задачу очереди в аренду. None — нет готовых или нет слотов."""
+    while True:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(select(func.pg_advisory_xact_lock(_queue_lock_key(queue))))
+        now = _utcnow()
+        busy = (
+            db.query(func.count(BackgroundTask.id))
+            .filter(BackgroundTask.queue == queue)
+            .filter(BackgroundTask.status == "running")
+            .filter(BackgroundTask.lease_expires_at > now)
+            .scalar()
+        )
+        if busy >= limit:
+            db.rollback()
+            return None
+        task = db.scalars(
+            select(BackgroundTask)
+            .where(BackgroundTask.queue == queue)
+            .where(or_(
+                and_(BackgroundTask.status == "queued", BackgroundTask.run_after <= now),
+                and_(BackgroundTask.status == "running", BackgroundTask.lease_expires_at <= now),
+            ))
+            .order_by(BackgroundTask.priority.desc(), BackgroundTask.id.asc())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if task is None:
+            db.rollback()
+            return None
+        if task.status == "running":
+            logger.warning(
+                "Задача #%s (%s): аренда %s истекла — забираем", task.id, task.kind, task.locked_by,
+            )
+            if task.attempts >= task.max_attempts:
+                task.status = "error"
+                task.last_error = f"Аренда истекла после {task.attempts} попыток"
+                task.finished_at = now
+                task.updated_at = now
+                task.locked_by = None
+                task.lease_expires_at = None
+                db.commit()
+                continue
+        task.status = "running"
+        task.attempts += 1
+        task.locked_by = worker_id
+        task.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        task.heartbeat_at = now
+        task.started_at = task.started_at or now
+        task.updated_at = now
+        db.commit()
+        db.refresh(task)
+        return task
+
+
+def heartbeat(db: Session, task_id: int, *, worker_id: str, lease_seconds: int) -> bool:
+    """Продлить аренду. False — задачу уже забрал другой воркер."""
+    now = _utcnow()
+    result = db.execute(
+        update(BackgroundTask)
+        .where(BackgroundTask.id == task_id)
+        .where(BackgroundTask.status == "running")
+        .where(BackgroundTask.locked_by == worker_id)
+        .values(
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            heartbeat_at=now,
+            updated_at=now,
+        )
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _owned(db: Session, task_id: int, worker_id: str) -> Optional[BackgroundTask]:
+    task = db.get(BackgroundTask, task_id, with_for_update=True)
+    if task is None or task.status != "running" or task.locked_by != worker_id:
+        db.rollback()
+        logger.warning("Задача #%s больше не принадлежит воркеру %s", task_id, worker_id)
+        return None
+    return task
+
+
+def complete(db: Session, task_id: int, *, worker_id: str) -> None:
+    task = _owned(db, task_id, worker_id)
+    if task is None:
+        return
+    now = _utcnow()
+    task.status = "done"
+    task.finished_at = now
+    task.updated_at = now
+    task.locked_by = None
+    task.lease_expires_at = None
+    db.commit()
+
+
+def fail(db: Session, task_id: int, *, worker_id: str, error: str) -> Optional[str]:
+    """Исполнитель бросил исключение: повтор с паузой или error. Возвращает новый статус."""
+    task = _owned(db, task_id, worker_id)
+    if task is None:
+        return None
+    now = _utcnow()
+    task.last_error = error[:4000]
+    task.locked_by = None
+    task.lease_expires_at = None
+    task.updated_at = now
+    if task.attempts < task.max_attempts:
+        task.status = "queued"
+        task.run_after = now + retry_delay(task.attempts)
+    else:
+        task.status = "error"
+        task.finished_at = now
+    db.commit()
+    return task.status
+
+
+__all__ = (
+    "active_task",
+    "ahas_active_task",
+    "claim",
+    "complete",
+    "enqueue",
+    "fail",
+    "has_active_task",
+    "heartbeat",
+    "retry_delay",
+)
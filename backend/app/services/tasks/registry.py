@@ -0,0 +1,101 @@
+"""Виды фоновых задач: очередь, приоритет и функция-исполнитель.
+
+Исполнитель указан строкой "модуль:функция" и импортируется только в
+процессе воркера — API, ставящий задачу, не тянет PyMuPDF, клиент LLM и т.п.
+Исполнитель получает payload задачи (dict) и либо возвращается, либо бросает
+исключение (тогда задача уходит на повтор).
+"""
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass
+from typing import Any, Callable
+
+TaskHandler = Callable[[dict[str, Any]], None]
+
+MASS_PARSE_JOB = "mass_parse.job"
+DISCLOSURE_SYNC = "disclosure.sync"
+DISCLOSURE_PARSE_JOB = "disclosure.parse_job"
+DISCLOSURE_DOWNLOAD_JOB = "disclosure.download_job"
+DAILY_PRICE_UPDATE = "market.daily_price_update"
+PRICE_BACKFILL = "market.price_backfill"
+MULTIPLIERS_REBUILD_HISTORY = "multipliers.rebuild_history"
+REPORTS_REVERIFY = "reports.reverify"
+
+
+@dataclass(frozen=True)
+class TaskKind:
+    name: str
+    queue: str
+    target: str  # "app.services.x:function"
+    priority: int = 0
+    max_attempts: int = 3
+
+    def handler(self) -> TaskHandler:
+        module_name, _, attr = self.target.partition(":")
+        return getattr(importlib.import_module(module_name), attr)
+
+
+# Задания mass-parse и разбора e-disclosure возобновляемы (состояние — в своих
+# таблицах), поэтому повтор после падения воркера безопасен: продолжат с
+# первого pending-элемента.
+TASK_KINDS: dict[str, TaskKind] = {
+    kind.name: kind
+    for kind in (
+        TaskKind(MASS_PARSE_JOB, "mass_parse", "app.services.mass_parse.worker:run_job_task",
+                 priority=10, max_attempts=5),
+        TaskKind(DISCLOSURE_SYNC, "disclosure", "app.services.disclosure.sync_service:run_sync_task",
+                 priority=5),
+        TaskKind(DISCLOSURE_PARSE_JOB, "disclosure",
+                 "app.services.disclosure.parse_queue:run_parse_task", priority=10, max_attempts=5),
+        # Загрузка докачивает `.part`-файлы, поэтому повтор не качает заново.
+        TaskKind(DISCLOSURE_DOWNLOAD_JOB, "disclosure",
+                 "app.services.disclosure.download_queue:run_download_task", priority=10),
+        TaskKind(DAILY_PRICE_UPDATE, "market", "app.services.market.price_tasks:daily_price_update_task"),
+        TaskKind(PRICE_BACKFILL, "market", "app.services.market.price_tasks:price_backfill_task"),
+        # Пересборка истории — одна транзакция, повтор просто пересоберёт заново.
+        TaskKind(MULTIPLIERS_REBUILD_HISTORY, "analysis",
+                 "app.services.analysis.multiplier_tasks:rebuild_history_task", priority=5),
+        # Перепроверка делит очередь с mass-parse: обе упираются в одну квоту
+        # LLM. Возобновляема — карточки пишутся по одному отчёту.
+        TaskKind(REPORTS_REVERIFY, "mass_parse", "app.services.reverification.worker:run_reverify_task",
+                 max_attempts=5),
+    )
+}
+
+
+def get_kind(name: str) -> TaskKind:
+    try:
+        return TASK_KINDS[name]
+    except KeyError:
+        raise LookupError(f"Неизвестный вид фоновой задачи: {name}") from None
+
+
+def parse_queue_limits(raw: str) -> dict[str, int]:
+    """"mass_parse=1,disclosure=2" → {"mass_parse": 1, "disclosure": 2}."""
+    limits: dict[str, int] = {}
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        if not sep or not value.strip().isdigit() or int(value) < 1:
+            raise ValueError(f"Неверная настройка очереди {part!r}: ожидается имя=число ≥ 1")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+__all__ = (
+    "DAILY_PRICE_UPDATE",
+    "DISCLOSURE_DOWNLOAD_JOB",
+    "DISCLOSURE_PARSE_JOB",
+    "DISCLOSURE_SYNC",
+    "MASS_PARSE_JOB",
+    "MULTIPLIERS_REBUILD_HISTORY",
+    "PRICE_BACKFILL",
+    "TASK_KINDS",
+    "TaskHandler",
+    "TaskKind",
+    "get_kind",
+    "parse_queue_limits",
+)
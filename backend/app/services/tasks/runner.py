@@ -0,0 +1,139 @@
+"""Исполнитель задач: по потоку на слот каждой очереди + heartbeat аренды.
+
+Число слотов очереди берётся из её лимита (`TASK_QUEUES`): больше потоков
+всё равно не получат задачу — лимит проверяет `claim` по всей базе.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import traceback
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.tasks import queue as task_queue
+from app.services.tasks.registry import get_kind, parse_queue_limits
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class TaskWorker:
+    def __init__(
+        self,
+        *,
+        queues: Optional[dict[str, int]] = None,
+        worker_id: Optional[str] = None,
+        lease_seconds: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.queues = queues if queues is not None else parse_queue_limits(settings.TASK_QUEUES)
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds or settings.TASK_LEASE_SECONDS
+        self.poll_seconds = settings.TASK_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self._session_factory = session_factory
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for queue, limit in self.queues.items():
+            for slot in range(limit):
+                thread = threading.Thread(
+                    target=self._slot_loop,
+                    args=(queue, limit),
+                    name=f"task-{queue}-{slot}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+        logger.info("Воркер %s: очереди %s", self.worker_id, self.queues)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Не брать новых задач и дождаться текущих (незавершённые заберут по аренде)."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _slot_loop(self, queue: str, limit: int) -> None:
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once(queue, limit)
+            except Exception:  # noqa: BLE001 — сбой БД не должен убить слот
+                logger.exception("Очередь %s: ошибка выдачи задачи", queue)
+                ran = False
+            if not ran:
+                self._stop.wait(self.poll_seconds)
+
+    def run_once(self, queue: str, limit: int) -> bool:
+        """Взять и выполнить одну задачу очереди. False — брать было нечего."""
+        db = self._session_factory()
+        try:
+            task = task_queue.claim(
+                db, queue, worker_id=self.worker_id, limit=limit, lease_seconds=self.lease_seconds,
+            )
+            if task is None:
+                return False
+            task_id, kind, payload = int(task.id), task.kind, dict(task.payload or {})
+        finally:
+            db.close()
+
+        logger.info("Задача #%s %s: старт (%s)", task_id, kind, payload)
+        stop_heartbeat = threading.Event()
+        beat = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(task_id, stop_heartbeat),
+            name=f"task-heartbeat-{task_id}",
+            daemon=True,
+        )
+        beat.start()
+        error: Optional[str] = None
+        try:
+            get_kind(kind).handler()(payload)
+        except Exception:  # noqa: BLE001
+            error = traceback.format_exc()
+            logger.exception("Задача #%s %s упала", task_id, kind)
+        finally:
+            stop_heartbeat.set()
+            beat.join()
+
+        db = self._session_factory()
+        try:
+            if error is None:
+                task_queue.complete(db, task_id, worker_id=self.worker_id)
+                logger.info("Задача #%s %s: готово", task_id, kind)
+            else:
+                status = task_queue.fail(db, task_id, worker_id=self.worker_id, error=error)
+                logger.warning("Задача #%s %s: → %s", task_id, kind, status)
+        finally:
+            db.close()
+        return True
+
+    def _heartbeat_loop(self, task_id: int, stop: threading.Event) -> None:
+        interval = max(self.lease_seconds / 3, 1.0)
+        while not stop.wait(interval):
+            db = self._session_factory()
+            try:
+                if not task_queue.heartbeat(
+                    db, task_id, worker_id=self.worker_id, lease_seconds=self.lease_seconds,
+                ):
+                    logger.error(
+                        "Задача #%s: аренда потеряна — её мог забрать другой воркер", task_id,
+                    )
+                    return
+            except Exception:  # noqa: BLE001 — следующий тик попробует снова
+                logger.exception("Задача #%s: heartbeat не записан", task_id)
+            finally:
+                db.close()
+
+
+__all__ = ("TaskWorker", "default_worker_id")
@@ -1,11 +1,13 @@
 import re
 import requests
 import os
-import time
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Mapping, Optional, Sequence
 from pathlib import Path
 from dotenv import load_dotenv
 
+from app.config import settings
 from app.utils.http_session import external_session
 
 # Определяем путь к корню проекта (на два уровня выше от этого файла)
@@ -148,10 +150,17 @@ def _normalize_brand_color(value: object) -> Optional[str]:
     return s
 
 
-def fetch_share_instrument_by_figi(token: str, base_url: str, figi: str) -> Optional[dict]:
+def fetch_share_instrument_by_figi(
+    token: str,
+    base_url: str,
+    figi: str,
+    session: Optional[requests.Session] = None,
+) -> Optional[dict]:
     """
     Детальная карточка акции по FIGI — в ответе часто есть brand (лого, цвет),
     тогда как в массиве Shares эти поля могут отсутствовать.
+
+    `session` — чтобы серия запросов шла по одному keep-alive соединению.
     """
     if not figi:
         return None
@@ -162,7 +171,7 @@ def fetch_share_instrument_by_figi(token: str, base_url: str, figi: str) -> Opti
     }
     payload = {"idType": "INSTRUMENT_ID_TYPE_FIGI", "id": figi}
     try:
-        response = external_session().post(url, json=payload, headers=headers, timeout=20)
+        response = (session or external_session()).post(url, json=payload, headers=headers, timeout=20)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException:
@@ -195,11 +204,104 @@ def fetch_share_instrument_by_figi(token: str, base_url: str, figi: str) -> Opti
     return _pick_inst(data)
 
 
-def get_tinkoff_companies() -> List[Dict]:
+# Бренд по FIGI: (URL логотипа, цвет).
+Brand = tuple[Optional[str], Optional[str]]
+
+
+def fetch_brands(
+    token: str,
+    base_url: str,
+    figis: Sequence[str],
+    *,
+    workers: int,
+) -> Dict[str, Brand]:
+    """
+    Бренды по FIGI через ShareBy — не больше `workers` запросов одновременно,
+    у каждого потока своё keep-alive соединение.
+
+    В ответ попадают только FIGI, на которые API ответил: сетевая ошибка или
+    лимит запросов — повод спросить на следующей синхронизации, а не
+    запомнить «бренда нет».
+    """
+    if not figis:
+        return {}
+    local = threading.local()
+    sessions: list[requests.Session] = []
+    lock = threading.Lock()
+
+    def fetch(figi: str) -> tuple[str, Optional[dict]]:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = external_session()
+            with lock:
+                sessions.append(session)
+        return figi, fetch_share_instrument_by_figi(token, base_url, figi, session=session)
+
+    brands: Dict[str, Brand] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tinvest-brand") as pool:
+            for figi, instrument in pool.map(fetch, figis):
+                if isinstance(instrument, dict):
+                    brands[figi] = extract_brand_from_instrument(instrument)
+    finally:
+        for session in sessions:
+            session.close()
+    return brands
+
+
+def _fill_brands(
+    token: str,
+    base_url: str,
+    companies: List[Dict],
+    brand_cache: Mapping[str, Brand],
+) -> None:
+    """
+    Дополнить бренд, которого нет в списке Shares: из кэша (brand_cache —
+    недавно проверенные бумаги из БД), иначе — ShareBy пулом потоков.
+    Спрошенные у API помечаются `brand_checked`.
+    """
+    missing: List[Dict] = []
+    for company in companies:
+        company["brand_checked"] = False
+        if company["brand_logo_url"] and company["brand_color"]:
+            continue
+        cached = brand_cache.get(company["figi"])
+        if cached is not None:
+            company["brand_logo_url"] = company["brand_logo_url"] or cached[0]
+            company["brand_color"] = company["brand_color"] or cached[1]
+        else:
+            missing.append(company)
+
+    fetched = fetch_brands(
+        token, base_url, [c["figi"] for c in missing], workers=settings.TINKOFF_BRAND_WORKERS,
+    )
+    for company in missing:
+        brand = fetched.get(company["figi"])
+        if brand is not None:
+            company["brand_logo_url"] = company["brand_logo_url"] or brand[0]
+            company["brand_color"] = company["brand_color"] or brand[1]
+            company["brand_checked"] = True
+
+    for company in companies:
+        if not company["brand_logo_url"]:
+            company["brand_logo_url"] = fallback_brand_logo_url(
+                company.get("isin"), company.get("ticker")
+            )
+    print(
+        f"Бренды: из кэша {len(companies) - len(missing)}, спрошено ShareBy {len(missing)}, "
+        f"получено {len(fetched)}"
+    )
+
+
+def get_tinkoff_companies(brand_cache: Optional[Mapping[str, Brand]] = None) -> List[Dict]:
     """
     Получает список компаний из T Invest API (Tinkoff Invest API).
     Фильтрует только российские компании или торгующие на Московской бирже.
     Требуется токен TINKOFF_TOKEN в переменных окружения.
+
+    brand_cache: FIGI → бренд, проверенный недавно; для этих бумаг ShareBy
+        не вызывается. У остальных без бренда в списке он догружается
+        параллельно (fetch_brands), такие записи помечены `brand_checked`.
     
     Критерии фильтрации:
     - ISIN начинается с "RU" (российская регистрация)
@@ -325,19 +427,8 @@ def get_tinkoff_companies() -> List[Dict]:
                     
                     # Добавляем только если компания российская ИЛИ торгуется на Мосбирже
                     if is_russian or is_moex:
+                        # В списке Shares часто нет brand — его дополнит _fill_brands.
                         logo_url, brand_color = extract_brand_from_instrument(instrument)
-                        # В списке Shares часто нет brand — догружаем ShareBy (с небольшой паузой)
-                        if not logo_url or not brand_color:
-                            full = fetch_share_instrument_by_figi(token, base_url, company["figi"])
-                            if isinstance(full, dict):
-                                lu, bc = extract_brand_from_instrument(full)
-                                logo_url = logo_url or lu
-                                brand_color = brand_color or bc
-                            time.sleep(0.02)
-                        if not logo_url:
-                            logo_url = fallback_brand_logo_url(
-                                company.get("isin"), company.get("ticker")
-                            )
                         company["brand_logo_url"] = logo_url
                         company["brand_color"] = brand_color
                         companies.append(company)
@@ -346,6 +437,7 @@ def get_tinkoff_companies() -> List[Dict]:
                         skipped_count += 1
                         
             print(f"Отфильтровано российских/Мосбиржа: {filtered_count}, пропущено: {skipped_count}")
+            _fill_brands(token, base_url, companies, brand_cache or {})
         else:
             print(f"Не удалось найти инструменты в ответе. Структура данных: {type(data)}")
             if isinstance(data, dict):
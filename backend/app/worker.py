@@ -0,0 +1,121 @@
+"""Процесс фоновых задач: `python -m app.worker` (из каталога backend).
+
+Выполняет задачи из таблицы background_tasks (mass-parse, sync и разбор
+e-disclosure, обновление цен) — API их только ставит. Процессов можно
+запустить сколько угодно: лимиты очередей общие (см. TASK_QUEUES), а
+планировщик работает только у лидера — процесса, держащего advisory lock.
+
+Остановка (SIGTERM/SIGINT) не ждёт долгих задач: их аренда истечёт, и
+задачу заберёт следующий запущенный воркер — задания возобновляемы.
+"""
+from __future__ import annotations
+
+import logging
+import signal
+import sys
+import threading
+import zlib
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+from app.database import engine
+from app.scheduler import start_scheduler, stop_scheduler
+from app.services.mass_parse.worker import recover_orphaned_running_jobs
+from app.services.tasks.runner import TaskWorker
+
+logger = logging.getLogger(__name__)
+
+_SCHEDULER_LOCK_KEY = zlib.crc32(b"graham_analyzer:scheduler")
+# Как часто не-лидер пробует перехватить лидерство, а лидер — проверяет,
+# что соединение с локом живо.
+_LEADER_CHECK_SECONDS = 30.0
+
+
+class SchedulerLeader:
+    """Планировщик — только в процессе, держащем session-level advisory lock.
+
+    Лок живёт, пока открыто соединение: упал процесс — Postgres отпускает лок,
+    и при следующей проверке его берёт другой воркер. Отдавая лидерство, лок
+    снимаем явно: `close()` лишь вернул бы соединение в пул вместе с локом.
+    """
+
+    def __init__(self) -> None:
+        self._conn: Optional[Connection] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None
+
+    def tick(self) -> None:
+        try:
+            if self._conn is None:
+                self._try_acquire()
+            else:
+                self._conn.execute(select(1))
+                self._conn.commit()
+        except Exception:  # noqa: BLE001 — соединение с локом потеряно
+            logger.exception("Планировщик: потеряно соединение с локом лидера")
+            self.release()
+
+    def _try_acquire(self) -> None:
+        conn = engine.connect()
+        got = conn.execute(select(func.pg_try_advisory_lock(_SCHEDULER_LOCK_KEY))).scalar()
+        # Лок сессионный — переживает commit; транзакцию не держим открытой.
+        conn.commit()
+        if not got:
+            conn.close()
+            return
+        self._conn = conn
+        logger.info("Воркер стал лидером — запускаем планировщик")
+        start_scheduler()
+
+    def release(self) -> None:
+        stop_scheduler()
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.execute(select(func.pg_advisory_unlock(_SCHEDULER_LOCK_KEY)))
+            conn.commit()
+            conn.close()
+        except Exception:  # noqa: BLE001 — соединение сломано: закрываем его по-настоящему
+            logger.warning("Планировщик: не удалось снять лок — закрываем соединение")
+            try:
+                conn.invalidate()
+                conn.close()
+            except Exception:  # noqa: BLE001
+                pass
+
+
+def run(stop: threading.Event) -> None:
+    """Крутить воркер и выборы лидера до stop (так же — в процессе API)."""
+    recover_orphaned_running_jobs()
+    worker = TaskWorker()
+    worker.start()
+    leader = SchedulerLeader()
+    try:
+        while not stop.is_set():
+            leader.tick()
+            stop.wait(_LEADER_CHECK_SECONDS)
+    finally:
+        leader.release()
+        worker.stop(timeout=5.0)
+        logger.info("Воркер %s остановлен", worker.worker_id)
+
+
+def main() -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(threadName)s %(name)s: %(message)s",
+    )
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    run(stop)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Выгрузить таблицу БД в файл потоком: NDJSON, CSV, Arrow IPC или Parquet.
+
+То же, что GET /export/{table}, но без API: серверный курсор, запись пачками
+по EXPORT_BATCH_SIZE строк, память не зависит от размера таблицы.
+
+Запуск из backend:
+  venv/bin/python scripts/export_data.py financial_reports --format parquet --out reports.parquet
+  venv/bin/python scripts/export_data.py multipliers --type daily --from 2020-01-01 \\
+      --columns ticker,date,pe_ratio,pb_ratio --format csv > daily.csv
+  venv/bin/python scripts/export_data.py stock_prices --ticker SBER --ticker LKOH --format arrow --out prices.arrows
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.database import SessionLocal  # noqa: E402
+from app.services.export.streaming import (  # noqa: E402
+    EXPORT_TABLES,
+    FORMATS,
+    ExportQuery,
+    build_plan,
+    export_chunks,
+    require_pyarrow,
+)
+
+# SQL_ECHO в .env напечатал бы каждый запрос поверх выгрузки в stdout.
+logging.getLogger("sqlalchemy.engine.Engine").setLevel(logging.WARNING)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--out", type=Path, help="Файл; по умолчанию stdout")
+    parser.add_argument("--columns", help="Колонки через запятую; по умолчанию все")
+    parser.add_argument("--company-id", type=int, action="append", default=[])
+    parser.add_argument("--ticker", action="append", default=[])
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument("--period-type", help="financial_reports: annual | quarterly | semi_annual")
+    parser.add_argument("--type", help="multipliers: report_based | current | daily")
+    parser.add_argument("--verified-only", action="store_true")
+    parser.add_argument("--batch-size", type=int, help="По умолчанию EXPORT_BATCH_SIZE")
+    args = parser.parse_args()
+
+    query = ExportQuery(
+        table=args.table,
+        columns=[c.strip() for c in (args.columns or "").split(",") if c.strip()],
+        company_ids=args.company_id,
+        tickers=args.ticker,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        period_type=args.period_type,
+        multiplier_type=args.type,
+        verified_only=args.verified_only,
+    )
+    try:
+        plan = build_plan(query)
+        require_pyarrow(args.format)
+    except (ValueError, RuntimeError) as exc:
+        print(f"Ошибка: {exc}", file=sys.stderr)
+        return 2
+
+    started = time.monotonic()
+    written = 0
+    db = SessionLocal()
+    out = args.out.open("wb") if args.out else sys.stdout.buffer
+    try:
+        for chunk in export_chunks(db, plan, args.format, batch_size=args.batch_size):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        db.close()
+        if args.out:
+            out.close()
+        else:
+            out.flush()
+    print(
+        f"{args.table}: {written / 1e6:.1f} МБ за {time.monotonic() - started:.1f} с",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Бюджет времени импорта API: отчёт по `python -X importtime`.
+
+uvicorn не принимает запросы, пока не импортирован app.main, — каждый тяжёлый
+модуль, попавший в цепочку импорта роутеров, удлиняет рестарт и деплой.
+Разбор PDF (PyMuPDF) и клиент LLM (openai, tenacity) грузятся лениво, при
+первом разборе, websockets — при запуске потока цен; скрипт следит, чтобы
+так и оставалось.
+
+Импорт выполняется в чистом подпроцессе (кэш модулей текущего процесса не
+мешает). Отчёт — самые долгие модули по суммарному времени и пакеты по
+собственному. Код возврата 1 — превышен бюджет или загружен модуль из
+запрещённого списка.
+
+Запуск из backend:
+  venv/bin/python scripts/import_time.py
+  venv/bin/python scripts/import_time.py --budget-ms 1500 --top 30
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+
+TARGET = "app.main"
+# Время холодного импорта app.main на машине разработчика — около 1,1 с;
+# запас на медленный CI.
+DEFAULT_BUDGET_MS = 2000
+# Модули, которых не должно быть после импорта API (загружаются при первом обращении).
+FORBIDDEN = (
+    "fitz",
+    "pymupdf",
+    "openai",
+    "tenacity",
+    "websockets",
+    "app.services.report_parser.extractor_service",
+    "app.services.report_parser.llm_client",
+    "app.services.report_parser.prompts",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| \s*(\S+)$")
+
+
+@dataclass(frozen=True)
+class ImportRow:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRow]:
+    """Строки `import time: self | cumulative | module` → ImportRow."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append(ImportRow(
+                module=m.group(3),
+                self_us=int(m.group(1)),
+                cumulative_us=int(m.group(2)),
+            ))
+    return rows
+
+
+def measure(target: str = TARGET) -> List[ImportRow]:
+    # PYTHONPATH — на backend, откуда бы скрипт ни запускали.
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} упал:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def total_us(rows: Sequence[ImportRow]) -> int:
+    """Всё время импорта — сумма собственного времени модулей."""
+    return sum(r.self_us for r in rows)
+
+
+def by_package(rows: Sequence[ImportRow]) -> Dict[str, int]:
+    packages: Dict[str, int] = defaultdict(int)
+    for r in rows:
+        packages[r.module.split(".")[0]] += r.self_us
+    return dict(packages)
+
+
+def forbidden_loaded(rows: Sequence[ImportRow], forbidden: Sequence[str] = FORBIDDEN) -> List[str]:
+    loaded = {r.module for r in rows}
+    return [name for name in forbidden if name in loaded]
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_BUDGET_MS,
+                        help=f"Бюджет импорта {TARGET}, мс (по умолчанию {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--top", type=int, default=20, help="Сколько модулей и пакетов показать")
+    args = parser.parse_args(argv)
+
+    rows = measure()
+    total_ms = total_us(rows) / 1000
+
+    print(f"Импорт {TARGET}: {total_ms:.0f} мс (бюджет {args.budget_ms} мс), модулей: {len(rows)}\n")
+    print("Модули приложения по суммарному времени, мс:")
+    own = [r for r in rows if r.module.startswith("app.")]
+    for r in sorted(own, key=lambda r: r.cumulative_us, reverse=True)[:args.top]:
+        print(f"  {r.cumulative_us / 1000:8.1f}  {r.module}")
+    print("\nПакеты по собственному времени, мс:")
+    packages = sorted(by_package(rows).items(), key=lambda kv: kv[1], reverse=True)
+    for name, us in packages[:args.top]:
+        print(f"  {us / 1000:8.1f}  {name}")
+
+    failed = False
+    leaked = forbidden_loaded(rows)
+    if leaked:
+        failed = True
+        print(f"\nОШИБКА: при импорте {TARGET} загружены ленивые модули: {', '.join(leaked)}")
+    if total_ms > args.budget_ms:
+        failed = True
+        print(f"\nОШИБКА: импорт {total_ms:.0f} мс — больше бюджета {args.budget_ms} мс")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
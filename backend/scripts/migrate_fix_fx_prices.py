@@ -14,6 +14,7 @@ Migration steps:
   2. For currency != RUB with non-null exchange_rate and a price that looks
      like RUB (> 500), divide by exchange_rate.
   3. Recompute report_based multipliers for touched reports.
+  4. Recompute dividend_facts (yields) for touched companies.
 
 Run: python migrate_fix_fx_prices.py
 """
@@ -24,6 +25,7 @@ import logging
 from app.database import SessionLocal
 from app.models.financial_report import FinancialReport
 from app.services.analysis.multiplier_service import save_report_based_multiplier
+from app.services.dividends.dividend_facts import refresh_dividend_facts
 from app.services.report_parser.schemas import _normalize_currency
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
@@ -41,6 +43,7 @@ def run() -> None:
         normalized_currency = 0
         converted_price = 0
         recalc_ids: list[int] = []
+        touched_companies: set[int] = set()
 
         for r in reports:
             touched = False
@@ -81,12 +84,17 @@ def run() -> None:
 
             if touched:
                 recalc_ids.append(r.id)
+                touched_companies.add(r.company_id)
 
         if not recalc_ids:
             log.info("Nothing to migrate; data is already clean.")
             return
 
         db.flush()
+        # Reports are written directly here, not via report_service, so the
+        # dividend yields have to be refreshed explicitly.
+        refresh_dividend_facts(db, touched_companies)
+        db.commit()
 
         # save_report_based_multiplier internally handles stale cleanup and
         # commits after each report. No need to call delete_multipliers_for_report
@@ -0,0 +1,245 @@
+"""Читающие запросы, общие для sync-сессии и AsyncSession.
+
+asyncpg в тестах не нужен: async-функции сервисов прогоняются через обёртку
+над sync-сессией SQLite с теми же методами (get/scalars/execute/scalar), что
+у AsyncSession. Проверяем, что оба пути выполняют один и тот же запрос.
+
+Обёртка не ловит ленивую подгрузку (MissingGreenlet) и разницу драйверов,
+поэтому перенесённые роутеры ещё прогоняются по HTTP с настоящей AsyncSession
+на sqlite+aiosqlite (тестовая зависимость из requirements.txt).
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.database import Base, async_database_url, get_async_db
+from app.models import Company, FinancialReport, Multiplier  # noqa: F401
+from app.models.disclosure import DisclosurePeriod, DisclosureSyncRun
+from app.routers import companies_router, disclosure_router, multipliers_router, reports_router
+from app.services.analysis import multiplier_service
+from app.services.companies import company_service
+from app.services.disclosure import sync_service
+from app.services.reports import report_service
+
+
+class _AsyncFacade:
+    """Интерфейс AsyncSession поверх sync-сессии."""
+
+    def __init__(self, session):
+        self._session = session
+
+    async def get(self, *args, **kw):
+        return self._session.get(*args, **kw)
+
+    async def scalars(self, stmt):
+        return self._session.scalars(stmt)
+
+    async def scalar(self, stmt):
+        return self._session.scalar(stmt)
+
+    async def execute(self, stmt):
+        return self._session.execute(stmt)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def company(db) -> Company:
+    company = Company(figi="FIGI0001", ticker="TEST", name="Тестовая компания", currency="RUB")
+    db.add(company)
+    db.commit()
+    return company
+
+
+def _report(company, year, period_type="annual", verified=False, **kw) -> FinancialReport:
+    month = 12 if period_type == "annual" else 6
+    return FinancialReport(
+        company_id=company.id, period_type=period_type, fiscal_year=year,
+        accounting_standard="IFRS", consolidated=True, source="company_website",
+        report_date=date(year, month, 30 if month == 6 else 31),
+        verified_by_analyst=verified, **kw,
+    )
+
+
+def _period(company, year, period_type="annual", **kw) -> DisclosurePeriod:
+    return DisclosurePeriod(
+        company_id=company.id, ticker=company.ticker, period_type=period_type,
+        fiscal_year=year, period_key=f"{year}-{period_type}",
+        updated_at=datetime.now(timezone.utc), **kw,
+    )
+
+
+@pytest.mark.parametrize("url", [
+    "postgresql://u:p@db:5432/graham",
+    "postgresql+psycopg2://u:p@db:5432/graham",
+])
+def test_async_url_keeps_address_and_switches_driver(url):
+    assert async_database_url(url) == "postgresql+asyncpg://u:p@db:5432/graham"
+
+
+def test_async_url_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        async_database_url("sqlite:///graham.db")
+
+
+def test_report_reads_match_between_sync_and_async(db, company):
+    db.add_all([
+        _report(company, 2022, verified=True),
+        _report(company, 2023),
+        _report(company, 2024, period_type="semi_annual"),
+    ])
+    db.commit()
+    adb = _AsyncFacade(db)
+
+    sync_list = report_service.get_reports_by_company(db, company.id)
+    assert [r.fiscal_year for r in sync_list] == [2024, 2023, 2022]
+    assert _run(report_service.aget_reports_by_company(adb, company.id)) == sync_list
+    assert _run(report_service.aget_all_reports(adb, limit=2)) == sync_list[:2]
+    assert _run(report_service.aget_latest_report(adb, company.id)) is sync_list[0]
+    assert _run(report_service.aget_report_by_id(adb, sync_list[1].id)) is sync_list[1]
+
+    unverified = _run(report_service.aget_unverified_reports(adb, company_id=company.id))
+    assert [r.fiscal_year for r in unverified] == [2024, 2023]
+    assert _run(report_service.acount_unverified_by_company(adb)) == {company.id: 2}
+    assert _run(report_service.acount_reports_by_company(adb)) == {company.id: 3}
+    assert report_service.count_reports_by_company(db) == {company.id: 3}
+
+
+def test_company_reads(db, company):
+    adb = _AsyncFacade(db)
+    assert _run(company_service.aget_all_companies(adb)) == [company]
+    assert _run(company_service.aget_company_by_id(adb, company.id)) is company
+    assert _run(company_service.aget_company_by_id(adb, company.id + 1)) is None
+
+
+def test_report_based_history_keeps_annual_only(db, company):
+    annual = _report(company, 2023)
+    interim = _report(company, 2024, period_type="semi_annual")
+    db.add_all([annual, interim])
+    db.flush()
+    db.add_all([
+        Multiplier(company_id=company.id, report_id=annual.id, date=annual.report_date, type="report_based"),
+        Multiplier(company_id=company.id, report_id=interim.id, date=interim.report_date, type="report_based"),
+        Multiplier(company_id=company.id, date=date(2025, 1, 10), type="current"),
+    ])
+    db.commit()
+
+    history = _run(multiplier_service.aget_multipliers_history(
+        _AsyncFacade(db), company.id, mult_type="report_based",
+    ))
+    assert [m.report_id for m in history] == [annual.id]
+    # report загружен сразу — ответу не нужна ленивая подгрузка.
+    assert "report" in history[0].__dict__
+    assert len(multiplier_service.get_multipliers_history(db, company.id)) == 3
+
+
+def test_coverage_missing_mode_and_summary(db, company):
+    db.add_all([
+        _period(company, 2024, on_edisclosure=True, coverage_status="available"),
+        _period(company, 2023, on_edisclosure=True, in_db=True, coverage_status="in_service"),
+        _period(company, 2025, period_type="semi_annual", on_edisclosure=True,
+                coverage_status="available"),
+        _period(company, 2025, period_type="q1", on_edisclosure=True, is_latest_interim=True,
+                coverage_status="available"),
+        DisclosureSyncRun(status="done", created_at=datetime.now(timezone.utc)),
+    ])
+    db.commit()
+
+    rows = db.scalars(sync_service.coverage_stmt(mode="missing")).all()
+    assert [(p.fiscal_year, p.period_type) for p in rows] == [(2025, "q1"), (2024, "annual")]
+    assert len(db.scalars(sync_service.coverage_stmt(mode="all", limit=2)).all()) == 2
+
+    adb = _AsyncFacade(db)
+    assert _run(sync_service.acoverage_counts(adb)) == {"available": 3, "in_service": 1}
+    assert _run(sync_service.aget_latest_run(adb)).status == "done"
+    assert _run(sync_service.ais_sync_alive(adb)) is False
+
+
+# ─── Роутеры на настоящей AsyncSession ──────────────────────────────────────
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine)
+    # NullPool: соединения aiosqlite не переходят между циклами событий.
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    # Как get_async_sessionmaker в app.database.
+    async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_db_override():
+        async with async_session() as db:
+            yield db
+
+    app = FastAPI()
+    for module in (companies_router, disclosure_router, multipliers_router, reports_router):
+        app.include_router(module.router)
+    app.dependency_overrides[get_async_db] = get_db_override
+    seed = sessionmaker(bind=sync_engine)()
+    try:
+        with TestClient(app) as client:
+            yield client, seed
+    finally:
+        seed.close()
+        sync_engine.dispose()
+        asyncio.run(async_engine.dispose())
+
+
+def test_ported_routers_serve_from_a_real_async_session(async_client):
+    client, db = async_client
+    company = Company(figi="FIGI0001", ticker="TEST", name="Тестовая компания", currency="RUB",
+                      isin="RU000A0TEST0")
+    db.add(company)
+    db.flush()
+    annual = _report(company, 2023, revenue=100.0)
+    db.add_all([annual, _report(company, 2024, period_type="semi_annual")])
+    db.flush()
+    db.add(Multiplier(company_id=company.id, report_id=annual.id, date=annual.report_date,
+                      type="report_based"))
+    db.add(_period(company, 2024, on_edisclosure=True, coverage_status="available"))
+    db.commit()
+
+    assert client.get("/companies/").json()[0]["ticker"] == "TEST"
+    assert client.get(f"/companies/{company.id}").json()["name"] == "Тестовая компания"
+    assert client.get(f"/companies/{company.id + 1}").status_code == 404
+
+    reports = client.get("/reports/").json()
+    assert [r["fiscal_year"] for r in reports] == [2024, 2023]
+    assert client.get(f"/reports/{annual.id}").json()["revenue"] == 100.0
+    assert client.get(f"/reports/company/{company.id}/latest").json()["fiscal_year"] == 2024
+    assert client.get("/reports/counts/by-company").json() == {str(company.id): 2}
+    assert client.get("/reports/unverified/counts").json() == {str(company.id): 2}
+
+    # История читает m.report — без joinedload здесь был бы MissingGreenlet.
+    history = client.get(f"/companies/{company.id}/multipliers/history?type=report_based")
+    assert history.status_code == 200
+    assert [m["report_id"] for m in history.json()] == [annual.id]
+
+    assert client.get("/disclosure/summary").status_code == 200
+    assert client.get("/disclosure/sync/status").json() is None
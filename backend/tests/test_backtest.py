@@ -0,0 +1,193 @@
+"""Бэктест скрина Грэма: отчёт виден с даты публикации, сплиты, доходность и оборот, кэш.
+
+База — SQLite в памяти; отчёты и цены минимальны, чтобы ожидаемые числа
+считались в уме.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.models import Company, FinancialReport, StockPrice
+from app.routers import backtest_router
+from app.services.backtest import engine as backtest_engine
+from app.services.backtest.engine import BacktestParams, load_universe, run_backtest
+from app.services.companies.data_version import bump_data_version
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    backtest_engine.clear_cache()
+    try:
+        yield session
+    finally:
+        session.close()
+        backtest_engine.clear_cache()
+        Base.metadata.drop_all(engine)
+
+
+def _company(db, ticker: str, splits=None) -> Company:
+    company = Company(figi=f"FIGI{ticker}", ticker=ticker, name=ticker, share_splits=splits)
+    db.add(company)
+    db.flush()
+    return company
+
+
+def _annual(db, company: Company, year: int, *, net_income: float, filing_date=None,
+            shares: int = 1_000_000_000) -> None:
+    # При цене 100 ₽ и 1 млрд акций: P/E = 100 000 / прибыль, P/B = 1, D/E = 0.25,
+    # CR = 3, дивдоходность 10% — всё, кроме P/E, «хорошо» по Грэму.
+    db.add(FinancialReport(
+        company_id=company.id, period_type="annual", fiscal_year=year,
+        accounting_standard="IFRS", consolidated=True, source="manual",
+        report_date=date(year, 12, 31), filing_date=filing_date,
+        net_income=net_income, equity=100_000.0, total_liabilities=25_000.0,
+        current_assets=30_000.0, current_liabilities=10_000.0,
+        shares_outstanding=shares, dividends_paid=True, dividends_per_share=10.0,
+    ))
+
+
+def _prices(db, company: Company, start: date, end: date, price) -> None:
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            db.add(StockPrice(company_id=company.id, date=day, price=price(day)))
+        day += timedelta(days=1)
+
+
+def _params(**overrides) -> BacktestParams:
+    base = dict(date_from=date(2022, 1, 1), date_to=date(2022, 6, 30),
+                rebalance="monthly", verdicts=())
+    return BacktestParams(**{**base, **overrides})
+
+
+def _selected(result) -> dict[str, tuple[str, ...]]:
+    return {r.day.isoformat()[:7]: r.tickers for r in result.rebalances}
+
+
+def test_report_counts_only_from_its_filing_date(db):
+    filed = _company(db, "FILED")
+    lagged = _company(db, "LAGGED")
+    for company, filing in ((filed, date(2022, 4, 20)), (lagged, None)):
+        _annual(db, company, 2020, net_income=1_000.0, filing_date=date(2021, 4, 1))
+        _annual(db, company, 2021, net_income=20_000.0, filing_date=filing)
+        _prices(db, company, date(2021, 12, 1), date(2022, 6, 30), lambda d: 100.0)
+    db.commit()
+
+    params = _params(max_pe=10, annual_lag_days=30)
+    selected = _selected(run_backtest(load_universe(db, params), params))
+
+    # P/E 5 по отчёту за 2021 год; до публикации рынок видел P/E 100 за 2020-й.
+    assert [m for m, t in selected.items() if "FILED" in t] == ["2022-05", "2022-06"]
+    # Без filing_date отчёт виден через annual_lag_days после конца периода.
+    assert [m for m, t in selected.items() if "LAGGED" in t][0] == "2022-02"
+
+
+def test_graham_verdict_and_ranking(db):
+    for ticker, net_income in (("CHEAP", 20_000.0), ("FAIR", 12_500.0), ("DEAR", 1_000.0)):
+        company = _company(db, ticker)
+        _annual(db, company, 2021, net_income=net_income, filing_date=date(2021, 12, 31))
+        _prices(db, company, date(2022, 1, 1), date(2022, 3, 31), lambda d: 100.0)
+    db.commit()
+
+    undervalued = _params(verdicts=("undervalued",), date_to=date(2022, 3, 31))
+    assert _selected(run_backtest(load_universe(db, undervalued), undervalued))["2022-01"] == ("CHEAP",)
+
+    ranked = _params(max_positions=2, rank_by="pe", date_to=date(2022, 3, 31))
+    assert _selected(run_backtest(load_universe(db, ranked), ranked))["2022-01"] == ("CHEAP", "FAIR")
+
+
+def test_split_changes_neither_multipliers_nor_returns(db):
+    split = date(2022, 3, 1)
+    company = _company(db, "SPLIT", splits=[{"date": split.isoformat(), "ratio": 10}])
+    _annual(db, company, 2021, net_income=20_000.0, filing_date=date(2022, 1, 10),
+            shares=100_000_000)
+    # До дробления 1 000 ₽ за акцию, после — 100 ₽: капитализация та же.
+    _prices(db, company, date(2022, 1, 1), date(2022, 6, 30),
+            lambda d: 1_000.0 if d < split else 100.0)
+    db.commit()
+
+    params = _params(max_pe=10)
+    universe = load_universe(db, params)
+    data = universe[0]
+    before, after = date(2022, 2, 15).toordinal(), date(2022, 4, 15).toordinal()
+    pe_before = data.snapshot_on(before).at_price(data.price_on(before))["pe_ratio"]
+    pe_after = data.snapshot_on(after).at_price(data.price_on(after))["pe_ratio"]
+    assert pe_before == pytest.approx(5.0)
+    assert pe_after == pytest.approx(5.0)
+
+    result = run_backtest(universe, params)
+    assert set(result.portfolio[result.days.index(date(2022, 1, 17).toordinal()):]) == {1.0}
+
+
+def test_returns_turnover_and_costs(db):
+    jump = date(2022, 1, 15)
+    up = _company(db, "UP")
+    flat = _company(db, "FLAT")
+    for company in (up, flat):
+        _annual(db, company, 2021, net_income=20_000.0, filing_date=date(2021, 12, 31))
+    _prices(db, up, date(2022, 1, 1), date(2022, 2, 28), lambda d: 100.0 if d < jump else 200.0)
+    _prices(db, flat, date(2022, 1, 1), date(2022, 2, 28), lambda d: 100.0)
+    db.commit()
+
+    params = _params(date_to=date(2022, 2, 28))
+    result = run_backtest(load_universe(db, params), params)
+
+    # Пополам в UP и FLAT, UP удвоился: 0.5 × 2 + 0.5 = 1.5.
+    assert result.portfolio[-1] == pytest.approx(1.5)
+    assert result.summary["total_return"] == pytest.approx(0.5)
+    assert result.summary["max_drawdown"] == 0.0
+    # Вход из денег — оборот 1; в феврале доли 2/3 и 1/3 возвращаются к половинам.
+    assert [r.turnover for r in result.rebalances] == pytest.approx([1.0, 1 / 6])
+    assert list(result.benchmark) == pytest.approx(list(result.portfolio))
+
+    costly = _params(date_to=date(2022, 2, 28), cost_bps=10)
+    with_costs = run_backtest(load_universe(db, costly), costly)
+    # Покупка всего портфеля (1.0) и затем покупки + продажи на 1/3 по 10 б.п.
+    assert with_costs.portfolio[-1] == pytest.approx(1.5 * (1 - 0.001) * (1 - 0.001 / 3))
+
+
+def test_cached_by_params_until_data_changes(db, monkeypatch):
+    company = _company(db, "SBER")
+    _annual(db, company, 2021, net_income=20_000.0, filing_date=date(2021, 12, 31))
+    _prices(db, company, date(2022, 1, 1), date(2022, 6, 30), lambda d: 100.0)
+    db.commit()
+
+    calls = []
+    real_load = backtest_engine.load_universe
+    monkeypatch.setattr(
+        backtest_engine, "load_universe", lambda *a: calls.append(1) or real_load(*a),
+    )
+    app = FastAPI()
+    app.include_router(backtest_router.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    body = {"date_from": "2022-01-01", "date_to": "2022-06-30", "verdicts": [], "max_pe": 10}
+    first = client.post("/backtest", json=body)
+    assert first.status_code == 200
+    assert first.json()["rebalances"][0]["tickers"] == ["SBER"]
+    assert client.post("/backtest", json=body).json() == first.json()
+    assert len(calls) == 1
+
+    client.post("/backtest", json={**body, "max_pe": 4})
+    assert len(calls) == 2
+
+    bump_data_version(db, [company.id])
+    db.commit()
+    client.post("/backtest", json=body)
+    assert len(calls) == 3
+
+    assert client.post("/backtest", json={**body, "date_to": "2021-01-01"}).status_code == 400
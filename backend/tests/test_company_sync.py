@@ -0,0 +1,185 @@
+"""Синхронизация компаний с T-Invest: сравнение в памяти, один upsert, бренды пулом и из кэша.
+
+T-Invest подменяется списком словарей в формате `get_tinkoff_companies`;
+база — SQLite в памяти (upsert строится диалектом SQLite, SQL для Postgres
+проверяется компиляцией).
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Company
+from app.services.companies import sync_service
+from app.services.companies.sync_service import (
+    _upsert_companies_stmt,
+    brand_cache,
+    plan_company_sync,
+    sync_companies_from_tinkoff,
+)
+from app.utils import tinkoff_client
+
+_NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _api(figi, ticker, **kw):
+    base = {
+        "figi": figi, "ticker": ticker, "name": f"ПАО {ticker}", "isin": f"RU{ticker}",
+        "sector": "energy", "currency": "rub", "lot": 1, "api_trade_available_flag": True,
+        "brand_logo_url": f"https://cdn/{ticker}.png", "brand_color": "#000000",
+        "brand_checked": False,
+    }
+    return {**base, **kw}
+
+
+def _row(figi, ticker, **kw):
+    values = {k: v for k, v in _api(figi, ticker).items() if k != "brand_checked"}
+    return {"id": len(ticker), **values, "brand_checked_at": None, **kw}
+
+
+def test_plan_writes_only_new_and_changed_rows():
+    existing = [
+        _row("F1", "LKOH", id=1),
+        _row("F2", "SBER", id=2),
+        _row("OLD", "MOEX", id=3),
+    ]
+    plan = plan_company_sync(existing, [
+        _api("F1", "LKOH"),                            # без изменений
+        _api("F2", "SBER", name="Сбербанк"),          # переименован
+        _api("F2", "SBER", name="Сбер"),              # повтор FIGI — последний выигрывает
+        _api("NEW", "MOEX", lot=10),                   # FIGI сменился, ISIN тот же
+        _api("F4", "SBERP", isin=""),                  # новая бумага
+        {"figi": "F5"},                                # битая запись
+    ], _NOW)
+
+    assert plan.unchanged == 1
+    assert plan.errors == 1
+    assert [(r["figi"], r["name"]) for r in plan.changed] == [("F2", "Сбер")]
+    assert [(r["id"], r["ticker"]) for r in plan.by_id] == [(3, "MOEX")]
+    assert [(r["figi"], r["is_preferred_share"]) for r in plan.created] == [("F4", True)]
+    # Все строки одного upsert — с одинаковым набором колонок.
+    assert len({tuple(r) for r in plan.upsert_rows}) == 1
+
+
+def test_empty_isin_and_unchecked_brand_keep_known_values():
+    checked = _NOW - timedelta(days=3)
+    existing = [_row("F1", "LKOH", id=1, brand_checked_at=checked)]
+    plan = plan_company_sync(existing, [_api("F1", "LKOH", isin=None)], _NOW)
+    assert plan.unchanged == 1
+
+    plan = plan_company_sync(existing, [_api("F1", "LKOH", brand_checked=True)], _NOW)
+    assert plan.changed[0]["brand_checked_at"] == _NOW
+
+
+def test_brand_cache_keeps_only_recent_checks():
+    existing = [
+        _row("FRESH", "LKOH", brand_checked_at=_NOW - timedelta(days=5)),
+        _row("NAIVE", "GAZP", brand_checked_at=(_NOW - timedelta(days=5)).replace(tzinfo=None)),
+        _row("STALE", "SBER", brand_checked_at=_NOW - timedelta(days=45)),
+        _row("NEVER", "MOEX"),
+    ]
+    assert set(brand_cache(existing, _NOW, ttl_days=30)) == {"FRESH", "NAIVE"}
+
+
+def test_upsert_sql_targets_figi_and_spares_manual_flags():
+    rows = plan_company_sync([], [_api("F1", "LKOH")], _NOW).upsert_rows
+    sql = str(_upsert_companies_stmt("postgresql", rows).compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (figi) DO UPDATE" in sql
+    assert "data_version = (companies.data_version +" in sql
+    set_clause = sql.split("DO UPDATE SET", 1)[1]
+    assert "is_preferred_share" not in set_clause
+    assert "sector_profile_key" not in set_clause
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+def test_sync_is_one_upsert_and_leaves_manual_fields(db, monkeypatch):
+    db.add_all([
+        Company(figi="F1", ticker="LKOH", name="ПАО LKOH", isin="RULKOH", sector="energy",
+                currency="rub", lot=1, api_trade_available_flag=True,
+                brand_logo_url="https://cdn/LKOH.png", brand_color="#000000"),
+        Company(figi="F2", ticker="SBERP", name="ПАО SBERP", isin="RUSBERP", sector="energy",
+                currency="rub", lot=1, api_trade_available_flag=True, is_preferred_share=False,
+                sector_profile_key="bank", brand_logo_url="https://cdn/SBERP.png",
+                brand_color="#000000", brand_checked_at=_NOW),
+    ])
+    db.commit()
+
+    seen_cache = {}
+
+    def fake_companies(cache):
+        seen_cache.update(cache)
+        return [
+            _api("F1", "LKOH"),
+            _api("F2", "SBERP", name="Сбербанк ап", brand_checked=True),
+            _api("F3", "ROSN"),
+        ]
+
+    monkeypatch.setattr(sync_service, "get_tinkoff_companies", fake_companies)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda *args: statements.append(args[2].split()[0]))
+
+    stats = sync_companies_from_tinkoff(db)
+
+    assert stats == {"total": 3, "created": 1, "updated": 1, "unchanged": 1, "errors": 0}
+    assert set(seen_cache) == {"F2"}
+    assert statements == ["SELECT", "INSERT"]
+
+    companies = {c.figi: c for c in db.scalars(select(Company))}
+    assert companies["F2"].name == "Сбербанк ап"
+    assert companies["F2"].sector_profile_key == "bank"
+    assert companies["F2"].is_preferred_share is False
+    assert companies["F2"].data_version == 1
+    assert companies["F1"].data_version == 0
+    assert companies["F3"].ticker == "ROSN"
+
+
+def test_missing_brands_are_fetched_concurrently(monkeypatch):
+    monkeypatch.setattr(tinkoff_client.settings, "TINKOFF_BRAND_WORKERS", 4)
+    both_in_flight = threading.Barrier(2, timeout=5)
+    asked = []
+
+    def fake_share_by(token, base_url, figi, session=None):
+        asked.append(figi)
+        if figi in ("A", "B"):
+            both_in_flight.wait()  # оба запроса должны идти одновременно
+        if figi == "DOWN":
+            return None
+        return {"figi": figi, "brand": {"logoName": f"{figi}.png", "logoBaseColor": "#ffffff"}}
+
+    monkeypatch.setattr(tinkoff_client, "fetch_share_instrument_by_figi", fake_share_by)
+    companies = [
+        {"figi": f, "ticker": f, "isin": f"RU{f}", "brand_logo_url": None, "brand_color": None}
+        for f in ("A", "B", "CACHED", "DOWN")
+    ]
+    tinkoff_client._fill_brands("t", "url", companies, {"CACHED": ("https://cdn/c.png", "#111111")})
+
+    by_figi = {c["figi"]: c for c in companies}
+    assert sorted(asked) == ["A", "B", "DOWN"]
+    assert by_figi["A"]["brand_checked"] and by_figi["A"]["brand_color"] == "#FFFFFF"
+    assert by_figi["CACHED"]["brand_logo_url"] == "https://cdn/c.png"
+    assert not by_figi["CACHED"]["brand_checked"]
+    # Недоступный ShareBy: запасной логотип с CDN, но бренд не помечен проверенным.
+    assert not by_figi["DOWN"]["brand_checked"]
+    assert by_figi["DOWN"]["brand_logo_url"].startswith(tinkoff_client.BRAND_CDN_BASE)
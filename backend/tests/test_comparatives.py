@@ -0,0 +1,171 @@
+"""Колонка прошлого года из годового PDF: черновик или сверка без LLM.
+
+PDF — LKOH_2024 из golden_pdf (таблицы читаются по-настоящему), ответ
+модели на текущий год, MOEX и описание компании подменены. База — SQLite в
+памяти.
+"""
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+from app.models import Company, FinancialReport
+from app.models.enums import ReportSource
+from app.services.report_parser import extractor_service as es
+from app.services.report_parser.pdf_extractor import extract_financial_pages
+from app.services.report_parser.schemas import ExtractedReport
+
+_PDF = Path(__file__).parent / "golden_pdf" / "LKOH_2024.pdf"
+
+
+@pytest.fixture(scope="module")
+def extraction():
+    return extract_financial_pages(_PDF)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def company(db) -> Company:
+    company = Company(figi="FIGILKOH", ticker="LKOH", name="Лукойл", currency="RUB")
+    db.add(company)
+    db.commit()
+    return company
+
+
+@pytest.fixture
+def parse(db, company, extraction, monkeypatch):
+    """parse_pdf_to_report по LKOH_2024: LLM отвечает за текущий год, сеть отключена."""
+    monkeypatch.setattr(settings, "LLM_HARVEST_COMPARATIVES", True)
+    current = ExtractedReport(
+        fiscal_year=2024, units_scale="millions", revenue=8_621_561, net_income=848_514,
+    )
+    with patch.object(es, "extract_financial_pages", return_value=extraction), \
+            patch.object(es, "_extract_normalized", return_value=(current, [], [])), \
+            patch.object(es, "_extract_company_description", return_value=None), \
+            patch.object(es, "get_closing_price_on_or_before", return_value={"price": 7000.0}), \
+            patch.object(es, "get_moex_issuesize", return_value={"issuesize": 692_865_762}):
+        yield lambda **kw: es.parse_pdf_to_report(
+            db, pdf_source=_PDF, company=company, fiscal_year=2024, **kw,
+        )
+
+
+def _reports(db) -> dict[int, FinancialReport]:
+    return {r.fiscal_year: r for r in db.scalars(select(FinancialReport))}
+
+
+def test_missing_prior_year_becomes_unverified_draft(db, parse):
+    outcome = parse()
+
+    comparative = outcome.comparative
+    assert comparative is not None and comparative.fiscal_year == 2023
+    reports = _reports(db)
+    assert set(reports) == {2023, 2024}
+    draft = reports[2023]
+    assert comparative.created_report_id == draft.id
+    assert (draft.auto_extracted, draft.verified_by_analyst) == (True, False)
+    assert draft.report_date == date(2023, 12, 31)
+    assert draft.total_assets == pytest.approx(8_600_173)
+    assert draft.revenue == pytest.approx(7_928_303)
+    assert draft.capex == pytest.approx(720_317)
+    # Полей вне таблиц в колонке нет — их не придумываем.
+    assert draft.dividends_per_share is None
+    assert draft.price_per_share == 7000.0
+    assert "Сравнительная колонка за 2023" in draft.extraction_notes
+    # PDF — отчёт за 2024: перепроверка по нему прочитала бы не тот год.
+    assert draft.source == ReportSource.COMPARATIVE_COLUMN
+    assert draft.source_pdf_path is None
+    assert reports[2024].source == ReportSource.COMPANY_WEBSITE
+
+
+def test_existing_prior_year_is_cross_checked_and_restatement_flagged(db, company, parse):
+    db.add(FinancialReport(
+        company_id=company.id, period_type="annual", fiscal_year=2023,
+        accounting_standard="IFRS", consolidated=True, source="manual",
+        report_date=date(2023, 12, 31), currency="RUB",
+        revenue=7_928_303, total_assets=8_600_173, capex=650_000,
+    ))
+    db.commit()
+
+    outcome = parse()
+
+    comparative = outcome.comparative
+    assert comparative.created_report_id is None
+    statuses = {d.field: d.status for d in comparative.diffs}
+    assert statuses["revenue"] == statuses["total_assets"] == "match"
+    assert statuses["equity"] == "missing_existing"
+    assert [d.field for d in comparative.restatements] == ["capex"]
+    reports = _reports(db)
+    assert set(reports) == {2023, 2024}
+    assert "ПЕРЕСЧЁТ 2023" in reports[2024].extraction_notes
+    assert "ПЕРЕСЧЁТ" not in (reports[2023].extraction_notes or "")
+
+
+def test_dry_run_and_opt_out_write_nothing(db, parse):
+    outcome = parse(dry_run=True)
+    assert outcome.comparative.created_report_id is None
+    assert outcome.comparative.extracted.total_assets == pytest.approx(8_600_173)
+    assert _reports(db) == {}
+
+    assert parse(harvest_comparatives=False).comparative is None
+    assert set(_reports(db)) == {2024}
+
+
+def test_real_prior_year_pdf_replaces_the_comparative_draft(db, company, extraction, parse):
+    parse()
+    draft = _reports(db)[2023]
+    draft_id = draft.id
+    full = ExtractedReport(
+        fiscal_year=2023, units_scale="millions", revenue=7_928_303, net_income=1_155_121,
+        shares_outstanding=692_865_762, dividends_paid=True, dividends_per_share=945.0,
+        filing_date="2024-03-20",
+    )
+
+    # Отчёт за 2023 разобран после отчёта за 2024 (порядок очереди не задан).
+    with patch.object(es, "_extract_normalized", return_value=(full, [], [])), \
+            patch.object(es, "extract_financial_pages", return_value=extraction), \
+            patch.object(es, "_extract_company_description", return_value=None), \
+            patch.object(es, "get_closing_price_on_or_before", return_value={"price": 7000.0}), \
+            patch.object(es, "get_moex_issuesize", return_value={"issuesize": 692_865_762}):
+        outcome = es.parse_pdf_to_report(
+            db, pdf_source=_PDF, company=company, fiscal_year=2023,
+            source_pdf_path="/data/LKOH_2023.pdf", harvest_comparatives=False,
+        )
+
+    assert outcome.created_report_id == draft_id
+    db.expire_all()
+    report = _reports(db)[2023]
+    assert report.source == ReportSource.COMPANY_WEBSITE
+    assert report.source_pdf_path == "/data/LKOH_2023.pdf"
+    assert float(report.dividends_per_share) == 945.0
+    assert report.dividends_paid is True
+    assert report.shares_weighted_avg == 692_865_762
+    assert report.filing_date == date(2024, 3, 20)
+    assert "Сравнительная колонка" not in report.extraction_notes
+
+
+def test_verified_comparative_draft_is_not_overwritten(db, company, parse):
+    parse()
+    draft = _reports(db)[2023]
+    draft.verified_by_analyst = True
+    db.commit()
+
+    with pytest.raises(es.ReportAlreadyExistsError):
+        es.prepare_report_request(db, pdf_source=_PDF, company=company, fiscal_year=2023)
@@ -0,0 +1,131 @@
+"""Скачивание e-disclosure задачей воркера: прогресс в БД, а не в памяти API.
+
+Сеть не нужна: download_reports_bulk подменён заглушкой, которая сообщает
+прогресс как загрузчик скрапера и кладёт файл на диск. База — SQLite в файле,
+чтобы поток записи прогресса видел те же таблицы.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.background_task import BackgroundTask
+from app.models.company import Company
+from app.models.disclosure import DisclosureDownloadItem, DisclosureDownloadJob, DisclosurePeriod
+from app.routers import disclosure_router
+from app.services.disclosure import download_queue
+from app.services.tasks.registry import DISCLOSURE_DOWNLOAD_JOB
+
+NOW = datetime(2026, 10, 19, 10, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'download.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(download_queue, "SessionLocal", factory)
+    monkeypatch.setattr(download_queue, "refresh_flags_only", lambda db: 0)
+    monkeypatch.setattr(
+        download_queue, "pdf_path_for",
+        lambda ticker, period_type, year, quarter: tmp_path / f"{ticker}_{year}.pdf",
+    )
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def periods(db):
+    company = Company(figi="FIGILKOH", ticker="LKOH", name="Лукойл", currency="RUB")
+    db.add(company)
+    db.flush()
+    rows = [
+        DisclosurePeriod(
+            company_id=company.id, ticker="LKOH", period_type="annual", fiscal_year=year,
+            period_key=str(year), file_url=url, updated_at=NOW,
+        )
+        for year, url in ((2023, "https://e-disclosure.ru/a.zip"),
+                          (2024, "https://e-disclosure.ru/b.zip"),
+                          (2022, None))
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def test_post_download_enqueues_worker_task_instead_of_downloading(db, periods, monkeypatch):
+    monkeypatch.setattr(download_queue, "download_reports_bulk", pytest.fail)
+
+    out = disclosure_router.download(disclosure_router.IdsIn(period_ids=[p.id for p in periods]), db)
+
+    assert (out.status, out.total_items) == ("pending", 2)      # без ссылки — не в задании
+    assert [i.key for i in out.items] == ["LKOH:2023", "LKOH:2024"]
+    task = db.query(BackgroundTask).one()
+    assert (task.kind, task.payload) == (DISCLOSURE_DOWNLOAD_JOB, {"job_id": out.id})
+
+
+def test_worker_writes_progress_to_db_and_marks_periods_on_disk(db, periods, tmp_path, monkeypatch):
+    job = download_queue.enqueue_download(db, [p.id for p in periods])
+    seen_mid_download = {}
+
+    def fake_bulk(by_ticker, *, progress):
+        assert [e["period_key"] for e in by_ticker["LKOH"]] == ["2023", "2024"]
+        progress(SimpleNamespace(key="LKOH:2023", status="downloading", bytes_done=512,
+                                 bytes_total=2048, error=None))
+        progress.flush()
+        # Прогресс виден из другой сессии (другого процесса API) ещё до конца пачки.
+        with download_queue.SessionLocal() as other:
+            item = other.query(DisclosureDownloadItem).filter_by(key="LKOH:2023").one()
+            seen_mid_download.update(status=item.status, bytes=(item.bytes_done, item.bytes_total))
+        (tmp_path / "LKOH_2023.pdf").write_bytes(b"%PDF")
+        progress(SimpleNamespace(key="LKOH:2023", status="done", bytes_done=2048,
+                                 bytes_total=2048, error=None))
+        progress(SimpleNamespace(key="LKOH:2024", status="error", bytes_done=0,
+                                 bytes_total=None, error="HTTP 404"))
+        return {"LKOH": {"2023": str(tmp_path / "LKOH_2023.pdf")}}
+
+    monkeypatch.setattr(download_queue, "download_reports_bulk", fake_bulk)
+    download_queue.run_download_task({"job_id": job.id})
+
+    assert seen_mid_download == {"status": "downloading", "bytes": (512, 2048)}
+    db.expire_all()
+    out = disclosure_router.get_download_job(job.id, db)
+    assert (out.status, out.done_ok, out.done_error) == ("completed", 1, 1)
+    by_key = {i.key: i for i in out.items}
+    assert by_key["LKOH:2023"].bytes_done == 2048
+    assert by_key["LKOH:2024"].error == "HTTP 404"
+    assert db.get(DisclosurePeriod, periods[0].id).on_disk is True
+    assert db.get(DisclosurePeriod, periods[1].id).on_disk is False
+
+
+def test_retry_downloads_only_unfinished_files(db, periods, monkeypatch):
+    job = download_queue.enqueue_download(db, [p.id for p in periods])
+    db.query(DisclosureDownloadItem).filter_by(key="LKOH:2023").update({"status": "done"})
+    db.query(DisclosureDownloadJob).filter_by(id=job.id).update({"status": "running"})
+    db.commit()
+    requested = []
+
+    def fake_bulk(by_ticker, *, progress):
+        requested.extend(e["period_key"] for e in by_ticker["LKOH"])
+        raise ConnectionError("e-disclosure недоступен")
+
+    monkeypatch.setattr(download_queue, "download_reports_bulk", fake_bulk)
+    download_queue.run_download_task({"job_id": job.id})
+
+    assert requested == ["2024"]
+    db.expire_all()
+    item = db.query(DisclosureDownloadItem).filter_by(key="LKOH:2024").one()
+    assert (item.status, item.error) == ("error", "e-disclosure недоступен")
+    assert db.get(DisclosureDownloadJob, job.id).status == "completed"
@@ -0,0 +1,57 @@
+"""Bulk upsert периодов e-disclosure: строки listing и SQL без живой базы.
+
+Запрос компилируется диалектом Postgres — проверяем, что цель ON CONFLICT
+совпадает с уникальным индексом модели (иначе Postgres не найдёт arbiter).
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.models.disclosure import DisclosurePeriod
+from app.services.disclosure.sync_service import _listing_rows, _upsert_listing_stmt
+
+_NOW = datetime(2026, 5, 1, tzinfo=timezone.utc)
+_COMPANY = SimpleNamespace(id=7, ticker=" lkoh ")
+
+
+def _entry(period_type, year, quarter=None, **kw):
+    return {"period_type": period_type, "fiscal_year": year, "fiscal_quarter": quarter, **kw}
+
+
+def test_only_latest_interim_is_flagged():
+    rows = _listing_rows(_COMPANY, [
+        _entry("annual", 2025),
+        _entry("quarterly", 2025, 3),
+        _entry("quarterly", 2026, 1),
+        _entry("semi_annual", 2025),
+    ], _NOW)
+
+    latest = [(r["period_type"], r["fiscal_year"]) for r in rows if r["is_latest_interim"]]
+    assert latest == [("quarterly", 2026)]
+    assert {r["ticker"] for r in rows} == {"LKOH"}
+
+
+def test_duplicate_period_in_listing_collapses_to_last():
+    rows = _listing_rows(_COMPANY, [
+        _entry("annual", 2025, doc_type="черновик"),
+        _entry("annual", 2025, doc_type="окончательный"),
+    ], _NOW)
+
+    assert len(rows) == 1
+    assert rows[0]["doc_type"] == "окончательный"
+
+
+def test_conflict_target_matches_unique_index():
+    rows = _listing_rows(_COMPANY, [_entry("annual", 2025)], _NOW)
+    sql = str(_upsert_listing_stmt(rows).compile(dialect=postgresql.dialect()))
+    unique = next(ix for ix in DisclosurePeriod.__table__.indexes if ix.unique)
+    index_ddl = str(CreateIndex(unique).compile(dialect=postgresql.dialect()))
+
+    target = "(company_id, period_type, fiscal_year, coalesce(fiscal_quarter, 0))"
+    assert f"ON CONFLICT {target} DO UPDATE" in sql
+    assert index_ddl.endswith(target)
+    # Флаги покрытия пересчитывает _refresh_all_flags — upsert их не затирает.
+    assert "in_db = excluded" not in sql
+    assert "coverage_status = excluded" not in sql
@@ -0,0 +1,225 @@
+"""Таблица dividend_facts: серии и пропуски оконными функциями, пересчёт при записи, скрин рынка.
+
+База — SQLite в памяти (оконные функции есть с 3.25); SQL для Postgres
+проверяется компиляцией. Текущий год — из `datetime.now`, поэтому «свежие»
+выплаты задаются относительно него.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.models import Company, DividendFact, FinancialReport
+from app.models.enums import AccountingStandard, PeriodType, ReportSource
+from app.routers import dividends_router
+from app.schemas import FinancialReportCreate
+from app.services.companies.data_version import bump_data_version
+from app.services.dividends.dividend_facts import (
+    _FACT_COLUMNS,
+    _facts_select,
+    _lock_companies,
+    get_dividend_facts,
+    screen_dividend_payers,
+)
+from app.services.reports import report_service
+
+THIS_YEAR = datetime.now().year
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+def _company(db, ticker: str, price: float | None = None) -> Company:
+    company = Company(figi=f"FIGI{ticker}", ticker=ticker, name=ticker, current_price=price)
+    db.add(company)
+    db.flush()
+    return company
+
+
+def _report(db, company: Company, year: int, *, dps: float | None = 10.0, price: float = 100.0,
+            period: PeriodType = PeriodType.ANNUAL, quarter: int | None = None,
+            special: float | None = None, net_income: float | None = None,
+            shares: int | None = None) -> None:
+    db.add(FinancialReport(
+        company_id=company.id, period_type=period, fiscal_year=year, fiscal_quarter=quarter,
+        accounting_standard=AccountingStandard.IFRS, consolidated=True,
+        source=ReportSource.MANUAL, report_date=date(year, 12 if quarter is None else quarter * 3, 28),
+        dividends_paid=dps is not None, dividends_per_share=dps,
+        special_dividends_per_share=special, price_per_share=price,
+        net_income=net_income, shares_outstanding=shares,
+    ))
+
+
+def _years(db, company: Company, years, **kw) -> None:
+    for year in years:
+        _report(db, company, year, **kw)
+
+
+def test_streaks_and_gaps_come_from_window_functions(db):
+    company = _company(db, "LKOH")
+    _years(db, company, (2012, 2013, 2014, 2017, 2018))
+    _report(db, company, 2019, dps=None)  # отчёт без выплаты — не год выплат
+    db.commit()
+
+    facts = get_dividend_facts(db, company.id)
+
+    assert [(f.year, f.streak, f.gap_before) for f in facts] == [
+        (2012, 1, None), (2013, 2, 0), (2014, 3, 0), (2017, 1, 2), (2018, 2, 0),
+    ]
+
+
+def test_annual_report_wins_and_yield_payout_are_computed(db):
+    company = _company(db, "SBER")
+    # Промежуточный отчёт с выплатой за тот же год — строку задаёт годовой.
+    _report(db, company, 2024, dps=5.0, period=PeriodType.QUARTERLY, quarter=2)
+    _report(db, company, 2024, dps=20.0, price=200.0, special=4.0,
+            net_income=40_000.0, shares=1_000_000_000)
+    db.commit()
+
+    (fact,) = get_dividend_facts(db, company.id)
+
+    assert float(fact.dividends_per_share) == 20.0
+    assert fact.dividend_yield == pytest.approx(10.0)
+    assert fact.regular_dividend_yield == pytest.approx(8.0)
+    # 20 ₽ × 1 млрд акций = 20 млрд ₽ из 40 млрд ₽ прибыли.
+    assert fact.payout_ratio == pytest.approx(50.0)
+
+
+def test_screen_filters_the_whole_universe_in_one_query(db):
+    recent = range(THIS_YEAR - 11, THIS_YEAR)          # 11 лет подряд до прошлого года
+    steady = _company(db, "STEADY", price=100.0)
+    _years(db, steady, recent, dps=8.0)
+    rich = _company(db, "RICH", price=100.0)
+    _years(db, rich, recent, dps=12.0)
+    short = _company(db, "SHORT")
+    _years(db, short, range(THIS_YEAR - 3, THIS_YEAR), dps=20.0)
+    lapsed = _company(db, "LAPSED")
+    _years(db, lapsed, range(THIS_YEAR - 20, THIS_YEAR - 5), dps=20.0)
+    low = _company(db, "LOW")
+    _years(db, low, recent, dps=3.0)
+    db.commit()
+    screen_dividend_payers(db)  # первый вызов заполняет таблицу
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda *args: statements.append(args[2].split()[0]))
+    rows = screen_dividend_payers(db, min_streak=10, min_yield=7, sort="yield")
+
+    assert [r["ticker"] for r in rows] == ["RICH", "STEADY"]
+    assert rows[0]["streak"] == 11
+    assert rows[0]["first_year"] == THIS_YEAR - 11
+    assert rows[0]["current_dividend_yield"] == pytest.approx(12.0)
+    # Проверка версий и сам скрин; пересчитывать нечего.
+    assert statements == ["SELECT", "SELECT"]
+
+    everyone = screen_dividend_payers(db, active_only=False)
+    assert everyone[0]["ticker"] == "LAPSED"  # сортировка по серии: 15 лет
+
+
+def test_screen_yield_excludes_special_payouts_by_default(db):
+    company = _company(db, "SPEC")
+    _report(db, company, THIS_YEAR - 1, dps=15.0, special=10.0)
+    db.commit()
+
+    assert screen_dividend_payers(db, min_yield=7) == []
+    (row,) = screen_dividend_payers(db, min_yield=7, regular_only=False)
+    assert row["dividend_yield"] == pytest.approx(15.0)
+
+
+def test_report_service_refreshes_facts_in_the_write_transaction(db, monkeypatch):
+    monkeypatch.setattr(report_service.multiplier_service, "save_report_based_multiplier",
+                        lambda **kw: None)
+    company = _company(db, "MOEX")
+    db.commit()
+
+    def create(year):
+        return report_service.create_report(db, FinancialReportCreate(
+            company_id=company.id, period_type=PeriodType.ANNUAL, fiscal_year=year,
+            report_date=f"{year}-12-31", dividends_paid=True, dividends_per_share=10.0,
+            price_per_share=100.0,
+        ))
+
+    create(2022)
+    report = create(2023)
+    db.refresh(company)
+
+    assert company.dividend_facts_version == company.data_version
+    assert company.dividend_start_year == 2022
+    assert [(f.year, f.streak) for f in db.scalars(select(DividendFact))] == [(2022, 1), (2023, 2)]
+
+    report_service.delete_report(db, report.id)
+    assert [f.year for f in db.scalars(select(DividendFact))] == [2022]
+
+
+def test_reads_compute_once_and_ignore_price_version_bumps(db):
+    company = _company(db, "GAZP")
+    _report(db, company, THIS_YEAR - 1)
+    db.commit()
+    # Отчёт записан в обход report_service: первое чтение досчитывает компанию.
+    assert len(get_dividend_facts(db, company.id)) == 1
+
+    # Цены и мультипликаторы поднимают data_version каждый день — чтение
+    # после этого ничего не пересчитывает (DELETE/INSERT на чтении ловили
+    # IntegrityError при параллельных запросах).
+    bump_data_version(db, [company.id])
+    db.commit()
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda *args: statements.append(args[2].split()[0]))
+
+    assert [f.year for f in get_dividend_facts(db, company.id)] == [THIS_YEAR - 1]
+    screen_dividend_payers(db)
+    assert set(statements) == {"SELECT"}
+
+
+def test_postgres_refresh_takes_company_locks_in_id_order():
+    executed = []
+    session = SimpleNamespace(
+        get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()),
+        execute=lambda stmt: executed.append(str(stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True},
+        ))),
+    )
+
+    _lock_companies(session, [3, 7])
+
+    assert [sql.split(", ")[1].split(")")[0] for sql in executed] == ["3", "7"]
+    assert all("pg_advisory_xact_lock" in sql for sql in executed)
+
+
+def test_facts_sql_compiles_for_postgres():
+    stmt = insert(DividendFact).from_select(_FACT_COLUMNS, _facts_select([1, 2]))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "lag(ranked.year) OVER (PARTITION BY ranked.company_id ORDER BY ranked.year)" in sql
+    assert "row_number() OVER (PARTITION BY yearly.company_id, yearly.island" in sql
+
+
+def test_screen_endpoint_rejects_unknown_sort(db):
+    app = FastAPI()
+    app.include_router(dividends_router.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    assert client.get("/dividends/screen", params={"sort": "pe"}).status_code == 400
+    assert client.get("/dividends/screen", params={"min_streak": 5}).json() == []
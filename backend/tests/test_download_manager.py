@@ -0,0 +1,106 @@
+"""Докачка и параллельная загрузка файлов e-disclosure (offline).
+
+Вместо e-disclosure — локальный http.server с поддержкой Range, который умеет
+обрывать первую отдачу на середине файла.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.disclosure.edisclosure_client import ensure_scraper_importable
+
+ensure_scraper_importable()
+
+from download_manager import DownloadManager, DownloadTask, part_path  # noqa: E402
+
+_PAYLOAD = bytes(range(256)) * 400  # 100 КБ
+
+
+class _Handler(BaseHTTPRequestHandler):
+    cut_first: dict[str, bool] = {}
+    ranges: list[str] = []
+
+    def log_message(self, *args):  # тише в выводе pytest
+        pass
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        _Handler.ranges.append(header or "")
+        if self.path == "/missing":
+            self.send_response(404)
+            self.end_headers()
+            return
+        start = int(header.split("=")[1].rstrip("-")) if header else 0
+        body = _PAYLOAD[start:]
+        self.send_response(206 if header else 200)
+        if header:
+            self.send_header("Content-Range", f"bytes {start}-{len(_PAYLOAD) - 1}/{len(_PAYLOAD)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if _Handler.cut_first.pop(self.path, False):
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.connection.close()  # обрыв: клиент получит меньше Content-Length
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    _Handler.cut_first = {}
+    _Handler.ranges = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def _manager(**kw) -> DownloadManager:
+    return DownloadManager(min_interval=0, backoff=0, retries=3, chunk_size=4096, **kw)
+
+
+def test_broken_transfer_resumes_with_range(server, tmp_path):
+    _Handler.cut_first["/a.pdf"] = True
+    dest = tmp_path / "a.pdf"
+
+    _manager().download(DownloadTask("LKOH:2024", f"{server}/a.pdf", dest))
+
+    assert dest.read_bytes() == _PAYLOAD
+    assert not part_path(dest).exists()
+    assert _Handler.ranges[0] == ""
+    assert _Handler.ranges[1].startswith("bytes=") and _Handler.ranges[1] != "bytes=0-"
+
+
+def test_existing_part_file_is_continued(server, tmp_path):
+    dest = tmp_path / "b.pdf"
+    part_path(dest).write_bytes(_PAYLOAD[:1000])
+
+    _manager().download(DownloadTask("k", f"{server}/b.pdf", dest))
+
+    assert dest.read_bytes() == _PAYLOAD
+    assert _Handler.ranges == ["bytes=1000-"]
+
+
+def test_run_reports_progress_and_isolates_errors(server, tmp_path):
+    seen: dict[str, set[str]] = {}
+    lock = threading.Lock()
+
+    def progress(state):
+        with lock:
+            seen.setdefault(state.key, set()).add(state.status)
+
+    tasks = [
+        DownloadTask(f"T{i}:2024", f"{server}/f{i}.pdf", tmp_path / f"f{i}.pdf") for i in range(5)
+    ] + [DownloadTask("BAD:2024", f"{server}/missing", tmp_path / "bad.pdf")]
+
+    results = _manager(max_workers=4, progress=progress).run(tasks)
+
+    assert all(results[f"T{i}:2024"] == tmp_path / f"f{i}.pdf" for i in range(5))
+    assert isinstance(results["BAD:2024"], Exception)
+    assert not (tmp_path / "bad.pdf").exists()
+    assert seen["T0:2024"] >= {"queued", "downloading", "done"}
+    assert "error" in seen["BAD:2024"]
+    # 404 не ретраится: 5 файлов + одна попытка BAD
+    assert _Handler.ranges.count("") == 6
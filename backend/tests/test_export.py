@@ -0,0 +1,137 @@
+"""Потоковая выгрузка таблиц: колонки и фильтры, пачки курсора, форматы.
+
+База — SQLite в файле: эндпоинт открывает свою сессию, как в проде.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Company, FinancialReport, Multiplier, StockPrice
+from app.routers import export_router
+from app.services.export.streaming import ExportQuery, build_plan, export_chunks
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(export_router, "SessionLocal", factory)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    sber = Company(figi="FIGISBER", ticker="SBER", name="Сбербанк", currency="RUB",
+                   former_tickers=["SBRF"])
+    lkoh = Company(figi="FIGILKOH", ticker="LKOH", name="Лукойл", currency="RUB")
+    session.add_all([sber, lkoh])
+    session.flush()
+    for company in (sber, lkoh):
+        session.add_all(
+            StockPrice(company_id=company.id, date=date(2024, 1, day), price=100 + day)
+            for day in range(1, 6)
+        )
+        session.add(FinancialReport(
+            company_id=company.id, period_type="annual", fiscal_year=2023,
+            accounting_standard="IFRS", consolidated=True, source="manual",
+            report_date=date(2023, 12, 31), revenue=1234.5, verified_by_analyst=company is sber,
+        ))
+        session.add(Multiplier(company_id=company.id, date=date(2024, 1, 5), type="daily",
+                               pe_ratio=4.25))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _ndjson(chunks) -> list[dict]:
+    return [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+
+def test_columns_filters_and_cursor_batches(db):
+    plan = build_plan(ExportQuery(
+        table="stock_prices", columns=["ticker", "date", "price"], tickers=["lkoh"],
+        date_from=date(2024, 1, 2),
+    ))
+    chunks = list(export_chunks(db, plan, "ndjson", batch_size=2))
+
+    assert len(chunks) == 2  # 4 строки пачками по 2 — кусок на пачку
+    rows = _ndjson(chunks)
+    assert rows[0] == {"ticker": "LKOH", "date": "2024-01-02", "price": 102.0}
+    assert [r["date"] for r in rows] == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+
+    reports = _ndjson(export_chunks(db, build_plan(ExportQuery(
+        table="financial_reports", columns=["ticker", "period_type", "revenue"],
+        verified_only=True, period_type="ANNUAL",
+    )), "ndjson"))
+    assert reports == [{"ticker": "SBER", "period_type": "annual", "revenue": 1234.5}]
+
+
+@pytest.mark.parametrize("query, message", [
+    (ExportQuery(table="prices"), "Неизвестная таблица"),
+    (ExportQuery(table="stock_prices", columns=["price", "volume"]), "volume"),
+    (ExportQuery(table="companies", date_from=date(2024, 1, 1)), "нет даты"),
+    (ExportQuery(table="multipliers", verified_only=True), "financial_reports"),
+])
+def test_invalid_query_is_rejected_before_reading(query, message):
+    with pytest.raises(ValueError, match=message):
+        build_plan(query)
+
+
+def test_csv_has_header_and_plain_values(db):
+    plan = build_plan(ExportQuery(table="companies", columns=["ticker", "former_tickers", "company_type"]))
+    rows = list(csv.reader(io.StringIO(b"".join(export_chunks(db, plan, "csv")).decode())))
+
+    assert rows[0] == ["ticker", "former_tickers", "company_type"]
+    assert rows[1][:2] == ["SBER", '["SBRF"]']
+    assert not rows[1][2].startswith("CompanyType.")
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_arrow_and_parquet_are_written_batch_by_batch(db, fmt):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    plan = build_plan(ExportQuery(table="stock_prices", columns=["ticker", "date", "price"]))
+    data = b"".join(export_chunks(db, plan, fmt, batch_size=4))
+
+    if fmt == "arrow":
+        table = pyarrow.ipc.open_stream(data).read_all()
+        assert len(table.to_batches()) == 3
+    else:
+        parquet = pyarrow.parquet.ParquetFile(pa.BufferReader(data))
+        assert parquet.num_row_groups == 3
+        table = parquet.read()
+    assert table.num_rows == 10
+    assert table.schema.field("price").type == pa.float64()
+    assert table.schema.field("date").type == pa.date32()
+    assert table.column("ticker").to_pylist()[:1] == ["SBER"]
+
+
+def test_endpoint_streams_and_validates(db):
+    app = FastAPI()
+    app.include_router(export_router.router)
+    client = TestClient(app)
+
+    response = client.get("/export/multipliers", params={"type": "daily", "columns": "ticker,pe_ratio"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert _ndjson([response.content]) == [
+        {"ticker": "SBER", "pe_ratio": 4.25}, {"ticker": "LKOH", "pe_ratio": 4.25},
+    ]
+
+    assert client.get("/export/multipliers", params={"columns": "nope"}).status_code == 400
+    assert "ticker" in client.get("/export/tables").json()["financial_reports"]
@@ -6,6 +6,8 @@
 """
 from unittest.mock import patch
 
+import pymupdf  # type: ignore[import-not-found]
+
 from app.services.report_parser.extractor_service import (
     _auto_fix_money_units,
     _collect_sanity_warnings,
@@ -14,10 +16,18 @@ from app.services.report_parser.extractor_service import (
     _sanitize_special_dividends,
     _sync_net_income_fields,
 )
+from app.services.report_parser.llm_client import _image_mime
 from app.services.report_parser.pdf_extractor import (
     SECTION_KEYWORDS,
+    _estimate_image_tokens,
+    _estimate_tokens,
+    _find_boilerplate_lines,
     _find_matches,
+    _pack_pages_by_budget,
     _prioritized_pages,
+    _render_page_image,
+    _strip_boilerplate,
+    extract_financial_pages,
 )
 from app.services.report_parser.schemas import ExtractedReport, rescale_to_millions
 
@@ -339,3 +349,135 @@ def test_prioritized_pages_respects_limit_and_dedupes():
 def test_keyword_groups_are_not_empty():
     """Пустая группа сломала бы распределение квоты страниц по разделам."""
     assert all(len(group) > 0 for group in SECTION_KEYWORDS)
+
+
+# ─── Упаковка страниц в бюджет токенов ──────────────────────────────────────
+
+
+def test_repeated_page_headers_are_stripped():
+    """Колонтитул на каждой странице съедает бюджет и ничего не даёт модели."""
+    pages = [
+        f"ПАО «Компания»\nКонсолидированная отчётность за 2024 год\n"
+        f"Строка таблицы {i}\nВыручка {i * 100}\nСтр. {i + 1}"
+        for i in range(10)
+    ]
+    boilerplate = _find_boilerplate_lines(pages)
+    body = _strip_boilerplate(pages[3], boilerplate)
+
+    assert "ПАО «Компания»" not in body
+    assert "Стр." not in body
+    assert "Выручка 300" in body
+
+
+def test_budget_packing_keeps_section_leaders_before_neighbors():
+    """Соседи баланса не должны вытеснить страницу с амортизацией."""
+    matched = {
+        1: ["итого активы", "итого обязательства"],
+        9: ["износ и амортизация"],
+    }
+    hits = {1: {8: 2}, 9: {6: 1}}
+    tokens = {i: 1_000 for i in range(12)}
+
+    chosen, used = _pack_pages_by_budget(
+        matched, hits, tokens, total=12, budget=2_100, window=2,
+    )
+
+    assert chosen == [1, 9]
+    assert used <= 2_100
+
+
+def test_budget_packing_adds_near_neighbors_first_and_skips_oversized():
+    matched = {5: ["итого активы"]}
+    hits = {5: {8: 1}}
+    tokens = {3: 100, 4: 5_000, 5: 100, 6: 100, 7: 100}
+
+    chosen, _ = _pack_pages_by_budget(
+        matched, hits, tokens, total=10, budget=500, window=2,
+    )
+
+    assert chosen == [3, 5, 6, 7]
+
+
+def test_budget_packing_keeps_top_page_even_if_it_alone_is_over_budget():
+    matched = {2: ["total assets"], 4: ["total liabilities"]}
+    hits = {2: {8: 3}, 4: {8: 1}}
+    tokens = {2: 9_000, 4: 8_000}
+
+    chosen, used = _pack_pages_by_budget(
+        matched, hits, tokens, total=6, budget=1_000, window=1,
+    )
+
+    assert (chosen, used) == ([2], 1_000)
+
+
+def test_oversized_top_page_is_sent_truncated_not_dropped():
+    doc = pymupdf.open()
+    page = doc.new_page(width=595, height=842)
+    line = "Total assets 1 234 567 890 Total liabilities 987 654 321 Equity 246 913 569"
+    page.insert_textbox(pymupdf.Rect(20, 20, 575, 822), "\n".join([line] * 60), fontsize=6)
+
+    result = extract_financial_pages(doc.tobytes(), token_budget=300)
+
+    assert result.selected_pages == [0]
+    assert "Total assets" in result.text
+    assert result.text.endswith("ОБРЕЗАНА ПО БЮДЖЕТУ ТОКЕНОВ]")
+    assert _estimate_tokens(result.text) <= 300
+
+
+def test_token_estimate_grows_with_text():
+    assert _estimate_tokens("") == 0
+    assert _estimate_tokens("а" * 2_800) > _estimate_tokens("а" * 280)
+
+
+# ─── Картинки страниц для vision ────────────────────────────────────────────
+
+
+def _page_with_small_table() -> "pymupdf.Page":
+    doc = pymupdf.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((72, 100), "Выручка      1 234 567", fontsize=8)
+    page.insert_text((72, 112), "Чистая прибыль  345 678", fontsize=8)
+    page.draw_rect(pymupdf.Rect(66, 88, 300, 118))
+    return page
+
+
+def test_page_image_is_cropped_to_table_and_grayscale():
+    page = _page_with_small_table()
+    img = _render_page_image(page)
+
+    # Таблица в верхнем левом углу — картинка много меньше страницы A4.
+    assert img.height < img.width < 1_000
+    assert img.tokens < img.baseline_tokens
+    pix = pymupdf.Pixmap(img.data)
+    assert pix.n == 1  # один канал — серый
+
+
+def test_full_page_raster_with_text_page_number_is_not_cropped():
+    """Скан: таблица — картинка во всю страницу, текстом только номер страницы."""
+    doc = pymupdf.open()
+    page = doc.new_page(width=595, height=842)
+    raster = pymupdf.Pixmap(pymupdf.csGRAY, pymupdf.IRect(0, 0, 300, 424), False)
+    raster.clear_with(200)
+    page.insert_image(page.rect, pixmap=raster)
+    page.insert_text((290, 830), "12", fontsize=8)
+
+    img = _render_page_image(page)
+
+    scale = img.dpi / 72.0
+    assert img.width >= int(595 * scale) - 1
+    assert img.height >= int(842 * scale) - 1
+
+
+def test_small_font_gets_higher_dpi():
+    assert _render_page_image(_page_with_small_table()).dpi > 150
+
+
+def test_image_tokens_follow_tile_pricing():
+    assert _estimate_image_tokens(512, 512) == 85 + 170
+    # A4 при 150 DPI: короткая сторона ужимается до 768 → 2×3 тайла.
+    assert _estimate_image_tokens(1240, 1754) == 85 + 170 * 6
+
+
+def test_image_mime_detected_by_signature():
+    assert _image_mime(b"\xff\xd8\xff\xe0....") == "image/jpeg"
+    assert _image_mime(b"\x89PNG\r\n\x1a\n") == "image/png"
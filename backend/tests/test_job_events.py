@@ -0,0 +1,217 @@
+"""События о ходе задач: шина с курсором, публикация по коммиту, SSE-эндпоинты.
+
+База — SQLite в памяти, поэтому NOTIFY не шлётся и события публикуются в шину
+процесса на after_commit; мост LISTEN проверяется разбором payload.
+Асинхронные сценарии запускаются через asyncio.run.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+from app.database import Base
+from app.models.disclosure import DisclosureSyncRun
+from app.models.mass_parse import MassParseItem, MassParseJob
+from app.routers import disclosure_router, mass_parse_router
+from app.services.events import bus as bus_module
+from app.services.events import publisher
+from app.services.events.bus import RESET, EventBus, sse_stream
+from app.services.mass_parse.worker import JOBS_TOPIC, job_topic
+
+NOW = datetime(2026, 10, 19, 10, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    fresh = EventBus(buffer_size=5)
+    monkeypatch.setattr(bus_module, "_bus", fresh)
+    return fresh
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+def _job(db, items: int = 2) -> MassParseJob:
+    job = MassParseJob(reports_root="/r", total_items=items, created_at=NOW, updated_at=NOW)
+    db.add(job)
+    db.flush()
+    for pos in range(items):
+        db.add(MassParseItem(job_id=job.id, position=pos, ticker=f"T{pos}", pdf_path=f"/r/{pos}.pdf"))
+    db.commit()
+    return job
+
+
+def _collect(bus: EventBus, topic: str, cursor, count: int) -> list:
+    async def run():
+        out = []
+        stream = bus.listen(topic, cursor, heartbeat=0.05)
+        try:
+            async for event in stream:
+                if event is not None:
+                    out.append(event)
+                if len(out) == count:
+                    return out
+        finally:
+            await stream.aclose()
+    return asyncio.run(run())
+
+
+def test_resume_replays_missed_events_and_resets_when_they_are_gone(bus):
+    first = bus.publish(("t",), "job", {"n": 1})
+    bus.publish(("other",), "job", {"n": 0})
+    bus.publish(("t",), "job", {"n": 2})
+
+    # Первое подключение: reset с курсором, дальше только новое.
+    (reset,) = _collect(bus, "t", None, 1)
+    assert reset.kind == RESET and reset.id == bus.last_id
+
+    # Переподключение с курсором: пропущенное той же темы, по порядку.
+    assert [e.data["n"] for e in _collect(bus, "t", first, 1)] == [2]
+
+    # Буфер темы — 5 событий: курсор старше вытесненного → reset.
+    for n in range(3, 10):
+        bus.publish(("t",), "job", {"n": n})
+    assert _collect(bus, "t", first, 1)[0].kind == RESET
+
+    # Курсор из прошлой жизни процесса (номера начинаются со времени старта).
+    assert _collect(bus, "t", bus.first_id - 100, 1)[0].kind == RESET
+
+
+def test_subscriber_is_woken_by_publish_from_another_thread(bus):
+    async def run():
+        stream = bus.listen("t", bus.last_id, heartbeat=5)
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        await asyncio.to_thread(bus.publish, ("t",), "item", {"id": 1})
+        try:
+            return await asyncio.wait_for(waiting, 1)
+        finally:
+            await stream.aclose()
+
+    event = asyncio.run(run())
+    assert (event.kind, event.data) == ("item", {"id": 1})
+
+
+def test_commit_publishes_coalesced_row_state_and_rollback_publishes_nothing(bus, db):
+    job = _job(db)
+    cursor = bus.last_id
+
+    item = db.query(MassParseItem).filter_by(position=0).one()
+    job.status = "running"
+    job.current_item_id = item.id
+    item.status = "running"
+    db.flush()
+    item.status = "success"        # второй flush той же транзакции
+    job.done_ok = 1
+    job.current_item_id = None
+    db.commit()
+
+    events = bus.since(job_topic(job.id), cursor)
+    assert sorted(e.kind for e in events) == ["item", "job"]
+    job_event = next(e for e in events if e.kind == "job")
+    assert job_event.data["status"] == "running"
+    assert (job_event.data["processed_count"], job_event.data["pending_count"]) == (1, 1)
+    # Даты — ISO-строки, как в ответе REST (SQLite часовой пояс не хранит).
+    assert job_event.data["created_at"].startswith("2026-10-19T10:00:00")
+    assert next(e for e in events if e.kind == "item").data["status"] == "success"
+    # Задание — ещё и в теме списка заданий, под тем же номером.
+    assert [e.id for e in bus.since(JOBS_TOPIC, cursor)] == [job_event.id]
+
+    cursor = bus.last_id
+    job.status = "paused"
+    db.flush()
+    db.rollback()
+    job.status = job.status      # присваивание без изменения — не событие
+    db.commit()
+    assert bus.since(job_topic(job.id), cursor) == []
+
+
+def test_bulk_changes_collapse_into_one_reset(bus, db):
+    cursor = bus.last_id
+    job = _job(db, items=publisher._BULK_ROWS + 1)
+
+    kinds = [e.kind for e in bus.since(job_topic(job.id), cursor)]
+    assert sorted(kinds) == ["job", RESET]
+
+
+def test_notify_payload_roundtrip_skips_own_origin_and_clips_text(bus):
+    payload = publisher._notify_payload(("disclosure.sync",), "sync_run", {"id": 3, "last_message": "x" * 9000})
+    assert len(payload.encode()) < 8000
+    assert not publisher.publish_notification(payload)       # своё же уведомление
+
+    foreign = json.loads(payload) | {"origin": "other-process"}
+    assert publisher.publish_notification(json.dumps(foreign))
+    (event,) = bus.since("disclosure.sync", bus.first_id - 1)
+    assert event.kind == "sync_run" and len(event.data["last_message"]) == publisher._CLIP_CHARS
+
+
+def test_sync_run_events_reach_the_sse_endpoint_with_last_event_id(bus, db):
+    run = DisclosureSyncRun(status="running", created_at=NOW)
+    db.add(run)
+    db.commit()
+    cursor = bus.last_id
+    run.companies_done = 5
+    run.last_message = "5/10 SBER"
+    db.commit()
+
+    async def scenario():
+        request = Request({"type": "http", "headers": [(b"last-event-id", str(cursor).encode())]})
+        response = await disclosure_router.sync_events(request, None)
+        chunks = response.body_iterator
+        try:
+            return [await anext(chunks), await anext(chunks)]
+        finally:
+            await chunks.aclose()
+
+    retry, message = asyncio.run(scenario())
+    assert retry.startswith("retry: ")
+    lines = message.strip().split("\n")
+    assert lines[0] == f"id: {bus.last_id}"
+    assert lines[1] == "event: sync_run"
+    data = json.loads(lines[2].removeprefix("data: "))
+    assert (data["companies_done"], data["last_message"]) == (5, "5/10 SBER")
+
+
+def test_job_events_endpoint_accepts_cursor_in_query(bus):
+    bus.publish((job_topic(7),), "item", {"id": 1})
+
+    async def scenario():
+        request = Request({"type": "http", "headers": []})
+        response = await mass_parse_router.job_events(7, request, str(bus.first_id - 1))
+        chunks = response.body_iterator
+        try:
+            await anext(chunks)
+            return await anext(chunks)
+        finally:
+            await chunks.aclose()
+
+    assert asyncio.run(scenario()).split("\n")[1] == "event: item"
+
+
+def test_sse_stream_sends_ping_when_idle(bus):
+    async def scenario():
+        stream = sse_stream("idle", bus.last_id, heartbeat=0.01, bus=bus)
+        try:
+            return [await anext(stream), await anext(stream)]
+        finally:
+            await stream.aclose()
+
+    assert asyncio.run(scenario())[1] == ": ping\n\n"
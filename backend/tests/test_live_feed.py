@@ -0,0 +1,183 @@
+"""Поток цен внутри дня: протокол стрима, склейка тиков, мультипликаторы по кэшу знаменателей, SSE.
+
+Биржу заменяет локальная заглушка с протоколом MarketDataStream
+(app/services/market/tinvest_stream_stub.py), базу — SQLite в памяти.
+Асинхронные сценарии запускаются через asyncio.run.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Company, FinancialReport
+from app.routers import market_router
+from app.services.analysis import multiplier_service
+from app.services.companies.data_version import bump_data_version
+from app.services.market.live_feed import LastPriceTable, LiveFeed
+from app.services.market.tinvest_stream import Tick, parse_tick, subscribe_messages
+from app.services.market.tinvest_stream_stub import StubLastPriceServer
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        Base.metadata.drop_all(engine)
+
+
+def _seed(db, ticker: str, *, net_income: float = 10_000.0) -> Company:
+    company = Company(figi=f"FIGI{ticker}", ticker=ticker, name=ticker)
+    db.add(company)
+    db.flush()
+    # 1 млрд акций, прибыль 10 млрд ₽, капитал 50 млрд ₽, дивиденд 6 ₽.
+    db.add(FinancialReport(
+        company_id=company.id, period_type="annual", fiscal_year=2025,
+        accounting_standard="IFRS", consolidated=True, source="manual",
+        report_date=date(2025, 12, 31), net_income=net_income, equity=50_000.0,
+        total_liabilities=25_000.0, current_assets=30_000.0, current_liabilities=15_000.0,
+        operating_cash_flow=15_000.0, capex=5_000.0, shares_outstanding=1_000_000_000,
+        dividends_paid=True, dividends_per_share=6.0, price_per_share=100.0,
+    ))
+    db.commit()
+    return company
+
+
+def test_stream_protocol_messages():
+    figis = [f"F{i}" for i in range(650)]
+    chunks = [json.loads(m)["subscribeLastPriceRequest"]["instruments"] for m in subscribe_messages(figis)]
+    assert [len(c) for c in chunks] == [300, 300, 50]
+
+    tick = parse_tick(json.dumps({"lastPrice": {
+        "figi": "BBG004730N88", "price": {"units": "312", "nano": 450000000},
+        "time": "2026-10-19T10:15:03.123456789Z",
+    }}))
+    assert tick.figi == "BBG004730N88"
+    assert tick.price == pytest.approx(312.45)
+    assert tick.time.microsecond == 123456
+    assert parse_tick('{"ping": {"time": "2026-10-19T10:15:03Z"}}') is None
+    assert parse_tick("not json") is None
+
+
+def test_ticks_are_coalesced_to_the_last_price():
+    table = LastPriceTable()
+    for price in (100.0, 101.0, 102.5):
+        table.update(Tick("A", price, None))
+    table.update(Tick("B", 50.0, None))
+
+    assert table.drain() == {"A", "B"}
+    assert table.get("A")[0] == 102.5
+    table.update(Tick("A", 102.5, None))  # та же цена — рассылать нечего
+    assert table.drain() == set()
+
+
+def test_feed_prices_match_card_multipliers_and_reach_sse(session_factory):
+    with session_factory() as db:
+        sber = _seed(db, "SBER")
+        _seed(db, "LKOH")
+        sber_id = sber.id
+
+    async def scenario():
+        server = StubLastPriceServer()
+        url = await server.start()
+        feed = LiveFeed(url=url, token="t-secret", flush_seconds=3600, refresh_seconds=3600,
+                        session_factory=session_factory)
+        await feed.start()
+        events = feed.events([sber_id], heartbeat=0.05)
+        try:
+            assert json.loads((await anext(events)).split("data: ", 1)[1]) == []
+            for _ in range(50):
+                if server.subscribed() == {"FIGISBER", "FIGILKOH"}:
+                    break
+                await asyncio.sleep(0.02)
+            for price in (118.0, 119.0, 120.0):
+                await server.push("FIGISBER", price)
+            await server.push("FIGILKOH", 7000.0)
+            for _ in range(50):
+                if len(feed.table) == 2 and feed.table.get("FIGISBER")[0] == 120.0:
+                    break
+                await asyncio.sleep(0.02)
+            updates = feed.flush()
+            event = await anext(events)
+            return server, updates, event
+        finally:
+            await events.aclose()
+            await feed.stop()
+            await server.close()
+
+    server, updates, event = asyncio.run(scenario())
+
+    assert server.tokens == ["Bearer t-secret"]
+    assert sorted(u["ticker"] for u in updates) == ["LKOH", "SBER"]
+    name, data = event.split("\n")[:2]
+    assert name == "event: prices"
+    (live,) = json.loads(data.removeprefix("data: "))   # подписка только на SBER
+    assert live["price"] == 120.0
+
+    with session_factory() as db:
+        card = multiplier_service.calculate_current_multipliers(db, sber_id, price_override=120.0)
+    for field in ("pe_ratio", "pb_ratio", "price_to_fcf", "dividend_yield", "market_cap"):
+        assert live[field] == pytest.approx(card[field]), field
+
+
+def test_feed_reconnects_and_rereads_changed_companies(session_factory):
+    with session_factory() as db:
+        company = _seed(db, "GAZP", net_income=10_000.0)
+        company_id = company.id
+
+    async def scenario():
+        server = StubLastPriceServer()
+        url = await server.start()
+        feed = LiveFeed(url=url, token="t", flush_seconds=3600, refresh_seconds=3600,
+                        session_factory=session_factory)
+        await feed.start()
+        try:
+            async def wait_for(predicate):
+                for _ in range(200):
+                    if predicate():
+                        return
+                    await asyncio.sleep(0.02)
+                raise AssertionError("не дождались")
+
+            await wait_for(lambda: server.subscribed() == {"FIGIGAZP"})
+            await server.drop_connections()
+            await wait_for(lambda: server.connections == 2 and server.subscribed())
+            await server.push("FIGIGAZP", 100.0)
+            await wait_for(lambda: len(feed.table) == 1)
+            before = feed.flush()[0]["pe_ratio"]
+
+            # Отчёт поправили — версия сменилась, знаменатель перечитан.
+            with session_factory() as db:
+                report = db.query(FinancialReport).one()
+                report.net_income = 20_000.0
+                bump_data_version(db, [company_id])
+                db.commit()
+            await feed.refresh()
+            after = feed.flush()[0]["pe_ratio"]
+            return before, after
+        finally:
+            await feed.stop()
+            await server.close()
+
+    before, after = asyncio.run(scenario())
+    assert before == pytest.approx(10.0)
+    assert after == pytest.approx(5.0)
+
+
+def test_live_endpoint_is_unavailable_without_stream():
+    app = FastAPI()
+    app.include_router(market_router.router)
+    assert TestClient(app).get("/market/live").status_code == 503
@@ -0,0 +1,144 @@
+"""Batch API: строки JSONL, отправка, опрос и разбор ответов.
+
+Провайдера заменяет `MockBatchServer` — локальный сервер с эндпоинтами
+OpenAI Batch (`/files`, `/batches`), подключённый к настоящему openai SDK
+через httpx.MockTransport. Сеть и ключ не нужны.
+"""
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from openai import OpenAI
+
+from app.services.report_parser import llm_batch
+from app.services.report_parser.llm_client import LLMParseError, LLMTransientError
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "mock",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+    }
+
+
+class MockBatchServer:
+    """Минимальный Batch API: батч «выполняется» за `polls_until_done` опросов.
+
+    `answer(body)` по телу запроса возвращает (status_code, content ответа).
+    """
+
+    def __init__(self, answer, *, polls_until_done: int = 1):
+        self.answer = answer
+        self.polls_until_done = polls_until_done
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self.transport = httpx.MockTransport(self._handle)
+
+    def client(self) -> OpenAI:
+        return OpenAI(
+            base_url="http://mock-batch/v1", api_key="sk-test", max_retries=0,
+            http_client=httpx.Client(transport=self.transport),
+        )
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/v1")
+        if request.method == "POST" and path == "/files":
+            content = request.content.decode("utf-8")
+            jsonl = content[content.index('{"custom_id"'):content.rindex("}") + 1]
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = jsonl
+            return httpx.Response(200, json={
+                "id": file_id, "object": "file", "bytes": len(jsonl), "created_at": 0,
+                "filename": "mass-parse.jsonl", "purpose": "batch", "status": "processed",
+            })
+        if request.method == "POST" and path == "/batches":
+            body = json.loads(request.content)
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {"input": body["input_file_id"], "polls": 0}
+            return httpx.Response(200, json=self._batch_json(batch_id))
+        if request.method == "GET" and path.startswith("/batches/"):
+            batch_id = path.rsplit("/", 1)[-1]
+            self.batches[batch_id]["polls"] += 1
+            return httpx.Response(200, json=self._batch_json(batch_id))
+        if request.method == "GET" and path.endswith("/content"):
+            return httpx.Response(200, text=self.files[path.split("/")[2]])
+        return httpx.Response(404, json={"error": {"message": f"нет {path}"}})
+
+    def _batch_json(self, batch_id: str) -> dict:
+        state = self.batches[batch_id]
+        lines = [json.loads(line) for line in self.files[state["input"]].splitlines()]
+        done = state["polls"] >= self.polls_until_done
+        data = {
+            "id": batch_id, "object": "batch", "endpoint": llm_batch.BATCH_ENDPOINT,
+            "input_file_id": state["input"], "completion_window": "24h",
+            "status": "completed" if done else "in_progress", "created_at": 0,
+            "request_counts": {"total": len(lines), "completed": len(lines) if done else 0, "failed": 0},
+        }
+        if done and "output" not in state:
+            out = []
+            for line in lines:
+                code, content = self.answer(line["body"])
+                body = _completion(content) if code == 200 else {"error": {"message": content}}
+                out.append(json.dumps({
+                    "id": "r", "custom_id": line["custom_id"], "error": None,
+                    "response": {"status_code": code, "body": body},
+                }))
+            state["output"] = f"file-out-{batch_id}"
+            self.files[state["output"]] = "\n".join(out)
+        if done:
+            data["output_file_id"] = state["output"]
+        return data
+
+
+def test_request_line_is_openai_batch_format():
+    line = json.loads(llm_batch.batch_request_line(
+        "item-7", system_prompt="system", user_prompt="user", images=[b"\x89PNG..."],
+    ))
+
+    assert line["custom_id"] == "item-7"
+    assert line["url"] == "/v1/chat/completions"
+    assert line["body"]["response_format"] == {"type": "json_object"}
+    assert "extra_body" not in line["body"]
+    image_part = line["body"]["messages"][1]["content"][-1]
+    assert image_part["image_url"]["url"].startswith("data:image/png;base64,")
+
+
+def test_submit_poll_and_results_through_mock_server():
+    answers = {
+        "ok": (200, json.dumps({"fiscal_year": 2024, "revenue": 500_000, "units_scale": "millions"})),
+        "bad": (200, "не json"),
+        "err": (500, "internal error"),
+    }
+    server = MockBatchServer(
+        lambda body: answers[body["messages"][1]["content"]], polls_until_done=2,
+    )
+    lines = [
+        llm_batch.batch_request_line(f"item-{name}", system_prompt="s", user_prompt=name)
+        for name in answers
+    ]
+
+    with patch.object(llm_batch, "_get_client", return_value=server.client()):
+        batch_id = llm_batch.submit_batch(lines)
+        first = llm_batch.get_batch(batch_id)
+        second = llm_batch.get_batch(batch_id)
+        results = llm_batch.fetch_batch_results(second)
+
+    assert not first.finished
+    assert second.finished and second.total == 3
+    assert results["item-ok"].revenue == 500_000
+    assert isinstance(results["item-bad"], LLMParseError)
+    assert isinstance(results["item-err"], LLMTransientError)
+    assert "500" in str(results["item-err"])
+
+
+def test_empty_batch_is_rejected():
+    with pytest.raises(ValueError):
+        llm_batch.submit_batch([])
@@ -0,0 +1,127 @@
+"""LLM-клиент: общий пул соединений и хеджирование async-запросов.
+
+Сеть не нужна: клиент только создаётся (без запросов), а хеджирование
+проверяется на корутинах-заглушках с искусственной задержкой.
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.services.report_parser import llm_client
+
+
+@pytest.fixture
+def configured_llm():
+    with patch.object(llm_client.settings, "LLM_API_KEY", "sk-test"):
+        llm_client.reset_clients()
+        yield
+        llm_client.reset_clients()
+
+
+def test_sync_client_is_shared_between_calls(configured_llm):
+    assert llm_client._get_client() is llm_client._get_client()
+
+
+def test_async_client_is_per_event_loop(configured_llm):
+    async def grab():
+        return llm_client._get_async_client(), llm_client._get_async_client()
+
+    first, same = asyncio.run(grab())
+    other, _ = asyncio.run(grab())
+
+    assert first is same
+    assert first is not other
+
+
+def test_reset_closes_async_clients_of_finished_loops(configured_llm):
+    # Открытые соединения держат свой loop живым (он остаётся в словаре) —
+    # здесь ту же роль играет ссылка на loop.
+    loop = asyncio.new_event_loop()
+    client = loop.run_until_complete(_grab_client())
+    loop.close()
+    assert not client.is_closed()
+
+    llm_client.reset_clients()
+
+    assert client.is_closed()
+    assert len(llm_client._async_clients) == 0
+
+
+def test_reset_closes_client_on_its_running_loop(configured_llm):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        client = asyncio.run_coroutine_threadsafe(_grab_client(), loop).result(5)
+
+        llm_client.reset_clients()
+
+        assert client.is_closed()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+
+def test_areset_closes_the_current_loop_client(configured_llm):
+    async def scenario():
+        client = llm_client._get_async_client()
+        await llm_client.areset_clients()
+        return client
+
+    assert asyncio.run(scenario()).is_closed()
+
+
+async def _grab_client():
+    return llm_client._get_async_client()
+
+
+def _delayed(results: list, delays: list[float]):
+    """Фабрика запросов: i-й вызов ждёт delays[i] и возвращает/поднимает results[i]."""
+    calls = {"n": 0, "cancelled": 0}
+
+    async def make_call():
+        i = calls["n"]
+        calls["n"] += 1
+        try:
+            await asyncio.sleep(delays[i])
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+        if isinstance(results[i], BaseException):
+            raise results[i]
+        return results[i]
+
+    return make_call, calls
+
+
+def test_fast_answer_sends_no_hedge():
+    make_call, calls = _delayed(["первый"], [0.0])
+
+    assert asyncio.run(llm_client._hedged(make_call, 0.05)) == "первый"
+    assert calls["n"] == 1
+
+
+def test_slow_answer_is_raced_by_hedge_and_loser_cancelled():
+    make_call, calls = _delayed(["медленный", "дубликат"], [1.0, 0.0])
+
+    assert asyncio.run(llm_client._hedged(make_call, 0.05)) == "дубликат"
+    assert calls["n"] == 2
+    assert calls["cancelled"] == 1
+
+
+def test_hedge_failure_does_not_hide_primary_success():
+    boom = llm_client.LLMTransientError("503")
+    make_call, _ = _delayed(["основной", boom], [0.15, 0.0])
+
+    assert asyncio.run(llm_client._hedged(make_call, 0.05)) == "основной"
+
+
+def test_both_failed_raises_first_error():
+    first = llm_client.LLMTransientError("первый")
+    make_call, _ = _delayed([llm_client.LLMTransientError("второй"), first], [0.2, 0.0])
+
+    with pytest.raises(llm_client.LLMTransientError, match="первый"):
+        asyncio.run(llm_client._hedged(make_call, 0.05))
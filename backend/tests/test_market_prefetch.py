@@ -0,0 +1,179 @@
+"""Спекулятивная подтяжка MOEX/курса, пока идёт вызов LLM.
+
+MOEX и ЦБ подменены счётчиками: проверяем, что запрос с угаданной датой
+делается один раз и переиспользуется после ответа модели, а при другой дате
+уходит заново. База — SQLite в памяти.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Company, FinancialReport  # noqa: F401
+from app.services.report_parser import extractor_service as es
+from app.services.report_parser.lookups import SpeculativeLookups
+from app.services.report_parser.schemas import ExtractedReport
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def company(db) -> Company:
+    company = Company(figi="FIGI0001", ticker="TEST", name="Тестовая компания", currency="RUB")
+    db.add(company)
+    db.commit()
+    return company
+
+
+class _Moex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.prices: list[tuple[str, date]] = []
+        self.issuesize = 0
+
+    def price(self, ticker, target):
+        with self.lock:
+            self.prices.append((ticker, target))
+        return {"price": 100.0}
+
+    def shares(self, ticker):
+        with self.lock:
+            self.issuesize += 1
+        return {"issuesize": 1_000_000_000}
+
+
+@pytest.fixture
+def moex():
+    fake = _Moex()
+    with patch.object(es, "get_closing_price_on_or_before", fake.price), \
+            patch.object(es, "get_moex_issuesize", fake.shares):
+        yield fake
+
+
+def _prepared(company, **kw) -> es.PreparedExtraction:
+    extraction = SimpleNamespace(
+        selected_pages=[1], total_pages=10, token_budget=None, estimated_tokens=0,
+    )
+    return es.PreparedExtraction(
+        company=company, fiscal_year=2024, report_type="general", pdf_label="t.pdf",
+        pdf_source=b"%PDF", source_pdf_path=None, extraction=extraction, **kw,
+    )
+
+
+def _extracted(**kw) -> ExtractedReport:
+    return ExtractedReport.model_validate({
+        "fiscal_year": 2024, "units_scale": "millions", "revenue": 500_000,
+        "filing_date": "2025-03-01", **kw,
+    })
+
+
+def _save(db, prepared, extracted, lookups):
+    return es._save_extracted_report(
+        db, prepared, extracted=extracted, autofix_msgs=[], dry_run=True, lookups=lookups,
+    )
+
+
+def test_lookups_reuse_matching_call_and_refetch_on_mismatch():
+    calls = []
+
+    def fetch(ticker, splits):
+        calls.append(ticker)
+        return ticker
+
+    with SpeculativeLookups() as lookups:
+        lookups.prefetch(fetch, "A", [{"ratio": 10}])
+        assert lookups.get(fetch, "A", [{"ratio": 10}]) == "A"
+        assert lookups.get(fetch, "B", [{"ratio": 10}]) == "B"
+    assert calls == ["A", "B"]
+    assert (lookups.hits, lookups.misses) == (1, 1)
+
+
+def test_expected_report_date_by_period():
+    assert es._expected_report_date("annual", 2024) == date(2024, 12, 31)
+    assert es._expected_report_date("semi_annual", 2024) == date(2024, 6, 30)
+    assert es._expected_report_date("quarterly", 2024, 1) == date(2024, 3, 31)
+    assert es._expected_report_date("quarterly", 2024, 3) == date(2024, 9, 30)
+
+
+def test_prefetched_annual_lookups_are_reused(db, company, moex):
+    prepared = _prepared(company)
+    with SpeculativeLookups() as lookups:
+        es._prefetch_market_data(db, lookups, prepared)
+        outcome = _save(db, prepared, _extracted(), lookups)
+
+    assert outcome.extracted is not None
+    assert sorted(moex.prices) == [("TEST", date(2024, 12, 31)), ("TEST", date(2025, 3, 1))]
+    assert moex.issuesize == 1
+    assert lookups.misses == 0
+
+
+def test_company_description_llm_call_waits_for_saved_report(db, company, moex):
+    calls = []
+    prepared = _prepared(company)
+
+    def describe(*args):
+        calls.append(args)
+        return None
+
+    with patch.object(es, "_extract_company_description", describe), \
+            SpeculativeLookups() as lookups:
+        es._prefetch_market_data(db, lookups, prepared)
+        assert calls == []          # пока идёт извлечение — только MOEX/курс
+        _save(db, prepared, _extracted(), lookups)
+        assert calls == []          # dry-run: отчёт не сохранён
+        es._save_extracted_report(
+            db, prepared, extracted=_extracted(), autofix_msgs=[], dry_run=False, lookups=lookups,
+        )
+
+    assert len(calls) == 1
+
+
+def test_interim_date_mismatch_is_refetched(db, company, moex):
+    prepared = _prepared(company, period_type="quarterly", fiscal_quarter=3)
+    with SpeculativeLookups() as lookups:
+        es._prefetch_market_data(db, lookups, prepared)
+        # Модель прочитала в отчёте другую дату — догадка не подходит.
+        _save(db, prepared, _extracted(report_date="2024-10-31"), lookups)
+
+    assert ("TEST", date(2024, 9, 30)) in moex.prices
+    assert ("TEST", date(2024, 10, 31)) in moex.prices
+    assert moex.issuesize == 2
+
+
+def test_fx_prefetch_uses_currency_of_previous_reports(db, company, moex):
+    db.add(FinancialReport(
+        company_id=company.id, period_type="annual", fiscal_year=2023,
+        accounting_standard="IFRS", consolidated=True, source="company_website",
+        report_date=date(2023, 12, 31), currency="USD", exchange_rate=90.0,
+    ))
+    db.commit()
+    rates = []
+
+    def fx(currency, target):
+        rates.append((currency, target))
+        return {"rate": 100.0}
+
+    prepared = _prepared(company)
+    with patch.object(es, "get_fx_rate_on_or_before", fx), SpeculativeLookups() as lookups:
+        es._prefetch_market_data(db, lookups, prepared)
+        outcome = _save(db, prepared, _extracted(currency="usd"), lookups)
+
+    assert rates == [("USD", date(2024, 12, 31))]
+    assert outcome.extracted.currency.upper() == "USD"
@@ -0,0 +1,172 @@
+"""Пересборка истории мультипликаторов (report_based) одной транзакцией.
+
+`backfill_report_based_multipliers` раньше вызывал
+`save_report_based_multiplier` на каждый отчёт — с запросами и commit на
+каждой итерации. Пакетная версия обязана записать те же строки: сравниваем
+колонки с поотчётным сохранением, в том числе приток клиентских средств
+гибрида, для которого предыдущий отчёт теперь ищется в памяти.
+
+Постановка задачи пересборки проверяется на той же SQLite: вторая
+постановка для той же компании не создаёт вторую задачу.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import BackgroundTask, Company, FinancialReport, Multiplier
+from app.models.enums import AccountingStandard, CompanyType, PeriodType, ReportSource
+from app.services.analysis import multiplier_tasks
+from app.services.analysis.multiplier_service import (
+    backfill_report_based_multipliers,
+    save_report_based_multiplier,
+)
+from app.services.companies.data_version import get_versions
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _company(db, ticker="TEST", company_type=None) -> Company:
+    company = Company(figi=f"FIGI{ticker}", ticker=ticker, name=ticker, currency="RUB",
+                      company_type=company_type)
+    db.add(company)
+    db.commit()
+    return company
+
+
+def _report(db, company: Company, year: int, **overrides) -> FinancialReport:
+    fields = {
+        "company_id": company.id,
+        "period_type": PeriodType.ANNUAL,
+        "fiscal_year": year,
+        "accounting_standard": AccountingStandard.IFRS,
+        "consolidated": True,
+        "report_date": date(year, 12, 31),
+        "source": ReportSource.MANUAL,
+        "currency": "RUB",
+        "price_per_share": 100.0 + year % 10,
+        "shares_outstanding": 1_000_000_000,
+        "revenue": 50_000.0 + year,
+        "net_income": 10_000.0,
+        "equity": 50_000.0,
+        "total_assets": 100_000.0,
+        "total_liabilities": 25_000.0,
+        "operating_cash_flow": 15_000.0,
+        "capex": 5_000.0,
+    }
+    fields.update(overrides)
+    report = FinancialReport(**fields)
+    db.add(report)
+    db.commit()
+    return report
+
+
+def _rows(db, company: Company) -> dict:
+    db.expire_all()
+    rows = (
+        db.query(Multiplier)
+        .filter(Multiplier.company_id == company.id, Multiplier.type == "report_based")
+        .all()
+    )
+    columns = [c.key for c in Multiplier.__table__.columns
+               if c.key not in ("id", "created_at", "updated_at")]
+    return {row.date: {c: getattr(row, c) for c in columns} for row in rows}
+
+
+def test_bulk_rebuild_matches_per_report_save(db):
+    company = _company(db, company_type=CompanyType.HYBRID.value)
+    reports = [
+        _report(db, company, 2022, customer_deposits=1_000.0),
+        _report(db, company, 2023, customer_deposits=1_600.0),
+        _report(db, company, 2024, customer_deposits=1_500.0, price_per_share=None),
+    ]
+    for report in reports:
+        save_report_based_multiplier(db, report)
+    expected = _rows(db, company)
+
+    result = backfill_report_based_multipliers(db, company.id)
+
+    assert result == {"total_reports": 3, "saved": 3, "skipped": 0}
+    assert _rows(db, company) == expected
+
+
+def test_rebuild_drops_interim_and_stale_rows(db):
+    company = _company(db)
+    annual = _report(db, company, 2023)
+    interim = _report(db, company, 2024, period_type=PeriodType.SEMI_ANNUAL,
+                      report_date=date(2024, 6, 30))
+    draft = _report(db, company, 2024, revenue=None, net_income=None, equity=None,
+                    total_assets=None)
+    db.add_all([
+        Multiplier(company_id=company.id, report_id=interim.id, date=interim.report_date,
+                   type="report_based"),
+        Multiplier(company_id=company.id, report_id=None, date=date(2020, 12, 31),
+                   type="report_based"),
+        Multiplier(company_id=company.id, date=date(2025, 1, 10), type="current"),
+    ])
+    db.commit()
+
+    result = backfill_report_based_multipliers(db, company.id)
+
+    assert result == {"total_reports": 3, "saved": 1, "skipped": 2}
+    assert list(_rows(db, company)) == [annual.report_date]
+    assert draft.report_date not in _rows(db, company)
+    assert db.query(Multiplier).filter(Multiplier.type == "current").count() == 1
+
+
+def test_same_date_reports_give_one_row_last_wins(db):
+    company = _company(db)
+    _report(db, company, 2023, accounting_standard=AccountingStandard.RAS)
+    ifrs = _report(db, company, 2023)
+
+    result = backfill_report_based_multipliers(db, company.id)
+
+    assert result["saved"] == 1
+    assert _rows(db, company)[date(2023, 12, 31)]["report_id"] == ifrs.id
+
+
+def test_rebuild_commits_once_and_bumps_version(db):
+    company = _company(db)
+    for year in (2021, 2022, 2023):
+        _report(db, company, year)
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(session))
+
+    backfill_report_based_multipliers(db, company.id)
+
+    assert len(commits) == 1
+    assert get_versions(db, company.id) == ((company.id, 1),)
+
+
+def test_schedule_is_single_flight_and_task_rebuilds(db, session_factory, monkeypatch):
+    company = _company(db)
+    _report(db, company, 2023)
+
+    assert multiplier_tasks.schedule_history_rebuild(db, company.id) is not None
+    assert multiplier_tasks.schedule_history_rebuild(db, company.id) is None
+    assert db.query(BackgroundTask).count() == 1
+
+    monkeypatch.setattr(multiplier_tasks, "SessionLocal", session_factory)
+    multiplier_tasks.rebuild_history_task({"company_id": company.id})
+    assert list(_rows(db, company)) == [date(2023, 12, 31)]
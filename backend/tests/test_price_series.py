@@ -0,0 +1,153 @@
+"""Ряд цен для графика: сплиты, прореживание, кэш по версии данных.
+
+Эндпоинт поднимается через TestClient; вместо AsyncSession — обёртка над
+sync-сессией SQLite (как в test_async_reads.py), asyncpg не нужен.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_async_db
+from app.models import Company, StockPrice
+from app.routers import market_router, response_cache
+from app.services.companies.data_version import bump_data_version
+from app.services.market import price_series
+from app.services.market.price_series import PriceSeries
+from app.services.share_splits import shares_factor
+
+
+class _AsyncFacade:
+    def __init__(self, session):
+        self._session = session
+
+    async def execute(self, stmt):
+        return self._session.execute(stmt)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    price_series.clear_cache()
+    response_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        price_series.clear_cache()
+        response_cache.clear()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(market_router.router)
+    app.dependency_overrides[get_async_db] = lambda: _AsyncFacade(db)
+    return TestClient(app)
+
+
+def _company(db, splits=None) -> Company:
+    company = Company(figi="FIGIT", ticker="T", name="Т-Технологии", currency="RUB",
+                      share_splits=splits)
+    db.add(company)
+    db.commit()
+    return company
+
+
+def _prices(db, company, start: date, days: int) -> None:
+    db.add_all(
+        StockPrice(company_id=company.id, date=start + timedelta(days=i),
+                   price=1000.0 + (i % 50), source="moex")
+        for i in range(days)
+    )
+    db.commit()
+
+
+def _series(start: date, closes) -> PriceSeries:
+    from array import array
+
+    days = array("q", (start.toordinal() + i for i in range(len(closes))))
+    return PriceSeries(days, array("d", closes))
+
+
+def test_split_adjustment_matches_shares_factor():
+    splits = [{"date": "2026-04-17", "ratio": 10}, {"date": "2020-01-10", "ratio": 2}]
+    series = _series(date(2020, 1, 1), [3200.0] * 3000)
+    adjusted = price_series.adjust_for_splits(series, splits)
+    for day, raw, value in zip(series.days, series.closes, adjusted.closes):
+        assert value == pytest.approx(raw / shares_factor(splits, date.fromordinal(day)))
+    assert series.closes[0] == 3200.0  # исходный ряд (кэш) не тронут
+
+
+def test_lttb_keeps_ends_and_spike():
+    closes = [100.0] * 1000
+    closes[437] = 500.0
+    series = _series(date(2020, 1, 1), closes)
+    sampled = price_series.downsample(series, 50)
+    assert len(sampled.days) == 50
+    assert sampled.days[0] == series.days[0] and sampled.days[-1] == series.days[-1]
+    assert 500.0 in sampled.close
+    assert list(sampled.days) == sorted(sampled.days)
+
+
+def test_ohlc_buckets():
+    series = _series(date(2020, 1, 1), [1.0, 5.0, 2.0, 3.0, 9.0, 4.0])
+    sampled = price_series.downsample(series, 2, "ohlc")
+    assert sampled.days == [series.days[0], series.days[3]]
+    assert (sampled.open, sampled.high, sampled.low, sampled.close) == (
+        [1.0, 3.0], [5.0, 9.0], [1.0, 3.0], [2.0, 4.0],
+    )
+
+
+def test_series_is_cached_per_data_version(db):
+    company = _company(db)
+    _prices(db, company, date(2024, 1, 1), 10)
+    company_id = company.id
+    selects = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *a: selects.append(statement))
+
+    first = price_series.get_price_series(db, company_id, 0)
+    assert price_series.get_price_series(db, company_id, 0) is first
+    assert len(selects) == 1
+
+    _prices(db, company, date(2024, 1, 11), 5)
+    bump_data_version(db, [company_id])
+    db.commit()
+    assert len(price_series.get_price_series(db, company_id, 1)) == 15
+
+
+def test_fifteen_years_endpoint_is_compact(db, client):
+    company = _company(db, splits=[{"date": "2026-04-17", "ratio": 10}])
+    _prices(db, company, date(2011, 4, 1), 15 * 365)
+
+    url = "/market/prices/series"
+    params = {"company_id": company.id, "points": 400}
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["method"], body["total_points"], len(body["dates"])) == ("lttb", 15 * 365, 400)
+    assert body["dates"][0] == "2011-04-01"
+    assert body["close"][0] == 100.0  # 1000 ₽ до дробления 10:1
+    assert len(response.content) < 12_000
+
+    assert client.get(
+        url, params=params, headers={"If-None-Match": response.headers["etag"]},
+    ).status_code == 304
+
+    raw = client.get(url, params={**params, "adjusted": False, "date_from": "2025-01-01",
+                                  "date_to": "2025-01-31"}).json()
+    assert (raw["method"], raw["total_points"]) == ("raw", 31)
+    assert min(raw["close"]) >= 1000.0
+    assert client.get(url, params={"company_id": 999}).status_code == 404
@@ -0,0 +1,153 @@
+"""Лента отчётов компании: один запрос отчётов на расчёт карточки.
+
+Карточка гибрида с промежуточным отчётом задаёт больше всего вопросов к
+отчётам: последний, последний годовой, пара для формулы LTM, предыдущий
+сопоставимый для притока клиентских средств — и всё это дважды (текущие
+мультипликаторы и показатели финсегмента). Проверяем, что запрос к
+financial_reports уходит один, а запись отчёта в сессии ленту сбрасывает.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Company, FinancialReport  # noqa: F401 — регистрирует таблицы
+from app.models.enums import AccountingStandard, CompanyType, PeriodType, ReportSource
+from app.services.analysis.multiplier_service import (
+    calculate_current_multipliers,
+    compute_ltm_bank_metrics,
+    get_ltm_data,
+)
+from app.services.analysis.report_timeline import get_report_timeline
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def hybrid(db) -> Company:
+    company = Company(figi="FIGIYDEX", ticker="YDEX", name="Гибрид", currency="RUB",
+                      company_type=CompanyType.HYBRID.value, current_price=4_000.0)
+    db.add(company)
+    db.commit()
+    return company
+
+
+def _report(db, company, *, year, period=PeriodType.ANNUAL, month_end=12, **fields):
+    report = FinancialReport(
+        company_id=company.id,
+        period_type=period,
+        fiscal_year=year,
+        accounting_standard=AccountingStandard.IFRS,
+        consolidated=True,
+        report_date=date(year, month_end, 31 if month_end == 12 else 30),
+        source=ReportSource.MANUAL,
+        currency="RUB",
+        shares_outstanding=400_000_000,
+        **fields,
+    )
+    db.add(report)
+    db.commit()
+    return report
+
+
+def _history(db, company):
+    _report(db, company, year=2024, net_income=900.0, customer_deposits=1_000.0)
+    _report(db, company, year=2025, net_income=1_000.0, customer_deposits=1_500.0)
+    _report(db, company, year=2025, period=PeriodType.SEMI_ANNUAL, month_end=6,
+            net_income=400.0, customer_deposits=1_200.0)
+    return _report(db, company, year=2026, period=PeriodType.SEMI_ANNUAL, month_end=6,
+                   net_income=500.0, equity=20_000.0, customer_deposits=1_700.0)
+
+
+def _count_report_selects(db):
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM financial_reports" in statement:
+            statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", on_execute)
+    return statements
+
+
+def test_card_needs_one_report_query(db, hybrid):
+    _history(db, hybrid)
+    company_id = hybrid.id
+    db.expire_all()
+    selects = _count_report_selects(db)
+
+    mults = calculate_current_multipliers(db, company_id)
+    metrics = compute_ltm_bank_metrics(db, company_id)
+
+    assert len(selects) == 1
+    assert mults["ltm_source"] == "semi_annual_derived"
+    assert mults["ltm_net_income"] == 1_100.0
+    # Приток от депозитов — против предыдущего полугодия, а не годового отчёта.
+    assert (mults["banking_flow"], mults["banking_flow_basis"]) == (500.0, "balance_delta")
+    assert metrics["banking_flow"] == 500.0
+
+
+def test_lookups_normalize_enum_and_plain_values(db, hybrid):
+    h1 = _history(db, hybrid)
+    timeline = get_report_timeline(db, hybrid.id)
+
+    assert timeline.latest() is h1
+    assert timeline.latest("annual").fiscal_year == 2025
+    prior_ytd = timeline.find(period_type="semi_annual", fiscal_year=2025,
+                              fiscal_quarter=None, anchor=h1)
+    assert prior_ytd.report_date == date(2025, 6, 30)
+    assert timeline.previous_comparable(h1) is prior_ytd
+    assert timeline.previous_comparable(prior_ytd) is None
+    assert timeline.find(period_type=PeriodType.ANNUAL, fiscal_year=2023,
+                         fiscal_quarter=None, anchor=h1) is None
+
+
+def test_report_writes_drop_the_timeline(db, hybrid):
+    _report(db, hybrid, year=2024, net_income=900.0)
+    assert get_ltm_data(db, hybrid.id)["ltm_net_income"] == 900.0
+    timeline = get_report_timeline(db, hybrid.id)
+    assert get_report_timeline(db, hybrid.id) is timeline
+
+    # Не сброшенный в БД отчёт: лента пересобирается, а не отвечает старым.
+    db.add(FinancialReport(
+        company_id=hybrid.id, period_type=PeriodType.ANNUAL, fiscal_year=2025,
+        accounting_standard=AccountingStandard.IFRS, consolidated=True,
+        report_date=date(2025, 12, 31), source=ReportSource.MANUAL, net_income=1_000.0,
+    ))
+    assert get_ltm_data(db, hybrid.id)["ltm_net_income"] == 1_000.0
+
+    timeline = get_report_timeline(db, hybrid.id)
+    db.execute(update(FinancialReport).values(net_income=1_200.0))
+    assert get_report_timeline(db, hybrid.id) is not timeline
+    db.expire_all()
+    assert get_ltm_data(db, hybrid.id)["ltm_net_income"] == 1_200.0
+
+    timeline = get_report_timeline(db, hybrid.id)
+    db.commit()
+    assert get_report_timeline(db, hybrid.id) is not timeline
+
+
+def test_ltm_from_ready_timeline_needs_no_session(db, hybrid):
+    _history(db, hybrid)
+    timeline = get_report_timeline(db, hybrid.id)
+
+    # Так зовёт бэктест (snapshots._snapshot): лента уже собрана, сессии нет.
+    ltm = get_ltm_data(None, hybrid.id, timeline)
+
+    assert (ltm["source"], ltm["ltm_net_income"]) == ("semi_annual_derived", 1_100.0)
+    with pytest.raises(ValueError):
+        get_ltm_data(None, hybrid.id)
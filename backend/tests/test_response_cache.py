@@ -0,0 +1,167 @@
+"""Версия данных компании и кэш ответов с ETag.
+
+Эндпоинты поднимаются через TestClient на SQLite в памяти (StaticPool —
+одно соединение на все потоки тредпула FastAPI). Расчёт дивидендов обёрнут
+счётчиком: проверяем, что повторный запрос его не вызывает, а запись отчёта
+или доли сбрасывает кэш через новую версию.
+"""
+from __future__ import annotations
+
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.models import Company, FinancialReport, HoldingStake
+from app.routers import dividends_router, holdings_router, response_cache
+from app.services.companies.data_version import bump_data_version, get_versions
+from app.services.reports import report_service
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    response_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        response_cache.clear()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(dividends_router.router)
+    app.include_router(holdings_router.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def _company(db, ticker, price=None) -> Company:
+    company = Company(figi=f"FIGI{ticker}", ticker=ticker, name=ticker, currency="RUB",
+                      current_price=price)
+    db.add(company)
+    db.commit()
+    return company
+
+
+def _report(db, company, year) -> FinancialReport:
+    report = FinancialReport(
+        company_id=company.id, period_type="annual", fiscal_year=year,
+        accounting_standard="IFRS", consolidated=True, source="company_website",
+        report_date=date(year, 12, 31), dividends_paid=True, verified_by_analyst=False,
+    )
+    db.add(report)
+    db.commit()
+    return report
+
+
+def _version(db, company) -> int:
+    return dict(get_versions(db, company.id))[company.id]
+
+
+def test_bump_touches_only_given_companies_and_keeps_updated_at(db):
+    a, b = _company(db, "AAA"), _company(db, "BBB")
+    bump_data_version(db, [a.id, a.id, None])
+    db.commit()
+    db.refresh(a)
+    assert (_version(db, a), _version(db, b)) == (1, 0)
+    assert a.updated_at is None
+
+
+def test_report_writes_bump_version(db):
+    company = _company(db, "AAA")
+    report = _report(db, company, 2023)
+    report_service.mark_report_verified(db, report.id)
+    report_service.mark_report_unverified(db, report.id)
+    assert _version(db, company) == 2
+    report_service.delete_report(db, report.id)
+    assert _version(db, company) == 3
+
+
+def test_holding_versions_include_subsidiaries(db):
+    holding, sub, other = _company(db, "HOLD"), _company(db, "SUB"), _company(db, "OTHER")
+    db.add(HoldingStake(holding_company_id=holding.id, subsidiary_company_id=sub.id,
+                        name="SUB", share_pct=50))
+    db.commit()
+    assert [cid for cid, _ in get_versions(db, holding.id, with_subsidiaries=True)] == [
+        holding.id, sub.id,
+    ]
+    assert get_versions(db, other.id + 100) == ()
+
+
+def test_etag_304_and_lru_hit(db, client):
+    company = _company(db, "AAA")
+    _report(db, company, 2023)
+    calls = []
+    real = dividends_router.calculate_dividend_continuity
+
+    def counting(*args):
+        calls.append(args)
+        return real(*args)
+
+    url = f"/dividends/company/{company.id}/analysis"
+    with patch.object(dividends_router, "calculate_dividend_continuity", counting):
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        not_modified = client.get(url, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+        again = client.get(url)
+        assert again.json() == first.json()
+        assert len(calls) == 1
+
+        # Другие параметры — другой ключ.
+        assert client.get(url, params={"min_years": 5}).headers["etag"] != etag
+        assert len(calls) == 2
+
+        report = _report(db, company, 2024)
+        report_service.mark_report_verified(db, report.id)
+        fresh = client.get(url, headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
+        assert len(calls) == 3
+
+
+def test_missing_company_is_not_cached(client):
+    assert client.get("/dividends/company/999/analysis").status_code == 404
+    assert client.get("/dividends/company/999/analysis").status_code == 404
+
+
+def test_nav_changes_with_subsidiary_price(db, client):
+    holding, sub = _company(db, "HOLD"), _company(db, "SUB", price=100)
+    db.add(HoldingStake(holding_company_id=holding.id, subsidiary_company_id=sub.id,
+                        name="SUB", share_pct=50))
+    db.commit()
+    url = f"/companies/{holding.id}/holding/nav"
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    sub.current_price = 120
+    bump_data_version(db, [sub.id])
+    db.commit()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_lru_evicts_least_recently_used():
+    store = response_cache._LruStore(max_entries=2)
+    store.put("a", b"1")
+    store.put("b", b"2")
+    assert store.get("a") == b"1"
+    store.put("c", b"3")
+    assert (store.get("a"), store.get("b"), store.get("c")) == (b"1", None, b"3")
@@ -0,0 +1,235 @@
+"""Перепроверка отчётов по PDF: инкрементальность, пул, карточки и точность.
+
+LLM не вызывается: `compare_pdf_with_existing` подменён функцией, которая
+отдаёт заранее заданный diff по отчёту. БД — SQLite в файле, чтобы потоки
+пула работали каждый со своим соединением.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+from app.models import Company, FinancialReport, ReportFieldScore, ReportScorecard
+from app.models.enums import AccountingStandard, PeriodType, ReportSource
+from app.services.report_parser import extractor_service
+from app.services.report_parser.extractor_service import ComparisonSummary, ReportFieldDiff
+from app.services.report_parser.llm_client import (
+    LLMParseError,
+    LLMQuotaExhaustedError,
+    LLMTransientError,
+)
+from app.services.reverification import service, worker
+from app.services.reverification.planner import extractor_version, plan_candidates
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reverify.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(worker, "SessionLocal", factory)
+    # Постановку в очередь проверяет test_task_queue; здесь задачу исполняем сами.
+    monkeypatch.setattr(service, "start_worker", lambda run_id: None)
+    monkeypatch.setattr(service, "is_worker_alive", lambda run_id: False)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+class FakeCompare:
+    """Вместо LLM: статусы полей по report_id, исключения — по report_id."""
+
+    def __init__(self):
+        self.statuses: dict[int, dict[str, str]] = {}
+        self.errors: dict[int, Exception] = {}
+        self.calls: list[int] = []
+        self.threads: set[str] = set()
+        # Первые N вызовов ждут друг друга: без параллельного пула — таймаут.
+        self.barrier: threading.Barrier | None = None
+        self._lock = threading.Lock()
+
+    def __call__(self, db, *, pdf_source, company, fiscal_year, period_type,
+                 fiscal_quarter, accounting_standard, consolidated):
+        report = db.scalar(select(FinancialReport).where(
+            FinancialReport.company_id == company.id,
+            FinancialReport.fiscal_year == fiscal_year,
+        ))
+        with self._lock:
+            self.calls.append(report.id)
+            self.threads.add(threading.current_thread().name)
+            first = len(self.calls) <= (self.barrier.parties if self.barrier else 0)
+        if first:
+            self.barrier.wait()
+        if report.id in self.errors:
+            raise self.errors[report.id]
+        statuses = self.statuses.get(report.id, {"revenue": "match"})
+        diffs = [
+            ReportFieldDiff(field=f, label=f, kind="money", existing_value=1.0,
+                            extracted_value=1.0, status=s)
+            for f, s in statuses.items()
+        ]
+        summary = ComparisonSummary(
+            total_fields=len(diffs),
+            matched=sum(s == "match" for s in statuses.values()),
+            close=sum(s == "close" for s in statuses.values()),
+            mismatched=sum(s == "mismatch" for s in statuses.values()),
+            missing_in_ai=sum(s == "missing_ai" for s in statuses.values()),
+        )
+        return SimpleNamespace(diffs=diffs, summary=summary)
+
+
+@pytest.fixture
+def compare(monkeypatch):
+    fake = FakeCompare()
+    monkeypatch.setattr(extractor_service, "compare_pdf_with_existing", fake)
+    return fake
+
+
+def _report(db, company, year, pdf_path) -> FinancialReport:
+    report = FinancialReport(
+        company_id=company.id, period_type=PeriodType.ANNUAL, fiscal_year=year,
+        accounting_standard=AccountingStandard.IFRS, consolidated=True,
+        report_date=date(year, 12, 31), source=ReportSource.MANUAL,
+        source_pdf_path=None if pdf_path is None else str(pdf_path),
+    )
+    db.add(report)
+    db.commit()
+    return report
+
+
+@pytest.fixture
+def reports(db, tmp_path):
+    """Четыре отчёта с PDF на диске, один с удалённым PDF, один без пути."""
+    sber = Company(figi="FIGISBER", ticker="SBER", name="Сбербанк", currency="RUB")
+    lkoh = Company(figi="FIGILKOH", ticker="LKOH", name="Лукойл", currency="RUB")
+    db.add_all([sber, lkoh])
+    db.commit()
+    on_disk = []
+    for company, year in ((sber, 2023), (sber, 2024), (lkoh, 2023), (lkoh, 2024)):
+        pdf = tmp_path / f"{company.ticker}_{year}.pdf"
+        pdf.write_bytes(b"%PDF-1.7 " + str(year).encode())
+        on_disk.append(_report(db, company, year, pdf))
+    _report(db, sber, 2022, tmp_path / "gone.pdf")
+    _report(db, lkoh, 2022, None)
+    return on_disk
+
+
+def _run(db, **kwargs):
+    run = service.create_run(db, **kwargs)
+    service.start_run(db, run.id)
+    worker.run_reverify_task({"run_id": run.id})
+    db.expire_all()
+    return service.get_run(db, run.id)
+
+
+def test_run_is_parallel_resumable_and_incremental(db, reports, compare, monkeypatch, tmp_path):
+    sber_2023, sber_2024, lkoh_2023, lkoh_2024 = reports
+    compare.errors[sber_2024.id] = LLMParseError("невалидный JSON")
+    compare.errors[lkoh_2023.id] = LLMTransientError("timeout")
+    compare.barrier = threading.Barrier(2, timeout=5)
+
+    run = _run(db, concurrency=2)
+    assert sorted(compare.calls) == sorted(r.id for r in reports)
+    assert len(compare.threads) == 2
+    assert (run.status, run.total_items, run.done_ok, run.done_error, run.done_skipped) == (
+        "completed", 4, 2, 2, 0,
+    )
+    cards = {c.report_id: c for c in db.scalars(select(ReportScorecard))}
+    # Временная ошибка карточку не пишет — отчёт возьмёт следующий прогон.
+    assert set(cards) == {sber_2023.id, sber_2024.id, lkoh_2024.id}
+    assert cards[sber_2024.id].status == "error"
+    assert cards[sber_2023.id].score == 1.0
+
+    # Повтор: только отчёт с временной ошибкой.
+    compare.calls.clear()
+    compare.barrier = None
+    compare.errors.clear()
+    run = _run(db)
+    assert compare.calls == [lkoh_2023.id]
+    assert (run.done_ok, run.done_skipped) == (1, 3)
+
+    # Заменили PDF — перепроверяется только он, карточка перезаписана.
+    compare.calls.clear()
+    (tmp_path / "SBER_2024.pdf").write_bytes(b"%PDF-1.7 fixed scan")
+    run = _run(db)
+    assert compare.calls == [sber_2024.id]
+    card = db.scalar(select(ReportScorecard).where(ReportScorecard.report_id == sber_2024.id))
+    assert (card.status, card.run_id) == ("ok", run.id)
+    assert db.scalar(select(func.count()).select_from(ReportScorecard)) == 4
+
+    # Сменили модель — новая версия, проверяется всё заново, старые карточки остаются.
+    compare.calls.clear()
+    monkeypatch.setattr(settings, "LLM_MODEL", "qwen-next")
+    assert plan_candidates(db, extractor_version())[1] == 0
+    _run(db)
+    assert sorted(compare.calls) == sorted(r.id for r in reports)
+    assert db.scalar(select(func.count()).select_from(ReportScorecard)) == 8
+
+
+def test_quota_exhaustion_pauses_and_resume_continues(db, reports, compare):
+    compare.errors[reports[1].id] = LLMQuotaExhaustedError("AllocationQuota")
+
+    run = _run(db, concurrency=1)
+    assert run.status == "paused"
+    assert "Квота" in run.last_message
+    assert compare.calls == [reports[0].id, reports[1].id]
+
+    compare.calls.clear()
+    compare.errors.clear()
+    service.start_run(db, run.id)
+    worker.run_reverify_task({"run_id": run.id})
+    db.expire_all()
+    run = service.get_run(db, run.id)
+    assert run.status == "completed"
+    assert compare.calls == [r.id for r in reports[1:]]
+    assert (run.done_ok, run.done_skipped) == (3, 1)
+
+
+def test_changed_prompts_block_resume(db, reports, compare, monkeypatch):
+    run = service.create_run(db)
+    monkeypatch.setattr(settings, "LLM_SECTION_MODE", not settings.LLM_SECTION_MODE)
+    with pytest.raises(ValueError):
+        service.start_run(db, run.id)
+
+
+def test_accuracy_by_field_issuer_and_model(db, reports, compare):
+    sber_2023, sber_2024, lkoh_2023, lkoh_2024 = reports
+    compare.statuses = {
+        sber_2023.id: {"revenue": "match", "net_income": "mismatch", "capex": "both_missing"},
+        sber_2024.id: {"revenue": "close", "net_income": "missing_ai"},
+        lkoh_2023.id: {"revenue": "match", "net_income": "match", "capex": "missing_existing"},
+    }
+    compare.errors[lkoh_2024.id] = LLMParseError("нет таблиц")
+    _run(db)
+    assert db.scalar(select(func.count()).select_from(ReportFieldScore)) == 8
+
+    by_field = {r.key: r for r in service.accuracy(db, "field")}
+    assert set(by_field) == {"revenue", "net_income"}
+    assert (by_field["revenue"].reports, by_field["revenue"].accuracy) == (3, 1.0)
+    assert by_field["net_income"].accuracy == pytest.approx(1 / 3)
+    assert service.accuracy(db, "field")[0].key == "net_income"  # худшие сверху
+
+    by_issuer = {r.label: r for r in service.accuracy(db, "issuer")}
+    assert (by_issuer["SBER"].correct, by_issuer["SBER"].mismatched,
+            by_issuer["SBER"].missing_in_ai) == (2, 1, 1)
+    assert (by_issuer["LKOH"].reports, by_issuer["LKOH"].errors,
+            by_issuer["LKOH"].accuracy) == (2, 1, 1.0)
+
+    (by_model,) = service.accuracy(db, "model")
+    assert (by_model.key, by_model.label) == (extractor_version(), settings.extraction_model_label)
+    assert (by_model.reports, by_model.correct) == (4, 4)
+    with pytest.raises(ValueError):
+        service.accuracy(db, "sector")
@@ -0,0 +1,101 @@
+"""Лидер планировщика: session-level advisory lock и его освобождение.
+
+Postgres здесь нет, поэтому `pg_try_advisory_lock` / `pg_advisory_unlock`
+заданы функциями SQLite с той же семантикой: лок принадлежит DBAPI-соединению
+и пропадает, только когда соединение закрыто по-настоящему. Два движка на
+один файл — два процесса воркера со своими пулами.
+"""
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+pytest.importorskip("apscheduler")  # app.worker тянет app.scheduler
+
+from app import worker  # noqa: E402
+
+_OWNERS: dict[int, int] = {}
+
+
+def _engine(path) -> Engine:
+    engine = create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_size=2)
+
+    @event.listens_for(engine, "connect")
+    def _advisory_locks(dbapi_conn, _record):
+        me = id(dbapi_conn)
+
+        def try_lock(key):
+            if _OWNERS.setdefault(key, me) != me:
+                return 0
+            return 1
+
+        def unlock(key):
+            if _OWNERS.get(key) != me:
+                return 0
+            del _OWNERS[key]
+            return 1
+
+        dbapi_conn.create_function("pg_try_advisory_lock", 1, try_lock)
+        dbapi_conn.create_function("pg_advisory_unlock", 1, unlock)
+
+    @event.listens_for(engine.pool, "close")
+    def _session_ends(dbapi_conn, _record):
+        for key, owner in list(_OWNERS.items()):
+            if owner == id(dbapi_conn):
+                del _OWNERS[key]
+
+    return engine
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    _OWNERS.clear()
+    monkeypatch.setattr(worker, "start_scheduler", lambda: None)
+    monkeypatch.setattr(worker, "stop_scheduler", lambda: None)
+    first, second = _engine(tmp_path / "a.db"), _engine(tmp_path / "a.db")
+    yield first, second
+    first.dispose()
+    second.dispose()
+
+
+def test_released_lock_can_be_taken_by_another_worker(engines, monkeypatch):
+    first, second = engines
+    monkeypatch.setattr(worker, "engine", first)
+    leader = worker.SchedulerLeader()
+    leader.tick()
+    assert leader.is_leader
+
+    monkeypatch.setattr(worker, "engine", second)
+    other = worker.SchedulerLeader()
+    other.tick()
+    assert not other.is_leader
+
+    # Соединение лидера вернулось в пул первого движка, но лок снят.
+    leader.release()
+    other.tick()
+    assert other.is_leader
+    other.release()
+
+
+def test_broken_leader_connection_is_closed_not_pooled(engines, monkeypatch):
+    first, second = engines
+    monkeypatch.setattr(worker, "engine", first)
+    leader = worker.SchedulerLeader()
+    leader.tick()
+    conn = leader._conn
+
+    def broken(*args, **kwargs):
+        raise ConnectionError("server closed the connection")
+
+    # Проверка лидера и снятие лока падают — соединение надо закрыть насовсем.
+    monkeypatch.setattr(conn, "execute", broken)
+    leader.tick()
+    assert not leader.is_leader
+
+    monkeypatch.setattr(worker, "engine", second)
+    other = worker.SchedulerLeader()
+    other.tick()
+    assert other.is_leader
+    other.release()
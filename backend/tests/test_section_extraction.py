@@ -0,0 +1,185 @@
+"""Извлечение по разделам: подсхемы, отбор страниц, слияние и перезапуск.
+
+LLM не вызывается — ответы разделов собираются руками, как их вернула бы
+модель, а параллельный прогон получает функцию-заглушку.
+"""
+from pathlib import Path
+from unittest.mock import patch
+
+from app.services.report_parser import extractor_service
+from app.services.report_parser.pdf_extractor import PdfExtractionResult
+from app.services.report_parser.schemas import ExtractedReport
+from app.services.report_parser.sections import (
+    SECTIONS,
+    SECTIONS_BY_NAME,
+    SectionJob,
+    merge_section_reports,
+    run_sections,
+    section_text,
+)
+
+# Возвращает каждый раздел, в слитый отчёт попадают голосованием.
+_COMMON = {
+    "fiscal_year", "period_type", "fiscal_quarter", "report_date", "report_type",
+    "accounting_standard", "consolidated", "currency", "units_scale",
+    "extraction_notes", "confidence",
+}
+
+
+def test_every_extracted_field_has_exactly_one_owner_section():
+    """Поле без владельца молча пропадёт из слитого отчёта, с двумя — конфликт."""
+    owned = [f for spec in SECTIONS for f in spec.fields]
+
+    assert len(owned) == len(set(owned))
+    assert set(owned) | _COMMON == set(ExtractedReport.model_fields)
+    assert all(_COMMON <= set(spec.schema.model_fields) for spec in SECTIONS)
+
+
+def test_section_schema_exposes_only_its_fields():
+    schema = SECTIONS_BY_NAME["cash_flow"].schema
+
+    assert "capex" in schema.model_fields
+    assert "currency" in schema.model_fields
+    assert "revenue" not in schema.model_fields
+
+
+def _section(**kw) -> ExtractedReport:
+    return ExtractedReport.model_validate({"fiscal_year": 2024, **kw})
+
+
+def test_merge_takes_each_field_from_its_owner():
+    merged, conflicts = merge_section_reports({
+        "balance": _section(total_assets=900_000, equity=400_000),
+        "income": _section(revenue=500_000, net_income=80_000),
+        "equity_notes": _section(dividends_paid=True, dividends_per_share=20),
+    })
+
+    assert merged.total_assets == 900_000
+    assert merged.revenue == 500_000
+    assert merged.dividends_per_share == 20
+    assert merged.dividends_paid is True
+    assert conflicts == []
+
+
+def test_merge_reports_currency_conflict_and_takes_majority():
+    merged, conflicts = merge_section_reports({
+        "balance": _section(currency="USD"),
+        "income": _section(currency="RUB"),
+        "cash_flow": _section(currency="RUB"),
+    })
+
+    assert merged.currency == "RUB"
+    assert len(conflicts) == 1
+    assert "currency" in conflicts[0]
+
+
+def test_merge_keeps_interim_period_and_reporting_basis():
+    """Квартальный отчёт не должен превратиться в годовой с датой 31.12."""
+    period = dict(
+        period_type="quarterly", fiscal_quarter=3, report_date="30.09.2024",
+        accounting_standard="RAS", consolidated=False,
+    )
+    merged, conflicts = merge_section_reports({
+        "balance": _section(total_assets=900_000, **period),
+        "income": _section(revenue=500_000, **period),
+        "cash_flow": _section(**{**period, "report_date": "2024-06-30"}),
+    })
+
+    assert (merged.period_type, merged.fiscal_quarter) == ("quarterly", 3)
+    assert (merged.accounting_standard, merged.consolidated) == ("RAS", False)
+    assert extractor_service._resolve_report_date(merged, fiscal_year=2024) == "2024-09-30"
+    assert len(conflicts) == 1 and "report_date" in conflicts[0]
+
+
+def test_merge_tie_goes_to_earlier_section_deterministically():
+    merged, _ = merge_section_reports({
+        "income": _section(currency="RUB"),
+        "balance": _section(currency="USD"),
+    })
+
+    assert merged.currency == "USD"  # баланс раньше ОПиУ в SECTIONS
+
+
+def test_merge_keeps_lowest_confidence_and_labels_notes():
+    merged, _ = merge_section_reports({
+        "balance": _section(confidence="high", extraction_notes="баланс в млн"),
+        "cash_flow": _section(confidence="low", extraction_notes="ОДДС без аренды"),
+    })
+
+    assert merged.confidence == "low"
+    assert "[Отчёт о движении денежных средств] ОДДС без аренды" in merged.extraction_notes
+
+
+def test_section_text_uses_its_pages_and_neighbors():
+    chunks = {i: f"СТРАНИЦА {i}" for i in (10, 11, 12, 40, 41)}
+    extraction = PdfExtractionResult(
+        pdf_path=Path("x.pdf"),
+        total_pages=100,
+        selected_pages=sorted(chunks),
+        text="\n".join(chunks.values()),
+        matched_sections={10: ["итого активы"], 40: ["interest paid"]},
+        page_chunks=chunks,
+        hits_by_page={10: {8: 1}, 40: {4: 1}},
+    )
+
+    balance = section_text(extraction, SECTIONS_BY_NAME["balance"])
+    cash_flow = section_text(extraction, SECTIONS_BY_NAME["cash_flow"])
+
+    assert "СТРАНИЦА 11" in balance and "СТРАНИЦА 40" not in balance
+    assert "СТРАНИЦА 41" in cash_flow and "СТРАНИЦА 10" not in cash_flow
+    # Дивиденды не нашлись по фразам — модель получает весь текст.
+    assert section_text(extraction, SECTIONS_BY_NAME["equity_notes"]) == extraction.text
+
+
+def test_failed_section_is_rerun_alone():
+    jobs = [SectionJob(spec, "system", "user") for spec in SECTIONS]
+    calls: list[str] = []
+
+    def flaky(job: SectionJob) -> ExtractedReport:
+        calls.append(job.spec.name)
+        if job.spec.name == "cash_flow" and calls.count("cash_flow") == 1:
+            raise RuntimeError("timeout")
+        return _section()
+
+    run = run_sections(jobs, flaky)
+    assert run.failed == ["cash_flow"]
+    assert len(run.results) == len(SECTIONS) - 1
+
+    retry = [job for job in jobs if job.spec.name in run.failed]
+    run_sections(retry, flaky, run=run)
+
+    assert run.failed == []
+    assert len(run.results) == len(SECTIONS)
+    assert calls.count("balance") == 1
+
+
+def test_sections_are_rescaled_before_merge():
+    """Баланс в млрд, ОПиУ в млн: сливать сырые числа нельзя — масштаб у каждого свой."""
+    answers = {
+        "balance": _section(units_scale="billions", total_assets=900),
+        "income": _section(units_scale="millions", revenue=500_000),
+        "cash_flow": _section(units_scale="millions", capex=60_000),
+        "equity_notes": _section(shares_units_scale="thousands", shares_outstanding=444_793_377),
+    }
+    by_schema = {SECTIONS_BY_NAME[name].schema: report for name, report in answers.items()}
+    extraction = PdfExtractionResult(
+        pdf_path=Path("x.pdf"), total_pages=1, selected_pages=[0], text="текст",
+        matched_sections={0: ["итого активы"]},
+    )
+
+    with patch.object(
+        extractor_service, "extract_section_via_llm",
+        side_effect=lambda **kw: by_schema[kw["response_model"]],
+    ):
+        merged, _ = extractor_service._extract_by_sections(
+            extraction,
+            report_type="general",
+            prompt_kwargs=dict(
+                ticker="TEST", expected_year=2024, company_name="Тест", sector=None,
+            ),
+        )
+
+    assert merged.total_assets == 900_000
+    assert merged.revenue == 500_000
+    assert merged.shares_outstanding == 444_793_377_000
+    assert merged.units_scale == "millions"
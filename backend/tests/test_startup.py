@@ -0,0 +1,98 @@
+"""Быстрый старт API: ленивые импорты парсера, readiness отдельно от liveness.
+
+Импорт app.main проверяется в чистом подпроцессе через scripts/import_time.py —
+в процессе pytest тяжёлые модули уже загружены другими тестами.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app import main
+from app.config import settings
+from app.services import report_parser
+from app.services.report_parser import errors
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "import_time.py"
+
+
+@pytest.fixture(scope="module")
+def import_time():
+    spec = importlib.util.spec_from_file_location("import_time", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    # dataclass ищет свой модуль в sys.modules.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    yield module
+    sys.modules.pop(spec.name, None)
+
+
+def test_api_import_leaves_pdf_llm_and_websockets_unloaded(import_time):
+    rows = import_time.measure()
+
+    assert any(r.module == "app.main" for r in rows)
+    assert import_time.forbidden_loaded(rows) == []
+    assert import_time.total_us(rows) == sum(import_time.by_package(rows).values())
+
+
+def test_parse_importtime_reads_self_and_cumulative(import_time):
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     fitz.table\n"
+        "import time:      3000 |       3120 |   fitz\n"
+        "warning: not an import line\n"
+    )
+
+    rows = import_time.parse_importtime(stderr)
+
+    assert [(r.module, r.self_us, r.cumulative_us) for r in rows] == [
+        ("fitz.table", 120, 120), ("fitz", 3000, 3120),
+    ]
+    assert import_time.forbidden_loaded(rows) == ["fitz"]
+
+
+def test_report_parser_names_resolve_on_first_use_and_errors_keep_identity():
+    from app.services.report_parser import extractor_service, llm_client
+
+    assert report_parser.parse_pdf_to_report is extractor_service.parse_pdf_to_report
+    assert llm_client.LLMTransientError is errors.LLMTransientError
+    assert extractor_service.ReportAlreadyExistsError is errors.ReportAlreadyExistsError
+    assert issubclass(errors.LLMRateLimitError, errors.LLMTransientError)
+    with pytest.raises(AttributeError):
+        report_parser.no_such_name
+
+
+def test_readiness_checks_database_and_liveness_does_not(monkeypatch):
+    ok = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    monkeypatch.setattr(main, "engine", ok)
+    assert main.readiness_check() == {"status": "ok", "database": "ok", "warmup": "pending"}
+
+    down = create_engine("sqlite:////nonexistent-dir/graham.db")
+    monkeypatch.setattr(main, "engine", down)
+    response = main.readiness_check()
+    assert response.status_code == 503
+    assert main.health_check() == {"status": "ok"}
+
+
+def test_startup_work_runs_in_background_and_is_cancelled_on_shutdown(monkeypatch):
+    monkeypatch.setattr(settings, "TINVEST_STREAM_ENABLED", False)
+    monkeypatch.setattr(settings, "JOB_EVENTS_PG_NOTIFY", False)
+    monkeypatch.setattr(settings, "TASK_WORKER_IN_API", False)
+    monkeypatch.setattr(settings, "PREWARM_PARSER_IMPORTS", True)
+    monkeypatch.setattr(settings, "PREWARM_PARSER_DELAY_SECONDS", 60.0)
+    monkeypatch.setattr(main, "dispose_async_engine", lambda: asyncio.sleep(0))
+    monkeypatch.setattr(main, "_warmup", None)
+
+    async def scenario():
+        async with main.lifespan(main.app):
+            # Старт не ждал разогрева: он ещё спит перед импортом парсера.
+            running = main._warmup_state()
+        return running, main._warmup.cancelled()
+
+    assert asyncio.run(scenario()) == ("pending", True)
@@ -0,0 +1,250 @@
+"""Таблицы текстового PDF без LLM: строки по координатам слов, поля, дозапрос.
+
+Страницы собираются из кортежей слов в формате `page.get_text("words")`:
+подпись слева, колонка примечаний, числа выровнены по правому краю колонок
+текущего и прошлого года, разряды — отдельными словами, как в PyMuPDF.
+"""
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.config import settings
+from app.services.report_parser import extractor_service
+from app.services.report_parser.pdf_extractor import PdfExtractionResult, extract_financial_pages
+from app.services.report_parser.schemas import ExtractedReport
+from app.services.report_parser.table_extractor import extract_tables, parse_amount
+
+_GOLDEN_PDF = Path(__file__).parent / "golden_pdf"
+
+_NOTE_X, _CUR_X, _PREV_X = 330.0, 470.0, 555.0
+
+
+def _words(lines: list[tuple]) -> list[tuple]:
+    """Строки → слова PyMuPDF: (подпись, [прим.], [текущий год], [прошлый год])."""
+    words: list[tuple] = []
+    for n, (label, *cells) in enumerate(lines):
+        y0, y1 = 100.0 + n * 14, 110.0 + n * 14
+        x = 60.0
+        for token in label.split():
+            words.append((x, y0, x + 6 * len(token), y1, token, 0, n, len(words)))
+            x += 6 * len(token) + 3
+        for right, cell in zip((_NOTE_X, _CUR_X, _PREV_X), cells):
+            if not cell:
+                continue
+            # Разряды — отдельные слова с узким зазором, как их отдаёт PyMuPDF.
+            pieces = cell.split()
+            x1 = right
+            for piece in reversed(pieces):
+                words.append((x1 - 5 * len(piece), y0, x1, y1, piece, 0, n, len(words)))
+                x1 -= 5 * len(piece) + 2
+    return words
+
+
+def _header(*years: str) -> tuple:
+    return ("Прим.", "", *years)
+
+
+_BALANCE = _words([
+    ("ПАО «Тест»",),
+    ("Консолидированный отчет о финансовом положении",),
+    ("(в тысячах российских рублей)",),
+    _header("2024", "2023"),
+    ("Активы",),
+    ("Денежные средства и их эквиваленты", "7", "1 426 264", "1 526 518"),
+    ("Итого оборотные активы", "", "3 309 453", "3 100 000"),
+    ("Итого активы", "", "9 282 619", "8 000 000"),
+    ("Итого акционерный капитал, относящийся к",),
+    ("акционерам ПАО «Тест»", "", "6 825 996", "5 900 000"),
+    ("Итого капитал", "", "6 892 008", "5 950 000"),
+    ("Краткосрочные кредиты и займы", "12", "100 006", "90 000"),
+    ("Долгосрочные кредиты и займы", "12", "280 000", "300 000"),
+    ("Итого краткосрочные обязательства", "", "1 486 739", "1 200 000"),
+    ("Итого обязательства", "", "2 390 611", "2 050 000"),
+    ("Итого обязательства и капитал", "", "9 282 619", "8 000 000"),
+])
+
+_INCOME = _words([
+    ("Консолидированный отчет о прибылях и убытках",),
+    ("(в тысячах российских рублей)",),
+    _header("2024", "2023"),
+    ("Выручка от реализации", "5", "8 621 561", "7 928 000"),
+    ("Износ и амортизация", "", "(332 651)", "(300 000)"),
+    ("Чистая прибыль", "", "851 546", "1 160 000"),
+    ("Чистая прибыль, относящаяся к:",),
+    ("акционерам ПАО «Тест»", "", "848 514", "1 155 000"),
+    ("неконтролирующим долям", "", "3 032", "5 000"),
+])
+
+_CASH_FLOW = _words([
+    ("Консолидированный отчет о движении денежных средств",),
+    ("(в тысячах российских рублей)",),
+    _header("2024", "2023"),
+    ("Движение денежных средств от операционной деятельности",),
+    ("Износ и амортизация", "", "593 446", "550 000"),
+    ("Проценты уплаченные", "", "(1 111)", "(900)"),
+    ("Чистые денежные средства, полученные от",),
+    ("операционной деятельности", "", "1 788 172", "1 500 000"),
+    ("Движение денежных средств от инвестиционной деятельности",),
+    ("Капитальные затраты", "", "(779 724)", "(700 000)"),
+    ("Движение денежных средств от финансовой деятельности",),
+    ("Проценты уплаченные", "", "(28 998)", "(25 000)"),
+    ("Погашение обязательств по аренде", "", "-", "(10)"),
+])
+
+
+def test_parse_amount_formats():
+    assert parse_amount("(1426264)") == -1_426_264
+    assert parse_amount("-") == 0.0
+    assert parse_amount("1,234,567") == 1_234_567
+    assert parse_amount("1'502'416") == 1_502_416
+    assert parse_amount("11,80") == pytest.approx(11.8)
+    assert parse_amount("abc") is None
+
+
+def test_statements_are_read_from_current_year_column():
+    tables = extract_tables({4: _BALANCE, 5: _INCOME, 7: _CASH_FLOW}, expected_year=2024)
+    values = {k: v.value for k, v in tables.values.items()}
+
+    assert tables.statements == {4: "balance", 5: "income", 7: "cash_flow"}
+    assert (tables.units_scale, tables.currency) == ("thousands", "RUB")
+    assert values["cash_and_equivalents"] == 1_426_264  # не номер примечания «7»
+    assert values["total_assets"] == 9_282_619
+    # Перенесённая подпись и «итого капитал» с долей меньшинства не путаются.
+    assert values["equity"] == 6_825_996
+    assert values["debt"] == 380_006
+    assert values["revenue"] == 8_621_561
+    assert (values["net_income"], values["net_income_reported"]) == (848_514, 851_546)
+    assert values["operating_cash_flow"] == 1_788_172
+    assert values["capex"] == 779_724
+    # Проценты — только из финансовой деятельности, D&A — из ОДДС, а не ОПиУ.
+    assert values["interest_paid"] == 28_998
+    assert values["depreciation_amortization"] == 593_446
+    assert values["lease_principal"] == 0.0
+    assert all(v.confidence == "high" for v in tables.values.values())
+
+
+def test_prior_year_only_page_is_skipped_and_broken_balance_is_not_trusted():
+    tables = extract_tables({4: _BALANCE, 5: _INCOME}, expected_year=2025)
+    assert tables.values == {}
+
+    broken = [w if w[4] != "619" or w[1] > 200 else (*w[:4], "600", *w[5:]) for w in _BALANCE]
+    tables = extract_tables({4: broken}, expected_year=2024)
+    assert tables.values["total_assets"].confidence == "low"
+    assert "total_assets" not in tables.trusted()
+
+
+def test_note_sentence_is_not_a_statement_title():
+    note = _words([
+        ("Примечания к консолидированной отчетности",),
+        ("в консолидированном отчете о движении денежных средств отражены",),
+        _header("2024", "2023"),
+        ("Проценты уплаченные", "", "(5 000)", "(4 000)"),
+    ])
+    assert extract_tables({30: note}, expected_year=2024).statements == {}
+
+
+def _extraction(page_words: dict[int, list[tuple]]) -> PdfExtractionResult:
+    chunks = {idx: f"СТРАНИЦА {idx}" for idx in (*page_words, 40)}
+    return PdfExtractionResult(
+        pdf_path=Path("x.pdf"), total_pages=60, selected_pages=sorted(chunks),
+        text="\n".join(chunks.values()), matched_sections={}, page_chunks=chunks,
+        hits_by_page={4: {0: 1}, 5: {1: 1}, 7: {4: 1}, 40: {3: 1}},
+        page_words=page_words,
+    )
+
+
+_PROMPT = dict(ticker="TEST", expected_year=2024, company_name="Тест", sector=None)
+
+
+def test_fast_path_asks_llm_only_for_missing_fields(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TABLE_FAST_PATH", True)
+    calls: list[dict] = []
+
+    def gap_fill(**kw):
+        calls.append(kw)
+        return ExtractedReport(
+            fiscal_year=2024, units_scale="units", dividends_per_share=541.0,
+            dividends_paid=True, shares_outstanding=692_865_762, confidence="high",
+        )
+
+    extraction = _extraction({4: _BALANCE, 5: _INCOME, 7: _CASH_FLOW})
+    with patch.object(extractor_service, "extract_section_via_llm", side_effect=gap_fill), \
+            patch.object(extractor_service, "extract_report_via_llm") as full_request:
+        report, _, _ = extractor_service._extract_normalized(
+            extraction, report_type="general", prompt_kwargs=_PROMPT, section_mode=None,
+        )
+
+    full_request.assert_not_called()
+    (call,) = calls
+    asked = set(call["response_model"].model_fields)
+    assert {"shares_outstanding", "dividends_per_share", "lease_interest"} <= asked
+    assert not asked & {"total_assets", "revenue", "capex", "debt_principal", "provisions"}
+    # Дозапрос получает страницы своих разделов, а не весь отобранный текст.
+    assert "СТРАНИЦА 40" in call["user_prompt"] and "СТРАНИЦА 4\n" not in call["user_prompt"]
+
+    assert report.units_scale == "millions"
+    assert report.total_assets == pytest.approx(9_282.619)
+    assert report.capex == pytest.approx(779.724)
+    assert report.dividends_per_share == 541.0
+    assert report.shares_outstanding == 692_865_762
+    assert "Из таблиц PDF" in report.extraction_notes
+
+
+def test_fast_path_keeps_interim_period_and_filing_date(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TABLE_FAST_PATH", True)
+    calls: list[dict] = []
+
+    def gap_fill(**kw):
+        calls.append(kw)
+        return ExtractedReport(
+            fiscal_year=2024, period_type="quarterly", fiscal_quarter=3,
+            report_date="2024-09-30", filing_date="2024-11-15",
+            accounting_standard="RAS", consolidated=False, units_scale="units",
+        )
+
+    extraction = _extraction({4: _BALANCE, 5: _INCOME, 7: _CASH_FLOW})
+    with patch.object(extractor_service, "extract_section_via_llm", side_effect=gap_fill):
+        report, _, _ = extractor_service._extract_normalized(
+            extraction, report_type="general", prompt_kwargs=_PROMPT, section_mode=None,
+        )
+
+    (call,) = calls
+    assert {"report_date", "filing_date", "fiscal_quarter"} <= set(call["response_model"].model_fields)
+    assert "report_date" in call["system_prompt"]
+    assert (report.period_type, report.fiscal_quarter) == ("quarterly", 3)
+    assert (report.report_date, report.filing_date) == ("2024-09-30", "2024-11-15")
+    assert (report.accounting_standard, report.consolidated) == ("RAS", False)
+    assert report.total_assets == pytest.approx(9_282.619)
+    assert extractor_service._resolve_report_date(report, period_type="quarterly") == "2024-09-30"
+
+
+def test_fast_path_falls_back_when_tables_are_unreadable(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TABLE_FAST_PATH", True)
+    garbage = _words([("Раскрываемая отчетность",), ("$4E>DO645 31 45>45DO",)])
+    extraction = _extraction({4: garbage})
+    answer = ExtractedReport(fiscal_year=2024, revenue=1.0)
+
+    with patch.object(extractor_service, "extract_report_via_llm", return_value=answer) as full, \
+            patch.object(extractor_service, "extract_section_via_llm") as gap_fill:
+        report, _, _ = extractor_service._extract_normalized(
+            extraction, report_type="general", prompt_kwargs=_PROMPT, section_mode=False,
+        )
+
+    full.assert_called_once()
+    gap_fill.assert_not_called()
+    assert report.revenue == 1.0
+
+
+def test_golden_lukoil_statements_are_read_without_llm():
+    extraction = extract_financial_pages(_GOLDEN_PDF / "LKOH_2024.pdf")
+    tables = extract_tables(extraction.page_words, expected_year=2024)
+    trusted = {k: v.value for k, v in tables.trusted().items()}
+
+    assert tables.units_scale == "millions"
+    assert trusted["total_assets"] == 9_282_619
+    assert trusted["debt"] == 380_006
+    assert trusted["net_income"] == 848_514
+    assert trusted["operating_cash_flow"] == 1_788_172
+    assert trusted["capex"] == 779_724
+    assert trusted["interest_paid"] == 28_998
@@ -0,0 +1,168 @@
+"""Очередь background_tasks: постановка, выдача в аренду, повторы, воркер.
+
+База — SQLite в памяти (общая на потоки через StaticPool): advisory lock и
+SKIP LOCKED — особенности Postgres, а порядок выдачи, лимит очереди, аренда
+и дедупликация проверяются на переносимой части запросов.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.background_task import BackgroundTask
+from app.services.tasks import queue as tq
+from app.services.tasks.registry import (
+    MASS_PARSE_JOB,
+    PRICE_BACKFILL,
+    TASK_KINDS,
+    TaskKind,
+    parse_queue_limits,
+)
+from app.services.tasks.runner import TaskWorker
+
+_CALLS: list[dict] = []
+
+
+def record_task(payload: dict) -> None:
+    _CALLS.append(payload)
+
+
+def broken_task(payload: dict) -> None:
+    raise RuntimeError("сломалось")
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _put(db, kind=PRICE_BACKFILL, **kw) -> BackgroundTask:
+    task = tq.enqueue(db, kind, **kw)
+    db.commit()
+    return task
+
+
+def _claim(db, queue="market", *, worker_id="w1", limit=1, lease_seconds=60):
+    return tq.claim(db, queue, worker_id=worker_id, limit=limit, lease_seconds=lease_seconds)
+
+
+def test_active_dedupe_key_is_enqueued_once(db):
+    first = _put(db, MASS_PARSE_JOB, payload={"job_id": 1}, dedupe_key="mass_parse:1")
+    assert first is not None and first.queue == "mass_parse"
+    assert _put(db, MASS_PARSE_JOB, payload={"job_id": 1}, dedupe_key="mass_parse:1") is None
+
+    task = _claim(db, "mass_parse")
+    tq.complete(db, task.id, worker_id="w1")
+
+    again = _put(db, MASS_PARSE_JOB, payload={"job_id": 1}, dedupe_key="mass_parse:1")
+    assert again is not None and again.id != first.id
+
+
+def test_claim_order_priority_then_fifo_and_run_after(db):
+    later = _put(db, run_after=datetime.now(timezone.utc) + timedelta(hours=1))
+    low = _put(db)
+    high = _put(db, priority=5)
+
+    order = []
+    for _ in range(3):
+        task = _claim(db, limit=10)
+        if task is None:
+            break
+        order.append(task.id)
+    assert order == [high.id, low.id]
+    assert later.id not in order
+
+
+def test_queue_limit_is_respected(db):
+    _put(db)
+    _put(db)
+    assert _claim(db, limit=1, worker_id="w1") is not None
+    assert _claim(db, limit=1, worker_id="w2") is None
+    assert _claim(db, limit=2, worker_id="w2") is not None
+
+
+def test_expired_lease_is_reclaimed_until_attempts_exhausted(db):
+    task = _put(db)
+    claimed = _claim(db, lease_seconds=-1)  # аренда уже истекла
+    assert claimed.attempts == 1
+
+    stolen = _claim(db, worker_id="w2")
+    assert stolen.id == task.id and stolen.locked_by == "w2" and stolen.attempts == 2
+    assert not tq.heartbeat(db, task.id, worker_id="w1", lease_seconds=60)
+    assert tq.heartbeat(db, task.id, worker_id="w2", lease_seconds=60)
+
+    row = db.get(BackgroundTask, task.id)
+    row.attempts = row.max_attempts
+    row.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    assert _claim(db, worker_id="w3") is None
+    db.refresh(row)
+    assert row.status == "error"
+
+
+def test_fail_retries_with_backoff_then_errors(db):
+    task = _put(db)
+    _claim(db)
+    assert tq.fail(db, task.id, worker_id="w1", error="boom") == "queued"
+    row = db.get(BackgroundTask, task.id)
+    assert row.last_error == "boom" and row.locked_by is None
+    assert _claim(db) is None  # ждёт run_after
+
+    row.attempts = row.max_attempts - 1
+    row.run_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    _claim(db)
+    assert tq.fail(db, task.id, worker_id="w1", error="boom") == "error"
+    assert tq.retry_delay(1) < tq.retry_delay(2) <= tq.retry_delay(99) == timedelta(hours=1)
+
+
+def test_worker_runs_handler_and_records_failures(session_factory, db):
+    kinds = {
+        "test.ok": TaskKind("test.ok", "test", f"{__name__}:record_task"),
+        "test.broken": TaskKind("test.broken", "test", f"{__name__}:broken_task", max_attempts=1),
+    }
+    _CALLS.clear()
+    with patch.dict(TASK_KINDS, kinds):
+        ok = _put(db, "test.ok", payload={"n": 1})
+        broken = _put(db, "test.broken")
+        worker = TaskWorker(queues={"test": 1}, worker_id="w", session_factory=session_factory)
+        assert worker.run_once("test", 1)
+        assert worker.run_once("test", 1)
+        assert not worker.run_once("test", 1)
+
+    db.expire_all()
+    assert _CALLS == [{"n": 1}]
+    assert db.get(BackgroundTask, ok.id).status == "done"
+    failed = db.get(BackgroundTask, broken.id)
+    assert failed.status == "error" and "сломалось" in failed.last_error
+
+
+def test_every_kind_resolves_to_handler_in_configured_queue():
+    queues = parse_queue_limits("mass_parse=1,disclosure=2,market=1,analysis=2")
+    for kind in TASK_KINDS.values():
+        assert kind.queue in queues
+        assert callable(kind.handler())
+    with pytest.raises(ValueError):
+        parse_queue_limits("market=0")
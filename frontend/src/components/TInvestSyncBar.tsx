@@ -24,7 +24,7 @@ const TInvestSyncBar: React.FC = () => {
       const s = data.statistics;
       setSyncTone(data.status === 'warning' ? 'warn' : 'ok');
       setSyncMessage(
-        `${data.message}\nИз API получено: ${s.total}, создано: ${s.created}, обновлено: ${s.updated}, ошибок: ${s.errors}`,
+        `${data.message}\nИз API получено: ${s.total}, создано: ${s.created}, обновлено: ${s.updated}, без изменений: ${s.unchanged}, ошибок: ${s.errors}`,
       );
       queryClient.invalidateQueries({ queryKey: ['companiesSyncStatus'] });
       queryClient.invalidateQueries({ queryKey: ['companies'] });
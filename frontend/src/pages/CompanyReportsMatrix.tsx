@@ -68,6 +68,7 @@ const SOURCE_OPTIONS = [
   { value: 'company_website', label: 'Сайт компании' },
   { value: 'api', label: 'API' },
   { value: 'regulator', label: 'Регулятор' },
+  { value: 'comparative_column', label: 'Сравнит. колонка' },
   { value: 'other', label: 'Прочее' },
 ];
 
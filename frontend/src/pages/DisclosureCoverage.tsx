@@ -4,13 +4,19 @@ import {
   downloadDisclosurePeriods,
   enqueueDisclosureParse,
   getDisclosureCoverage,
+  getDisclosureDownloadJob,
   getDisclosureParseJob,
   getDisclosureSummary,
   getDisclosureSyncStatus,
   startDisclosureSync,
   type CoverageItem,
   type CoverageStatus,
+  type DisclosureDownloadItem,
+  type DisclosureDownloadJob,
+  type DisclosureParseJob,
+  type DisclosureSyncRun,
 } from '../services/disclosure.api';
+import { useJobEvents } from '../services/jobEvents';
 import './DisclosureCoverage.css';
 
 type Mode = 'missing' | 'expected' | 'all';
@@ -35,6 +41,7 @@ const DisclosureCoverage: React.FC = () => {
   const [selected, setSelected] = useState<Set<number>>(new Set());
   const [actionError, setActionError] = useState<string | null>(null);
   const [parseJobId, setParseJobId] = useState<number | null>(null);
+  const [downloadJobId, setDownloadJobId] = useState<number | null>(null);
 
   const summaryQ = useQuery({
     queryKey: ['disclosure-summary'],
@@ -42,10 +49,35 @@ const DisclosureCoverage: React.FC = () => {
     refetchInterval: 5000,
   });
 
+  // Завершилась задача — покрытие и сводка изменились, worker_alive тоже.
+  const refreshAfterJob = () => {
+    qc.invalidateQueries({ queryKey: ['disclosure-summary'] });
+    qc.invalidateQueries({ queryKey: ['disclosure-coverage'] });
+  };
+
+  const syncLive = useJobEvents(
+    '/disclosure/sync/events',
+    {
+      sync_run: (run: Omit<DisclosureSyncRun, 'worker_alive'>) => {
+        const current = qc.getQueryData<DisclosureSyncRun | null>(['disclosure-sync']);
+        if (current?.id === run.id && run.status === 'running') {
+          qc.setQueryData<DisclosureSyncRun>(['disclosure-sync'], { ...current, ...run });
+          return;
+        }
+        qc.invalidateQueries({ queryKey: ['disclosure-sync'] });
+        if (run.status !== 'running' && run.status !== 'pending') refreshAfterJob();
+      },
+    },
+    () => qc.invalidateQueries({ queryKey: ['disclosure-sync'] }),
+  );
+
   const syncQ = useQuery({
     queryKey: ['disclosure-sync'],
     queryFn: getDisclosureSyncStatus,
-    refetchInterval: (q) => (q.state.data?.status === 'running' ? 2000 : 10000),
+    refetchInterval: (q) => {
+      if (syncLive) return false;
+      return q.state.data?.status === 'running' ? 2000 : 10000;
+    },
   });
 
   const coverageQ = useQuery({
@@ -59,11 +91,57 @@ const DisclosureCoverage: React.FC = () => {
     refetchInterval: 8000,
   });
 
+  const parseLive = useJobEvents(
+    parseJobId != null ? `/disclosure/parse-jobs/${parseJobId}/events` : null,
+    {
+      job: (job: Omit<DisclosureParseJob, 'worker_alive'>) => {
+        if (job.status === 'running') {
+          qc.setQueryData<DisclosureParseJob>(['disclosure-parse-job', job.id], (old) =>
+            old ? { ...old, ...job } : old,
+          );
+          return;
+        }
+        qc.invalidateQueries({ queryKey: ['disclosure-parse-job', job.id] });
+        if (job.status !== 'pending') refreshAfterJob();
+      },
+    },
+    () => qc.invalidateQueries({ queryKey: ['disclosure-parse-job', parseJobId] }),
+  );
+
   const parseJobQ = useQuery({
     queryKey: ['disclosure-parse-job', parseJobId],
     queryFn: () => getDisclosureParseJob(parseJobId!),
     enabled: parseJobId != null,
-    refetchInterval: (q) => (q.state.data?.status === 'running' ? 2000 : false),
+    refetchInterval: (q) => (!parseLive && q.state.data?.status === 'running' ? 2000 : false),
+  });
+
+  const downloadKey = ['disclosure-download-job', downloadJobId];
+  const downloadLive = useJobEvents(
+    downloadJobId != null ? `/disclosure/download-jobs/${downloadJobId}/events` : null,
+    {
+      job: (job: Omit<DisclosureDownloadJob, 'items'>) => {
+        qc.setQueryData<DisclosureDownloadJob>(downloadKey, (old) =>
+          old ? { ...old, ...job } : old,
+        );
+        if (job.status === 'completed') refreshAfterJob();
+      },
+      item: (item: DisclosureDownloadItem) => {
+        qc.setQueryData<DisclosureDownloadJob>(downloadKey, (old) =>
+          old
+            ? { ...old, items: old.items.map((it) => (it.id === item.id ? item : it)) }
+            : old,
+        );
+      },
+    },
+    () => qc.invalidateQueries({ queryKey: downloadKey }),
+  );
+
+  const downloadJobQ = useQuery({
+    queryKey: downloadKey,
+    queryFn: () => getDisclosureDownloadJob(downloadJobId!),
+    enabled: downloadJobId != null,
+    refetchInterval: (q) =>
+      !downloadLive && q.state.data && q.state.data.status !== 'completed' ? 2000 : false,
   });
 
   const syncMut = useMutation({
@@ -78,11 +156,10 @@ const DisclosureCoverage: React.FC = () => {
 
   const downloadMut = useMutation({
     mutationFn: (ids: number[]) => downloadDisclosurePeriods(ids),
-    onSuccess: async (res) => {
+    onSuccess: (job) => {
       setActionError(null);
-      if (res.errors?.length) setActionError(res.errors.join('; '));
-      await qc.invalidateQueries({ queryKey: ['disclosure-coverage'] });
-      await qc.invalidateQueries({ queryKey: ['disclosure-summary'] });
+      qc.setQueryData(['disclosure-download-job', job.id], job);
+      setDownloadJobId(job.id);
     },
     onError: (e: Error) => setActionError(e.message),
   });
@@ -205,6 +282,28 @@ const DisclosureCoverage: React.FC = () => {
           </p>
         )}
 
+        {downloadJobQ.data && (
+          <div className="disclosure-message">
+            Скачивание #{downloadJobQ.data.id}: {downloadJobQ.data.status} · ok{' '}
+            {downloadJobQ.data.done_ok}/{downloadJobQ.data.total_items}
+            {downloadJobQ.data.done_error ? ` · ошибок ${downloadJobQ.data.done_error}` : ''}
+            <ul>
+              {downloadJobQ.data.items
+                .filter((it) => it.status === 'downloading' || it.status === 'error')
+                .map((it) => (
+                  <li key={it.id}>
+                    {it.key}:{' '}
+                    {it.status === 'error'
+                      ? it.error
+                      : `${Math.round(it.bytes_done / 1024)}${
+                          it.bytes_total ? ` / ${Math.round(it.bytes_total / 1024)}` : ''
+                        } КБ`}
+                  </li>
+                ))}
+            </ul>
+          </div>
+        )}
+
         {parseJobQ.data && (
           <p className="disclosure-message">
             Parse job #{parseJobQ.data.id}: {parseJobQ.data.status} · ok{' '}
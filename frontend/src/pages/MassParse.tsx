@@ -10,9 +10,11 @@ import {
   pauseMassParseJob,
   resumeMassParseJob,
   retryMassParseErrors,
+  type MassParseItem,
   type MassParseItemStatus,
   type MassParseJob,
 } from '../services/massParse.api';
+import { useJobEvents } from '../services/jobEvents';
 import './MassParse.css';
 
 const STATUS_FILTERS: Array<{ key: string; label: string }> = [
@@ -57,19 +59,71 @@ const MassParse: React.FC = () => {
     staleTime: 15_000,
   });
 
+  // Ход заданий приходит по SSE; опрос — только пока поток не открыт.
+  const jobsLive = useJobEvents(
+    '/mass-parse/jobs/events',
+    {
+      job: (job: Omit<MassParseJob, 'worker_alive'>) => {
+        const list = queryClient.getQueryData<MassParseJob[]>(['mass-parse-jobs']);
+        if (list && !list.some((j) => j.id === job.id)) {
+          queryClient.invalidateQueries({ queryKey: ['mass-parse-jobs'] });
+        } else {
+          queryClient.setQueryData<MassParseJob[]>(['mass-parse-jobs'], (old) =>
+            old?.map((j) => (j.id === job.id ? { ...j, ...job } : j)),
+          );
+        }
+        queryClient.setQueryData<MassParseJob>(['mass-parse-job', job.id], (old) =>
+          old ? { ...old, ...job } : old,
+        );
+        // worker_alive в событиях нет — по завершении перечитываем задание.
+        if (job.status !== 'running' && job.status !== 'pending') {
+          queryClient.invalidateQueries({ queryKey: ['mass-parse-job', job.id] });
+        }
+      },
+    },
+    () => {
+      queryClient.invalidateQueries({ queryKey: ['mass-parse-jobs'] });
+      queryClient.invalidateQueries({ queryKey: ['mass-parse-job'] });
+    },
+  );
+
   const jobsQuery = useQuery({
     queryKey: ['mass-parse-jobs'],
     queryFn: listMassParseJobs,
-    refetchInterval: 5000,
+    refetchInterval: jobsLive ? false : 5000,
   });
 
   const activeJobId = selectedJobId ?? jobsQuery.data?.[0]?.id ?? null;
 
+  const itemsLive = useJobEvents(
+    activeJobId != null ? `/mass-parse/jobs/${activeJobId}/events` : null,
+    {
+      item: (item: MassParseItem & { job_id: number }) => {
+        queryClient
+          .getQueriesData<MassParseItem[]>({ queryKey: ['mass-parse-items', item.job_id] })
+          .forEach(([key, items]) => {
+            if (!items) return;
+            const filter = key[2] as string;
+            queryClient.setQueryData<MassParseItem[]>(
+              key,
+              items
+                .map((i) => (i.id === item.id ? { ...i, ...item } : i))
+                .filter((i) => !filter || i.status === filter),
+            );
+          });
+      },
+    },
+    () => {
+      queryClient.invalidateQueries({ queryKey: ['mass-parse-items', activeJobId] });
+    },
+  );
+
   const jobQuery = useQuery({
     queryKey: ['mass-parse-job', activeJobId],
     queryFn: () => getMassParseJob(activeJobId!),
     enabled: activeJobId != null,
     refetchInterval: (q) => {
+      if (jobsLive) return false;
       const st = q.state.data?.status;
       return st === 'running' ? 2000 : 8000;
     },
@@ -83,7 +137,12 @@ const MassParse: React.FC = () => {
         limit: 500,
       }),
     enabled: activeJobId != null,
-    refetchInterval: () => (jobQuery.data?.status === 'running' ? 2500 : 10000),
+    refetchInterval: () => {
+      // С фильтром по статусу в список могут войти новые элементы — их
+      // события не добавляют, поэтому редкий опрос остаётся.
+      if (itemsLive) return itemFilter ? 15000 : false;
+      return jobQuery.data?.status === 'running' ? 2500 : 10000;
+    },
   });
 
   useEffect(() => {
@@ -63,6 +63,27 @@ export interface DisclosureParseJob {
   worker_alive: boolean;
 }
 
+export interface DisclosureDownloadItem {
+  id: number;
+  disclosure_period_id: number;
+  key: string;
+  status: 'queued' | 'downloading' | 'done' | 'error';
+  bytes_done: number;
+  bytes_total: number | null;
+  error: string | null;
+  pdf_path: string | null;
+}
+
+export interface DisclosureDownloadJob {
+  id: number;
+  status: string;
+  total_items: number;
+  done_ok: number;
+  done_error: number;
+  last_message: string | null;
+  items: DisclosureDownloadItem[];
+}
+
 function errDetail(error: unknown): string {
   const ax = error as { response?: { data?: { detail?: string } } };
   return ax?.response?.data?.detail || (error instanceof Error ? error.message : 'Ошибка');
@@ -100,15 +121,22 @@ export const getDisclosureSyncStatus = async (): Promise<DisclosureSyncRun | nul
 
 export const downloadDisclosurePeriods = async (
   periodIds: number[],
-): Promise<{ downloaded: number; paths: Record<string, string>; errors: string[] }> => {
+): Promise<DisclosureDownloadJob> => {
   try {
-    const { data } = await api.post('/disclosure/download', { period_ids: periodIds });
+    const { data } = await api.post<DisclosureDownloadJob>('/disclosure/download', {
+      period_ids: periodIds,
+    });
     return data;
   } catch (e) {
     throw new Error(errDetail(e));
   }
 };
 
+export const getDisclosureDownloadJob = async (jobId: number): Promise<DisclosureDownloadJob> => {
+  const { data } = await api.get<DisclosureDownloadJob>(`/disclosure/download-jobs/${jobId}`);
+  return data;
+};
+
 export const enqueueDisclosureParse = async (
   periodIds: number[],
 ): Promise<DisclosureParseJob> => {
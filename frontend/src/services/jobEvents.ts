@@ -0,0 +1,52 @@
+import { useEffect, useRef, useState } from 'react';
+import { api } from './companies.api';
+
+/** Виды событий SSE `…/events`: строка задания, элемента очереди или прогона sync. */
+export type JobEventKind = 'job' | 'item' | 'sync_run';
+
+export type JobEventHandlers = Partial<Record<JobEventKind, (data: any) => void>>;
+
+const KINDS: JobEventKind[] = ['job', 'item', 'sync_run'];
+
+/**
+ * Подписка на ход фоновой задачи (SSE вместо опроса REST).
+ *
+ * Возвращает true, пока поток открыт: на это время опрос можно выключить.
+ * После обрыва EventSource переподключается сам и присылает Last-Event-ID —
+ * сервер дошлёт пропущенное. `onReset` — пропущенное не восстановить (или это
+ * первое подключение): перечитать состояние через REST один раз.
+ */
+export function useJobEvents(
+  path: string | null,
+  handlers: JobEventHandlers,
+  onReset: () => void,
+): boolean {
+  const [connected, setConnected] = useState(false);
+  const handlersRef = useRef(handlers);
+  const resetRef = useRef(onReset);
+  handlersRef.current = handlers;
+  resetRef.current = onReset;
+
+  useEffect(() => {
+    if (!path || typeof EventSource === 'undefined') {
+      setConnected(false);
+      return undefined;
+    }
+    const source = new EventSource(`${api.defaults.baseURL}${path}`);
+    source.onopen = () => setConnected(true);
+    // Пока EventSource переподключается, страница снова опрашивает REST.
+    source.onerror = () => setConnected(false);
+    source.addEventListener('reset', () => resetRef.current());
+    KINDS.forEach((kind) =>
+      source.addEventListener(kind, (e) => {
+        handlersRef.current[kind]?.(JSON.parse((e as MessageEvent).data));
+      }),
+    );
+    return () => {
+      source.close();
+      setConnected(false);
+    };
+  }, [path]);
+
+  return connected;
+}
@@ -29,6 +29,8 @@ export const getCompanyCurrentMultipliers = async (
     return response.data;
 };
 
+const HISTORY_REBUILD_MAX_RETRIES = 5;
+
 export const getCompanyMultipliersHistory = async (
     companyId: number,
     type?: 'report_based' | 'current' | 'daily',
@@ -36,11 +38,18 @@ export const getCompanyMultipliersHistory = async (
 ): Promise<MultiplierRecord[]> => {
     const params: Record<string, string | number> = { limit };
     if (type) params['type'] = type;
-    const response = await api.get<MultiplierRecord[]>(
-        `/companies/${companyId}/multipliers/history`,
-        { params },
-    );
-    return response.data;
+    // 202 — история пересобирается на сервере; повторяем через Retry-After.
+    for (let attempt = 0; ; attempt++) {
+        const response = await api.get<MultiplierRecord[]>(
+            `/companies/${companyId}/multipliers/history`,
+            { params },
+        );
+        if (response.status !== 202 || attempt >= HISTORY_REBUILD_MAX_RETRIES) {
+            return response.data;
+        }
+        const retryAfter = Number(response.headers['retry-after']) || 2;
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+    }
 };
 
 export const refreshCompanyMultipliers = async (
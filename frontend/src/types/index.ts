@@ -250,6 +250,7 @@ export interface CompaniesSyncStatistics {
     total: number;
     created: number;
     updated: number;
+    unchanged: number;
     errors: number;
 }
 
@@ -361,7 +362,7 @@ export interface FinancialReportCreate {
     fiscal_quarter?: number | null;  // 1-4 для квартальных, null для годовых
     accounting_standard: 'IFRS' | 'RAS' | 'US_GAAP' | 'UK_GAAP' | 'OTHER';
     consolidated: boolean;
-    source: 'manual' | 'company_website' | 'api' | 'regulator' | 'other';
+    source: 'manual' | 'company_website' | 'api' | 'regulator' | 'comparative_column' | 'other';
     
     // Даты
     report_date: string; // YYYY-MM-DD (дата окончания периода)
@@ -584,6 +585,8 @@ export interface ParsePdfResponse {
     selected_pages: number;
     total_pages: number;
     warnings: string[];
+    /** Черновик за прошлый год из сравнительной колонки этого же PDF */
+    prior_year_report_id?: number | null;
 }
 
 /** Статус настройки LLM (GET /reports/ai/status) */
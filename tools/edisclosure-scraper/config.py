@@ -51,8 +51,13 @@ USER_AGENT = (
 PAGE_DELAY_MIN = 8    # пауза перед запросом страницы списка файлов
 PAGE_DELAY_MAX = 15
 
-FILE_DELAY_MIN = 10   # пауза между скачиваниями файлов одной компании
-FILE_DELAY_MAX = 20
+# Скачивание файлов (/portal/FileLoad.ashx) — через download_manager.py:
+# не больше DOWNLOAD_PER_HOST одновременных запросов к хосту и старт не чаще
+# раза в DOWNLOAD_MIN_INTERVAL секунд. Вместо паузы 10–20 с на каждый файл
+# одной компании — очередь из файлов всех компаний сразу.
+DOWNLOAD_MAX_WORKERS = int(os.getenv("EDISCLOSURE_DOWNLOAD_WORKERS", "4"))
+DOWNLOAD_PER_HOST = int(os.getenv("EDISCLOSURE_DOWNLOAD_PER_HOST", "2"))
+DOWNLOAD_MIN_INTERVAL = float(os.getenv("EDISCLOSURE_DOWNLOAD_MIN_INTERVAL", "2"))
 
 COMPANY_DELAY_MIN = 45  # пауза между компаниями
 COMPANY_DELAY_MAX = 90
@@ -0,0 +1,231 @@
+"""
+Параллельная докачиваемая загрузка файлов.
+
+- Ограничение параллельности: общее (`max_workers`) и на хост (`per_host`),
+  плюс минимальный интервал между стартами запросов к одному хосту —
+  вежливость к e-disclosure сохраняется, но файлы разных компаний качаются
+  одновременно, а не по одному с паузой 10–20 с.
+- Докачка: байты пишутся в `<dest>.part`; после обрыва следующий запрос идёт
+  с `Range: bytes=<уже скачано>-`. Сервер без поддержки Range (ответ 200)
+  — качаем заново с нуля.
+- Готовый файл проверяется по размеру (Content-Range / Content-Length) и
+  только потом атомарно переименовывается в `dest` — недокачанный файл
+  никогда не выглядит готовым.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+class IncompleteDownloadError(IOError):
+    """Соединение закрылось раньше, чем пришёл весь файл."""
+
+
+@dataclass(frozen=True)
+class DownloadTask:
+    key: str          # по нему — прогресс и результат (например, "LKOH:2024")
+    url: str
+    dest: Path
+
+
+@dataclass
+class DownloadProgress:
+    key: str
+    # queued | downloading | done | error
+    status: str
+    bytes_done: int = 0
+    bytes_total: Optional[int] = None
+    attempt: int = 0
+    error: Optional[str] = None
+
+
+ProgressCallback = Callable[[DownloadProgress], None]
+
+
+def part_path(dest: Path) -> Path:
+    return dest.with_name(dest.name + ".part")
+
+
+def _total_from_response(resp: requests.Response, offset: int) -> Optional[int]:
+    """Полный размер файла из Content-Range (206) или Content-Length (200)."""
+    m = _CONTENT_RANGE_RE.match(resp.headers.get("Content-Range", ""))
+    if m and m.group(3) != "*":
+        return int(m.group(3))
+    length = resp.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return int(length) + (offset if resp.status_code == 206 else 0)
+    return None
+
+
+class _HostGate:
+    """Семафор на хост + минимальный интервал между стартами запросов."""
+
+    def __init__(self, per_host: int, min_interval: float):
+        self._per_host = per_host
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._sems: dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: dict[str, float] = {}
+
+    def _sem(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._sems:
+                self._sems[host] = threading.BoundedSemaphore(self._per_host)
+            return self._sems[host]
+
+    def acquire(self, host: str) -> None:
+        self._sem(host).acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self._min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host: str) -> None:
+        self._sem(host).release()
+
+
+class DownloadManager:
+    def __init__(
+        self,
+        session_factory: Callable[[], requests.Session] = requests.Session,
+        *,
+        max_workers: int = 8,
+        per_host: int = 2,
+        min_interval: float = 1.0,
+        retries: int = 4,
+        backoff: float = 2.0,
+        timeout: float = 120.0,
+        chunk_size: int = 256 * 1024,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        self._session_factory = session_factory
+        self._local = threading.local()
+        self._max_workers = max_workers
+        self._gate = _HostGate(per_host, min_interval)
+        self._retries = retries
+        self._backoff = backoff
+        self._timeout = timeout
+        self._chunk_size = chunk_size
+        self._progress = progress
+
+    def _session(self) -> requests.Session:
+        # requests.Session не гарантирует потокобезопасность — своя на поток.
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._session_factory()
+        return session
+
+    def _report(self, state: DownloadProgress) -> None:
+        if self._progress is not None:
+            try:
+                self._progress(state)
+            except Exception:  # noqa: BLE001 — прогресс не должен ронять загрузку
+                logger.debug("progress callback failed", exc_info=True)
+
+    def _fetch_once(self, task: DownloadTask, state: DownloadProgress) -> None:
+        part = part_path(task.dest)
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        host = urlsplit(task.url).netloc
+
+        self._gate.acquire(host)
+        try:
+            with self._session().get(
+                task.url, headers=headers, stream=True, timeout=self._timeout
+            ) as resp:
+                if resp.status_code == 416 and offset:
+                    # .part уже целиком (обрыв случился после последнего байта)
+                    # или устарел — сервер скажет полный размер.
+                    total = _total_from_response(resp, 0)
+                    if total is not None and total == offset:
+                        state.bytes_done = state.bytes_total = total
+                        return
+                    part.unlink(missing_ok=True)
+                    raise IncompleteDownloadError(f"Range {offset}- отвергнут, качаем заново")
+                resp.raise_for_status()
+                if resp.status_code != 206:
+                    offset = 0  # сервер проигнорировал Range — отдаёт файл с начала
+                total = _total_from_response(resp, offset)
+                state.bytes_total = total
+                state.bytes_done = offset
+                state.status = "downloading"
+                self._report(state)
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in resp.iter_content(chunk_size=self._chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            state.bytes_done += len(chunk)
+                            self._report(state)
+        finally:
+            self._gate.release(host)
+
+        size = part.stat().st_size
+        if total is not None and size != total:
+            raise IncompleteDownloadError(f"получено {size} из {total} байт")
+
+    def download(self, task: DownloadTask) -> Path:
+        """Скачать один файл (с докачкой и ретраями). Возвращает task.dest."""
+        state = DownloadProgress(key=task.key, status="queued")
+        task.dest.parent.mkdir(parents=True, exist_ok=True)
+        last_exc: Optional[BaseException] = None
+        for attempt in range(1, self._retries + 1):
+            state.attempt = attempt
+            try:
+                self._fetch_once(task, state)
+                os.replace(part_path(task.dest), task.dest)
+                state.status = "done"
+                self._report(state)
+                return task.dest
+            except requests.HTTPError as exc:
+                code = exc.response.status_code if exc.response is not None else None
+                last_exc = exc
+                if code is not None and 400 <= code < 500 and code != 429:
+                    break  # 404/403 повтором не лечатся
+            except (requests.RequestException, IncompleteDownloadError) as exc:
+                last_exc = exc
+            logger.warning(
+                "Загрузка %s: попытка %d/%d не удалась: %s",
+                task.key, attempt, self._retries, last_exc,
+            )
+            if attempt < self._retries:
+                time.sleep(self._backoff * attempt)
+        state.status = "error"
+        state.error = str(last_exc)
+        self._report(state)
+        raise last_exc  # type: ignore[misc]
+
+    def run(self, tasks: list[DownloadTask]) -> dict[str, Union[Path, BaseException]]:
+        """Скачать все задачи параллельно. Ошибка одной не останавливает остальные."""
+        for task in tasks:
+            self._report(DownloadProgress(key=task.key, status="queued"))
+        results: dict[str, Union[Path, BaseException]] = {}
+        if not tasks:
+            return results
+        with ThreadPoolExecutor(
+            max_workers=min(self._max_workers, len(tasks)), thread_name_prefix="download"
+        ) as pool:
+            futures = {task.key: pool.submit(self.download, task) for task in tasks}
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    results[key] = exc
+        return results
@@ -5,14 +5,20 @@
 from __future__ import annotations
 
 import logging
-import random
 import shutil
-import time
 from pathlib import Path
+from typing import Optional
 
 import requests
 
-from config import FILE_DELAY_MIN, FILE_DELAY_MAX, REPORTS_BASE_DIR, USER_AGENT
+from config import (
+    DOWNLOAD_MAX_WORKERS,
+    DOWNLOAD_MIN_INTERVAL,
+    DOWNLOAD_PER_HOST,
+    REPORTS_BASE_DIR,
+    USER_AGENT,
+)
+from download_manager import DownloadManager, DownloadTask, ProgressCallback
 from pdf_extract import (
     extract_main_pdf_from_zip,
     pdf_target_path,
@@ -94,92 +100,99 @@ def _filename_for(report: ReportEntry) -> str:
     return f"{report.period_key}_consolidated.{ext}"
 
 
-def _download_to_path(session: requests.Session, url: str, dest: Path) -> None:
-    resp = session.get(url, timeout=120, stream=True)
-    resp.raise_for_status()
-    with open(dest, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=65536):
-            if chunk:
-                f.write(chunk)
-
-
-def download_reports(ticker: str, reports: list[ReportEntry]) -> dict[str, str]:
+def _finalize(ticker: str, report: ReportEntry, dest: Path, pdf_path: Path) -> Optional[str]:
+    """Скачанный/лежащий рядом файл → TICKER_{period_key}.pdf (zip распаковываем)."""
+    key = report.period_key
+    suffix = dest.suffix.lower()
+    if suffix == ".zip":
+        extracted = extract_main_pdf_from_zip(
+            dest, ticker, report.year, dest.parent, delete_zip=True, period_key=key
+        )
+        if not extracted:
+            logger.warning("[%s] Не удалось извлечь PDF из %s", ticker, dest.name)
+        return str(extracted) if extracted else None
+    if suffix == ".pdf":
+        shutil.copy2(dest, pdf_path)
+        if dest != pdf_path:
+            dest.unlink(missing_ok=True)
+        logger.info("[%s] ✓ Сохранён %s", ticker, pdf_path.name)
+        return str(pdf_path)
+    logger.warning("[%s] Неизвестный тип %s", ticker, dest.name)
+    return None
+
+
+def download_reports_bulk(
+    jobs: dict[str, list[ReportEntry]],
+    *,
+    progress: Optional[ProgressCallback] = None,
+) -> dict[str, dict[str, str]]:
     """
-    Скачивает отчёты → TICKER_{period_key}.pdf.
-    Возвращает {period_key: path}.
-    """
-    if not reports:
-        return {}
-
-    ticker_dir = _ticker_dir(ticker)
-    process_orphan_zips_in_ticker_dir(ticker, ticker_dir)
-
-    session = _make_session()
-    result: dict[str, str] = {}
-
-    for report in sorted(
-        reports,
-        key=lambda r: (r.fiscal_year, r.interim_rank),
-        reverse=True,
-    ):
-        key = report.period_key
-        pdf_path = pdf_target_path(ticker, report.year, ticker_dir, period_key=key)
+    Скачивает отчёты нескольких компаний одной параллельной пачкой.
 
-        if pdf_path.exists():
-            logger.info("[%s] PDF %s уже есть — %s", ticker, key, pdf_path.name)
-            result[key] = str(pdf_path)
-            continue
-
-        filename = _filename_for(report)
-        dest = ticker_dir / filename
+    Ключ прогресса — "TICKER:period_key". Возвращает {ticker: {period_key: path}}.
+    Уже лежащие на диске PDF/zip не качаются; оборванные загрузки докачиваются
+    из `.part` (см. download_manager.py).
+    """
+    result: dict[str, dict[str, str]] = {ticker: {} for ticker in jobs}
+    pending: dict[str, tuple[str, ReportEntry, Path, Path]] = {}
+    tasks: list[DownloadTask] = []
 
-        if dest.exists() and dest.suffix.lower() == ".zip":
-            extracted = extract_main_pdf_from_zip(
-                dest, ticker, report.year, ticker_dir, delete_zip=True, period_key=key
-            )
-            if extracted:
-                result[key] = str(extracted)
+    for ticker, reports in jobs.items():
+        if not reports:
             continue
-
-        if dest.exists() and dest.suffix.lower() == ".pdf":
-            shutil.copy2(dest, pdf_path)
-            if dest != pdf_path:
-                dest.unlink(missing_ok=True)
-            logger.info("[%s] ✓ Сохранён %s", ticker, pdf_path.name)
-            result[key] = str(pdf_path)
+        ticker_dir = _ticker_dir(ticker)
+        process_orphan_zips_in_ticker_dir(ticker, ticker_dir)
+        for report in sorted(reports, key=lambda r: (r.fiscal_year, r.interim_rank), reverse=True):
+            key = report.period_key
+            pdf_path = pdf_target_path(ticker, report.year, ticker_dir, period_key=key)
+            if pdf_path.exists():
+                logger.info("[%s] PDF %s уже есть — %s", ticker, key, pdf_path.name)
+                result[ticker][key] = str(pdf_path)
+                continue
+            dest = ticker_dir / _filename_for(report)
+            if dest.exists():
+                saved = _finalize(ticker, report, dest, pdf_path)
+                if saved:
+                    result[ticker][key] = saved
+                continue
+            task_key = f"{ticker}:{key}"
+            pending[task_key] = (ticker, report, dest, pdf_path)
+            tasks.append(DownloadTask(key=task_key, url=report.file_url, dest=dest))
+
+    if not tasks:
+        return result
+
+    _get_sp_cookies()  # один раз до старта потоков: Playwright не потокобезопасен
+    manager = DownloadManager(
+        _make_session,
+        max_workers=DOWNLOAD_MAX_WORKERS,
+        per_host=DOWNLOAD_PER_HOST,
+        min_interval=DOWNLOAD_MIN_INTERVAL,
+        progress=progress,
+    )
+    logger.info("Скачиваем %d файлов (до %d параллельно).", len(tasks), DOWNLOAD_MAX_WORKERS)
+    for task_key, outcome in manager.run(tasks).items():
+        ticker, report, dest, pdf_path = pending[task_key]
+        if isinstance(outcome, BaseException):
+            logger.error("[%s] Не скачан %s: %s", ticker, report.file_url, outcome)
             continue
-
-        delay = random.uniform(FILE_DELAY_MIN, FILE_DELAY_MAX)
-        time.sleep(delay)
-
-        logger.info("[%s] Скачиваем %s → %s", ticker, report.file_url, filename)
+        size_kb = dest.stat().st_size / 1024
+        logger.info("[%s] ✓ Временный %s (%.0f КБ)", ticker, dest.name, size_kb)
         try:
-            _download_to_path(session, report.file_url, dest)
-            size_kb = dest.stat().st_size / 1024
-            logger.info("[%s] ✓ Временный %s (%.0f КБ)", ticker, filename, size_kb)
-
-            suffix = dest.suffix.lower()
-            if suffix == ".pdf":
-                shutil.copy2(dest, pdf_path)
-                dest.unlink(missing_ok=True)
-                logger.info("[%s] ✓ Сохранён %s", ticker, pdf_path.name)
-                result[key] = str(pdf_path)
-            elif suffix == ".zip":
-                extracted = extract_main_pdf_from_zip(
-                    dest, ticker, report.year, ticker_dir, delete_zip=True, period_key=key
-                )
-                if extracted:
-                    result[key] = str(extracted)
-                else:
-                    logger.warning("[%s] Не удалось извлечь PDF из %s", ticker, filename)
-            else:
-                logger.warning("[%s] Неизвестный тип %s", ticker, filename)
-
-        except requests.HTTPError as exc:
-            logger.error("[%s] HTTP-ошибка %s: %s", ticker, report.file_url, exc)
-        except requests.RequestException as exc:
-            logger.error("[%s] Ошибка сети %s: %s", ticker, report.file_url, exc)
+            saved = _finalize(ticker, report, dest, pdf_path)
         except OSError as exc:
             logger.error("[%s] Ошибка записи %s: %s", ticker, dest, exc)
-
+            continue
+        if saved:
+            result[ticker][report.period_key] = saved
     return result
+
+
+def download_reports(ticker: str, reports: list[ReportEntry]) -> dict[str, str]:
+    """
+    Скачивает отчёты → TICKER_{period_key}.pdf.
+    Возвращает {period_key: path}.
+    """
+    if not reports:
+        return {}
+    return download_reports_bulk({ticker: reports})[ticker]